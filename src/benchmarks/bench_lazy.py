@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""Lazy processing benchmark for `spider.orb.orb_models`: crawls every page of a synthetic corpus with `OrbAgent`,
+which extracts the content and the links of a page before `crawl` returns, and with `OrbLazyAgent`, which parses
+the page on the first `next` of either processor and only extracts what is drained.
+
+Every page of a corpus generated with `benchmarks.corpus_gen` (found with `orb_scan`) is crawled by both agents,
+draining:
+
+* `both`: the content processor, then the link processor, as `orb_runner` does.
+* `content`: only the content processor, e.g., to harvest pages found by `orb_scan`.
+* `links`: only the link processor, e.g., to map the link graph of a corpus.
+* `first_link`: only the first link of every page, e.g., to sample a corpus.
+
+Each mode reports the milliseconds per pass over the corpus and the pages crawled per second, for each agent.
+
+Example:
+    $ python3 -m benchmarks.bench_lazy --pages 500 --repeat 5 --output lazy.json
+"""
+
+from __future__ import annotations
+import json
+import argparse
+import tempfile
+from benchmarks.bench_utils import time_it, environment, write_report
+from benchmarks.corpus_gen import generate_corpus
+from spider.orb.orb_models import OrbAgent, OrbLazyAgent, OrbDocDB, OrbUriDB
+from spider.orb.orb_scan import scan_corpus
+
+__author__ = "Garrett Buchanan, Livingstone Rwagatare"
+__copyright__ = "Copyright 2023, Westmont College"
+__credits__ = ["Garrett Buchanan", "Livingstone Rwagatare", "Mike Ryu"]
+__license__ = "MIT"
+__email__ = "mryu@westmont.edu"
+
+MODES = ("both", "content", "links", "first_link")
+AGENTS = {"eager": OrbAgent, "lazy": OrbLazyAgent}
+
+
+def main() -> None:
+    pars = setup_argument_parser()
+    args = pars.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="orb_bench_lazy_") as tmp_dir:
+        with open(generate_corpus(tmp_dir, pages=args.pages, seed=args.seed), 'r', encoding="UTF-8") as config_file:
+            config = json.load(config_file)
+        uris = scan_corpus(tmp_dir)
+        results = {
+            "environment": environment(),
+            "corpus": {"pages": len(uris), "seed": args.seed},
+            "modes": {mode: {name: time_it(lambda agent=agent, mode=mode: crawl(agent, uris, config, mode),
+                                           args.repeat, items=len(uris))
+                             for name, agent in AGENTS.items()}
+                      for mode in args.modes},
+        }
+    for mode, timings in results["modes"].items():
+        timings["speedup"] = round(timings["eager"]["ms"]["min"] / max(timings["lazy"]["ms"]["min"], 1e-9), 2)
+    write_report(results, args.output)
+
+
+def setup_argument_parser() -> argparse.ArgumentParser:
+    pars = argparse.ArgumentParser(prog="python3 -m benchmarks.bench_lazy")
+    pars.add_argument("--pages", type=int, default=300, help="number of pages in the generated corpus")
+    pars.add_argument("--repeat", type=int, default=3, help="number of timed passes over the corpus per agent")
+    pars.add_argument("--modes", type=str, nargs='+', default=list(MODES), choices=MODES,
+                      help="what to drain from every page")
+    pars.add_argument("--seed", type=int, default=128, help="random seed for the corpus")
+    pars.add_argument("--output", type=str, default=None, help="optional path to write the JSON results to")
+    return pars
+
+
+def crawl(agent_class: type[OrbAgent], uris: list, config: dict, mode: str) -> None:
+    """Crawls every one of `uris` with a new `agent_class`, draining its processors as `mode` says."""
+    doc_db, uri_db = OrbDocDB(), OrbUriDB()
+    agent_config = config["agent_config"]
+    for uri in uris:
+        content_processor, link_processor = agent_class(uri, doc_db, uri_db, agent_config).crawl()
+        if mode in ("both", "content"):
+            for _ in content_processor:
+                pass
+        if mode in ("both", "links"):
+            for _ in link_processor:
+                pass
+        elif mode == "first_link":
+            next(link_processor, None)
+
+
+if __name__ == '__main__':
+    main()
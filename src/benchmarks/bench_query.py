@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""Query latency benchmark for `text_processing.freq_rank` over an index of a synthetic crawl.
+
+A corpus is generated with `benchmarks.corpus_gen` (or reused with `--corpus-dir`), crawled with `orb_runner`'s
+`run_sequential_crawl` into an `IndexBuilder`, and then a synthetic query log is run against the index with every
+evaluation strategy. Query terms are drawn from the indexed documents (so common terms are queried more often,
+like in real logs), and a share of the queries also contain a two-word phrase taken from a document.
+Latencies are reported per strategy as mean/p50/p90/p99 milliseconds, along with whether the strategies agreed.
+
+Example:
+    $ python3 -m benchmarks.bench_query --pages 2000 --queries 1000 -k 10 --output ../out/bench_query.json
+"""
+
+from __future__ import annotations
+import os
+import json
+import random
+import argparse
+import tempfile
+from time import perf_counter
+from benchmarks.bench_utils import percentiles, environment, write_report
+from benchmarks.corpus_gen import generate_corpus, CONFIG_NAME
+from spider.orb.orb_models import OrbURI, OrbUriFrontier, OrbDocDB, OrbUriDB
+from spider.orb.orb_runner import run_sequential_crawl
+from text_processing.freq_index import IndexBuilder
+from text_processing.freq_rank import QueryEngine, METHODS
+
+__author__ = "Garrett Buchanan, Livingstone Rwagatare"
+__copyright__ = "Copyright 2023, Westmont College"
+__credits__ = ["Garrett Buchanan", "Livingstone Rwagatare", "Mike Ryu"]
+__license__ = "MIT"
+__email__ = "mryu@westmont.edu"
+
+
+def main() -> None:
+    pars = setup_argument_parser()
+    args = pars.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="orb_bench_query_") as tmp_dir:
+        corpus_dir = args.corpus_dir or os.path.join(tmp_dir, "corpus")
+        config_path = os.path.join(corpus_dir, CONFIG_NAME)
+        if not (args.corpus_dir and os.path.isfile(config_path)):
+            config_path = generate_corpus(corpus_dir, pages=args.pages, seed=args.seed)
+        with open(config_path, 'r', encoding="UTF-8") as config_file:
+            config = json.load(config_file)
+
+        documents = _DocumentList()
+        builder = IndexBuilder(os.path.join(tmp_dir, "index"))
+        start = perf_counter()
+        run_sequential_crawl(documents, OrbUriFrontier(list(map(OrbURI, config["seeds"]))), OrbDocDB(), OrbUriDB(),
+                             config, index=builder)
+        with builder.finish() as index:
+            build_ms = (perf_counter() - start) * 1000
+            queries = make_query_log(index, documents, args.queries, args.phrase_ratio, random.Random(args.seed))
+            results = {
+                "environment": environment(),
+                "corpus": {"pages": args.pages, "seed": args.seed, "documents": index.num_docs, "terms": len(index)},
+                "crawl_and_index_ms": round(build_ms, 3),
+                "queries": len(queries),
+                "k": args.k,
+                "methods": run_query_log(QueryEngine(index), queries, args.k),
+            }
+    write_report(results, args.output)
+
+
+def setup_argument_parser() -> argparse.ArgumentParser:
+    pars = argparse.ArgumentParser(prog="python3 -m benchmarks.bench_query")
+    pars.add_argument("--pages", type=int, default=500, help="number of pages in the generated corpus")
+    pars.add_argument("--corpus-dir", type=str, default=None,
+                      help="optional directory to generate the corpus in (or reuse an existing corpus from)")
+    pars.add_argument("--queries", type=int, default=500, help="number of queries in the synthetic query log")
+    pars.add_argument("--phrase-ratio", type=float, default=0.1, help="fraction of queries containing a phrase")
+    pars.add_argument("-k", type=int, default=10, help="number of results per query")
+    pars.add_argument("--seed", type=int, default=128, help="random seed for the corpus and the query log")
+    pars.add_argument("--output", type=str, default=None, help="optional path to write the JSON results to")
+    return pars
+
+
+class _DocumentList(list):
+    """Document stream for `run_sequential_crawl` that keeps every document apart, to draw phrases from."""
+    def write(self, content: str) -> None:
+        self.append(content)
+
+
+def make_query_log(index, documents: list[str], count: int, phrase_ratio: float, rng: random.Random) -> list[str]:
+    """Returns `count` queries of 1 to 4 terms drawn from random positions of random documents."""
+    docs = [tokens for tokens in map(index.tokenize, documents) if len(tokens) > 1]
+    queries = []
+    for _ in range(count):
+        terms = [rng.choice(rng.choice(docs)) for _ in range(rng.randint(1, 4))] if docs else []
+        if docs and rng.random() < phrase_ratio:
+            tokens = rng.choice(docs)
+            start = rng.randrange(len(tokens) - 1)
+            terms.append('"{} {}"'.format(tokens[start], tokens[start + 1]))
+        queries.append(" ".join(terms))
+    return queries
+
+
+def run_query_log(engine: QueryEngine, queries: list[str], k: int) -> dict:
+    """Runs every query with every method (after one warm-up pass) and summarizes the latencies per method."""
+    for query in queries:  # decode (and cache) every postings list first, so that strategies are compared fairly
+        engine.search(query, k, "taat")
+    expected = None
+    results = {}
+    for method in METHODS:
+        latencies, hits = [], []
+        for query in queries:
+            start = perf_counter()
+            hits.append(engine.search(query, k, method))
+            latencies.append((perf_counter() - start) * 1000)
+        expected = hits if expected is None else expected
+        results[method] = {"ms": percentiles(latencies), "agrees": hits == expected}
+    return results
+
+
+if __name__ == '__main__':
+    main()
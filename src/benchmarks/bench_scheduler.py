@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""Politeness benchmark for `spider.orb.orb_scheduler`: crawls a synthetic corpus mirrored on several local ports,
+each standing in for a host with its own latency and capacity, with and without per-host scheduling.
+
+Every stand-in host serves the same corpus generated with `benchmarks.corpus_gen` (without broken links), after
+an injected delay of its `--latency-ms`. Past `--capacity` concurrent requests a host slows down by one more delay
+per extra request, and past twice its capacity it answers "503 Service Unavailable", so hammering one host
+collapses its throughput the way an overloaded server does. The crawl is seeded with the first page of every host
+and run in three modes with the same number of worker threads:
+
+* `fifo`: one queue for all hosts and no limits, i.e., workers fetching the frontier in order with no notion of
+  host (URIs are still fetched by the scheduler's workers, so only the scheduling differs).
+* `fixed`: one queue per host, ready soonest first, each limited to `--max-concurrency` requests in flight.
+* `adaptive`: like `fixed`, but the per-host limit is adjusted by AIMD (the default).
+
+Each mode reports the wall time, the pages fetched per second, the requests that failed (pages lost), and the
+state of every host at the end.
+
+Example:
+    $ python3 -m benchmarks.bench_scheduler --pages 200 --latency-ms 10 20 40 80 --workers 8 --output sched.json
+"""
+
+from __future__ import annotations
+import json
+import time
+import argparse
+import tempfile
+import threading
+from functools import partial
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+from benchmarks.bench_utils import environment, write_report
+from benchmarks.corpus_gen import generate_corpus, PAGE_NAME
+from spider.orb.orb_models import OrbURI, OrbUriFrontier, OrbDocDB, OrbUriDB
+from spider.orb.orb_http import OrbHttpPool
+from spider.orb.orb_scheduler import OrbHostScheduler
+from spider.orb.orb_runner import run_sequential_crawl
+
+__author__ = "Garrett Buchanan, Livingstone Rwagatare"
+__copyright__ = "Copyright 2023, Westmont College"
+__credits__ = ["Garrett Buchanan", "Livingstone Rwagatare", "Mike Ryu"]
+__license__ = "MIT"
+__email__ = "mryu@westmont.edu"
+
+MODES = ("fifo", "fixed", "adaptive")
+
+
+def main() -> None:
+    pars = setup_argument_parser()
+    args = pars.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="orb_bench_scheduler_") as tmp_dir:
+        config_path = generate_corpus(tmp_dir, pages=args.pages, broken_ratio=0.0, seed=args.seed)
+        with open(config_path, 'r', encoding="UTF-8") as config_file:
+            config = json.load(config_file)
+        servers = [start_host(tmp_dir, latency_ms / 1000, args.capacity) for latency_ms in args.latency_ms]
+        try:
+            seeds = ["http://127.0.0.1:{:d}/{}".format(server.server_address[1], PAGE_NAME.format(0))
+                     for server in servers]
+            results = {
+                "environment": environment(),
+                "corpus": {"pages": args.pages, "seed": args.seed},
+                "hosts": {"latency_ms": args.latency_ms, "capacity": args.capacity},
+                "workers": args.workers,
+                "modes": {mode: crawl(config, seeds, mode, args) for mode in args.modes},
+            }
+        finally:
+            for server in servers:
+                server.shutdown()
+                server.server_close()
+    write_report(results, args.output)
+
+
+def setup_argument_parser() -> argparse.ArgumentParser:
+    pars = argparse.ArgumentParser(prog="python3 -m benchmarks.bench_scheduler")
+    pars.add_argument("--pages", type=int, default=100, help="number of pages in the corpus every host serves")
+    pars.add_argument("--latency-ms", type=float, nargs='+', default=[10.0, 20.0, 40.0, 80.0],
+                      help="injected latency of every stand-in host (one host per value)")
+    pars.add_argument("--capacity", type=int, default=2,
+                      help="concurrent requests a host serves without slowing down")
+    pars.add_argument("--workers", type=int, default=8, help="number of fetching threads")
+    pars.add_argument("--rate", type=float, default=None,
+                      help="optional requests per second per host for the scheduled modes (unlimited by default)")
+    pars.add_argument("--max-concurrency", type=int, default=4,
+                      help="most requests in flight per host in the scheduled modes")
+    pars.add_argument("--modes", type=str, nargs='+', default=list(MODES), choices=MODES,
+                      help="scheduling modes to run")
+    pars.add_argument("--seed", type=int, default=128, help="random seed for the corpus")
+    pars.add_argument("--output", type=str, default=None, help="optional path to write the JSON results to")
+    return pars
+
+
+class _StandInServer(ThreadingHTTPServer):
+    """Local server standing in for a remote host with a fixed `latency` that degrades past `capacity`."""
+    daemon_threads = True
+
+    def __init__(self, address, handler, latency: float, capacity: int) -> None:
+        super().__init__(address, handler)
+        self.latency = latency
+        self.capacity = capacity
+        self.in_flight = 0
+        self.lock = threading.Lock()
+
+    def handle_error(self, request, client_address) -> None:
+        pass  # crawlers hanging up are not the benchmark's concern
+
+
+class _StandInHandler(SimpleHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:
+        server = self.server
+        with server.lock:
+            server.in_flight += 1
+            load = server.in_flight
+        try:
+            time.sleep(server.latency * (1 + max(0, load - server.capacity)))
+            if load > 2 * server.capacity:
+                self.send_error(503)
+            else:
+                super().do_GET()
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+class _SingleQueueScheduler(OrbHostScheduler):
+    """Scheduler that sees every URI as coming from the same host, i.e., a plain FIFO frontier with workers."""
+    def host_key(self, uri: str) -> str:
+        return "*"
+
+
+def start_host(corpus_dir: str, latency: float, capacity: int) -> _StandInServer:
+    """Starts a stand-in host serving `corpus_dir` on a free local port, in a background thread."""
+    server = _StandInServer(("127.0.0.1", 0), partial(_StandInHandler, directory=corpus_dir), latency, capacity)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def crawl(config: dict, seeds: list[str], mode: str, args: argparse.Namespace) -> dict:
+    """Crawls every host from `seeds` with the scheduling `mode`; returns the timing, the fetch counts, and the
+    state of every host."""
+    with OrbHttpPool(pool_size=args.workers, hosts=["127.0.0.1"]) as pool:
+        frontier = OrbUriFrontier(list(map(OrbURI, seeds)))
+        if mode == "fifo":
+            scheduler = _SingleQueueScheduler(frontier, pool, workers=args.workers, rate=None,
+                                              max_concurrency=args.workers, adaptive=False)
+        else:
+            scheduler = OrbHostScheduler(frontier, pool, workers=args.workers, rate=args.rate,
+                                         max_concurrency=args.max_concurrency, adaptive=mode == "adaptive")
+        started = time.perf_counter()
+        run_sequential_crawl(_NullStream(), scheduler, OrbDocDB(), OrbUriDB(), config, fetcher=scheduler)
+        seconds = time.perf_counter() - started
+        scheduler.close()
+        counts = pool.to_dict()
+    fetched = counts["requests"] - counts["errors"]
+    return {
+        "seconds": round(seconds, 3),
+        "fetched": fetched,
+        "failed": counts["errors"],
+        "pages_per_sec": round(fetched / seconds, 1) if seconds else 0.0,
+        "reuse_rate": counts["reuse_rate"],
+        "mean_fetch_ms": counts["mean_ms"],
+        "hosts": scheduler.to_dict(),
+    }
+
+
+class _NullStream:
+    """Document stream that drops what is written to it; the benchmark only measures fetching."""
+    def write(self, content: str) -> None:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""Cold-start benchmark for the command-line entry points, based on `python -X importtime`.
+
+Every run starts a fresh interpreter, so the numbers include interpreter start-up and all module imports
+(and compiling them, if bytecode caching is disabled via `PYTHONDONTWRITEBYTECODE`). Results are printed as JSON.
+The benchmark fails (exits with 1) if an entry point imports one of the heavy modules that must only be loaded on
+demand, or if `--max-import-ms` is given and an entry point's median import time exceeds it.
+
+Example:
+    $ python3 -m benchmarks.bench_startup --runs 10 --max-import-ms 50 --output ../out/startup.json
+"""
+
+import os
+import sys
+import time
+import argparse
+import subprocess
+from benchmarks.bench_utils import summarize, environment, write_report
+
+__author__ = "Garrett Buchanan, Livingstone Rwagatare"
+__copyright__ = "Copyright 2023, Westmont College"
+__credits__ = ["Garrett Buchanan", "Livingstone Rwagatare", "Mike Ryu"]
+__license__ = "MIT"
+__email__ = "mryu@westmont.edu"
+
+ENTRY_POINTS = ["spider.orb.orb_runner", "text_processing.freq_counter"]
+LAZY_MODULES = ["bs4", "nltk", "text_processing.freq_spill"]  # Must not be imported just by loading an entry point.
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def main() -> None:
+    pars = setup_argument_parser()
+    args = pars.parse_args()
+
+    results = {"environment": environment(), "runs": args.runs, "entry_points": {}}
+    failed = False
+    for module in args.modules:
+        result = measure_entry_point(module, args.runs)
+        eager = sorted(set(result.pop("modules")) & set(LAZY_MODULES))
+        result["eagerly_imported"] = eager
+        within_limit = args.max_import_ms is None or result["import_ms"]["median"] <= args.max_import_ms
+        result["passed"] = not eager and within_limit
+        failed |= not result["passed"]
+        results["entry_points"][module] = result
+
+    write_report(results, args.output)
+    sys.exit(1 if failed else 0)
+
+
+def setup_argument_parser() -> argparse.ArgumentParser:
+    pars = argparse.ArgumentParser(prog="python3 -m benchmarks.bench_startup")
+    pars.add_argument("modules", type=str, nargs='*', default=ENTRY_POINTS,
+                      help="optional entry point modules to measure (defaults to all of them)")
+    pars.add_argument("--runs", type=int, default=5,
+                      help="number of fresh interpreters to start per entry point")
+    pars.add_argument("--max-import-ms", type=float, default=None,
+                      help="optional limit on the median import time (in milliseconds) of each entry point")
+    pars.add_argument("--output", type=str, default=None,
+                      help="optional path to write the JSON results to")
+    return pars
+
+
+def import_times(module: str) -> tuple[float, list[str]]:
+    """Imports `module` in a fresh interpreter with `-X importtime`.
+
+    Returns:
+        A tuple of the cumulative import time of `module` in milliseconds and the names of every module
+        imported (directly or transitively) because of it.
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=SRC_DIR, capture_output=True, text=True, check=True)
+    rows = [line.split("|") for line in result.stderr.splitlines() if line.startswith("import time:")][1:]
+    names = [name.strip() for _, _, name in rows]
+    cumulative = dict((name.strip(), int(total)) for _, total, name in rows)
+
+    # Modules imported on behalf of `module` are the ones logged after the last top-level module preceding it.
+    end = names.index(module)
+    start = max((i for i in range(end) if not rows[i][2].startswith("  ")), default=-1) + 1
+    return cumulative[module] / 1000, names[start:end + 1]
+
+
+def measure_entry_point(module: str, runs: int) -> dict:
+    """Measures the import time of `module` and the wall-clock time of running it with `--help`, `runs` times."""
+    import_ms = []
+    modules = []
+    for _ in range(runs):
+        elapsed, modules = import_times(module)
+        import_ms.append(elapsed)
+
+    wall_ms = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-m", module, "--help"], cwd=SRC_DIR, capture_output=True, check=True)
+        wall_ms.append((time.perf_counter() - start) * 1000)
+
+    return {
+        "import_ms": summarize(import_ms),
+        "help_wall_ms": summarize(wall_ms),
+        "modules_imported": len(modules),
+        "modules": modules,
+    }
+
+
+if __name__ == '__main__':
+    main()
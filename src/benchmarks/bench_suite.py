@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""Reproducible benchmark suite for the crawler and the text processing stages, run over a synthetic corpus.
+
+A corpus is generated with `benchmarks.corpus_gen` (or an existing one is reused with `--corpus-dir`), and each
+benchmark is timed `--repeat` times. Results are printed (and optionally written) as JSON, including the corpus
+parameters and the environment, so that runs can be compared against each other.
+
+Example:
+    $ python3 -m benchmarks.bench_suite --pages 1000 --repeat 5 --output ../out/bench.json
+    $ python3 -m benchmarks.bench_suite --only tokenize_file,compute_twogram_freq
+"""
+
+from __future__ import annotations
+import io
+import os
+import sys
+import json
+import random
+import argparse
+import tempfile
+import subprocess
+from benchmarks.bench_utils import time_it, environment, write_report
+from benchmarks.corpus_gen import generate_corpus, CONFIG_NAME
+from spider.orb.orb_models import OrbURI, OrbAgent, OrbDocDB, OrbUriDB, OrbUriFrontier
+from text_processing.freq_utils import tokenize_file
+from text_processing.freq_counter import compute_twogram_freq
+
+__author__ = "Garrett Buchanan, Livingstone Rwagatare"
+__copyright__ = "Copyright 2023, Westmont College"
+__credits__ = ["Garrett Buchanan", "Livingstone Rwagatare", "Mike Ryu"]
+__license__ = "MIT"
+__email__ = "mryu@westmont.edu"
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def main() -> None:
+    pars = setup_argument_parser()
+    args = pars.parse_args()
+    only = set(args.only.split(",")) if args.only else set(BENCHMARKS)
+    unknown = only - set(BENCHMARKS)
+    if unknown:
+        pars.error("Unknown benchmark(s): {}".format(", ".join(sorted(unknown))))
+
+    with tempfile.TemporaryDirectory(prefix="orb_bench_") as tmp_dir:
+        corpus_dir = args.corpus_dir or os.path.join(tmp_dir, "corpus")
+        corpus = dict(pages=args.pages, page_words=args.page_words, fan_out=args.fan_out,
+                      duplicate_ratio=args.duplicate_ratio, broken_ratio=args.broken_ratio,
+                      div_density=args.div_density, seed=args.seed)
+        config_path = os.path.join(corpus_dir, CONFIG_NAME)
+        if not (args.corpus_dir and os.path.isfile(config_path)):
+            config_path = generate_corpus(corpus_dir, **corpus)
+
+        bench = BenchCorpus(config_path, tmp_dir)
+        results = {"environment": environment(), "corpus": corpus, "repeat": args.repeat, "benchmarks": {}}
+        for name, benchmark in BENCHMARKS.items():
+            if name in only:
+                results["benchmarks"][name] = benchmark(bench, args.repeat)
+
+    write_report(results, args.output)
+
+
+def setup_argument_parser() -> argparse.ArgumentParser:
+    pars = argparse.ArgumentParser(prog="python3 -m benchmarks.bench_suite")
+    pars.add_argument("--only", type=str, default=None,
+                      help="optional comma-separated names of the benchmarks to run: " + ", ".join(BENCHMARKS))
+    pars.add_argument("--repeat", type=int, default=3, help="number of timed runs per benchmark")
+    pars.add_argument("--output", type=str, default=None, help="optional path to write the JSON results to")
+    pars.add_argument("--corpus-dir", type=str, default=None,
+                      help="optional directory to generate the corpus in (or reuse an existing corpus from)")
+    pars.add_argument("--pages", type=int, default=500, help="number of pages in the generated corpus")
+    pars.add_argument("--page-words", type=int, default=300, help="average number of words per page")
+    pars.add_argument("--fan-out", type=int, default=6, help="average number of links per page")
+    pars.add_argument("--duplicate-ratio", type=float, default=0.05, help="fraction of duplicate pages")
+    pars.add_argument("--broken-ratio", type=float, default=0.02, help="fraction of broken links")
+    pars.add_argument("--div-density", type=float, default=0.5, help="fraction of text in div.p/div.q elements")
+    pars.add_argument("--seed", type=int, default=128, help="random seed for the generated corpus")
+    return pars
+
+
+class BenchCorpus:
+    """Lazily prepared inputs shared by the benchmarks: the corpus config, its pages, its text, and its tokens."""
+    def __init__(self, config_path: str, tmp_dir: str) -> None:
+        self.config_path = config_path
+        self.tmp_dir = tmp_dir
+        with open(config_path, 'r', encoding="UTF-8") as config_file:
+            self.config = json.load(config_file)
+        corpus_dir = os.path.dirname(config_path)
+        self.pages = sorted(os.path.join(corpus_dir, name) for name in os.listdir(corpus_dir) if name.endswith(".htm"))
+        self._text = None
+        self._tokens = None
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            doc_db, uri_db = OrbDocDB(), OrbUriDB()
+            docs = []
+            for page in self.pages:
+                content, _ = OrbAgent(OrbURI(page), doc_db, uri_db, self.config["agent_config"]).crawl()
+                docs.extend(doc.content for doc in content)
+            self._text = "".join(docs)
+        return self._text
+
+    @property
+    def tokens(self) -> list[str]:
+        if self._tokens is None:
+            self._tokens = tokenize_file(io.StringIO(self.text))
+        return self._tokens
+
+
+def bench_agent_crawl(bench: BenchCorpus, repeat: int) -> dict:
+    """Fetches, parses, and drains both processors for every page, with fresh DBs so nothing is skipped."""
+    agent_config = bench.config["agent_config"]
+
+    def crawl_all():
+        for page in bench.pages:
+            content, links = OrbAgent(OrbURI(page), OrbDocDB(), OrbUriDB(), agent_config).crawl()
+            list(content)
+            list(links)
+
+    return time_it(crawl_all, repeat, items=len(bench.pages))
+
+
+def bench_db_membership(bench: BenchCorpus, repeat: int) -> dict:
+    """Checks membership of every page URI (plus as many misses) in an `OrbUriDB` holding every page URI."""
+    db = OrbUriDB()
+    db.add_all(*map(OrbURI, bench.pages))
+    probes = [OrbURI(page) for page in bench.pages] + [OrbURI(page + ".missing") for page in bench.pages]
+    random.Random(0).shuffle(probes)
+
+    def lookup_all():
+        for uri in probes:
+            _ = uri in db
+
+    return time_it(lookup_all, repeat, items=len(probes))
+
+
+def bench_frontier_push_pop(bench: BenchCorpus, repeat: int) -> dict:
+    """Pushes 20 URIs per page onto an `OrbUriFrontier` and pops them all off again."""
+    uris = [OrbURI(page) for page in bench.pages] * 20
+
+    def push_pop_all():
+        frontier = OrbUriFrontier(uris[:1])
+        for uri in uris:
+            frontier.push(uri)
+        while frontier:
+            frontier.pop()
+
+    return time_it(push_pop_all, repeat, items=len(uris))
+
+
+def bench_tokenize_file(bench: BenchCorpus, repeat: int) -> dict:
+    """Tokenizes the crawled text of the whole corpus."""
+    text = bench.text
+    return time_it(lambda stream: tokenize_file(stream), repeat, setup=lambda: io.StringIO(text), items=len(text))
+
+
+def bench_compute_twogram_freq(bench: BenchCorpus, repeat: int) -> dict:
+    """Counts and orders the two-grams of the crawled (and tokenized) text of the whole corpus."""
+    tokens = bench.tokens
+    return time_it(lambda: compute_twogram_freq(tokens), repeat, items=len(tokens))
+
+
+def bench_orb_runner(bench: BenchCorpus, repeat: int) -> dict:
+    """Runs `orb_runner` end to end (crawl, tokenize, count, and print) in a fresh interpreter."""
+    output_path = os.path.join(bench.tmp_dir, "orb_runner.out.txt")
+    command = [sys.executable, "-m", "spider.orb.orb_runner", bench.config_path, output_path]
+    return time_it(lambda: subprocess.run(command, cwd=SRC_DIR, check=True, capture_output=True),
+                   repeat, items=len(bench.pages))
+
+
+BENCHMARKS = {
+    "agent_crawl": bench_agent_crawl,
+    "db_membership": bench_db_membership,
+    "frontier_push_pop": bench_frontier_push_pop,
+    "tokenize_file": bench_tokenize_file,
+    "compute_twogram_freq": bench_compute_twogram_freq,
+    "orb_runner": bench_orb_runner,
+}
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""Shared timing and reporting helpers for the benchmarks in this package.
+"""
+
+import sys
+import json
+import time
+import platform
+import statistics
+
+__author__ = "Garrett Buchanan, Livingstone Rwagatare"
+__copyright__ = "Copyright 2023, Westmont College"
+__credits__ = ["Garrett Buchanan", "Livingstone Rwagatare", "Mike Ryu"]
+__license__ = "MIT"
+__email__ = "mryu@westmont.edu"
+
+
+def summarize(samples: list[float]) -> dict:
+    """Returns the min, median, and max of `samples`, rounded to 3 decimal places."""
+    return {
+        "min": round(min(samples), 3),
+        "median": round(statistics.median(samples), 3),
+        "max": round(max(samples), 3),
+    }
+
+
+def percentiles(samples: list[float]) -> dict:
+    """Returns the mean and the 50th, 90th, and 99th percentiles of `samples` (nearest rank), rounded to 3 places."""
+    ordered = sorted(samples)
+
+    def rank(p):
+        return ordered[min(len(ordered) - 1, max(0, -(-p * len(ordered) // 100) - 1))]
+
+    return {
+        "mean": round(statistics.fmean(ordered), 3),
+        "p50": round(rank(50), 3),
+        "p90": round(rank(90), 3),
+        "p99": round(rank(99), 3),
+        "max": round(ordered[-1], 3),
+    }
+
+
+def time_it(fn, repeat: int = 3, setup=None, items: int = None) -> dict:
+    """Times `repeat` calls of `fn` (each preceded by an untimed call of `setup`, if given).
+
+    Args:
+        fn: function to time; it is passed whatever `setup` returned, if `setup` is given.
+        repeat (int): number of timed calls.
+        setup: optional function preparing a fresh input for every call of `fn`.
+        items (int): optional number of items `fn` processes per call, to report a throughput.
+
+    Returns:
+        A dictionary with a summary of the elapsed milliseconds per call and, if `items` was given,
+        the throughput in items per second based on the fastest call.
+    """
+    elapsed_ms = []
+    for _ in range(repeat):
+        args = (setup(),) if setup else ()
+        start = time.perf_counter()
+        fn(*args)
+        elapsed_ms.append((time.perf_counter() - start) * 1000)
+
+    result = {"ms": summarize(elapsed_ms)}
+    if items is not None:
+        result["items"] = items
+        result["items_per_sec"] = round(items / max(min(elapsed_ms) / 1000, 1e-9), 1)
+    return result
+
+
+def environment() -> dict:
+    """Describes the machine and interpreter the benchmarks ran on, so results can be compared fairly."""
+    return {
+        "python": sys.version.split()[0],
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "system": platform.system(),
+    }
+
+
+def write_report(results: dict, output_path: str = None) -> None:
+    """Prints `results` as JSON, and writes them to `output_path` as well if it is given."""
+    report = json.dumps(results, indent=2)
+    if output_path:
+        with open(output_path, 'w', encoding="UTF-8") as output_file:
+            output_file.write(report + "\n")
+    print(report)
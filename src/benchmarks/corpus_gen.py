@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""Generates reproducible synthetic local HTML corpora (plus a matching `orb_runner` config) for benchmarking.
+
+Pages are laid out like the sample corpora: a flat directory of `.htm` files whose text lives in `<p>` elements
+and/or `<div class="p">`/`<div class="q">` elements, and whose `<a href>` links point to sibling pages by relative
+path. The generated config follows the same schema as `data/orb_*.config.json`.
+
+Example:
+    $ python3 -m benchmarks.corpus_gen ../out/bench_corpus --pages 2000 --page-words 400 --fan-out 8
+"""
+
+from __future__ import annotations
+import os
+import json
+import random
+import argparse
+
+__author__ = "Garrett Buchanan, Livingstone Rwagatare"
+__copyright__ = "Copyright 2023, Westmont College"
+__credits__ = ["Garrett Buchanan", "Livingstone Rwagatare", "Mike Ryu"]
+__license__ = "MIT"
+__email__ = "mryu@westmont.edu"
+
+PAGE_NAME = "page_{:06d}.htm"
+CONFIG_NAME = "corpus.config.json"
+SYLLABLES = ["ka", "lo", "mi", "ne", "ru", "sa", "to", "vi", "de", "an", "or", "el", "ith", "ba", "zu", "qe"]
+
+
+def main() -> None:
+    pars = setup_argument_parser()
+    args = pars.parse_args()
+    config_path = generate_corpus(args.out_dir, args.pages, args.page_words, args.fan_out, args.duplicate_ratio,
+                                  args.broken_ratio, args.div_density, args.vocabulary, args.seed,
+                                  args.remove_stopwords)
+    print(config_path)
+
+
+def setup_argument_parser() -> argparse.ArgumentParser:
+    pars = argparse.ArgumentParser(prog="python3 -m benchmarks.corpus_gen")
+    pars.add_argument("out_dir", type=str,
+                      help="required path to the directory to write the corpus (and its config) to")
+    pars.add_argument("--pages", type=int, default=500, help="number of pages to generate")
+    pars.add_argument("--page-words", type=int, default=300, help="average number of words of text per page")
+    pars.add_argument("--fan-out", type=int, default=6, help="average number of links per page")
+    pars.add_argument("--duplicate-ratio", type=float, default=0.05,
+                      help="fraction of pages whose text duplicates another page's")
+    pars.add_argument("--broken-ratio", type=float, default=0.02,
+                      help="fraction of links that point to pages that do not exist")
+    pars.add_argument("--div-density", type=float, default=0.5,
+                      help="fraction of text blocks in div.p/div.q elements rather than <p> elements")
+    pars.add_argument("--vocabulary", type=int, default=20000, help="number of distinct words to draw text from")
+    pars.add_argument("--seed", type=int, default=128, help="random seed; the same arguments give the same corpus")
+    pars.add_argument("--remove-stopwords", action="store_true",
+                      help="switch to enable stopword removal in the generated config (requires NLTK data)")
+    return pars
+
+
+def generate_corpus(out_dir: str, pages: int = 500, page_words: int = 300, fan_out: int = 6,
+                    duplicate_ratio: float = 0.05, broken_ratio: float = 0.02, div_density: float = 0.5,
+                    vocabulary: int = 20000, seed: int = 128, remove_stopwords: bool = False) -> str:
+    """Writes a synthetic corpus of `pages` HTML pages and its config to `out_dir`.
+
+    Every page links to the next page, so the whole corpus is reachable from the seed (the first page); the
+    remaining links go to random pages, or to missing ones at a rate of `broken_ratio`. Words are drawn from a
+    Zipfian distribution over `vocabulary` synthetic words, like natural text.
+
+    Returns:
+        The path of the generated config file.
+    """
+    if pages < 1:
+        raise ValueError("A corpus needs at least one page.")
+    if vocabulary > sum(len(SYLLABLES) ** n for n in range(1, 5)):
+        raise ValueError("Vocabulary is larger than the number of distinct words that can be generated.")
+    rng = random.Random(seed)
+    os.makedirs(out_dir, exist_ok=True)
+
+    words = _make_words(rng, vocabulary)
+    weights = [1 / (rank + 1) for rank in range(len(words))]
+    texts = []
+
+    for page in range(pages):
+        if texts and rng.random() < duplicate_ratio:
+            blocks = rng.choice(texts)
+        else:
+            blocks = _make_blocks(rng, words, weights, page_words, div_density)
+        texts.append(blocks)
+
+        links = [rng.randrange(pages) for _ in range(max(0, round(rng.gauss(fan_out, fan_out / 3)) - 1))]
+        hrefs = [PAGE_NAME.format(pages + link) if rng.random() < broken_ratio else PAGE_NAME.format(link)
+                 for link in links]
+        if page + 1 < pages:
+            hrefs.insert(0, PAGE_NAME.format(page + 1))
+
+        with open(os.path.join(out_dir, PAGE_NAME.format(page)), 'w', encoding="UTF-8") as page_file:
+            page_file.write(_render_page(page, blocks, hrefs))
+
+    config = {
+        "seeds": [os.path.abspath(os.path.join(out_dir, PAGE_NAME.format(0)))],
+        "options": {
+            "remove_stopwords": remove_stopwords,
+            "stopwords_lang": "english"
+        },
+        "agent_config": {
+            "external": ["https://", "http://"],
+            "encoding": "UTF-8",
+            "parser": "html.parser",
+            "tags": {"p": {}, "div": {"class": ["p", "q"]}},
+            "debug": False
+        }
+    }
+    config_path = os.path.join(out_dir, CONFIG_NAME)
+    with open(config_path, 'w', encoding="UTF-8") as config_file:
+        json.dump(config, config_file, indent=2)
+    return config_path
+
+
+def _make_words(rng: random.Random, vocabulary: int) -> list[str]:
+    words = set()
+    while len(words) < vocabulary:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(1, 4))))
+    words = sorted(words)
+    rng.shuffle(words)
+    return words
+
+
+def _make_blocks(rng: random.Random, words: list[str], weights: list[float], page_words: int,
+                 div_density: float) -> list[tuple[str, str]]:
+    remaining = max(1, round(rng.gauss(page_words, page_words / 4)))
+    blocks = []
+    while remaining > 0:
+        size = min(remaining, rng.randint(10, 80))
+        remaining -= size
+        text = " ".join(rng.choices(words, weights, k=size)).capitalize() + "."
+        if rng.random() < div_density:
+            blocks.append(("div class=\"{}\"".format(rng.choice("pq")), text))
+        else:
+            blocks.append(("p", text))
+    return blocks
+
+
+def _render_page(page: int, blocks: list[tuple[str, str]], hrefs: list[str]) -> str:
+    lines = ["<!DOCTYPE html>", "<html>", f"<head><title>Page {page}</title></head>", "<body>",
+             f"<h2>Page {page}</h2>"]
+    for tag, text in blocks:
+        lines.append(f"<{tag}>{text}</{tag.split()[0]}>")
+    lines.append('<a href="#top">Top</a> | <a href="https://www.example.com">External</a>')
+    lines.extend(f'<a href="{href}">Link {i}</a><br>' for i, href in enumerate(hrefs))
+    lines.extend(["</body>", "</html>", ""])
+    return "\n".join(lines)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,177 @@
+"""Provides `RunProfiler`, which wraps a run of `orb_runner` or `freq_counter` in cProfile and/or tracemalloc.
+
+`--profile cpu` writes `<output>.pstats` (readable with `python3 -m pstats` or any pstats viewer), `--profile mem`
+writes `<output>.alloc.txt` with the top allocation sites, and `--profile both` writes both. The profilers are only
+imported when profiling is requested, so unprofiled runs do not pay for them.
+"""
+
+from __future__ import annotations
+
+__author__ = "Garrett Buchanan, Livingstone Rwagatare"
+__copyright__ = "Copyright 2023, Westmont College"
+__credits__ = ["Garrett Buchanan", "Livingstone Rwagatare", "Mike Ryu"]
+__license__ = "MIT"
+__email__ = "mryu@westmont.edu"
+
+PROFILE_MODES = ("cpu", "mem", "both")
+DEFAULT_TOP = 25  # Allocation sites listed per snapshot in the allocation report.
+TRACEMALLOC_FRAMES = 1  # Frames kept per allocation; more frames give tracebacks but slow tracing down further.
+
+
+class RunProfiler:
+    """Context manager that profiles the run it wraps, and optionally every Nth agent of a crawl within that run.
+
+    Entering the profiler starts tracemalloc (for "mem" or "both") and cProfile (for "cpu" or "both"); exiting
+    stops them and writes their reports next to `output_path`. A crawl loop also wraps every agent it runs in
+    `with profiler.agent(): ...`, which lets the profiler:
+
+    * take a tracemalloc snapshot of the top `top` allocation sites after every `snapshot_every` agents, to show
+      how memory grows over the crawl rather than only where it ended up; and
+    * in sampling mode (`sample_every` > 1), enable cProfile only for every `sample_every`-th agent instead of
+      for the whole run, which keeps the overhead of profiling a long crawl low while still profiling a fair
+      sample of its pages. Work outside of agents (e.g., printing the frequencies) is not profiled in that mode.
+
+    A `RunProfiler` with no `mode` does nothing and is falsy, so it can be passed around unconditionally.
+
+    Attributes:
+        _mode (str | None): one of `PROFILE_MODES`, or `None` to disable profiling.
+        _output_path (str): path the report paths are derived from (by appending `.pstats` and `.alloc.txt`).
+        _top (int): number of allocation sites listed per snapshot.
+        _snapshot_every (int): number of agents between allocation snapshots; 0 disables interval snapshots.
+        _sample_every (int): profile only every Nth agent's CPU time; 1 profiles the whole run.
+        _agents (int): number of agents run so far.
+        _profile (cProfile.Profile | None): the CPU profiler, if profiling CPU.
+        _snapshots (list[tuple[str, list[str]]]): titled allocation reports taken so far.
+
+    """
+    def __init__(self, mode: str | None, output_path: str, top: int = DEFAULT_TOP, snapshot_every: int = 0,
+                 sample_every: int = 1) -> None:
+        if mode is not None and mode not in PROFILE_MODES:
+            raise ValueError("Profile mode must be one of: {}.".format(", ".join(PROFILE_MODES)))
+        if sample_every < 1 or snapshot_every < 0 or top < 1:
+            raise ValueError("Profile intervals must be positive numbers of agents.")
+        self._mode = mode
+        self._output_path = output_path
+        self._top = top
+        self._snapshot_every = snapshot_every
+        self._sample_every = sample_every
+        self._agents = 0
+        self._profile = None
+        self._snapshots: list[tuple[str, list[str]]] = []
+
+    @classmethod
+    def from_options(cls, mode: str | None, output_path: str, options: dict, sample_every: int = None,
+                     snapshot_every: int = None) -> RunProfiler:
+        """Creates a profiler from the `profile*` config `options`, with command line arguments taking precedence.
+
+        Recognized options are "profile" (mode), "profile_top", "profile_snapshot_every", and "profile_sample_every".
+
+        """
+        return cls(mode or options.get("profile"), output_path, options.get("profile_top", DEFAULT_TOP),
+                   snapshot_every if snapshot_every is not None else options.get("profile_snapshot_every", 0),
+                   sample_every if sample_every is not None else options.get("profile_sample_every", 1))
+
+    def __bool__(self) -> bool:
+        return self._mode is not None
+
+    @property
+    def cpu(self) -> bool:
+        return self._mode in ("cpu", "both")
+
+    @property
+    def mem(self) -> bool:
+        return self._mode in ("mem", "both")
+
+    @property
+    def pstats_path(self) -> str:
+        return self._output_path + ".pstats"
+
+    @property
+    def alloc_path(self) -> str:
+        return self._output_path + ".alloc.txt"
+
+    def __enter__(self) -> RunProfiler:
+        if self.mem:
+            import tracemalloc
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        if self.cpu:
+            import cProfile
+            self._profile = cProfile.Profile()
+            if self._sample_every == 1:
+                self._profile.enable()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        if self._profile is not None:
+            self._profile.disable()
+            self._profile.dump_stats(self.pstats_path)
+            self._profile = None
+        if self.mem:
+            import tracemalloc
+            self._snapshot("Final snapshot after {} agents".format(self._agents))
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            self._write_alloc_report(peak)
+
+    def agent(self) -> _AgentScope:
+        """Returns a context manager to wrap a single agent's crawl (and the processing of its results) in."""
+        return _AgentScope(self)
+
+    def _enter_agent(self) -> None:
+        self._agents += 1
+        if self._profile is not None and self._sample_every > 1 and self._agents % self._sample_every == 0:
+            self._profile.enable()
+
+    def _exit_agent(self) -> None:
+        if self._profile is not None and self._sample_every > 1 and self._agents % self._sample_every == 0:
+            self._profile.disable()
+        if self.mem and self._snapshot_every and self._agents % self._snapshot_every == 0:
+            self._snapshot("Snapshot after {} agents".format(self._agents))
+
+    def _snapshot(self, title: str) -> None:
+        import tracemalloc
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ))
+        current = tracemalloc.get_traced_memory()[0]
+        lines = ["{:>10.1f} KiB current".format(current / 1024)]
+        lines.extend(str(stat) for stat in snapshot.statistics("lineno")[:self._top])
+        self._snapshots.append((title, lines))
+
+    def _write_alloc_report(self, peak: int) -> None:
+        with open(self.alloc_path, 'w', encoding="UTF-8") as report_file:
+            report_file.write("Peak traced memory: {:.1f} KiB\n".format(peak / 1024))
+            for title, lines in self._snapshots:
+                report_file.write("\n{} (top {})\n{}\n".format(title, self._top, "-" * 80))
+                report_file.writelines(line + "\n" for line in lines)
+
+
+class _AgentScope:
+    __slots__ = ("_profiler",)
+
+    def __init__(self, profiler: RunProfiler) -> None:
+        self._profiler = profiler
+
+    def __enter__(self) -> None:
+        if self._profiler:
+            self._profiler._enter_agent()
+
+    def __exit__(self, *exc_info) -> None:
+        if self._profiler:
+            self._profiler._exit_agent()
+
+
+def add_profile_arguments(pars, agents: bool = False) -> None:
+    """Adds the `--profile` options shared by the command line entry points to the argument parser `pars`."""
+    pars.add_argument("--profile", type=str, default=None, choices=PROFILE_MODES,
+                      help="optional profiler(s) to run: cpu (cProfile), mem (tracemalloc), or both; "
+                           "reports are written next to the output file")
+    if agents:
+        pars.add_argument("--profile-sample", type=int, default=None, metavar="N",
+                          help="optional sampling mode, only profiling the CPU time of every Nth agent")
+        pars.add_argument("--profile-snapshot", type=int, default=None, metavar="N",
+                          help="optional number of agents between allocation snapshots (with mem profiling)")
+
+
+NULL_PROFILER = RunProfiler(None, "")
@@ -0,0 +1,440 @@
+#!/usr/bin/env python3
+"""Crawls corpora shipped as archives in place, without extracting them: `OrbArchiveAgent` crawls the members of
+`.zip`, `.tar`, `.tar.gz` (or `.tgz`), and WARC (`.warc` or `.warc.gz`) files addressed by archive URIs.
+
+An archive URI names a member inside an archive file, `archive:<path of the archive>!/<member>`, e.g.,
+`archive:../corpora/net_bible.zip!/net_bible/index.htm`. Members of zip and tar archives are named by their path
+inside the archive, and members of WARC files by the target URI of their record, e.g.,
+`archive:../crawls/site.warc.gz!/http://www.example.com/index.htm`.
+
+Every archive is opened once per process and read through a single file handle, with an index of its members:
+
+* zip: the central directory, read when the archive is opened; members are read by random access.
+* tar: the member headers, read in one pass when the archive is opened; members are then read by random access.
+  A gzip-compressed tar is read through `SeekableGzip`, which keeps checkpoints of the decompressor along the
+  way, so reading a member only decompresses from the nearest checkpoint before it.
+* WARC: the offset of every "response" (with HTTP status 200) and "resource" record, by target URI, built in one
+  pass when the archive is opened. Records of a `.warc.gz` file are separate gzip members, each read on its own.
+
+Example:
+    $ python3 -m spider.orb.orb_archive ../corpora/net_bible.tar.gz
+"""
+
+from __future__ import annotations
+import io
+import sys
+import zlib
+import bisect
+import tarfile
+import zipfile
+import argparse
+import posixpath
+from abc import ABC, abstractmethod
+from urllib.parse import urljoin
+from spider.orb.orb_models import OrbAgent, OrbLinkProcessor, ARCHIVE_SCHEME
+from spider.orb.orb_warc import read_warc_record
+
+__author__ = "Garrett Buchanan", "Livingstone Rwagatare"
+__copyright__ = "Copyright 2023, Westmont College"
+__credits__ = ["Garrett Buchanan", "Livingstone Rwagatare", "Mike Ryu"]
+__license__ = "MIT"
+__email__ = "mryu@westmont.edu"
+
+MEMBER_SEPARATOR = "!/"
+CHUNK_SIZE = 64 * 1024
+CHECKPOINT_SPACING = 1024 * 1024  # Decompressed bytes between checkpoints of a `SeekableGzip`.
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+ARCHIVE_ERRORS = (OSError, KeyError, ValueError, EOFError, zlib.error, tarfile.TarError, zipfile.BadZipFile)
+
+
+def main() -> None:
+    pars = argparse.ArgumentParser(prog="python3 -m spider.orb.orb_archive")
+    pars.add_argument("archive_path", type=str, help="required path to a .zip, .tar(.gz), or .warc(.gz) archive")
+    args = pars.parse_args()
+
+    try:
+        archive = open_archive(args.archive_path)
+    except ARCHIVE_ERRORS as e:
+        print("An error occurred while trying to open files:\n  ", e, file=sys.stderr)
+        exit(1)
+    for member in archive.members():
+        print(archive_uri(args.archive_path, member))
+
+
+class OrbArchiveAgent(OrbAgent):
+    """`OrbAgent` for archive URIs: reads the member a URI names from its archive (opened once per process), and
+    resolves the links on it to archive URIs of the same archive.
+
+    Links are resolved like `OrbAgent.crawl` resolves them for local files: external links are kept as they are
+    (unless they name a record of the same WARC file), and others are appended to the directory of the member
+    linking to them. Members of a WARC file, named by URIs, resolve relative links against their URI instead."""
+
+    def _open_uri_as_file(self) -> io.StringIO | None:
+        """Reads the member named by `self._uri.uri` from its archive; returns its text, or `None` if the archive
+        or the member could not be read (see `OrbAgent._open_uri_as_file`)."""
+        try:
+            archive_path, member = split_archive_uri(self._uri.uri)
+            data = open_archive(archive_path).read(member)
+            self._bytes_read = len(data)
+            return io.StringIO(data.decode(self._config["encoding"], "replace"))
+        except ARCHIVE_ERRORS as e:
+            self._stats.count("failed_opens")
+            if self._config["debug"]:
+                print("Member {} failed to open:\n".format(self._uri.uri), e, file=sys.stderr)
+            return None
+
+    def _resolve_link(self, link: str, base_uri: str | None) -> str:
+        archive_path, member = split_archive_uri(self._uri.uri)
+        if OrbLinkProcessor.is_link_external(self, link):
+            if archive_path.endswith((".warc", ".warc.gz")) and link in open_archive(archive_path):
+                return archive_uri(archive_path, link)
+            return link
+        if "://" in member:  # a WARC record, named by its target URI
+            return archive_uri(archive_path, urljoin(member, link))
+        prev_slash_local = member.rfind("/")
+        final_link = member[:prev_slash_local] + "/" + link if prev_slash_local >= 0 else link
+        return archive_uri(archive_path, posixpath.normpath(final_link))
+
+
+class OrbArchive(ABC):
+    """Index of the members of an archive, read through one file handle.
+
+    Attributes:
+        _path (str): path of the archive.
+        _file (BufferedReader): the archive file.
+
+    """
+    def __init__(self, path: str) -> None:
+        self._path = path
+        self._file = open(path, 'rb')
+
+    @abstractmethod
+    def __contains__(self, member: object) -> bool:
+        pass
+
+    @abstractmethod
+    def members(self) -> list[str]:
+        """Returns the names of the members, in the order they are stored."""
+        pass
+
+    @abstractmethod
+    def read(self, member: str) -> bytes:
+        """Returns the contents of `member`; raises `KeyError` if the archive has no such member."""
+        pass
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class OrbZipArchive(OrbArchive):
+    """Zip archive, indexed by its central directory."""
+    def __init__(self, path: str) -> None:
+        super().__init__(path)
+        self._zip = zipfile.ZipFile(self._file)
+        self._names = {_normalize(name): name for name in self._zip.namelist() if not name.endswith("/")}
+
+    def __contains__(self, member: object) -> bool:
+        return member in self._names
+
+    def members(self) -> list[str]:
+        return list(self._names)
+
+    def read(self, member: str) -> bytes:
+        return self._zip.read(self._names[member])
+
+    def close(self) -> None:
+        self._zip.close()
+        super().close()
+
+
+class OrbTarArchive(OrbArchive):
+    """Tar archive, uncompressed or gzip-compressed (through a `SeekableGzip`), indexed by its member headers.
+    Archives compressed otherwise (bzip2, xz) are read as `tarfile` reads them, with no random access."""
+    def __init__(self, path: str) -> None:
+        super().__init__(path)
+        if path.endswith((".tar.gz", ".tgz")):
+            fileobj = io.BufferedReader(SeekableGzip(self._file), CHUNK_SIZE)
+            self._tar = tarfile.open(fileobj=fileobj, mode="r:")
+        else:
+            self._tar = tarfile.open(fileobj=self._file, mode="r:*")
+        self._infos = {_normalize(info.name): info for info in self._tar.getmembers() if info.isfile()}
+
+    def __contains__(self, member: object) -> bool:
+        return member in self._infos
+
+    def members(self) -> list[str]:
+        return list(self._infos)
+
+    def read(self, member: str) -> bytes:
+        return self._tar.extractfile(self._infos[member]).read()
+
+    def close(self) -> None:
+        self._tar.close()
+        super().close()
+
+
+class OrbWarcArchive(OrbArchive):
+    """WARC file, uncompressed or compressed record by record (`.warc.gz`), indexed by the target URI of its
+    "response" and "resource" records. The first record for a URI is the one read; "response" records are only
+    indexed if their HTTP status is 200, and their HTTP headers are stripped (and the body decoded) when read.
+
+    Attributes:
+        _gzipped (bool): whether every record is a gzip member of its own.
+        _records (dict[str, tuple[int, str]]): offset of the record of every target URI (in the file if the
+            records are compressed, otherwise of its block) and its type.
+
+    """
+    def __init__(self, path: str) -> None:
+        super().__init__(path)
+        self._gzipped = path.endswith(".gz")
+        self._records: dict[str, tuple[int, str]] = {}
+        offset = 0
+        while True:
+            record = self._read_record(offset)
+            if record is None:
+                break
+            headers, block, next_offset = record
+            uri = headers.get("warc-target-uri", "").strip("<>")
+            kind = headers.get("warc-type", "")
+            if uri and uri not in self._records and (kind == "resource" or kind == "response" and
+                                                     _http_status(block) == 200):
+                self._records[uri] = (offset, kind)
+            offset = next_offset
+
+    def __contains__(self, member: object) -> bool:
+        return member in self._records
+
+    def members(self) -> list[str]:
+        return list(self._records)
+
+    def read(self, member: str) -> bytes:
+        offset, kind = self._records[member]
+        _, block, _ = self._read_record(offset)
+        return _http_body(block) if kind == "response" else block
+
+    def _read_record(self, offset: int) -> tuple[dict[str, str], bytes, int] | None:
+        """Reads the record at `offset`; returns its (lowercased) headers, its block, and the offset of the next
+        record, or `None` at the end of the file."""
+        self._file.seek(offset)
+        if self._gzipped:
+            decompressor = zlib.decompressobj(GZIP_WBITS)
+            data = bytearray()
+            consumed = 0
+            while not decompressor.eof:
+                chunk = self._file.read(CHUNK_SIZE)
+                if not chunk:
+                    if consumed:
+                        raise EOFError("Truncated WARC record at offset {:d}".format(offset))
+                    return None
+                data += decompressor.decompress(chunk)
+                consumed += len(chunk)
+            reader = io.BytesIO(data)
+            next_offset = offset + consumed - len(decompressor.unused_data)
+        else:
+            reader = self._file
+        try:
+            record = read_warc_record(reader)
+        except (ValueError, EOFError) as e:
+            raise type(e)("{} at offset {:d}".format(e, offset)) from None
+        if record is None:
+            return None
+        headers, block = record
+        if not self._gzipped:
+            next_offset = reader.tell()
+        return headers, block, next_offset
+
+
+class SeekableGzip(io.RawIOBase):
+    """Read-only, seekable view of the decompressed contents of a gzip file.
+
+    Reading forward decompresses the file chunk by chunk, and every `spacing` decompressed bytes a copy of the
+    decompressor's state is kept as a checkpoint, along with the positions it was taken at. Seeking backwards
+    restarts decompression from the last checkpoint before the new position instead of the start of the file, so
+    after one pass over the file any position is reached by decompressing at most `spacing` bytes (plus a chunk).
+    Files of several gzip members are read as one stream, like `gzip` does.
+
+    Attributes:
+        _file (BufferedReader): the compressed file.
+        _spacing (int): decompressed bytes between checkpoints.
+        _checkpoints (list[tuple[int, int, Decompress]]): offset in the compressed file and in the decompressed
+            stream of every checkpoint, and the decompressor state there, ordered by offset.
+        _offsets (list[int]): decompressed offset of every checkpoint, for bisecting.
+        _decompressor (Decompress): decompressor of the current gzip member.
+        _pending (bytes): compressed bytes read from the file but not decompressed yet.
+        _buffer (bytes): the chunk decompressed last.
+        _buffer_start (int): decompressed offset of `_buffer`.
+        _position (int): decompressed offset of the next read.
+
+    """
+    def __init__(self, fileobj, spacing: int = CHECKPOINT_SPACING) -> None:
+        super().__init__()
+        self._file = fileobj
+        self._spacing = spacing
+        start = fileobj.tell()
+        self._checkpoints = [(start, 0, zlib.decompressobj(GZIP_WBITS))]
+        self._offsets = [0]
+        self._restore(self._checkpoints[0])
+        self._position = 0
+
+    @property
+    def num_checkpoints(self) -> int:
+        return len(self._checkpoints)
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            while self._advance():  # the length is only known once everything was decompressed
+                pass
+            offset += self._buffer_start + len(self._buffer)
+        if offset < 0:
+            raise ValueError("Negative seek position {:d}".format(offset))
+        self._position = offset
+        return offset
+
+    def readinto(self, buffer) -> int:
+        view = memoryview(buffer).cast('B')
+        filled = 0
+        while filled < len(view):
+            position = self._position
+            if position < self._buffer_start:
+                self._restore(self._checkpoints[bisect.bisect_right(self._offsets, position) - 1])
+            elif position < self._buffer_start + len(self._buffer):
+                start = position - self._buffer_start
+                chunk = self._buffer[start:start + len(view) - filled]
+                view[filled:filled + len(chunk)] = chunk
+                filled += len(chunk)
+                self._position += len(chunk)
+            elif not self._advance():
+                break
+        return filled
+
+    def _restore(self, checkpoint: tuple) -> None:
+        compressed_offset, offset, decompressor = checkpoint
+        self._file.seek(compressed_offset)
+        self._decompressor = decompressor.copy()
+        self._pending = b""
+        self._buffer = b""
+        self._buffer_start = offset
+
+    def _advance(self) -> bool:
+        """Decompresses at most `CHUNK_SIZE` (or `_spacing`) bytes more into `_buffer`; returns `False` at the end of
+        the file."""
+        decompressor = self._decompressor
+        if decompressor.eof:  # the next gzip member, if any, starts with what the last one left unused
+            self._pending = decompressor.unused_data
+            decompressor = self._decompressor = zlib.decompressobj(GZIP_WBITS)
+        data = self._pending or self._file.read(CHUNK_SIZE)
+        if not data:
+            return False
+        self._buffer_start += len(self._buffer)
+        self._buffer = decompressor.decompress(data, min(CHUNK_SIZE, self._spacing))
+        self._pending = decompressor.unconsumed_tail
+        end = self._buffer_start + len(self._buffer)
+        if not decompressor.eof and end >= self._offsets[-1] + self._spacing:
+            self._checkpoints.append((self._file.tell() - len(self._pending), end, decompressor.copy()))
+            self._offsets.append(end)
+        return True
+
+
+_ARCHIVES: dict[str, OrbArchive] = {}
+
+
+def open_archive(path: str) -> OrbArchive:
+    """Returns the archive at `path`, opening and indexing it on first use; raises `ValueError` for files that are
+    not a supported kind of archive."""
+    archive = _ARCHIVES.get(path)
+    if archive is None:
+        if path.endswith(".zip"):
+            archive = OrbZipArchive(path)
+        elif path.endswith((".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz")):
+            archive = OrbTarArchive(path)
+        elif path.endswith((".warc", ".warc.gz")):
+            archive = OrbWarcArchive(path)
+        else:
+            raise ValueError("Not a .zip, .tar(.gz), or .warc(.gz) archive: {}".format(path))
+        _ARCHIVES[path] = archive
+    return archive
+
+
+def close_archives() -> None:
+    """Closes every archive opened by `open_archive`."""
+    while _ARCHIVES:
+        _ARCHIVES.popitem()[1].close()
+
+
+def archive_uri(archive_path: str, member: str) -> str:
+    """Returns the archive URI of `member` of the archive at `archive_path`."""
+    return ARCHIVE_SCHEME + archive_path + MEMBER_SEPARATOR + member
+
+
+def split_archive_uri(uri: str) -> tuple[str, str]:
+    """Returns the path of the archive and the name of the member an archive URI names."""
+    if not uri.startswith(ARCHIVE_SCHEME) or MEMBER_SEPARATOR not in uri:
+        raise ValueError("Not an archive URI: {}".format(uri))
+    return tuple(uri[len(ARCHIVE_SCHEME):].split(MEMBER_SEPARATOR, 1))
+
+
+def _normalize(name: str) -> str:
+    """Returns a member name without a leading "./" or "/", as links to it are resolved."""
+    return posixpath.normpath(name).lstrip("/")
+
+
+def _http_status(block: bytes) -> int | None:
+    """Returns the status code of the HTTP response at the start of `block`, or `None` if there is none."""
+    parts = block[:block.find(b"\n")].split()
+    return int(parts[1]) if len(parts) > 1 and parts[0].startswith(b"HTTP/") and parts[1].isdigit() else None
+
+
+def _http_body(block: bytes) -> bytes:
+    """Returns the body of the HTTP response in `block`, decoding its transfer and content encodings."""
+    end = block.find(b"\r\n\r\n")
+    separator = 4
+    if end < 0:
+        end, separator = block.find(b"\n\n"), 2
+    if end < 0:
+        return b""
+    headers = {}
+    for line in block[:end].decode("ISO-8859-1").splitlines()[1:]:
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip().lower()
+    body = block[end + separator:]
+    if "chunked" in headers.get("transfer-encoding", ""):
+        body = _dechunk(body)
+    encoding = headers.get("content-encoding", "identity")
+    if encoding in ("gzip", "x-gzip"):
+        body = zlib.decompress(body, GZIP_WBITS)
+    elif encoding == "deflate":
+        try:
+            body = zlib.decompress(body)
+        except zlib.error:
+            body = zlib.decompress(body, -zlib.MAX_WBITS)
+    return body
+
+
+def _dechunk(body: bytes) -> bytes:
+    data = bytearray()
+    position = 0
+    while position < len(body):
+        line_end = body.find(b"\r\n", position)
+        if line_end < 0:
+            break
+        size = int(body[position:line_end].split(b";")[0] or b"0", 16)
+        if size == 0:
+            break
+        data += body[line_end + 2:line_end + 2 + size]
+        position = line_end + 2 + size + 2
+    return bytes(data)
+
+
+if __name__ == '__main__':
+    main()
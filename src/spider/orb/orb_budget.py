@@ -0,0 +1,151 @@
+"""Crawl budgets for the local crawler: limits on pages, bytes read, link depth, and wall-clock time after which
+`run_sequential_crawl` stops cleanly, leaving a partial (and flagged) output instead of running unbounded.
+"""
+
+from __future__ import annotations
+import json
+from time import monotonic
+
+__author__ = "Garrett Buchanan", "Livingstone Rwagatare"
+__copyright__ = "Copyright 2023, Westmont College"
+__credits__ = ["Garrett Buchanan", "Livingstone Rwagatare", "Mike Ryu"]
+__license__ = "MIT"
+__email__ = "mryu@westmont.edu"
+
+LIMITS = ("max_pages", "max_bytes", "max_depth", "max_seconds")
+
+
+class OrbCrawlBudget:
+    """Tracks what a crawl has used against optional limits, and what was left undone when one of them ran out.
+
+    `max_pages`, `max_bytes`, and `max_seconds` end the crawl: `exceeded` is checked before every page is crawled,
+    and once a limit is reached the crawl stops and `stop` records the reason along with the URIs remaining in the
+    frontier. `max_depth` does not end the crawl but bounds it: pages further than `max_depth` links from a seed
+    (following the "depth" each `OrbURI` inherits from its parent) are skipped and counted instead of crawled, so
+    a crawl limited only by depth still runs to completion.
+
+    Attributes:
+        _limits (dict[str, int | float | None]): every limit in `LIMITS`, `None` where there is no limit.
+        _pages (int): pages read so far.
+        _bytes (int): bytes read so far.
+        _too_deep (int): URIs skipped for being beyond `max_depth`.
+        _started (float | None): `monotonic` time when the crawl started, `None` until `start` is called.
+        _stopped (str | None): the limit that stopped the crawl, `None` if it has not been stopped.
+        _remaining (list[str]): URIs left in the frontier when the crawl was stopped.
+
+    """
+    def __init__(self, max_pages: int = None, max_bytes: int = None, max_depth: int = None,
+                 max_seconds: float = None) -> None:
+        self._limits = {"max_pages": max_pages, "max_bytes": max_bytes, "max_depth": max_depth,
+                        "max_seconds": max_seconds}
+        for limit, value in self._limits.items():
+            if value is not None and value < 0:
+                raise ValueError("Crawl budget {} must not be negative: {}".format(limit, value))
+        self._pages = 0
+        self._bytes = 0
+        self._too_deep = 0
+        self._started: float | None = None
+        self._stopped: str | None = None
+        self._remaining: list[str] = []
+
+    @classmethod
+    def from_options(cls, options: dict, **overrides) -> OrbCrawlBudget:
+        """Creates the budget set by the `LIMITS` keys of the config `options`; `overrides` that are not `None`
+        (e.g., from the command line) take precedence."""
+        limits = {limit: options.get(limit) for limit in LIMITS}
+        limits.update((limit, value) for limit, value in overrides.items() if value is not None)
+        return cls(**limits)
+
+    def __bool__(self) -> bool:
+        """Returns whether any limit is set."""
+        return any(value is not None for value in self._limits.values())
+
+    @property
+    def pages(self) -> int:
+        return self._pages
+
+    @property
+    def bytes(self) -> int:
+        return self._bytes
+
+    @property
+    def stopped(self) -> str | None:
+        return self._stopped
+
+    @property
+    def partial(self) -> bool:
+        """Whether the crawl was stopped before its frontier was empty, or skipped pages beyond its depth limit."""
+        return self._stopped is not None or self._too_deep > 0
+
+    @property
+    def remaining(self) -> list[str]:
+        return self._remaining
+
+    def start(self) -> None:
+        """Starts the wall clock, unless it is already running."""
+        if self._started is None:
+            self._started = monotonic()
+
+    def elapsed(self) -> float:
+        return 0.0 if self._started is None else monotonic() - self._started
+
+    def exceeded(self) -> str | None:
+        """Returns the name of the first limit in `LIMITS` that has been used up, or `None` if there is none."""
+        limits = self._limits
+        if limits["max_pages"] is not None and self._pages >= limits["max_pages"]:
+            return "max_pages"
+        if limits["max_bytes"] is not None and self._bytes >= limits["max_bytes"]:
+            return "max_bytes"
+        if limits["max_seconds"] is not None and self.elapsed() >= limits["max_seconds"]:
+            return "max_seconds"
+        return None
+
+    def within_depth(self, uri) -> bool:
+        """Returns whether `uri` is within the depth limit; counts it as skipped if it is not."""
+        max_depth = self._limits["max_depth"]
+        if max_depth is None or uri_depth(uri) <= max_depth:
+            return True
+        self._too_deep += 1
+        return False
+
+    def charge(self, bytes_read: int) -> None:
+        """Adds one page of `bytes_read` bytes to what the crawl has used."""
+        self._pages += 1
+        self._bytes += bytes_read
+
+    def stop(self, reason: str, frontier) -> None:
+        """Records that the crawl stopped because of `reason`, and empties the URIs left in `frontier` into
+        `remaining`."""
+        self._stopped = reason
+        if hasattr(frontier, "drain"):  # an `OrbHostScheduler`, whose `pop` would wait for the rest to be fetched
+            self._remaining.extend(uri.uri for uri in frontier.drain())
+            return
+        while frontier:
+            uri = frontier.pop()
+            if uri is None:
+                break
+            self._remaining.append(uri.uri)
+
+    def to_dict(self) -> dict:
+        """Returns the limits, the usage, and why (and with what left) the crawl stopped as a JSON-serializable
+        `dict`."""
+        return {
+            "partial": self.partial,
+            "stopped": self._stopped,
+            "limits": dict(self._limits),
+            "used": {"pages": self._pages, "bytes": self._bytes, "seconds": round(self.elapsed(), 6)},
+            "skipped_too_deep": self._too_deep,
+            "remaining_count": len(self._remaining),
+            "remaining": list(self._remaining),
+        }
+
+    def dump(self, output_path: str) -> None:
+        """Writes `to_dict` as JSON to `output_path`."""
+        with open(output_path, 'w', encoding="UTF-8") as output_file:
+            json.dump(self.to_dict(), output_file, indent=2)
+            output_file.write("\n")
+
+
+def uri_depth(uri) -> int:
+    """Returns the number of links followed from a seed to reach `uri` (0 for a seed, whose props carry no depth)."""
+    return uri.props.get("depth", 0) if uri.props else 0
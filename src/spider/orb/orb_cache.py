@@ -0,0 +1,271 @@
+"""On-disk cache of HTTP responses for `OrbHttpPool`, so that crawling the same mirrors again only downloads the
+pages that changed: cached pages are revalidated with conditional requests, and a page that has not changed
+("304 Not Modified") is served from the cache along with what was extracted from it the last time.
+
+A cache is a directory holding one `<digest>.entry` file per canonical URI (`canonical_uri`), named after the
+BLAKE2b digest of the URI. An entry file starts with one line of JSON metadata (the URI, the validators and
+caching headers of the response, when it was stored, and the extraction results saved for it, if any), followed by
+the decoded body. A URI that was redirected may instead have an alias entry, naming the URI it was redirected to
+in place of the headers and body, so that fetching it again is served from the entry of that URI without another
+round-trip for the redirect. Entries are evicted least recently used first once their total size exceeds the
+cache's limit; the recency of an entry is the modification time of its file, so it survives from one run to the
+next.
+"""
+
+from __future__ import annotations
+import os
+import json
+import time
+import hashlib
+import threading
+from typing import NamedTuple
+from collections import OrderedDict
+from urllib.parse import urlsplit, urlunsplit
+from spider.orb.orb_stats import OrbCrawlStats, OrbNullStats, NULL_STATS
+
+__author__ = "Garrett Buchanan", "Livingstone Rwagatare"
+__copyright__ = "Copyright 2023, Westmont College"
+__credits__ = ["Garrett Buchanan", "Livingstone Rwagatare", "Mike Ryu"]
+__license__ = "MIT"
+__email__ = "mryu@westmont.edu"
+
+DEFAULT_CACHE_BYTES = 256 * 1024 * 1024  # Total size of entry files to keep.
+ENTRY_SUFFIX = ".entry"
+DEFAULT_PORTS = {"http": 80, "https": 443}
+CACHED_HEADERS = ("content-type", "etag", "last-modified", "cache-control")
+EXTRACTION_CONFIG = ("encoding", "external", "parser", "tags", "extract_links")  # Agent config extractions use.
+
+
+class OrbCacheEntry(NamedTuple):
+    """Cached response for one canonical URI.
+
+    Attributes:
+        uri (str): canonical URI of the response.
+        headers (dict[str, str]): the `CACHED_HEADERS` of the response that were present, lowercased.
+        stored_at (float): time the response was stored or last revalidated, as seconds since the epoch.
+        extraction (dict | None): extraction results saved for the body: the `extraction_key` they were made
+            with, the document content, and the links.
+        body (bytes): decoded body of the response.
+
+    """
+    uri: str
+    headers: dict
+    stored_at: float
+    extraction: dict | None
+    body: bytes
+
+    def validators(self) -> dict:
+        """Returns the conditional request headers that revalidate this entry (empty if it has no validators)."""
+        conditions = {}
+        if "etag" in self.headers:
+            conditions["If-None-Match"] = self.headers["etag"]
+        if "last-modified" in self.headers:
+            conditions["If-Modified-Since"] = self.headers["last-modified"]
+        return conditions
+
+    def is_fresh(self, now: float) -> bool:
+        """Returns whether the entry may be used without revalidating it, per its "Cache-Control: max-age"."""
+        directives = _cache_control(self.headers.get("cache-control", ""))
+        if "no-cache" in directives or "max-age" not in directives:
+            return False
+        try:
+            return now - self.stored_at < int(directives["max-age"])
+        except ValueError:
+            return False
+
+    def extracted(self, key: str) -> tuple[str, list[str]] | None:
+        """Returns the content and links extracted from the body with `key`, or `None` if none were saved."""
+        if self.extraction is None or self.extraction.get("key") != key:
+            return None
+        return self.extraction["content"], self.extraction["links"]
+
+
+class OrbHttpCache:
+    """Directory of cached responses, looked up by canonical URI, with LRU eviction by total size.
+
+    `OrbHttpPool` records the outcome of every cacheable fetch with `count`: a "hit" (a fresh entry, served without
+    a request), "revalidated" (a conditional request answered "304 Not Modified"), or a "miss" (a full download).
+    Those, and the entries "stored" and "evicted", are counted with a "cache_" prefix in `stats` as well. The cache
+    may be used from several threads at once.
+
+    Attributes:
+        _cache_dir (str): directory the entries are kept in.
+        _max_bytes (int): total size of entry files to keep.
+        _entries (OrderedDict[str, int]): size of every entry file by digest, least recently used first.
+        _size (int): total size of entry files.
+        _stats (OrbCrawlStats | OrbNullStats): where the outcomes are counted.
+        _counts (dict[str, int]): hits, revalidations, misses, and entries stored and evicted.
+        _lock (Lock): guards the state above and the entry files.
+
+    """
+    def __init__(self, cache_dir: str, max_bytes: int = DEFAULT_CACHE_BYTES,
+                 stats: OrbCrawlStats | OrbNullStats = NULL_STATS) -> None:
+        if max_bytes is None or max_bytes < 0:
+            raise ValueError("Cache size must be a non-negative number of bytes.")
+        os.makedirs(cache_dir, exist_ok=True)
+        self._cache_dir = cache_dir
+        self._max_bytes = max_bytes
+        self._entries: OrderedDict[str, int] = OrderedDict()
+        self._size = 0
+        self._stats = stats
+        self._counts = dict.fromkeys(("hits", "revalidated", "misses", "stored", "evicted"), 0)
+        self._lock = threading.Lock()
+        found = []
+        for entry in os.scandir(cache_dir):
+            if entry.name.endswith(ENTRY_SUFFIX) and entry.is_file():
+                found.append((entry.stat().st_mtime, entry.name[:-len(ENTRY_SUFFIX)], entry.stat().st_size))
+        for _, digest, size in sorted(found):
+            self._entries[digest] = size
+            self._size += size
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size(self) -> int:
+        """Total size of the entry files in bytes."""
+        return self._size
+
+    def get(self, uri: str) -> OrbCacheEntry | None:
+        """Returns the entry cached for `uri`, marking it as recently used, or `None` if there is none. If `uri` is
+        an `alias` of another URI, returns the entry cached for that one, whose `uri` tells them apart."""
+        found = self._read(canonical_uri(uri))
+        if found is not None and "alias" in found[0]:
+            found = self._read(found[0]["alias"])
+            if found is not None and "alias" in found[0]:
+                return None  # aliases are not followed any further
+        if found is None:
+            return None
+        meta, body = found
+        return OrbCacheEntry(meta["uri"], meta["headers"], meta["stored_at"], meta.get("extraction"), body)
+
+    def put(self, uri: str, headers: dict, body: bytes, extraction: dict = None) -> OrbCacheEntry | None:
+        """Caches the response `body` to `uri` with its (lowercased) `headers`, unless it must not be stored
+        ("Cache-Control: no-store") or is larger than the whole cache; returns the new entry, or `None`."""
+        if "no-store" in _cache_control(headers.get("cache-control", "")):
+            return None
+        entry = OrbCacheEntry(canonical_uri(uri), {name: headers[name] for name in CACHED_HEADERS if name in headers},
+                              time.time(), extraction, body)
+        return entry if self._write(entry) else None
+
+    def alias(self, uri: str, target: str) -> bool:
+        """Makes `uri` look up the entry cached for `target` (as when fetching `uri` was redirected to `target`),
+        instead of any entry of its own; returns whether the alias was stored."""
+        canonical, target = canonical_uri(uri), canonical_uri(target)
+        if canonical == target:
+            return False
+        return self._store(canonical, {"uri": canonical, "alias": target}, b"")
+
+    def refresh(self, entry: OrbCacheEntry, headers: dict) -> OrbCacheEntry:
+        """Stores `entry` again as revalidated now, updated with the (lowercased) `headers` of the "304 Not
+        Modified" response; returns the updated entry."""
+        updated = dict(entry.headers)
+        updated.update((name, headers[name]) for name in CACHED_HEADERS if name in headers and name != "content-type")
+        entry = entry._replace(headers=updated, stored_at=time.time())
+        self._write(entry)
+        return entry
+
+    def save_extraction(self, entry: OrbCacheEntry, key: str, content: str, links: list[str]) -> OrbCacheEntry:
+        """Stores the `content` and `links` extracted from the body of `entry` with `key` along with it."""
+        entry = entry._replace(extraction={"key": key, "content": content, "links": list(links)})
+        self._write(entry)
+        return entry
+
+    def count(self, outcome: str) -> None:
+        """Counts one fetch with `outcome`: "hits", "revalidated", or "misses"."""
+        with self._lock:
+            self._counts[outcome] += 1
+            self._stats.count("cache_" + outcome)
+
+    def to_dict(self) -> dict:
+        """Returns the counts, the number of entries, and their total size as a JSON-serializable `dict`."""
+        with self._lock:
+            return dict(self._counts, entries=len(self._entries), bytes=self._size)
+
+    def _read(self, canonical: str) -> tuple[dict, bytes] | None:
+        digest = _digest(canonical)
+        with self._lock:
+            if digest not in self._entries:
+                return None
+            try:
+                with open(self._path(digest), 'rb') as entry_file:
+                    meta = json.loads(entry_file.readline())
+                    body = entry_file.read()
+                os.utime(self._path(digest))
+            except (OSError, ValueError):
+                self._remove(digest)
+                return None
+            if meta.get("uri") != canonical:
+                return None
+            self._entries.move_to_end(digest)
+        return meta, body
+
+    def _write(self, entry: OrbCacheEntry) -> bool:
+        return self._store(entry.uri, {"uri": entry.uri, "headers": entry.headers, "stored_at": entry.stored_at,
+                                       "extraction": entry.extraction}, entry.body)
+
+    def _store(self, canonical: str, meta: dict, body: bytes) -> bool:
+        meta = json.dumps(meta).encode("UTF-8") + b"\n"
+        size = len(meta) + len(body)
+        if size > self._max_bytes:
+            return False
+        digest = _digest(canonical)
+        with self._lock:
+            path = self._path(digest)
+            temp_path = "{}.{:d}.tmp".format(path, threading.get_ident())
+            with open(temp_path, 'wb') as entry_file:
+                entry_file.write(meta)
+                entry_file.write(body)
+            os.replace(temp_path, path)  # readers see the old entry or the new one, never half of one
+            self._size += size - self._entries.pop(digest, 0)
+            self._entries[digest] = size
+            self._counts["stored"] += 1
+            self._stats.count("cache_stored")
+            while self._size > self._max_bytes:
+                self._remove(next(iter(self._entries)))
+                self._counts["evicted"] += 1
+                self._stats.count("cache_evicted")
+        return True
+
+    def _remove(self, digest: str) -> None:
+        self._size -= self._entries.pop(digest, 0)
+        try:
+            os.remove(self._path(digest))
+        except OSError:
+            pass
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self._cache_dir, digest + ENTRY_SUFFIX)
+
+
+def canonical_uri(uri: str) -> str:
+    """Returns `uri` with its scheme and host lowercased, its default port, user info, and fragment dropped, and
+    an empty path made "/", so that every spelling of the same resource is cached once."""
+    parts = urlsplit(uri)
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if ":" in host:
+        host = "[{}]".format(host)
+    port = parts.port
+    netloc = host if port is None or port == DEFAULT_PORTS.get(scheme) else "{}:{:d}".format(host, port)
+    return urlunsplit((scheme, netloc, parts.path or "/", parts.query, ""))
+
+
+def extraction_key(config: dict) -> str:
+    """Returns a digest of the agent `config` that extraction results depend on; results saved with another key
+    (e.g., from a crawl looking for other tags) are not reused."""
+    relevant = json.dumps({name: config.get(name) for name in EXTRACTION_CONFIG}, sort_keys=True)
+    return hashlib.blake2b(relevant.encode("UTF-8"), digest_size=8).hexdigest()
+
+
+def _digest(canonical: str) -> str:
+    return hashlib.blake2b(canonical.encode("UTF-8"), digest_size=16).hexdigest()
+
+
+def _cache_control(value: str) -> dict[str, str]:
+    directives = {}
+    for directive in value.split(","):
+        name, _, argument = directive.strip().partition("=")
+        if name:
+            directives[name.lower()] = argument.strip('"')
+    return directives
@@ -0,0 +1,488 @@
+#!/usr/bin/env python3
+"""Runs a local crawl distributed over several nodes (processes, on one or more hosts sharing the filesystem that
+holds the corpus), with the same output as `orb_runner.run_sequential_crawl` followed by a `StreamingTwoGramCounter`.
+
+Every node owns an equal range of a stable 32-bit hash of URIs (`partition`) and crawls only the URIs it owns,
+deduplicating them against its own `OrbUriDB` shard. Links found for URIs owned by other nodes are batched and sent
+to their owners over TCP. Likewise, every document is sent to the node owning its content digest, which drops it if
+its `OrbDocDB` shard has seen the content before and otherwise counts its two-grams right away. A coordinator seeds
+the nodes, detects when they have all gone idle with no batches in flight, and collects their results.
+
+The sequential crawl writes documents back to back, in breadth-first order, into one stream, so tokens and two-grams
+span document boundaries and which copy of duplicate content counts depends on the crawl order. To reproduce that
+exactly, every node reports the links of every page it crawled, and the coordinator replays the breadth-first crawl
+over them (which is cheap: it reads no pages) to order the distinct documents. Nodes count the two-grams within each
+document, leaving out its first and last few characters (up to the first and after the last whitespace); those
+fringes are sent to the coordinator, which counts the two-grams across documents by stitching them back together in
+crawl order, and merges the partial counts of all nodes.
+
+Example:
+    $ python3 -m spider.orb.orb_distributed node --listen 0.0.0.0:7100
+    $ python3 -m spider.orb.orb_distributed crawl ../data/orb_a.config.json ../out/a.txt --nodes h1:7100 h2:7100
+    $ python3 -m spider.orb.orb_distributed crawl ../data/orb_a.config.json ../out/a.txt --local 4
+"""
+
+from __future__ import annotations
+import sys
+import json
+import time
+import zlib
+import queue
+import socket
+import struct
+import hashlib
+import argparse
+import threading
+import multiprocessing
+from collections import Counter, deque
+from spider.orb.orb_models import OrbURI, OrbDoc, OrbDocDB, OrbUriDB, agent_class
+from text_processing.freq_models import FrequencyTable
+from text_processing.freq_stream import TOKEN_PATTERN
+from text_processing.freq_stopwords import StopwordFilter
+from text_processing.freq_utils import order_frequencies
+
+__author__ = "Garrett Buchanan", "Livingstone Rwagatare"
+__copyright__ = "Copyright 2023, Westmont College"
+__credits__ = ["Garrett Buchanan", "Livingstone Rwagatare", "Mike Ryu"]
+__license__ = "MIT"
+__email__ = "mryu@westmont.edu"
+
+FRAME = struct.Struct(">I")  # Length prefix of every message; messages are UTF-8 JSON objects.
+DEFAULT_BATCH_SIZE = 256  # Links (or documents) sent to another node at a time.
+POLL_INTERVAL = 0.02  # Seconds between the coordinator's checks for termination.
+CUTS = (" ", "\n")  # Characters at which `TokenStream` cuts text; see `count_document`.
+
+
+def main() -> None:
+    pars = argparse.ArgumentParser(prog="python3 -m spider.orb.orb_distributed")
+    commands = pars.add_subparsers(dest="command", required=True)
+    node = commands.add_parser("node", help="run a crawl node until a coordinator is done with it")
+    node.add_argument("--listen", type=str, default="127.0.0.1:0", help="host:port to listen on")
+    crawl = commands.add_parser("crawl", help="coordinate a crawl over running nodes (or local processes)")
+    crawl.add_argument("config_file_path", type=str, help="required path to a config JSON file")
+    crawl.add_argument("output_file_path", type=str, help="required path to the output text file")
+    where = crawl.add_mutually_exclusive_group(required=True)
+    where.add_argument("--nodes", type=str, nargs='+', metavar="HOST:PORT", help="addresses of running nodes")
+    where.add_argument("--local", type=int, metavar="N", help="number of local node processes to start")
+    args = pars.parse_args()
+
+    if args.command == "node":
+        host, port = args.listen.rsplit(":", 1)
+        node = OrbNode(host, int(port))
+        print("Listening on {}:{:d}".format(*node.address), flush=True)
+        node.serve()
+        return
+
+    from spider.orb.orb_runner import validate_config, write_twogram_freq, VALID_CONFIG_SCHEMA
+    try:
+        with open(args.config_file_path, 'r') as config_file:
+            config = json.load(config_file)
+        if not validate_config(config, VALID_CONFIG_SCHEMA):
+            raise OSError(f"Invalid configuration file: {args.config_file_path}")
+    except OSError as e:
+        print("An error occurred while trying to open files:\n  ", e, file=sys.stderr)
+        exit(1)
+    if args.local:
+        frequencies = run_local_crawl(config, args.local)
+    else:
+        addresses = [(host, int(port)) for host, port in (node.rsplit(":", 1) for node in args.nodes)]
+        frequencies = run_distributed_crawl(config, addresses)
+    write_twogram_freq(frequencies, args.output_file_path, config)
+
+
+def partition(uri: str, nodes: int) -> int:
+    """Returns the number of the node owning `uri` out of `nodes`: each node owns an equal range of the URIs' CRC-32,
+    which (unlike `hash`) is the same in every process and on every host."""
+    return (zlib.crc32(uri.encode("UTF-8")) * nodes) >> 32
+
+
+def content_digest(content: str) -> str:
+    """Returns a stable digest of a document's content, to route it to the node deduplicating it."""
+    return hashlib.blake2b(content.encode("UTF-8"), digest_size=16).hexdigest()
+
+
+def count_document(content: str, stopwords: StopwordFilter | None, counts: Counter) -> tuple[list, int]:
+    """Counts the two-grams of a document that do not depend on its neighbors in the crawl into `counts`.
+
+    `TokenStream` only cuts text at spaces and newlines, so the text before a document's first cut and after its
+    last cut joins the text of its neighbors, while the text in between is tokenized exactly as it would be in the
+    whole stream. The two-grams within that text are counted here; what is needed to count the rest once the order
+    of the documents is known is returned as the document's fringe: `[head, first, last, tail]`, where `head` and
+    `tail` are the text before the first and after the last cut, and `first` and `last` the first and last tokens
+    (after stopword removal) in between, if any. The fringe of a document without any cut is `[content]`.
+
+    Returns:
+        The fringe, and the number of two-grams counted.
+    """
+    start = min((index for index in (content.find(cut) for cut in CUTS) if index >= 0), default=-1)
+    if start < 0:
+        return [content], 0
+    end = max(content.rfind(cut) for cut in CUTS) + 1
+    tokens = TOKEN_PATTERN.findall(content[start:end].lower())
+    if stopwords:
+        tokens = stopwords.filter(tokens)
+    counts.update(zip(tokens, tokens[1:]))
+    return [content[:start], tokens[0] if tokens else None, tokens[-1] if tokens else None, content[end:]], \
+        max(len(tokens) - 1, 0)
+
+
+def stitch_documents(fringes, stopwords: StopwordFilter | None, counts: Counter) -> int:
+    """Counts the two-grams across documents into `counts`, given the fringes of the documents (see
+    `count_document`) in the order they were crawled; returns the number of two-grams counted.
+
+    Together with the counts of `count_document` for every document, these are exactly the counts a
+    `StreamingTwoGramCounter` would make of all documents written to it in that order.
+    """
+    carry, prev, total = "", None, 0
+    for fringe in fringes:
+        if len(fringe) == 1:  # no cut: the whole document joins the text around it
+            carry += fringe[0]
+            continue
+        head, first, last, tail = fringe
+        tokens = TOKEN_PATTERN.findall((carry + head).lower())
+        if stopwords:
+            tokens = stopwords.filter(tokens)
+        if first is not None:
+            tokens.append(first)
+        for token in tokens:
+            if prev is not None:
+                counts[(prev, token)] += 1
+                total += 1
+            prev = token
+        if last is not None:
+            prev = last
+        carry = tail
+    tokens = TOKEN_PATTERN.findall(carry.lower())
+    if stopwords:
+        tokens = stopwords.filter(tokens)
+    for token in tokens:
+        if prev is not None:
+            counts[(prev, token)] += 1
+            total += 1
+        prev = token
+    return total
+
+
+class OrbNode:
+    """One node of a distributed crawl: crawls the URIs it owns and counts the documents it owns.
+
+    A node listens for connections from its peers and the coordinator; a thread per connection reads messages into
+    one inbox, and the node's main loop (`serve`) handles them one at a time, crawling a page from its queue
+    whenever the inbox is empty. Messages it handles are:
+
+    * `start` (from the coordinator): the config, the addresses of all nodes, this node's number, the seeds it
+      owns, and whether to follow links.
+    * `links` and `docs` (from peers): batches of URIs, and of `[digest, content]` documents, this node owns.
+    * `status` (from the coordinator): answered with whether the node is idle and how many batches it has sent to,
+      and handled from, its peers, for termination detection.
+    * `finish` (from the coordinator): answered with the node's results, after which `serve` returns.
+
+    Attributes:
+        _server (socket): listening socket.
+        _inbox (Queue): `(message, connection)` pairs read from all connections.
+        _node (int): this node's number.
+        _peers (list[tuple[str, int]]): address of every node, by number.
+        _connections (dict[int, socket]): connections to peers, opened on first use.
+        _out (dict[tuple[str, int], list]): batches being filled, by message type and peer.
+        _queue (deque[str]): URIs to crawl.
+        _uri_db (OrbUriDB): shard of URIs seen, i.e., queued or crawled.
+        _doc_db (OrbDocDB): shard of fingerprints of documents counted.
+        _pages (list[list]): `[uri, digest or None, links]` of every page crawled.
+        _fringes (dict[str, list]): fringe of every document counted, by digest.
+        _counts (Counter): two-grams counted within documents.
+        _total (int): number of two-grams counted.
+        _sent (int): batches sent to peers.
+        _handled (int): batches from peers handled.
+        _early (list[tuple[dict, socket]]): batches from peers received before `start`, handled right after it.
+        _warc (OrbWarcWriter | None): WARC file of this node's pages, if the "warc_dir" option is set.
+        _follow_links (bool): whether links are crawled, or only the seeds (e.g., every page found by `orb_scan`).
+
+    """
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, batch_size: int = DEFAULT_BATCH_SIZE) -> None:
+        self._server = socket.create_server((host, port))
+        self._batch_size = batch_size
+        self._inbox: queue.Queue = queue.Queue()
+        self._done = False
+        self._node = 0
+        self._peers: list[tuple[str, int]] = []
+        self._connections: dict[int, socket.socket] = {}
+        self._out: dict[tuple[str, int], list] = {}
+        self._config: dict = {}
+        self._stopwords: StopwordFilter | None = None
+        self._queue: deque[str] = deque()
+        self._uri_db = OrbUriDB()
+        self._doc_db = OrbDocDB()
+        self._pages: list[list] = []
+        self._fringes: dict[str, list] = {}
+        self._counts: Counter = Counter()
+        self._total = 0
+        self._sent = 0
+        self._handled = 0
+        self._early: list[tuple[dict, socket.socket]] = []
+        self._warc = None
+        self._follow_links = True
+
+    @property
+    def address(self) -> tuple[str, int]:
+        return self._server.getsockname()[:2]
+
+    def serve(self) -> None:
+        """Handles messages and crawls pages until the coordinator asks for the results."""
+        threading.Thread(target=self._accept, daemon=True).start()
+        try:
+            while not self._done:
+                try:
+                    message, connection = self._inbox.get(block=not self._queue)
+                except queue.Empty:
+                    self._crawl(self._queue.popleft())
+                    if not self._queue:
+                        self._flush()
+                    continue
+                self._handle(message, connection)
+        finally:
+            self._server.close()
+            for connection in self._connections.values():
+                connection.close()
+
+    def _accept(self) -> None:
+        while True:
+            try:
+                connection, _ = self._server.accept()
+            except OSError:
+                return  # the server was closed
+            threading.Thread(target=self._read, args=(connection,), daemon=True).start()
+
+    def _read(self, connection: socket.socket) -> None:
+        with connection:
+            while True:
+                message = receive_message(connection)
+                if message is None:
+                    return
+                self._inbox.put((message, connection))
+
+    def _handle(self, message: dict, connection: socket.socket) -> None:
+        kind = message["type"]
+        if kind in ("links", "docs") and not self._peers:  # a peer started before this node; handle it after start
+            self._early.append((message, connection))
+        elif kind == "links":
+            for uri in message["uris"]:
+                self._add_uri(uri)
+            self._handled += 1
+        elif kind == "docs":
+            for digest, content in message["docs"]:
+                self._add_doc(digest, content)
+            self._handled += 1
+        elif kind == "status":
+            idle = not self._queue and not any(self._out.values())
+            send_message(connection, {"idle": idle, "sent": self._sent, "handled": self._handled})
+        elif kind == "start":
+            self._config = message["config"]
+            self._stopwords = StopwordFilter.from_config(self._config)
+            self._node = message["node"]
+            self._peers = [tuple(peer) for peer in message["peers"]]
+            self._follow_links = message.get("follow_links", True)
+            options = self._config["options"]
+            if options.get("warc_dir"):  # one WARC file per node
+                from spider.orb.orb_warc import OrbWarcWriter
+                self._warc = OrbWarcWriter(options["warc_dir"], self._node, self._config["agent_config"]["encoding"],
+                                           options.get("warc_batch_size"))
+            for uri in message["seeds"]:
+                self._add_uri(uri)
+            for early in self._early:
+                self._handle(*early)
+            self._early = []
+        elif kind == "finish":
+            if self._warc is not None:
+                self._warc.finish()
+            send_message(connection, {
+                "pages": self._pages,
+                "fringes": self._fringes,
+                "counts": [[first, second, count] for (first, second), count in self._counts.items()],
+                "total": self._total,
+            })
+            self._done = True
+        else:
+            raise ValueError("Unknown message type: {}".format(kind))
+
+    def _add_uri(self, uri: str) -> None:
+        if self._uri_db.add(OrbURI(uri)):
+            self._queue.append(uri)
+
+    def _add_doc(self, digest: str, content: str) -> None:
+        if self._doc_db.add(OrbDoc(content).fingerprint):
+            self._fringes[digest], total = count_document(content, self._stopwords, self._counts)
+            self._total += total
+
+    def _crawl(self, uri: str) -> None:
+        agent_config = self._config["agent_config"]
+        agent = agent_class(uri, agent_config)(OrbURI(uri), OrbDocDB(), OrbUriDB(), agent_config)
+        content_processor, link_processor = agent.crawl()
+        doc = next(content_processor, None)
+        digest = None
+        if doc is not None:
+            digest = content_digest(doc.content)
+            self._route("docs", digest, [digest, doc.content])
+        if self._warc is not None and agent.page is not None:
+            self._warc.add(uri, agent.page, None if doc is None else doc.content)
+        links = link_processor.links
+        if self._follow_links:
+            for link in dict.fromkeys(links):
+                self._route("links", link, link)
+        self._pages.append([uri, digest, links])
+
+    def _route(self, kind: str, key: str, item) -> None:
+        """Handles `item` if this node owns `key`, or adds it to the batch of `kind` for the node that does."""
+        owner = partition(key, len(self._peers))
+        if owner == self._node:
+            if kind == "links":
+                self._add_uri(item)
+            else:
+                self._add_doc(*item)
+            return
+        batch = self._out.setdefault((kind, owner), [])
+        batch.append(item)
+        if len(batch) >= self._batch_size:
+            self._send_batch(kind, owner)
+
+    def _flush(self) -> None:
+        for kind, owner in list(self._out):
+            if self._out[(kind, owner)]:
+                self._send_batch(kind, owner)
+
+    def _send_batch(self, kind: str, owner: int) -> None:
+        connection = self._connections.get(owner)
+        if connection is None:
+            connection = self._connections[owner] = socket.create_connection(self._peers[owner])
+        send_message(connection, {"type": kind, ("uris" if kind == "links" else "docs"): self._out[(kind, owner)]})
+        self._out[(kind, owner)] = []
+        self._sent += 1
+
+
+def run_distributed_crawl(config: dict, addresses: list[tuple[str, int]], poll_interval: float = POLL_INTERVAL,
+                          follow_links: bool = True) -> FrequencyTable:
+    """Coordinates a crawl over the running nodes at `addresses`; returns the two-gram frequencies of the crawl. With
+    `follow_links` off, only the seeds are crawled, as `run_sequential_crawl` does.
+
+    The crawl is over once every node is idle and as many batches have been handled as were sent, twice in a row
+    with the same counts (so no batch can have been in flight in between).
+    """
+    controls = [socket.create_connection(address) for address in addresses]
+    try:
+        seeds = config["seeds"]
+        for node, control in enumerate(controls):
+            send_message(control, {"type": "start", "node": node, "config": config,
+                                   "peers": [list(address) for address in addresses], "follow_links": follow_links,
+                                   "seeds": [seed for seed in seeds if partition(seed, len(addresses)) == node]})
+        previous = None
+        while True:
+            statuses = [request_message(control, {"type": "status"}) for control in controls]
+            wave = (sum(status["sent"] for status in statuses), sum(status["handled"] for status in statuses))
+            if all(status["idle"] for status in statuses) and wave[0] == wave[1]:
+                if wave == previous:
+                    break
+                previous = wave
+            else:
+                previous = None
+            time.sleep(poll_interval)
+        results = [request_message(control, {"type": "finish"}) for control in controls]
+    finally:
+        for control in controls:
+            control.close()
+    return merge_results(config, results, follow_links)
+
+
+def run_local_crawl(config: dict, nodes: int, follow_links: bool = True) -> FrequencyTable:
+    """Starts `nodes` node processes on this host, coordinates a crawl over them, and waits for them to exit."""
+    if nodes < 1:
+        raise ValueError("A distributed crawl needs at least one node.")
+    processes, addresses = [], []
+    try:
+        for _ in range(nodes):
+            receiver, sender = multiprocessing.Pipe(duplex=False)
+            process = multiprocessing.Process(target=_serve_local, args=(sender,), daemon=True)
+            process.start()
+            sender.close()
+            processes.append(process)
+            addresses.append(receiver.recv())
+            receiver.close()
+        return run_distributed_crawl(config, addresses, follow_links=follow_links)
+    finally:
+        for process in processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+
+
+def _serve_local(sender) -> None:
+    node = OrbNode()
+    sender.send(node.address)
+    sender.close()
+    node.serve()
+
+
+def merge_results(config: dict, results: list[dict], follow_links: bool = True) -> FrequencyTable:
+    """Replays the breadth-first crawl over the pages the nodes crawled to order the documents like
+    `run_sequential_crawl` would, stitches their fringes in that order, and merges all two-gram counts."""
+    pages, fringes, counts, total = {}, {}, Counter(), 0
+    for result in results:
+        for uri, digest, links in result["pages"]:
+            pages[uri] = (digest, links)
+        fringes.update(result["fringes"])
+        for first, second, count in result["counts"]:
+            counts[(first, second)] += count
+        total += result["total"]
+
+    order, seen_docs, seen_uris = [], set(), set()
+    frontier = deque(config["seeds"])  # seeds are not added to the URI database, just like in the sequential crawl
+    while frontier:
+        digest, links = pages.get(frontier.popleft(), (None, ()))
+        if digest is not None and digest not in seen_docs:
+            seen_docs.add(digest)
+            order.append(digest)
+        for link in links if follow_links else ():
+            if link not in seen_uris:
+                seen_uris.add(link)
+                frontier.append(link)
+
+    total += stitch_documents((fringes[digest] for digest in order), StopwordFilter.from_config(config), counts)
+    twograms, ordered_counts = order_frequencies(counts)
+    return FrequencyTable(twograms, ordered_counts, total, pairs=True)
+
+
+def send_message(connection: socket.socket, message: dict) -> None:
+    data = json.dumps(message, separators=(",", ":")).encode("UTF-8")
+    connection.sendall(FRAME.pack(len(data)) + data)
+
+
+def receive_message(connection: socket.socket) -> dict | None:
+    """Returns the next message from `connection`, or `None` if it was closed."""
+    header = _receive_exactly(connection, FRAME.size)
+    if header is None:
+        return None
+    data = _receive_exactly(connection, FRAME.unpack(header)[0])
+    if data is None:
+        raise ConnectionError("Connection closed in the middle of a message.")
+    return json.loads(data)
+
+
+def request_message(connection: socket.socket, message: dict) -> dict:
+    """Sends `message` and returns the reply."""
+    send_message(connection, message)
+    reply = receive_message(connection)
+    if reply is None:
+        raise ConnectionError("Node closed the connection before replying.")
+    return reply
+
+
+def _receive_exactly(connection: socket.socket, size: int) -> bytes | None:
+    chunks = bytearray()
+    while len(chunks) < size:
+        chunk = connection.recv(min(size - len(chunks), 1 << 20))
+        if not chunk:
+            return None
+        chunks += chunk
+    return bytes(chunks)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""Provides `OrbDocStoreWriter` and `OrbDocStore` for keeping the documents of a crawl on disk, compressed, so they
+can be streamed again (e.g., to tokenize them) or retrieved one by one by IID after the crawl, in constant memory.
+
+A document store is a directory holding:
+
+* `blocks.bin`: the documents in the order they were added, packed into blocks of about `block_size` bytes that
+  are each compressed with zlib. Within a block, every document is stored as the varint lengths of its URI, title,
+  and content (in UTF-8 bytes, plus one, with zero standing for `None`) followed by those bytes.
+* `blocks.idx`: the file offset of every block in `blocks.bin`, plus the size of `blocks.bin` at the end, as
+  little-endian unsigned 64-bit integers.
+* `docs.idx`: for every document, in order of IID, its IID, its block number, and its offset within the
+  uncompressed block (`DOC_RECORD`).
+* `meta.json`: format version, compression, block size, and number of documents.
+
+Example:
+    $ python3 -m spider.orb.orb_docstore ../out/docs 12 40
+"""
+
+from __future__ import annotations
+import os
+import sys
+import json
+import mmap
+import zlib
+import struct
+import argparse
+from array import array
+from collections import OrderedDict
+from spider.orb.orb_models import OrbStoredDoc
+from text_processing.freq_codec import encode_varints, decode_varints, little_endian_view
+
+__author__ = "Garrett Buchanan", "Livingstone Rwagatare"
+__copyright__ = "Copyright 2023, Westmont College"
+__credits__ = ["Garrett Buchanan", "Livingstone Rwagatare", "Mike Ryu"]
+__license__ = "MIT"
+__email__ = "mryu@westmont.edu"
+
+STORE_VERSION = 1
+DEFAULT_BLOCK_SIZE = 64 * 1024  # Uncompressed bytes of documents per block.
+DEFAULT_LEVEL = 6  # zlib compression level.
+BLOCK_CACHE_SIZE = 4  # Decompressed blocks kept for random access.
+DOC_RECORD = struct.Struct("<QII")  # IID, block number, offset within the uncompressed block.
+META_FILE, BLOCKS_FILE, BLOCK_INDEX_FILE, DOC_INDEX_FILE = "meta.json", "blocks.bin", "blocks.idx", "docs.idx"
+
+
+def main() -> None:
+    pars = argparse.ArgumentParser(prog="python3 -m spider.orb.orb_docstore")
+    pars.add_argument("store_dir", type=str, help="required path to a directory written by `OrbDocStoreWriter`")
+    pars.add_argument("iids", type=int, nargs='*', help="IIDs of documents to print (all are listed otherwise)")
+    args = pars.parse_args()
+
+    try:
+        with OrbDocStore(args.store_dir) as store:
+            if not args.iids:
+                print("{:d} documents in {:d} blocks".format(len(store), store.num_blocks))
+                for doc in store:
+                    print("[IID {:04d}] {} ({:d} characters)".format(doc.iid, doc.uri, len(doc.content)))
+            for iid in args.iids:
+                doc = store.get(iid)
+                print("[IID {:04d}] {}".format(iid, "(none)" if doc is None else doc.uri))
+                if doc is not None:
+                    print(doc.content)
+    except (OSError, ValueError) as e:
+        print("An error occurred while trying to open files:\n  ", e, file=sys.stderr)
+        exit(1)
+
+
+class OrbDocStoreWriter:
+    """Appends crawled documents to a document store directory as they are added, with bounded memory.
+
+    Documents are encoded into an in-memory block; once the block reaches `block_size` bytes (`DEFAULT_BLOCK_SIZE`
+    if it is `None`) it is compressed and appended to the blocks file, and the block starts over. Every document's
+    entry in the offset index is written as soon as it is added, so only the current block is ever held in memory.
+    `finish` writes out the last block and opens the finished store.
+
+    Documents must be added in increasing order of IID, which is the order in which the crawler creates them; that
+    is what lets `OrbDocStore` find a document by binary searching the offset index.
+
+    Attributes:
+        _store_dir (str): directory the store is written to.
+        _block_size (int): uncompressed bytes of documents per block.
+        _level (int): zlib compression level.
+        _block (bytearray): encoded documents of the current block.
+        _blocks_file (BufferedWriter): the blocks file being written.
+        _docs_file (BufferedWriter): the offset index being written.
+        _offsets (array): file offset of every block written so far.
+        _count (int): number of documents added.
+        _last_iid (int): IID of the last document added.
+
+    """
+    def __init__(self, store_dir: str, block_size: int = None, level: int = DEFAULT_LEVEL) -> None:
+        if block_size is None:
+            block_size = DEFAULT_BLOCK_SIZE
+        if block_size < 1:
+            raise ValueError("Block size must be a positive number of bytes.")
+        os.makedirs(store_dir, exist_ok=True)
+        self._store_dir = store_dir
+        self._block_size = block_size
+        self._level = level
+        self._block = bytearray()
+        self._blocks_file = open(os.path.join(store_dir, BLOCKS_FILE), 'wb')
+        self._docs_file = open(os.path.join(store_dir, DOC_INDEX_FILE), 'wb')
+        self._offsets = array('Q')
+        self._count = 0
+        self._last_iid = -1
+
+    def __len__(self) -> int:
+        return self._count
+
+    def add(self, doc, uri: str = None) -> int:
+        """Stores `doc` (an `OrbDoc`, or any `SpiderDoc`) crawled from `uri`; returns its IID."""
+        if doc.iid <= self._last_iid:
+            raise ValueError("Documents must be added in increasing order of IID ({:d} after {:d}).".format(
+                doc.iid, self._last_iid))
+        fields = [None if value is None else value.encode("UTF-8") for value in (uri, doc.title, doc.content)]
+        self._docs_file.write(DOC_RECORD.pack(doc.iid, len(self._offsets), len(self._block)))
+        encode_varints([0 if field is None else len(field) + 1 for field in fields], self._block)
+        for field in fields:
+            if field:
+                self._block += field
+        self._count += 1
+        self._last_iid = doc.iid
+        if len(self._block) >= self._block_size:
+            self._flush()
+        return doc.iid
+
+    def finish(self) -> OrbDocStore:
+        """Writes out the last block, the block index, and the metadata, then opens the finished store."""
+        if self._block:
+            self._flush()
+        self._offsets.append(self._blocks_file.tell())
+        self._blocks_file.close()
+        self._docs_file.close()
+        offsets = self._offsets
+        if sys.byteorder != "little":
+            offsets = array('Q', offsets)
+            offsets.byteswap()
+        with open(os.path.join(self._store_dir, BLOCK_INDEX_FILE), 'wb') as block_index_file:
+            offsets.tofile(block_index_file)
+        with open(os.path.join(self._store_dir, META_FILE), 'w', encoding="UTF-8") as meta_file:
+            json.dump({
+                "version": STORE_VERSION,
+                "compression": "zlib",
+                "block_size": self._block_size,
+                "num_docs": self._count,
+                "num_blocks": len(self._offsets) - 1,
+            }, meta_file, indent=2)
+        return OrbDocStore(self._store_dir)
+
+    def _flush(self) -> None:
+        self._offsets.append(self._blocks_file.tell())
+        self._blocks_file.write(zlib.compress(self._block, self._level))
+        self._block = bytearray()
+
+
+class OrbDocStore:
+    """Read-only view of a document store directory written by `OrbDocStoreWriter`.
+
+    The blocks file and both indexes are memory-mapped, so opening a store reads nothing but its metadata. Iterating
+    over the store decompresses one block at a time, in order; `get` binary searches the offset index for an IID and
+    decompresses the one block holding it (the last few blocks decompressed are kept for nearby lookups).
+
+    Attributes:
+        _store_dir (str): directory the store was read from.
+        _count (int): number of documents.
+        _blocks (mmap | bytes): contents of the blocks file.
+        _offsets (Sequence[int]): file offset of every block, plus the end of the last one.
+        _docs (mmap | bytes): contents of the offset index, `DOC_RECORD`s ordered by IID.
+        _cache (OrderedDict[int, bytes]): recently decompressed blocks.
+
+    """
+    def __init__(self, store_dir: str) -> None:
+        with open(os.path.join(store_dir, META_FILE), 'r', encoding="UTF-8") as meta_file:
+            meta = json.load(meta_file)
+        if meta.get("version") != STORE_VERSION or meta.get("compression") != "zlib":
+            raise ValueError("Unsupported document store format: {}".format(store_dir))
+        self._store_dir = store_dir
+        self._count = meta["num_docs"]
+        self._files = []
+        self._blocks = self._map(BLOCKS_FILE)
+        self._block_index = self._map(BLOCK_INDEX_FILE)
+        self._offsets = little_endian_view(self._block_index, 0, meta["num_blocks"] + 1, 'Q')
+        self._docs = self._map(DOC_INDEX_FILE)
+        self._cache: OrderedDict[int, bytes] = OrderedDict()
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def num_blocks(self) -> int:
+        return len(self._offsets) - 1
+
+    def __contains__(self, iid: object) -> bool:
+        return isinstance(iid, int) and self._find(iid) is not None
+
+    def get(self, iid: int) -> OrbStoredDoc | None:
+        """Returns the document stored with `iid`, or `None` if there is none."""
+        record = self._find(iid)
+        if record is None:
+            return None
+        block, offset = record
+        doc, _ = _decode_doc(iid, self._block(block), offset)
+        return doc
+
+    def __iter__(self):
+        """Yields every `OrbStoredDoc` in the order they were stored, decompressing one block at a time."""
+        position = 0
+        for block in range(self.num_blocks):
+            data = zlib.decompress(self._blocks[self._offsets[block]:self._offsets[block + 1]])
+            offset = 0
+            while offset < len(data):
+                iid, _, _ = DOC_RECORD.unpack_from(self._docs, position * DOC_RECORD.size)
+                doc, offset = _decode_doc(iid, data, offset)
+                position += 1
+                yield doc
+
+    def contents(self):
+        """Yields the content of every document in the order they were stored, e.g., to tokenize the crawl again."""
+        for doc in self:
+            yield doc.content
+
+    def iids(self):
+        """Yields the IID of every document in increasing order, without decompressing anything."""
+        for position in range(self._count):
+            yield DOC_RECORD.unpack_from(self._docs, position * DOC_RECORD.size)[0]
+
+    def close(self) -> None:
+        self._cache.clear()
+        if isinstance(self._offsets, memoryview):
+            self._offsets.release()
+        for mapped_file, buffer in self._files:
+            if isinstance(buffer, mmap.mmap):
+                buffer.close()
+            mapped_file.close()
+        self._files = []
+
+    def __enter__(self) -> OrbDocStore:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _map(self, name: str):
+        """Opens and memory-maps a file of the store (`b""` if it is empty, since that cannot be memory-mapped)."""
+        mapped_file = open(os.path.join(self._store_dir, name), 'rb')
+        buffer = b""
+        if os.fstat(mapped_file.fileno()).st_size:
+            buffer = mmap.mmap(mapped_file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._files.append((mapped_file, buffer))
+        return buffer
+
+    def _find(self, iid: int) -> tuple[int, int] | None:
+        """Returns the block number and offset of the document with `iid`, or `None` if there is none."""
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            record_iid, block, offset = DOC_RECORD.unpack_from(self._docs, middle * DOC_RECORD.size)
+            if record_iid == iid:
+                return block, offset
+            if record_iid < iid:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+
+    def _block(self, block: int) -> bytes:
+        data = self._cache.get(block)
+        if data is None:
+            data = self._cache[block] = zlib.decompress(self._blocks[self._offsets[block]:self._offsets[block + 1]])
+            if len(self._cache) > BLOCK_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        else:
+            self._cache.move_to_end(block)
+        return data
+
+
+def _decode_doc(iid: int, data: bytes, offset: int) -> tuple[OrbStoredDoc, int]:
+    """Decodes the document at `offset` in an uncompressed block; returns it and the offset of the next one."""
+    lengths, offset = decode_varints(data, offset, 3)
+    fields = []
+    for length in lengths:
+        if length:
+            fields.append(data[offset:offset + length - 1].decode("UTF-8"))
+            offset += length - 1
+        else:
+            fields.append(None)
+    uri, title, content = fields
+    return OrbStoredDoc(iid, uri, title, content), offset
+
+
+if __name__ == '__main__':
+    main()
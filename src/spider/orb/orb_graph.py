@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""Provides `OrbGraphBuilder` and `OrbLinkGraph` for capturing the link graph of a crawl in compressed sparse row
+(CSR) form and analyzing it with vectorized NumPy code (PageRank, in/out-degrees, and BFS depths).
+
+A saved link graph is a directory holding:
+
+* `indptr.npy`: for every node ID, the index of its first out-link in `indices.npy` (plus the number of edges at
+  the end), as unsigned 64-bit integers.
+* `indices.npy`: the target node ID of every edge, grouped by source node ID in the order the links were found,
+  as unsigned 32-bit integers. Every link is an edge, so a page linking to another twice has two edges to it.
+* `nodes.jsonl`: the URI of every node, one JSON string per line, ordered by node ID.
+
+Example:
+    $ python3 -m spider.orb.orb_graph ../out/graph --top 10
+"""
+
+from __future__ import annotations
+import os
+import sys
+import json
+import argparse
+from array import array
+import numpy as np
+
+__author__ = "Garrett Buchanan", "Livingstone Rwagatare"
+__copyright__ = "Copyright 2023, Westmont College"
+__credits__ = ["Garrett Buchanan", "Livingstone Rwagatare", "Mike Ryu"]
+__license__ = "MIT"
+__email__ = "mryu@westmont.edu"
+
+INDPTR_FILE, INDICES_FILE, NODES_FILE = "indptr.npy", "indices.npy", "nodes.jsonl"
+DEFAULT_DAMPING = 0.85
+DEFAULT_TOLERANCE = 1e-10  # Largest L1 change in PageRank between iterations to stop at.
+DEFAULT_MAX_ITERATIONS = 100
+
+
+def main() -> None:
+    pars = argparse.ArgumentParser(prog="python3 -m spider.orb.orb_graph")
+    pars.add_argument("graph_dir", type=str, help="required path to a directory written by `OrbLinkGraph.save`")
+    pars.add_argument("--top", type=int, default=10, help="number of nodes with the highest PageRank to print")
+    pars.add_argument("--damping", type=float, default=DEFAULT_DAMPING, help="PageRank damping factor")
+    args = pars.parse_args()
+
+    try:
+        graph = OrbLinkGraph.load(args.graph_dir)
+    except (OSError, ValueError) as e:
+        print("An error occurred while trying to open files:\n  ", e, file=sys.stderr)
+        exit(1)
+    ranks = graph.pagerank(args.damping)
+    in_degrees, out_degrees = graph.in_degrees(), graph.out_degrees()
+    depths = graph.bfs_depths([0] if graph.num_nodes else [])
+    print("{:d} nodes, {:d} edges".format(graph.num_nodes, graph.num_edges))
+    print("{:>10} {:>6} {:>6} {:>6}  {}".format("pagerank", "in", "out", "depth", "uri"))
+    for node in np.argsort(-ranks, kind="stable")[:args.top]:
+        print("{:10.6f} {:6d} {:6d} {:6d}  {}".format(ranks[node], in_degrees[node], out_degrees[node], depths[node],
+                                                      graph.uri(int(node))))
+
+
+class OrbGraphBuilder:
+    """Records the links of a crawl as edges between integer node IDs, to be turned into an `OrbLinkGraph`.
+
+    URIs are interned to node IDs in the order they are first seen (so the first page crawled, a seed, is node 0),
+    and edges are appended to two flat `array`s of source and target IDs, so recording a link costs a dict lookup
+    and two appends. Nothing is deduplicated: every link found is an edge. `finish` sorts the edges by source node
+    (keeping the order links were found in) into CSR arrays.
+
+    Attributes:
+        _ids (dict[str, int]): node ID of every URI seen so far.
+        _uris (list[str]): URI of every node ID.
+        _sources (array): source node ID of every edge.
+        _targets (array): target node ID of every edge.
+
+    """
+    def __init__(self) -> None:
+        self._ids: dict[str, int] = {}
+        self._uris: list[str] = []
+        self._sources = array('I')
+        self._targets = array('I')
+
+    @property
+    def num_nodes(self) -> int:
+        return len(self._uris)
+
+    @property
+    def num_edges(self) -> int:
+        return len(self._targets)
+
+    def node(self, uri: str) -> int:
+        """Returns the node ID of `uri`, adding it as a node if it has not been seen yet."""
+        node = self._ids.get(uri)
+        if node is None:
+            node = self._ids[uri] = len(self._uris)
+            self._uris.append(uri)
+        return node
+
+    def add_edges(self, source: str, targets) -> None:
+        """Adds `source` as a node (even if it has no links) and an edge from it to every URI in `targets`."""
+        source_id = self.node(source)
+        node = self.node
+        target_ids = [node(target) for target in targets]
+        self._sources.extend([source_id] * len(target_ids))
+        self._targets.extend(target_ids)
+
+    def finish(self) -> OrbLinkGraph:
+        """Returns the recorded links as an `OrbLinkGraph`."""
+        n = len(self._uris)
+        sources = np.frombuffer(self._sources, dtype=np.uint32) if self._sources else np.zeros(0, np.uint32)
+        targets = np.frombuffer(self._targets, dtype=np.uint32) if self._targets else np.zeros(0, np.uint32)
+        order = np.argsort(sources, kind="stable")
+        indptr = np.zeros(n + 1, dtype=np.uint64)
+        np.cumsum(np.bincount(sources, minlength=n), out=indptr[1:])
+        return OrbLinkGraph(list(self._uris), indptr, targets[order])
+
+
+class OrbLinkGraph:
+    """Read-only link graph in compressed sparse row form: the out-links of node `v` are the target node IDs in
+    `indices[indptr[v]:indptr[v + 1]]`.
+
+    Every analysis works on whole arrays at once (one `bincount` per PageRank iteration, one gather per BFS level),
+    so it takes seconds even for millions of edges. A graph `load`ed from disk is memory-mapped.
+
+    Attributes:
+        _uris (list[str]): URI of every node ID.
+        _ids (dict[str, int] | None): node ID of every URI, built on first use.
+        _indptr (ndarray): offset of every node's out-links in `_indices`, plus the number of edges at the end.
+        _indices (ndarray): target node ID of every edge, grouped by source node ID.
+
+    """
+    def __init__(self, uris: list[str], indptr, indices) -> None:
+        if len(indptr) != len(uris) + 1 or int(indptr[-1]) != len(indices):
+            raise ValueError("CSR arrays do not match the {:d} nodes given.".format(len(uris)))
+        self._uris = uris
+        self._ids: dict[str, int] | None = None
+        self._indptr = indptr
+        self._indices = indices
+
+    @property
+    def num_nodes(self) -> int:
+        return len(self._uris)
+
+    @property
+    def num_edges(self) -> int:
+        return len(self._indices)
+
+    @property
+    def indptr(self):
+        return self._indptr
+
+    @property
+    def indices(self):
+        return self._indices
+
+    def uri(self, node: int) -> str:
+        return self._uris[node]
+
+    def node(self, uri: str) -> int | None:
+        """Returns the node ID of `uri`, or `None` if it is not in the graph."""
+        if self._ids is None:
+            self._ids = {uri: node for node, uri in enumerate(self._uris)}
+        return self._ids.get(uri)
+
+    def successors(self, node: int):
+        """Returns the target node IDs of the out-links of `node`, in the order they were found."""
+        return self._indices[int(self._indptr[node]):int(self._indptr[node + 1])]
+
+    def out_degrees(self):
+        """Returns the number of out-links of every node (duplicate links included)."""
+        return np.diff(self._indptr).astype(np.int64)
+
+    def in_degrees(self):
+        """Returns the number of in-links of every node (duplicate links included)."""
+        return np.bincount(self._indices, minlength=self.num_nodes).astype(np.int64)
+
+    def pagerank(self, damping: float = DEFAULT_DAMPING, tolerance: float = DEFAULT_TOLERANCE,
+                 max_iterations: int = DEFAULT_MAX_ITERATIONS):
+        """Returns the PageRank of every node, by power iteration.
+
+        A page splits its rank evenly among its links, so a page linking to another twice gives it twice the share.
+        The rank of pages without links (including pages that were never crawled) is spread over all pages.
+
+        """
+        n = self.num_nodes
+        if not n:
+            return np.zeros(0)
+        out_degrees = self.out_degrees()
+        sources = np.repeat(np.arange(n), out_degrees)
+        dangling = out_degrees == 0
+        inverse_degrees = np.divide(1.0, out_degrees, out=np.zeros(n), where=~dangling)
+        ranks = np.full(n, 1.0 / n)
+        for _ in range(max_iterations):
+            shares = (ranks * inverse_degrees)[sources]
+            updated = np.bincount(self._indices, weights=shares, minlength=n) * damping
+            updated += (1.0 - damping + damping * ranks[dangling].sum()) / n
+            change = np.abs(updated - ranks).sum()
+            ranks = updated
+            if change < tolerance:
+                break
+        return ranks
+
+    def bfs_depths(self, sources):
+        """Returns the number of links on the shortest path from any node in `sources` to every node (-1 for the
+        nodes that cannot be reached), expanding a whole BFS level at a time."""
+        n = self.num_nodes
+        depths = np.full(n, -1, dtype=np.int64)
+        frontier = np.unique(np.asarray(sources, dtype=np.int64))
+        depths[frontier] = 0
+        depth = 0
+        indptr = self._indptr.astype(np.int64)
+        while len(frontier):
+            starts, counts = indptr[frontier], indptr[frontier + 1] - indptr[frontier]
+            # index of every out-link of the frontier: each node's start, plus 0..count-1 within its run
+            positions = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+            neighbors = np.unique(self._indices[positions])
+            frontier = neighbors[depths[neighbors] < 0]
+            depth += 1
+            depths[frontier] = depth
+        return depths
+
+    def save(self, graph_dir: str) -> None:
+        """Writes the graph to `graph_dir` in the layout described in the module documentation."""
+        os.makedirs(graph_dir, exist_ok=True)
+        np.save(os.path.join(graph_dir, INDPTR_FILE), np.asarray(self._indptr, dtype='<u8'))
+        np.save(os.path.join(graph_dir, INDICES_FILE), np.asarray(self._indices, dtype='<u4'))
+        with open(os.path.join(graph_dir, NODES_FILE), 'w', encoding="UTF-8") as nodes_file:
+            nodes_file.writelines(json.dumps(uri) + "\n" for uri in self._uris)
+
+    @classmethod
+    def load(cls, graph_dir: str) -> OrbLinkGraph:
+        """Reads a graph written by `save`, memory-mapping its CSR arrays."""
+        with open(os.path.join(graph_dir, NODES_FILE), 'r', encoding="UTF-8") as nodes_file:
+            uris = [json.loads(line) for line in nodes_file]
+        indptr = np.load(os.path.join(graph_dir, INDPTR_FILE), mmap_mode='r')
+        indices = np.load(os.path.join(graph_dir, INDICES_FILE), mmap_mode='r')
+        return cls(uris, indptr, indices)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,314 @@
+"""HTTP fetching for the local crawler: `OrbHttpPool` lets `OrbAgent` crawl http(s) links, which it otherwise only
+collects, through pooled keep-alive connections.
+"""
+
+from __future__ import annotations
+import io
+import zlib
+import threading
+import http.client
+from time import time, perf_counter
+from collections import deque
+from urllib.parse import urlsplit, urljoin
+from spider.orb.orb_stats import OrbCrawlStats, OrbNullStats, NULL_STATS
+from spider.orb.orb_cache import OrbHttpCache, OrbCacheEntry, DEFAULT_CACHE_BYTES, canonical_uri, extraction_key
+
+__author__ = "Garrett Buchanan", "Livingstone Rwagatare"
+__copyright__ = "Copyright 2023, Westmont College"
+__credits__ = ["Garrett Buchanan", "Livingstone Rwagatare", "Mike Ryu"]
+__license__ = "MIT"
+__email__ = "mryu@westmont.edu"
+
+DEFAULT_POOL_SIZE = 4  # Idle connections kept per host.
+DEFAULT_TIMEOUT = 10.0  # Seconds to wait to connect, and for every read.
+DEFAULT_MAX_BYTES = 8 * 1024 * 1024  # Decoded bytes of a response body to keep; the rest is not read.
+MAX_REDIRECTS = 5
+CHUNK_SIZE = 64 * 1024
+USER_AGENT = "orb-crawler/1.0"
+
+
+class OrbHttpPool:
+    """Fetches http(s) URIs over keep-alive connections, keeping up to `pool_size` idle connections per host.
+
+    A fetch takes an idle connection to the host from the pool (or opens one), sends a GET accepting gzip and
+    deflate encodings, and streams the body in chunks, decoding it as it arrives, until it ends or `max_bytes` of
+    decoded body have been read. A connection whose response was read to the end goes back to the pool for the next
+    fetch from the same host; one cut off by the size cap, or that failed, is closed. Redirects are followed.
+
+    Every fetch is timed as the "fetch" stage of `stats`, and counted as "http_requests", "http_reused" (if it went
+    over a pooled connection), "http_connections" (if it had to open one), "http_truncated", and "http_errors". The
+    pool keeps the same counts itself, see `to_dict`. Fetches may run in several threads at once (as they do under
+    `OrbHostScheduler`).
+
+    With an `OrbHttpCache` as `cache`, a page cached before is served from it while it is fresh, and revalidated
+    with a conditional request (If-None-Match/If-Modified-Since) otherwise; if it has not changed, the cached body
+    is served, along with the extraction results saved for it (see `OrbHttpResponse`). Complete 200 responses are
+    cached as they are downloaded; one reached through redirects is aliased under the URI that was asked for too,
+    so that fetching that URI again, while the response is fresh, does not repeat the redirects.
+
+    Attributes:
+        _pool_size (int): idle connections kept per host.
+        _timeout (float): seconds to wait to connect and for every read.
+        _max_bytes (int): decoded bytes of a response body to keep.
+        _hosts (set[str] | None): hosts that may be fetched from; any host if `None`.
+        _idle (dict[tuple[str, str, int], deque]): idle connections by scheme, host, and port.
+        _stats (OrbCrawlStats | OrbNullStats): where fetches are timed and counted.
+        _counts (dict[str, int]): requests, reused and opened connections, truncated bodies, and errors.
+        _opens (int): calls to `open`, i.e., pages fetched (or attempted), counting redirects as one.
+        _seconds (float): total time spent fetching.
+        _lock (Lock): guards the counts and `stats` against fetches running in other threads.
+        _cache (OrbHttpCache | None): cache of responses, if any.
+
+    """
+    def __init__(self, pool_size: int = DEFAULT_POOL_SIZE, timeout: float = DEFAULT_TIMEOUT,
+                 max_bytes: int = DEFAULT_MAX_BYTES, hosts: list[str] = None,
+                 stats: OrbCrawlStats | OrbNullStats = NULL_STATS, cache: OrbHttpCache = None) -> None:
+        if pool_size is None or pool_size < 0:
+            raise ValueError("Pool size must be a non-negative number of connections.")
+        self._pool_size = pool_size
+        self._timeout = timeout
+        self._max_bytes = max_bytes
+        self._hosts = set(hosts) if hosts is not None else None
+        self._idle: dict[tuple[str, str, int], deque] = {}
+        self._stats = stats
+        self._counts = dict.fromkeys(("requests", "reused", "connections", "truncated", "errors"), 0)
+        self._opens = 0
+        self._seconds = 0.0
+        self._lock = threading.Lock()
+        self._cache = cache
+
+    @classmethod
+    def from_options(cls, options: dict, stats: OrbCrawlStats | OrbNullStats = NULL_STATS) -> OrbHttpPool:
+        """Creates a pool configured by the "http_pool_size", "http_timeout", "http_max_bytes", and "http_hosts"
+        config `options`, caching responses in the "http_cache_dir" directory (of at most "http_cache_bytes") if
+        that option is set."""
+        cache = None
+        if options.get("http_cache_dir"):
+            cache = OrbHttpCache(options["http_cache_dir"], options.get("http_cache_bytes", DEFAULT_CACHE_BYTES), stats)
+        return cls(options.get("http_pool_size", DEFAULT_POOL_SIZE), options.get("http_timeout", DEFAULT_TIMEOUT),
+                   options.get("http_max_bytes", DEFAULT_MAX_BYTES), options.get("http_hosts"), stats, cache)
+
+    @property
+    def cache(self) -> OrbHttpCache | None:
+        return self._cache
+
+    def can_fetch(self, uri: str) -> bool:
+        """Returns whether `uri` is an http(s) URI this pool may fetch."""
+        parts = urlsplit(uri)
+        return parts.scheme in ("http", "https") and bool(parts.hostname) and \
+            (self._hosts is None or parts.hostname in self._hosts)
+
+    def open(self, uri: str, encoding: str = "UTF-8") -> OrbHttpResponse | None:
+        """Fetches `uri` (or takes it from the cache) and returns the response, readable like a text file, or `None`
+        if it could not be fetched (including responses other than 200 OK)."""
+        started = perf_counter()
+        cache = self._cache
+        requested, redirected = uri, False
+        try:
+            response = None
+            for _ in range(MAX_REDIRECTS + 1):
+                entry = cache.get(uri) if cache is not None else None
+                if entry is not None and entry.uri != canonical_uri(uri):  # an alias: `uri` was redirected before
+                    if entry.is_fresh(time()):
+                        uri = entry.uri
+                    else:
+                        entry = None  # the redirect may have changed, so follow it again
+                if entry is not None and entry.is_fresh(time()):
+                    cache.count("hits")
+                    response = OrbHttpResponse(uri, entry.body, _charset(entry.headers.get("content-type", ""),
+                                                                         encoding), cache, entry)
+                    break
+                status, headers, body, complete = self._fetch(uri, entry.validators() if entry is not None else {})
+                if status == 304 and entry is not None:
+                    cache.count("revalidated")
+                    entry = cache.refresh(entry, headers)
+                    response = OrbHttpResponse(uri, entry.body, _charset(entry.headers.get("content-type", ""),
+                                                                         encoding), cache, entry)
+                    break
+                location = headers.get("location")
+                if status in (301, 302, 303, 307, 308) and location:
+                    uri, redirected = urljoin(uri, location), True
+                    continue
+                if status != 200:
+                    break
+                if cache is not None:
+                    cache.count("misses")
+                    entry = cache.put(uri, headers, body) if complete else None
+                response = OrbHttpResponse(uri, body, _charset(headers.get("content-type", ""), encoding), cache,
+                                           entry)
+                break
+            if response is None:
+                self._count("errors")
+            elif redirected and entry is not None:
+                cache.alias(requested, uri)  # so that fetching `requested` again skips the redirect
+            return response
+        except (OSError, http.client.HTTPException, zlib.error):
+            self._count("errors")
+            return None
+        finally:
+            elapsed = perf_counter() - started
+            with self._lock:
+                self._opens += 1
+                self._seconds += elapsed
+                self._stats.record("fetch", elapsed)
+
+    def close(self) -> None:
+        """Closes every idle connection."""
+        for connections in self._idle.values():
+            while connections:
+                connections.pop().close()
+        self._idle.clear()
+
+    def __enter__(self) -> OrbHttpPool:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    @property
+    def reuse_rate(self) -> float:
+        """Fraction of requests sent over a pooled connection."""
+        return self._counts["reused"] / self._counts["requests"] if self._counts["requests"] else 0.0
+
+    def to_dict(self) -> dict:
+        """Returns the counts, the reuse rate, and the mean latency of `open` as a JSON-serializable `dict`."""
+        return dict(self._counts, reuse_rate=round(self.reuse_rate, 6),
+                    mean_ms=round(self._seconds * 1000 / self._opens, 3) if self._opens else 0.0)
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            self._counts[counter] += 1
+            self._stats.count("http_" + counter)
+
+    def _fetch(self, uri: str, conditions: dict) -> tuple[int, dict, bytes, bool]:
+        """Sends one GET for `uri`, with the conditional request headers `conditions`; returns the status, the
+        headers (lowercased), the decoded body, and whether the whole body was read."""
+        parts = urlsplit(uri)
+        key = (parts.scheme, parts.hostname, parts.port or (443 if parts.scheme == "https" else 80))
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+        request_headers = {"Accept-Encoding": "gzip, deflate", "User-Agent": USER_AGENT, **conditions}
+
+        idle = self._idle.setdefault(key, deque())
+        while True:
+            try:
+                connection, reused = idle.pop(), True
+            except IndexError:  # checked by popping, since another thread may take the last idle connection
+                connection, reused = self._connect(key), False
+            try:
+                connection.request("GET", path, headers=request_headers)
+                response = connection.getresponse()
+                break
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+                connection.close()
+                if not reused:  # a fresh connection failing is a real error, a stale pooled one is retried
+                    raise
+            except BaseException:
+                connection.close()
+                raise
+        self._count("requests")
+        self._count("reused" if reused else "connections")
+
+        try:
+            headers = {name.lower(): value for name, value in response.getheaders()}
+            body, complete = self._read_body(response, headers.get("content-encoding", "identity").lower())
+        except BaseException:
+            connection.close()
+            raise
+        if complete and not response.will_close and len(idle) < self._pool_size:
+            idle.append(connection)
+        else:
+            connection.close()
+        return response.status, headers, body, complete
+
+    def _connect(self, key: tuple[str, str, int]) -> http.client.HTTPConnection:
+        scheme, host, port = key
+        if scheme == "https":
+            return http.client.HTTPSConnection(host, port, timeout=self._timeout)
+        return http.client.HTTPConnection(host, port, timeout=self._timeout)
+
+    def _read_body(self, response: http.client.HTTPResponse, content_encoding: str) -> tuple[bytes, bool]:
+        """Reads and decodes the body in chunks, up to `max_bytes` decoded bytes; returns it and whether the whole
+        body was read (so the connection can be reused)."""
+        decoder = None
+        if content_encoding in ("gzip", "x-gzip"):
+            decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        elif content_encoding == "deflate":
+            decoder = _DeflateDecoder()
+        body = bytearray()
+        while len(body) <= self._max_bytes:
+            chunk = response.read(CHUNK_SIZE)
+            if not chunk:
+                if decoder is not None:
+                    body += decoder.flush()
+                if len(body) <= self._max_bytes:
+                    return bytes(body), True
+                break
+            # never decode more than one byte past the cap, so a small compressed body cannot blow up in memory
+            body += decoder.decompress(chunk, self._max_bytes + 1 - len(body)) if decoder is not None else chunk
+        self._count("truncated")
+        return bytes(body[:self._max_bytes]), False
+
+
+class OrbHttpResponse(io.StringIO):
+    """Body of a fetched page, readable (and closable) like the text file `OrbAgent` would otherwise open.
+
+    A response served from (or stored in) an `OrbHttpCache` also carries what was extracted from the same body
+    before: `OrbAgent` asks for it with `cached_extraction` and skips parsing the page if there is some, and saves
+    what it extracted otherwise with `save_extraction`.
+
+    Attributes:
+        uri (str): URI the body was finally fetched from, after redirects; relative links resolve against it.
+        size (int): size of the (decoded) body in bytes.
+        _cache (OrbHttpCache | None): cache the response is kept in, if any.
+        _entry (OrbCacheEntry | None): cache entry of the response, if it was served from or stored in the cache.
+
+    """
+    def __init__(self, uri: str, body: bytes, encoding: str, cache: OrbHttpCache = None,
+                 entry: OrbCacheEntry = None) -> None:
+        super().__init__(body.decode(encoding, "replace"))
+        self.uri = uri
+        self.size = len(body)
+        self._cache = cache
+        self._entry = entry
+
+    def cached_extraction(self, config: dict) -> tuple[str, list[str]] | None:
+        """Returns the document content and links extracted from this body before with the agent `config`, or
+        `None` if there are none."""
+        return self._entry.extracted(extraction_key(config)) if self._entry is not None else None
+
+    def save_extraction(self, config: dict, content: str, links: list[str]) -> None:
+        """Saves the document content and links extracted from this body with the agent `config` in the cache."""
+        if self._entry is not None:
+            key = extraction_key(config)
+            if self._entry.extracted(key) is None:
+                self._entry = self._cache.save_extraction(self._entry, key, content, links)
+
+
+class _DeflateDecoder:
+    """Decodes "deflate" bodies, which servers send either zlib-wrapped (as specified) or raw."""
+    def __init__(self) -> None:
+        self._decoder = None
+
+    def decompress(self, chunk: bytes, max_length: int) -> bytes:
+        if self._decoder is None:
+            is_zlib = len(chunk) >= 2 and (chunk[0] & 0x0F) == 8 and ((chunk[0] << 8) | chunk[1]) % 31 == 0
+            self._decoder = zlib.decompressobj(zlib.MAX_WBITS if is_zlib else -zlib.MAX_WBITS)
+        return self._decoder.decompress(chunk, max_length)
+
+    def flush(self) -> bytes:
+        return self._decoder.flush() if self._decoder is not None else b""
+
+
+def _charset(content_type: str, default: str) -> str:
+    for parameter in content_type.split(";")[1:]:
+        name, _, value = parameter.partition("=")
+        if name.strip().lower() == "charset" and value.strip():
+            charset = value.strip().strip('"')
+            try:
+                "".encode(charset)
+                return charset
+            except LookupError:
+                break
+    return default
@@ -2,11 +2,18 @@
 """
 
 from __future__ import annotations
+import os
 from sys import stderr
-from bs4 import BeautifulSoup
+from urllib.parse import urljoin
 from queue import SimpleQueue
-from typing import TextIO
+from typing import Iterator, TextIO, NamedTuple
 from spider.spider_models import *
+from spider.orb.orb_stats import OrbCrawlStats, OrbNullStats, NULL_STATS
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from spider.orb.orb_http import OrbHttpPool
+    from spider.orb.orb_paths import OrbPathIndex
 
 __author__ = "Garrett Buchanan", "Livingstone Rwagatare"
 __copyright__ = "Copyright 2023, Westmont College"
@@ -14,6 +21,8 @@ __credits__ = ["Garrett Buchanan", "Livingstone Rwagatare", "Mike Ryu"]
 __license__ = "MIT"
 __email__ = "mryu@westmont.edu"
 
+ARCHIVE_SCHEME = "archive:"  # URIs of members of archives, crawled by `spider.orb.orb_archive.OrbArchiveAgent`.
+
 
 class OrbDocFP(SpiderDocFP):
     """This class creates a fingerprint using the hash method. It also has equality and string methods.
@@ -45,6 +54,22 @@ class OrbDoc(SpiderDoc):
         self._fingerprint = OrbDocFP(self._content)
 
 
+class OrbStoredDoc(NamedTuple):
+    """A document as read back from an `OrbDocStore`, along with the URI it was crawled from.
+
+    Attributes:
+        iid (int): instance ID of the `OrbDoc` when it was stored.
+        uri (str | None): URI the document was crawled from.
+        title (str | None): title of the document.
+        content (str): the document content.
+
+    """
+    iid: int
+    uri: str | None
+    title: str | None
+    content: str
+
+
 class OrbURI(SpiderURI):
     """Class that provides methods to deal with URIs. The eq method checks to see if one URI
        is equal to another URI. The hash method returns the hash value of the URI."""
@@ -65,11 +90,18 @@ class OrbContentProcessor(SpiderContentProcessor):
     def __next__(self) -> SpiderDoc:
         if self._doc is None:  # makes sure the doc is not empty
             raise StopIteration
-        if self._doc.fingerprint in self._agent.doc_db:  # if the fingerprint has been seen stop iterating
+        stats = self._agent.stats
+        with stats.time("db"):
+            is_duplicate = self._doc.fingerprint in self._agent.doc_db
+            if not is_duplicate:
+                self._doc_db.add(self._doc.fingerprint)
+        if is_duplicate:  # if the fingerprint has been seen stop iterating
+            stats.count("duplicates")
             raise StopIteration
-        else:  # if not empty or duplicate add the fingerprint to the database and return the doc
-            self._doc_db.add(self._doc.fingerprint)
-            return self._doc
+        else:  # if not empty or duplicate the fingerprint was added to the database, so return the doc
+            stats.count("documents")
+            doc, self._doc = self._doc, None  # yield the doc only once
+            return doc
 
 
 class OrbLinkProcessor(SpiderLinkProcessor):
@@ -82,19 +114,47 @@ class OrbLinkProcessor(SpiderLinkProcessor):
         self._counter = 0  # set up a counter variable for iteration
         self._uri_db: SpiderUriDB = self._agent.uri_db  # create a variable for the URI database
         self._link_list = link_list  # create a list to hold the gathered links
+        parent_props = self._agent.uri.props  # links are one deeper than their page; seeds carry no depth (0)
+        self._depth = (parent_props.get("depth", 0) if parent_props else 0) + 1
+
+    @property
+    def links(self) -> list:
+        """Every link found on the page, in order, including the ones already seen and those yielded already."""
+        return self._link_list
 
     def __next__(self) -> SpiderURI:
-        while self._counter < len(self._link_list):  # iterate while contents in the link list
+        stats = self._agent.stats
+        paths = getattr(self._agent, "paths", None)
+        while self._has_next():  # iterate while contents in the link list
             current_uri = self._link_list[self._counter]  # create a variable for the current URI
-            uri = OrbURI(current_uri, {"parent": self._agent.uri.uri})  # instantiate OrbURI
             self._counter += 1  # advance the counter
-            if uri in self._uri_db:  # if the URI is in the database continue
+            if paths is not None and not self._exists(paths, current_uri):  # a broken link to a local file
+                paths.reject(current_uri, self._agent.uri.uri)
+                stats.count("broken_links")
                 continue
-            else:  # if the URI is not in the database add it and return it
-                self._uri_db.add(uri)
+            uri = OrbURI(current_uri, {"parent": self._agent.uri.uri, "depth": self._depth})  # instantiate OrbURI
+            with stats.time("db"):
+                is_seen = uri in self._uri_db
+                if not is_seen:
+                    self._uri_db.add(uri)
+            if is_seen:  # if the URI is in the database continue
+                continue
+            else:  # if the URI was not in the database it was added, so return it
+                stats.count("new_links")
                 return uri
         raise StopIteration
 
+    def _has_next(self) -> bool:
+        """Returns whether there are links left to look at."""
+        return self._counter < len(self._link_list)
+
+    def _exists(self, paths: OrbPathIndex, link: str) -> bool:
+        """Returns whether `link` is to a local file that exists; links to anything else are assumed to exist."""
+        if link.startswith(ARCHIVE_SCHEME) or OrbLinkProcessor.is_link_external(self._agent, link):
+            return True
+        with self._agent.stats.time("paths"):
+            return paths.exists(link)
+
     @staticmethod
     def is_link_external(agent: SpiderAgent, link: str) -> bool:
         """Determines if the given link is an external (web) link based on the definition of "external" tokens
@@ -123,38 +183,62 @@ class OrbAgent(SpiderAgent):
        the corpus and strips the content for formatting. It also finds the links within the documents of the corpus
        and iterates through one link at a time, then adds it to the link list once the link has a complete path or if
        the link is external. The method then returns OrbLinkProcessor and OrbContentProcessor as a tuple if the file
-       opened successfully, otherwise it returns an empty OrbLinkProcessor and OrbContentProcessor."""
+       opened successfully, otherwise it returns an empty OrbLinkProcessor and OrbContentProcessor.
+
+       An `OrbCrawlStats` may be passed in as `stats` to time the stages of the crawl (and count pages, bytes, and
+       links) across agents; by default nothing is recorded. If an `OrbHttpPool` is passed in as `fetcher`, external
+       http(s) URIs it can fetch are crawled through it (and relative links on them resolved against their URI)
+       instead of being skipped; a page its cache found unchanged is not parsed again, but the content and links
+       extracted from it before are reused. Links are not extracted at all if the config sets "extract_links" to
+       `False`. With an `OrbPathIndex` passed in as `paths` (shared across agents), `OrbLinkProcessor` rejects links
+       to local files that do not exist, and records them there, instead of yielding them."""
+
+    def __init__(self, uri: SpiderURI, doc_db: SpiderDocDB, uri_db: SpiderUriDB, config: dict,
+                 stats: OrbCrawlStats | OrbNullStats = NULL_STATS, fetcher: OrbHttpPool = None,
+                 paths: OrbPathIndex = None) -> None:
+        super().__init__(uri, doc_db, uri_db, config)
+        self._stats = stats
+        self._fetcher = fetcher
+        self._paths = paths
+        self._bytes_read: int | None = None
+        self._page: str | None = None
+
+    @property
+    def stats(self) -> OrbCrawlStats | OrbNullStats:
+        return self._stats
+
+    @property
+    def paths(self) -> OrbPathIndex | None:
+        return self._paths
+
+    @property
+    def bytes_read(self) -> int | None:
+        """Size in bytes of the file read by `crawl`, or `None` if it has not read one."""
+        return self._bytes_read
+
+    @property
+    def page(self) -> str | None:
+        """Text of the page read by `crawl`, or `None` if it has not read one."""
+        return self._page
 
     def crawl(self) -> (OrbContentProcessor, OrbLinkProcessor):
-        openfile = self._open_uri_as_file()  # open the file
+        stats = self._stats
+        with stats.time("open"):
+            openfile = self._open_uri_as_file()  # open the file
         if openfile:  # if there is an opened file continue
-            read_file = openfile.read()  # read the file
-            soup = BeautifulSoup(read_file, self._config["parser"])  # Create variable that calls BeautifulSoup
-            found_tags = self.config["tags"]  # create variable found_tags which finds the tags in the HTML
-
-            content = ""  # create a variable that's an empty string to add content to later
-            for tag_key in found_tags:  # iterate through the keys in the gathered tags
-                total_match = soup.find_all(tag_key, found_tags[tag_key])
-                for match in total_match:  # iterate through the matches and assign the content to the content variable
-                    new_string = match.text.strip() + " "
-                    content += new_string
-            fresh_content = content.strip()  # assign a variable to the fully stripped content
-
-            links = soup.find_all('a')  # find all the 'a' tags because those contain the links
-            link_list = []  # create an empty list to put links into
-
-            for link in links:  # iterate through and get all the links containing 'href'
-                true_link = link.get('href')
-                if true_link is not None:  # if there is a link and the link contains a '#' continue
-                    if '#' in true_link:
-                        continue
-                    if OrbLinkProcessor.is_link_external(self, true_link):  # if the link is external append to the list
-                        link_list.append(true_link)
-                    else:  # otherwise find the path and assign it to the link then add it to the list
-                        prev_slash_local = self.uri.uri.rfind("/")
-                        path = self.uri.uri[:prev_slash_local]
-                        final_link = path + "/" + true_link
-                        link_list.append(final_link)
+            extracted = openfile.cached_extraction(self._config) if hasattr(openfile, "cached_extraction") else None
+            if extracted is not None:  # an unchanged page from the HTTP cache: reuse what was extracted from it
+                fresh_content, link_list = extracted
+                self._page = openfile.getvalue()
+                if stats:
+                    stats.count("pages")
+                    stats.count("bytes", self._bytes_read)
+                    stats.count("cached_extractions")
+            else:
+                fresh_content, link_list = self._extract(openfile)
+                if hasattr(openfile, "save_extraction"):
+                    openfile.save_extraction(self._config, fresh_content, link_list)
+            stats.count("links", len(link_list))
 
             openfile.close()  # close the file
 
@@ -164,6 +248,66 @@ class OrbAgent(SpiderAgent):
         else:  # if the file didn't open return empty OrbContent and OrbLink processors
             return OrbContentProcessor(self, ''), OrbLinkProcessor(self, [])
 
+    def _extract(self, openfile: TextIO) -> tuple[str, list[str]]:
+        """Reads and parses the opened file; returns the content of its configured tags and the links on it."""
+        stats = self._stats
+        soup = self._parse(openfile)
+        fresh_content = self._extract_content(soup)
+        link_list = []  # create an empty list to put links into
+        if not self._config.get("extract_links", True):  # e.g., harvesting content of pages found by `orb_scan`
+            return fresh_content, link_list
+        with stats.time("links"):
+            links = soup.find_all('a')  # find all the 'a' tags because those contain the links
+            base_uri = getattr(openfile, "uri", None)  # fetched pages resolve links like a browser would
+            link_list.extend(self._iter_links(links, base_uri))
+        return fresh_content, link_list
+
+    def _parse(self, openfile: TextIO):
+        """Reads the opened file and returns it parsed as a `BeautifulSoup`."""
+        stats = self._stats
+        from bs4 import BeautifulSoup  # imported on first use, so that loading this module stays cheap
+        with stats.time("read"):
+            read_file = self._page = openfile.read()  # read the file
+            if self._bytes_read is None:  # fetched pages know their size already
+                self._bytes_read = os.fstat(openfile.fileno()).st_size
+        if stats:
+            stats.count("pages")
+            stats.count("bytes", len(read_file.encode(self._config["encoding"], "replace")))
+        with stats.time("parse"):
+            return BeautifulSoup(read_file, self._config["parser"])  # Create variable that calls BeautifulSoup
+
+    def _extract_content(self, soup) -> str:
+        """Returns the text of the configured tags found in `soup`, stripped and separated by spaces."""
+        found_tags = self.config["tags"]  # create variable found_tags which finds the tags in the HTML
+        with self._stats.time("content"):
+            content = ""  # create a variable that's an empty string to add content to later
+            for tag_key in found_tags:  # iterate through the keys in the gathered tags
+                total_match = soup.find_all(tag_key, found_tags[tag_key])
+                for match in total_match:  # iterate through the matches and assign their content to the content
+                    new_string = match.text.strip() + " "
+                    content += new_string
+            return content.strip()  # the fully stripped content
+
+    def _iter_links(self, links, base_uri: str | None) -> Iterator[str]:
+        """Yields the resolved link of every 'a' tag in `links` that has an 'href' (without a '#')."""
+        for link in links:  # iterate through and get all the links containing 'href'
+            true_link = link.get('href')
+            if true_link is not None:  # if there is a link and the link contains a '#' continue
+                if '#' in true_link:
+                    continue
+                yield self._resolve_link(true_link, base_uri)
+
+    def _resolve_link(self, link: str, base_uri: str | None) -> str:
+        """Returns the URI `link` on the crawled page refers to: external links as they are, links on fetched pages
+        resolved against `base_uri`, and links on local files appended to the directory of the file."""
+        if OrbLinkProcessor.is_link_external(self, link):  # if external keep it as it is
+            return link
+        if base_uri is not None:
+            return urljoin(base_uri, link)
+        prev_slash_local = self.uri.uri.rfind("/")  # otherwise find the path and assign it to the link
+        path = self.uri.uri[:prev_slash_local]
+        return path + "/" + link
+
     def _open_uri_as_file(self) -> TextIO | None:
         """If `self._uri.uri` is not an external link, opens the file specified by the URI and returns it.
 
@@ -177,8 +321,19 @@ class OrbAgent(SpiderAgent):
         """
         try:
             if not OrbLinkProcessor.is_link_external(self, self._uri.uri):
-                return open(self._uri.uri, 'r', encoding=self._config["encoding"])
+                openfile = open(self._uri.uri, 'r', encoding=self._config["encoding"])
+                if self._uri.props and "size" in self._uri.props:  # seeds found by `orb_scan` know their size
+                    self._bytes_read = self._uri.props["size"]
+                return openfile
+            if self._fetcher is not None and self._fetcher.can_fetch(self._uri.uri):
+                response = self._fetcher.open(self._uri.uri, self._config["encoding"])
+                if response is None:
+                    raise OSError("Could not fetch {}".format(self._uri.uri))
+                self._bytes_read = response.size
+                return response
+            self._stats.count("external")
         except OSError as e:
+            self._stats.count("failed_opens")
             if self._config["debug"]:
                 err_str = "Link from ...{} failed to open:\n".format(
                     self._uri.props['parent'][-40:] if self._uri.props else 'unknown'
@@ -187,6 +342,145 @@ class OrbAgent(SpiderAgent):
             return None
 
 
+class OrbLazyAgent(OrbAgent):
+    """`OrbAgent` whose `crawl` defers all the work to its processors, as `SpiderProcessor` allows: the page is
+    opened and parsed once, the first time either processor is advanced, and each processor only extracts what it
+    yields. Draining only the `OrbLazyContentProcessor` never looks at the links on the page, and the
+    `OrbLazyLinkProcessor` yields links one at a time as it finds them, so a caller that only drains the links (or
+    stops early) never extracts the content (or the rest of the links). A page that is never asked for is never
+    opened; `bytes_read` and `page` are `None` until it is.
+
+    Unlike `OrbAgent`, content and links extracted from a page fetched through an `OrbHttpCache` are not saved to
+    it, since either may never be extracted; content and links saved there before are reused all the same.
+
+    Attributes:
+        _loaded (bool): whether the page was opened (and parsed, unless the cache had its extraction).
+        _soup (BeautifulSoup | None): the parsed page, or `None` if it was not parsed.
+        _base_uri (str | None): URI links on a fetched page are resolved against.
+        _extracted (tuple[str, list[str]] | None): content and links the HTTP cache had for the page.
+
+    """
+    def __init__(self, uri: SpiderURI, doc_db: SpiderDocDB, uri_db: SpiderUriDB, config: dict,
+                 stats: OrbCrawlStats | OrbNullStats = NULL_STATS, fetcher: OrbHttpPool = None,
+                 paths: OrbPathIndex = None) -> None:
+        super().__init__(uri, doc_db, uri_db, config, stats, fetcher, paths)
+        self._loaded = False
+        self._soup = None
+        self._base_uri: str | None = None
+        self._extracted: tuple[str, list[str]] | None = None
+
+    def crawl(self) -> (OrbLazyContentProcessor, OrbLazyLinkProcessor):
+        return OrbLazyContentProcessor(self), OrbLazyLinkProcessor(self)
+
+    def content(self) -> str:
+        """Returns the content of the configured tags on the page (empty if it could not be opened)."""
+        self._load()
+        if self._extracted is not None:
+            return self._extracted[0]
+        return "" if self._soup is None else self._extract_content(self._soup)
+
+    def iter_links(self) -> Iterator[str]:
+        """Yields the links on the page one at a time, in order, as they are found."""
+        self._load()
+        if self._extracted is not None:
+            yield from self._extracted[1]
+            return
+        if self._soup is None or not self._config.get("extract_links", True):
+            return
+        stats = self._stats
+        links = self._iter_links((tag for tag in self._soup.descendants if tag.name == 'a'), self._base_uri)
+        while True:
+            with stats.time("links"):
+                link = next(links, None)
+            if link is None:
+                return
+            yield link
+
+    def _load(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        stats = self._stats
+        with stats.time("open"):
+            openfile = self._open_uri_as_file()
+        if not openfile:
+            return
+        try:
+            extracted = openfile.cached_extraction(self._config) if hasattr(openfile, "cached_extraction") else None
+            if extracted is not None:  # an unchanged page from the HTTP cache
+                self._extracted = extracted
+                self._page = openfile.getvalue()
+                if stats:
+                    stats.count("pages")
+                    stats.count("bytes", self._bytes_read)
+                    stats.count("cached_extractions")
+            else:
+                self._base_uri = getattr(openfile, "uri", None)
+                self._soup = self._parse(openfile)
+        finally:
+            openfile.close()
+
+
+class OrbLazyContentProcessor(OrbContentProcessor):
+    """`OrbContentProcessor` that asks its `OrbLazyAgent` for the content of the page on the first `next`."""
+
+    def __init__(self, agent: OrbLazyAgent) -> None:
+        super().__init__(agent, '')
+        self._pending = True
+
+    def __next__(self) -> SpiderDoc:
+        if self._pending:
+            self._pending = False
+            content = self._agent.content()
+            self._doc = OrbDoc(content) if content else None
+        return super().__next__()
+
+
+class OrbLazyLinkProcessor(OrbLinkProcessor):
+    """`OrbLinkProcessor` that pulls the links of its `OrbLazyAgent`'s page one at a time, as they are needed."""
+
+    def __init__(self, agent: OrbLazyAgent) -> None:
+        super().__init__(agent, [])
+        self._pending = agent.iter_links()
+
+    @property
+    def links(self) -> list:
+        """Every link found on the page, in order; finds the links not pulled yet first."""
+        while self._pull():
+            pass
+        return self._link_list
+
+    def _has_next(self) -> bool:
+        return self._counter < len(self._link_list) or self._pull()
+
+    def _pull(self) -> bool:
+        link = next(self._pending, None)
+        if link is None:
+            return False
+        self._link_list.append(link)
+        self._agent.stats.count("links")
+        return True
+
+
+def agent_class(uri: str, config: dict = None) -> type[OrbAgent]:
+    """Returns the `OrbAgent` class that crawls `uri`: `OrbArchiveAgent` for archive URIs, `OrbStreamAgent` for local
+    pages of at least "stream_bytes" bytes if the agent `config` sets it (every local page if it is 0 or less), and
+    `OrbAgent` otherwise."""
+    if uri.startswith(ARCHIVE_SCHEME):
+        from spider.orb.orb_archive import OrbArchiveAgent  # imported on first use; it imports this module
+        return OrbArchiveAgent
+    stream_bytes = None if config is None else config.get("stream_bytes")
+    if stream_bytes is not None and not any(ext in uri for ext in config["external"]):
+        try:
+            streamed = stream_bytes <= 0 or os.path.getsize(uri) >= stream_bytes
+        except OSError:  # the agent reports the page failing to open
+            streamed = False
+        if streamed:
+            from spider.orb.orb_stream import OrbStreamAgent  # imported on first use; it imports this module
+            return OrbStreamAgent
+    return OrbAgent
+
+
 class OrbUriFrontier(SpiderUriFrontier):
     """URI Frontier implementation that utilizes Python's built-in `SimpleQueue`; `OrbUriFrontier` is a simple
     sequential FIFO queue that does not perform any prioritization or politeness enforcement.
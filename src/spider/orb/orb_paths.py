@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""Answers whether the local files links point to exist from memory, so that broken links are rejected before they
+enter the frontier instead of costing a failed `open` (and an exception) every time a page links to them, and
+reports them at the end of the crawl.
+
+`OrbPathIndex` lists every directory a link points into once, with `os.scandir`, the first time it is asked about a
+file in it, and remembers every answer by path: a file in the listing exists, and a file that is not is confirmed
+missing with one `os.path.isfile` (so that names the listing spells differently, e.g., on case-insensitive file
+systems, or files created since, are not rejected by mistake). `OrbLinkProcessor` asks it about every local link
+of an agent it was given to, and it records each missing target with the pages linking to it.
+
+Example:
+    $ python3 -m spider.orb.orb_paths ../out/broken_links.json
+"""
+
+from __future__ import annotations
+import os
+import sys
+import json
+import argparse
+
+__author__ = "Garrett Buchanan", "Livingstone Rwagatare"
+__copyright__ = "Copyright 2023, Westmont College"
+__credits__ = ["Garrett Buchanan", "Livingstone Rwagatare", "Mike Ryu"]
+__license__ = "MIT"
+__email__ = "mryu@westmont.edu"
+
+REPORT_PAGES = 5  # Pages linking to a missing target that the report lists.
+
+
+def main() -> None:
+    pars = argparse.ArgumentParser(prog="python3 -m spider.orb.orb_paths")
+    pars.add_argument("report_path", type=str, help="required path to a broken link report written by `orb_runner`")
+    args = pars.parse_args()
+
+    try:
+        with open(args.report_path, 'r', encoding="UTF-8") as report_file:
+            report = json.load(report_file)
+    except (OSError, ValueError) as e:
+        print("An error occurred while trying to open files:\n  ", e, file=sys.stderr)
+        exit(1)
+    print("{broken_links:d} broken links to {missing:d} missing files".format(**report))
+    for target in report["targets"]:
+        print("{:>6d}  {}".format(target["links"], target["uri"]))
+        for page in target["pages"]:
+            print("        from {}".format(page))
+
+
+class OrbPathIndex:
+    """Existence of local files, answered from directory listings cached in memory, plus a record of the broken
+    links that were rejected.
+
+    Attributes:
+        _known (dict[str, bool]): whether the file exists, by path as linked and by normalized path.
+        _listings (dict[str, frozenset[str] | None]): names of the files in every directory listed so far, by
+            normalized path (`None` for a directory that could not be listed).
+        _broken (dict[str, list]): number of links to every missing target and the first `REPORT_PAGES` pages
+            linking to it, in the order they were found.
+        _lookups (int): number of existence checks.
+        _scans (int): number of directories listed.
+        _stats (int): number of files looked up with `os.path.isfile`.
+
+    """
+    def __init__(self) -> None:
+        self._known: dict[str, bool] = {}
+        self._listings: dict[str, frozenset[str] | None] = {}
+        self._broken: dict[str, list] = {}
+        self._lookups = 0
+        self._scans = 0
+        self._stats = 0
+
+    def __len__(self) -> int:
+        """Number of missing targets recorded."""
+        return len(self._broken)
+
+    def exists(self, path: str) -> bool:
+        """Returns whether `path` is an existing file."""
+        self._lookups += 1
+        known = self._known.get(path)
+        if known is not None:
+            return known
+        normalized = os.path.normpath(path)
+        known = self._known.get(normalized)
+        if known is None:
+            directory, name = os.path.split(normalized)
+            if directory not in self._listings:
+                self._listings[directory] = self._list(directory)
+            listing = self._listings[directory]
+            known = listing is not None and name in listing
+            if not known:
+                self._stats += 1
+                known = os.path.isfile(path)
+            self._known[normalized] = known
+        self._known[path] = known
+        return known
+
+    def reject(self, path: str, parent: str | None) -> None:
+        """Records a link to the missing file `path` from the page `parent`."""
+        broken = self._broken.get(path)
+        if broken is None:
+            broken = self._broken[path] = [0, []]
+        broken[0] += 1
+        if parent is not None and len(broken[1]) < REPORT_PAGES and parent not in broken[1]:
+            broken[1].append(parent)
+
+    def report(self) -> dict:
+        """Returns the broken links rejected, by missing target, most linked first, as a JSON-serializable `dict`."""
+        targets = sorted(self._broken.items(), key=lambda item: -item[1][0])
+        return {
+            "missing": len(targets),
+            "broken_links": sum(count for count, _ in self._broken.values()),
+            "targets": [{"uri": uri, "links": count, "pages": pages} for uri, (count, pages) in targets],
+        }
+
+    def dump(self, path: str) -> None:
+        """Writes `report` to the file at `path` as JSON."""
+        with open(path, 'w', encoding="UTF-8") as report_file:
+            json.dump(self.report(), report_file, indent=2)
+
+    def to_dict(self) -> dict:
+        """Returns the number of existence checks, directories listed, files looked up on their own, and broken
+        links and missing targets as a JSON-serializable `dict`."""
+        return {
+            "lookups": self._lookups,
+            "directories": self._scans,
+            "stats": self._stats,
+            "broken_links": sum(count for count, _ in self._broken.values()),
+            "missing": len(self._broken),
+        }
+
+    def _list(self, directory: str) -> frozenset[str] | None:
+        self._scans += 1
+        try:
+            with os.scandir(directory or os.curdir) as scan:
+                return frozenset(entry.name for entry in scan if entry.is_file())
+        except OSError:
+            return None
+
+
+if __name__ == '__main__':
+    main()
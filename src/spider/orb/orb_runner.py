@@ -6,10 +6,14 @@ import io
 import sys
 import json
 import argparse
-from spider.orb.orb_models import OrbURI, OrbDoc, OrbUriFrontier, OrbDocDB, OrbUriDB, OrbAgent
-from text_processing.freq_utils import tokenize_file, print_frequencies
+from spider.orb.orb_models import OrbURI, OrbDoc, OrbUriFrontier, OrbDocDB, OrbUriDB, agent_class
+from spider.orb.orb_stats import OrbCrawlStats, NULL_STATS
+from spider.orb.orb_budget import OrbCrawlBudget
+from profiling.prof_hooks import RunProfiler, NULL_PROFILER, add_profile_arguments
+from text_processing.freq_utils import print_frequencies
 from text_processing.freq_counter import compute_twogram_freq
-from nltk.corpus import stopwords
+from text_processing.freq_stream import StreamingTwoGramCounter
+from text_processing.freq_stopwords import StopwordFilter
 
 __author__ = "Garrett Buchanan", "Livingstone Rwagatare"
 __copyright__ = "Copyright 2023, Westmont College"
@@ -17,6 +21,8 @@ __credits__ = ["Garrett Buchanan", "Livingstone Rwagatare", "Mike Ryu"]
 __license__ = "MIT"
 __email__ = "mryu@westmont.edu"
 
+BUDGET_SUFFIX = ".budget.json"  # Sidecar written next to the output file when a crawl budget is set.
+
 VALID_CONFIG_SCHEMA = {
   "seeds": [],
   "options": {
@@ -45,10 +51,127 @@ def main() -> None:
         print("An error occurred while trying to open files:\n  ", e, file=sys.stderr)
         exit(1)
 
-    doc_stream = io.StringIO()
-    uri_frontier = OrbUriFrontier(list(map(OrbURI, config["seeds"])))
-    run_sequential_crawl(doc_stream, uri_frontier, OrbDocDB(), OrbUriDB(), config)
-    print_twogram_freq(remove_stopwords(tokenize_file(doc_stream), config), args.output_file_path, config)
+    options = config["options"]
+    if args.no_links:  # harvest content only
+        config["agent_config"]["extract_links"] = False
+    if args.stream_bytes is not None:  # parse pages this large in chunks, following their links as they are found
+        config["agent_config"]["stream_bytes"] = args.stream_bytes
+    seeds = list(map(OrbURI, config["seeds"]))
+    scan_dir = args.scan or options.get("scan_dir")  # optionally seed with every page found under a directory
+    if scan_dir:
+        from spider.orb.orb_scan import scan_corpus, DEFAULT_EXTENSIONS
+        seen = {seed.uri for seed in seeds}
+        seeds += [uri for uri in scan_corpus(scan_dir, options.get("scan_extensions", DEFAULT_EXTENSIONS),
+                                             args.scan_glob or options.get("scan_globs"),
+                                             args.scan_workers or options.get("scan_workers", 1))
+                  if uri.uri not in seen]
+        config["seeds"] = [seed.uri for seed in seeds]
+    index_dir = args.index or options.get("index_dir")  # optional positional inverted index of the crawled docs
+    store_dir = args.docs or options.get("doc_store_dir")  # optional compressed store of the crawled docs
+    graph_dir = args.graph or options.get("graph_dir")  # optional link graph of every link crawled, saved as CSR
+    budget = OrbCrawlBudget.from_options(options, max_pages=args.max_pages, max_bytes=args.max_bytes,
+                                         max_depth=args.max_depth, max_seconds=args.max_seconds)
+    stats_path = args.stats or options.get("stats_file")  # optional JSON summary of where the crawl spent its time
+    http_fetch = args.http or options.get("http_fetch", False)
+    check_links = args.check_links or args.broken_links or options.get("check_links", False)  # reject broken links
+    warc_dir = args.warc or options.get("warc_dir")  # optional WARC files of the raw pages and their content
+    if warc_dir and config["agent_config"].get("stream_bytes") is not None:
+        pars.error("streamed pages are never held whole, so they cannot be written to WARC files; --warc cannot be "
+                   "used with --stream-bytes (or their options in the config file)")
+    nodes = args.nodes or options.get("nodes", 1)
+    if nodes > 1:  # crawl with local node processes; `orb_distributed` can also spread a crawl over several hosts
+        unsupported = [name for name, value in (
+            ("--index", index_dir), ("--docs", store_dir), ("--graph", graph_dir), ("--max-*", budget),
+            ("--stats", stats_path), ("--http", http_fetch), ("--http-cache", args.http_cache),
+            ("--workers", args.workers or options.get("http_workers")), ("--check-links", check_links),
+            ("--profile", args.profile or options.get("profile"))) if value]
+        if unsupported:
+            pars.error("a crawl over several nodes only writes two-gram frequencies (and WARC files); {} cannot be "
+                       "used with --nodes (or their options in the config file)".format(", ".join(unsupported)))
+        from spider.orb.orb_distributed import run_local_crawl
+        if args.warc:  # every node writes its own WARC file
+            options["warc_dir"] = args.warc
+        write_twogram_freq(run_local_crawl(config, nodes, follow_links=not scan_dir), args.output_file_path, config,
+                           args.format)
+        return
+    stopwords = StopwordFilter.from_config(config)
+    doc_stream = StreamingTwoGramCounter(stopwords, options.get("spill_budget"),
+                                         options.get("spill_dir"), options.get("spill_compress", False))
+    index = None
+    if index_dir:
+        from text_processing.freq_index import IndexBuilder
+        index = IndexBuilder(index_dir, stopwords, options.get("index_segment_budget"))
+    store = None
+    if store_dir:
+        from spider.orb.orb_docstore import OrbDocStoreWriter
+        store = OrbDocStoreWriter(store_dir, options.get("doc_store_block_size"))
+    graph = None
+    if graph_dir:
+        from spider.orb.orb_graph import OrbGraphBuilder
+        graph = OrbGraphBuilder()
+    warc = None
+    if warc_dir:
+        from spider.orb.orb_warc import OrbWarcWriter
+        warc = OrbWarcWriter(warc_dir, encoding=config["agent_config"]["encoding"],
+                             batch_size=options.get("warc_batch_size"))
+    stats = OrbCrawlStats() if stats_path else NULL_STATS
+    fetcher = None
+    if http_fetch:  # optionally crawl http(s) links instead of skipping them
+        from spider.orb.orb_http import OrbHttpPool
+        fetcher = OrbHttpPool.from_options(dict(options, http_cache_dir=args.http_cache) if args.http_cache
+                                           else options, stats)
+    workers = args.workers or options.get("http_workers", 0)
+    paths = None
+    if check_links:  # reject links to missing local files before they reach the frontier
+        from spider.orb.orb_paths import OrbPathIndex
+        paths = OrbPathIndex()
+    profiler = RunProfiler.from_options(args.profile, args.output_file_path or args.config_file_path, options,
+                                        args.profile_sample, args.profile_snapshot)
+    with profiler:
+        uri_frontier = OrbUriFrontier(seeds)
+        scheduler = None
+        if fetcher is not None and workers:  # fetch pages from many hosts at once, politely (see `orb_scheduler`)
+            from spider.orb.orb_scheduler import OrbHostScheduler
+            scheduler = OrbHostScheduler.from_options(uri_frontier, fetcher, dict(options, http_workers=workers),
+                                                      config["agent_config"]["encoding"])
+            uri_frontier = scheduler
+        run_sequential_crawl(doc_stream, uri_frontier, OrbDocDB(), OrbUriDB(), config, stats=stats, profiler=profiler,
+                             index=index, store=store, graph=graph, warc=warc, budget=budget if budget else None,
+                             fetcher=fetcher if scheduler is None else scheduler, paths=paths,
+                             follow_links=not scan_dir)
+        if scheduler is not None:
+            scheduler.close()
+            for host, state in scheduler.to_dict().items():
+                print("Host {}: {fetched:d} fetched, {errors:d} errors, concurrency limit {limit:g} (peak "
+                      "{peak_in_flight:d} in flight)".format(host, **state), file=sys.stderr)
+        write_twogram_freq(doc_stream.finish(), args.output_file_path, config, args.format, budget.partial)
+        if index is not None:
+            index.finish().close()
+        if store is not None:
+            store.finish().close()
+        if graph is not None:
+            graph.finish().save(graph_dir)
+        if warc is not None:
+            warc.finish()
+    if fetcher is not None:
+        fetcher.close()
+        print("HTTP: {requests:d} requests, {reused:d} over reused connections ({reuse_rate:.1%}), {errors:d} errors, "
+              "{mean_ms:.1f} ms mean fetch latency".format(**fetcher.to_dict()), file=sys.stderr)
+        if fetcher.cache is not None:
+            print("HTTP cache: {hits:d} hits, {revalidated:d} revalidated, {misses:d} misses, {evicted:d} evicted, "
+                  "{entries:d} entries ({bytes:d} bytes)".format(**fetcher.cache.to_dict()), file=sys.stderr)
+    if paths is not None and (paths or args.broken_links):
+        print("Broken links: {broken_links:d} links to {missing:d} missing files".format(**paths.to_dict()),
+              file=sys.stderr)
+        if args.broken_links:
+            paths.dump(args.broken_links)
+    if stats_path:
+        stats.dump(stats_path)
+    if budget:  # a sidecar file tells whether the output is complete, and what was left if it is not
+        budget.dump(args.output_file_path + BUDGET_SUFFIX)
+        if budget.stopped:
+            print("Crawl stopped at its {} budget with {:d} URIs left in the frontier; the output is partial.".format(
+                budget.stopped, len(budget.remaining)), file=sys.stderr)
 
 
 def setup_argument_parser() -> argparse.ArgumentParser:
@@ -57,6 +180,50 @@ def setup_argument_parser() -> argparse.ArgumentParser:
                       help="required string containing the path to a config JSON file")
     pars.add_argument("output_file_path", type=str, nargs='?',
                       help="optional string containing the path to an output text file")
+    pars.add_argument("--stats", type=str, default=None,
+                      help="optional path to write per-stage crawl timings and counters to as JSON")
+    pars.add_argument("--format", type=str, default=None, choices=("text", "binary"),
+                      help="optional output file format, text (the default) or binary (see `freq_binary`)")
+    pars.add_argument("--index", type=str, default=None, metavar="DIR",
+                      help="optional directory to build a positional inverted index of the crawled documents in")
+    pars.add_argument("--docs", type=str, default=None, metavar="DIR",
+                      help="optional directory to store the crawled documents in, compressed, for later retrieval")
+    pars.add_argument("--graph", type=str, default=None, metavar="DIR",
+                      help="optional directory to save the link graph of the crawl to (see `orb_graph`)")
+    pars.add_argument("--warc", type=str, default=None, metavar="DIR",
+                      help="optional directory to write the raw pages crawled and their content to, as WARC files")
+    pars.add_argument("--scan", type=str, default=None, metavar="DIR",
+                      help="optional directory to seed the crawl with every page under, crawled without following "
+                           "links (see `orb_scan`)")
+    pars.add_argument("--scan-glob", type=str, nargs='+', default=None, metavar="PATTERN",
+                      help="optional patterns the paths of scanned pages (relative to the directory) must match")
+    pars.add_argument("--scan-workers", type=int, default=None,
+                      help="optional number of threads scanning subdirectories at once")
+    pars.add_argument("--no-links", action="store_true",
+                      help="switch to skip extracting links altogether, e.g., to harvest the content of scanned pages")
+    pars.add_argument("--stream-bytes", type=int, default=None, metavar="BYTES",
+                      help="optional size of local pages from which on they are parsed in chunks (see `orb_stream`)")
+    pars.add_argument("--check-links", action="store_true",
+                      help="switch to reject links to missing local files before they reach the frontier, and report "
+                           "them (see `orb_paths`)")
+    pars.add_argument("--broken-links", type=str, default=None, metavar="PATH",
+                      help="optional path to write a JSON report of the links to missing local files to (implies "
+                           "--check-links)")
+    pars.add_argument("--http", action="store_true",
+                      help="switch to crawl http(s) links through pooled keep-alive connections (see `orb_http`)")
+    pars.add_argument("--http-cache", type=str, default=None, metavar="DIR",
+                      help="optional directory to cache http(s) responses in, revalidating them on later crawls")
+    pars.add_argument("--workers", type=int, default=None,
+                      help="optional number of threads fetching pages over http(s) at once, paced per host")
+    pars.add_argument("--nodes", type=int, default=None,
+                      help="optional number of local processes to distribute the crawl over (two-grams output only)")
+    pars.add_argument("--max-pages", type=int, default=None, help="optional number of pages to stop crawling after")
+    pars.add_argument("--max-bytes", type=int, default=None, help="optional number of bytes to stop crawling after")
+    pars.add_argument("--max-depth", type=int, default=None,
+                      help="optional number of links away from the seeds beyond which pages are not crawled")
+    pars.add_argument("--max-seconds", type=float, default=None,
+                      help="optional number of seconds to stop crawling after")
+    add_profile_arguments(pars, agents=True)
     return pars
 
 
@@ -75,43 +242,97 @@ def validate_config(config, schema, sub=""):
     return is_valid
 
 
-def run_sequential_crawl(doc_str, uri_frontier, doc_db, uri_db, config):
+def run_sequential_crawl(doc_str, uri_frontier, doc_db, uri_db, config, *, stats=NULL_STATS, profiler=NULL_PROFILER,
+                         index=None, store=None, graph=None, warc=None, budget=None, fetcher=None, paths=None,
+                         follow_links=True):
     """This method runs the crawl process on all the URIs that we have gathered
-       with our crawler."""
+       with our crawler, writing every document's content to `doc_str` (an `io.StringIO`, rewound at the end, or a
+       sink such as `StreamingTwoGramCounter`) as soon as it is crawled.
+
+       The optional keyword arguments: `stats` and `profiler` record where the crawl spends its time; `index`,
+       `store`, `graph` and `warc` also get every document, link or page crawled; `budget` stops the crawl cleanly
+       once it is used up; `fetcher` crawls http(s) links (pass an `OrbHostScheduler` as both it and `uri_frontier`);
+       `paths` rejects links to missing local files; and with `follow_links` off, only the pages already in
+       `uri_frontier` are crawled."""
+    if budget is not None:
+        budget.start()
     while uri_frontier:
-        next_uri = uri_frontier.pop()   # pop the URI to move to the net one
+        if budget is not None:
+            exceeded = budget.exceeded()
+            if exceeded:
+                budget.stop(exceeded, uri_frontier)  # keep what was crawled; record what was not
+                break
+        with stats.time("frontier"):
+            next_uri = uri_frontier.pop()   # pop the URI to move to the net one
         if next_uri is None:
             break   # if next_uri return None that means all URIs have been crawled
-        agent = OrbAgent(next_uri, doc_db, uri_db, config["agent_config"])
-        debug_print_current_uri(next_uri, config)   # goes through the URIs and prints the current URI then pops it
-        content_processor, link_processor = agent.crawl()
-        documents = [document for document in content_processor]
-        links = [link for link in link_processor]
-        for document in documents:
-            debug_print_current_doc(document, config)
-            doc_str.write(document.content)  # writes the current document's content
-        uri_frontier.push_all(*links)
+        if budget is not None and not budget.within_depth(next_uri):
+            continue
+        with profiler.agent():
+            agent = agent_class(next_uri.uri, config["agent_config"])(next_uri, doc_db, uri_db,
+                                                                      config["agent_config"], stats, fetcher, paths)
+            debug_print_current_uri(next_uri, config)   # goes through the URIs and prints the current URI
+            content_processor, link_processor = agent.crawl()
+            if follow_links:
+                for link in link_processor:  # a streamed page yields its links while the rest of it is being read
+                    with stats.time("frontier"):
+                        uri_frontier.push(link)
+            documents = [document for document in content_processor]
+            if budget is not None and agent.bytes_read is not None:  # lazy agents only know it once they open
+                budget.charge(agent.bytes_read)
+            if graph is not None:
+                with stats.time("graph"):
+                    graph.add_edges(next_uri.uri, link_processor.links)
+            if warc is not None and agent.page is not None:
+                with stats.time("warc"):
+                    warc.add(next_uri.uri, agent.page, documents[0].content if documents else None)
+            for document in documents:
+                debug_print_current_doc(document, config)
+                with stats.time("write"):
+                    doc_str.write(document.content)  # writes the current document's content
+                if index is not None:
+                    with stats.time("index"):
+                        index.add(document, next_uri.uri)
+                if store is not None:
+                    with stats.time("store"):
+                        store.add(document, next_uri.uri)
 
-    doc_str.seek(0)
+    if isinstance(doc_str, io.IOBase):
+        doc_str.seek(0)
 
 
 def remove_stopwords(words, config):
     """This function removes all the stopwords from the content of a corpus using NLTK's stopwords corpus.
-       This is done so that only relevant words are returned."""
+       This is done so that only relevant words are returned. The stopwords are loaded (and NLTK imported) only
+       once per process, and never if the option is off."""
     if not config['options']['remove_stopwords']:   # if no option to remove stopwords return the given words
         return words
-    stop_words = set(stopwords.words(config['options']['stopwords_lang']))  # set of unique stopwords from config
-    not_stopwords = [word for word in words if word not in stop_words]  # if a word is not in stopwords add to list
-    return not_stopwords
+    return StopwordFilter.from_config(config).filter(words)  # keep the words that are not stopwords, in order
 
 
 def print_twogram_freq(all_words, output_path, config):
     """This function computes the frequencies of the words within a corpus and returns the frequencies of the two
        grams present within the corpus."""
-    frequencies = compute_twogram_freq(all_words)   # computes the two gram frequencies to return
-    encoding = config['agent_config']['encoding']
-    with open(output_path, 'w', encoding=encoding) as output_file:  # write the contents to the output file
-        print_frequencies(frequencies, output_file)
+    options = config['options']   # optional "spill_*" options count on disk past the given number of two grams
+    frequencies = compute_twogram_freq(all_words, options.get('spill_budget'), options.get('spill_dir'),
+                                       options.get('spill_compress', False))
+    write_twogram_freq(frequencies, output_path, config)
+
+
+def write_twogram_freq(frequencies, output_path, config, output_format=None, partial=False):
+    """This function writes already computed two gram frequencies to the output file, as text or (if the format, or
+       else the "output_format" option, is "binary") in the binary format of `text_processing.freq_binary`, where
+       `partial` flags frequencies counted from a crawl that stopped early (text output is flagged by the budget
+       sidecar file `orb_runner` writes next to it instead)."""
+    if (output_format or config['options'].get('output_format', 'text')) == 'binary':
+        from text_processing.freq_binary import write_frequency_file  # only imported if binary output is asked for
+        write_frequency_file(frequencies, output_path, partial=partial)
+    else:
+        encoding = config['agent_config']['encoding']
+        with open(output_path, 'w', encoding=encoding) as output_file:  # write the contents to the output file
+            print_frequencies(frequencies, output_file)
+    if hasattr(frequencies, 'close'):   # remove the runs of frequencies spilled to disk once they have been printed
+        frequencies.close()
 
 
 def debug_print_current_uri(uri, config):
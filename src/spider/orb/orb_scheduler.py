@@ -0,0 +1,333 @@
+"""Per-host politeness and adaptive concurrency for networked crawls: `OrbHostScheduler` sits between a URI
+frontier and the agents, fetching pages from many hosts at once without overloading any one of them.
+"""
+
+from __future__ import annotations
+import threading
+from time import monotonic, perf_counter
+from collections import deque
+from urllib.parse import urlsplit
+from spider.orb.orb_models import OrbURI
+from spider.orb.orb_http import OrbHttpPool, OrbHttpResponse
+
+__author__ = "Garrett Buchanan", "Livingstone Rwagatare"
+__copyright__ = "Copyright 2023, Westmont College"
+__credits__ = ["Garrett Buchanan", "Livingstone Rwagatare", "Mike Ryu"]
+__license__ = "MIT"
+__email__ = "mryu@westmont.edu"
+
+DEFAULT_WORKERS = 8
+DEFAULT_RATE = 10.0  # Requests per second each host's token bucket refills by; `None` for no rate limit.
+DEFAULT_BURST = 4.0  # Tokens a host's bucket holds at most, i.e., requests that may be sent back to back.
+DEFAULT_MAX_CONCURRENCY = 8  # Most requests in flight to one host at once.
+LATENCY_FACTOR = 3.0  # A host is congested once its (smoothed) latency exceeds its best latency by this factor.
+LATENCY_WEIGHT = 0.25  # Weight of the newest fetch in a host's smoothed latency.
+DECREASE_FACTOR = 0.5  # Multiplies a host's concurrency limit on congestion or errors.
+
+
+class OrbHostState:
+    """Politeness state of one host: its queue of URIs, a token bucket pacing requests, and a concurrency limit
+    adjusted by additive increase, multiplicative decrease (AIMD).
+
+    A request may start when the host has a URI queued, fewer requests in flight than its (whole) concurrency
+    limit, and a token in its bucket. Every fetch that succeeds without congestion raises the limit by
+    `1 / limit`, so by about one per limit's worth of fetches, up to `max_concurrency`. A failed fetch, or a
+    smoothed latency above `latency_factor` times the best latency seen from the host, halves it instead (but not
+    below one, and at most once per smoothed latency, so a burst of slow responses counts as one signal).
+
+    Attributes:
+        name (str): the host (and port) URIs are grouped by.
+        queue (deque[OrbURI]): URIs waiting to be fetched from the host.
+        in_flight (int): requests to the host under way.
+        limit (float): current concurrency limit.
+        latency (float | None): smoothed seconds per fetch, `None` before the first one.
+        best_latency (float | None): fewest seconds any fetch from the host took.
+        fetched (int): fetches finished, successful or not.
+        errors (int): fetches that failed.
+        peak_in_flight (int): most requests that were in flight at once.
+        _rate (float | None): tokens added per second; `None` for no rate limit.
+        _burst (float): tokens the bucket holds at most.
+        _tokens (float): tokens in the bucket as of `_refilled`.
+        _refilled (float): time the bucket was last refilled.
+        _max_concurrency (int): highest the limit may grow to.
+        _adaptive (bool): whether the limit is adjusted at all (it stays at `max_concurrency` otherwise).
+        _latency_factor (float): congestion threshold relative to `best_latency`.
+        _decreased (float): time the limit was last decreased.
+
+    """
+    def __init__(self, name: str, rate: float | None = DEFAULT_RATE, burst: float = DEFAULT_BURST,
+                 max_concurrency: int = DEFAULT_MAX_CONCURRENCY, adaptive: bool = True,
+                 latency_factor: float = LATENCY_FACTOR, now: float = 0.0) -> None:
+        if max_concurrency < 1:
+            raise ValueError("Host concurrency must be at least one request.")
+        if rate is not None and (rate <= 0 or burst < 1):
+            raise ValueError("Host rate must be positive, and its burst at least one request.")
+        self.name = name
+        self.queue: deque[OrbURI] = deque()
+        self.in_flight = 0
+        self.limit = 1.0 if adaptive else float(max_concurrency)
+        self.latency: float | None = None
+        self.best_latency: float | None = None
+        self.fetched = 0
+        self.errors = 0
+        self.peak_in_flight = 0
+        self._rate = rate
+        self._burst = burst
+        self._tokens = burst
+        self._refilled = now
+        self._max_concurrency = max_concurrency
+        self._adaptive = adaptive
+        self._latency_factor = latency_factor
+        self._decreased = float("-inf")
+
+    def ready_at(self, now: float) -> float | None:
+        """Returns the earliest time a request to the host may start, or `None` if none can until one finishes (or
+        a URI is queued)."""
+        if not self.queue or self.in_flight >= int(self.limit):
+            return None
+        if self._rate is None:
+            return now
+        self._refill(now)
+        return now if self._tokens >= 1 else now + (1 - self._tokens) / self._rate
+
+    def start(self, now: float) -> OrbURI:
+        """Takes the next URI off the queue as a request under way; `ready_at` must have allowed it."""
+        if self._rate is not None:
+            self._refill(now)
+            self._tokens -= 1
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        return self.queue.popleft()
+
+    def finish(self, seconds: float, ok: bool, now: float) -> None:
+        """Records a request that took `seconds` and succeeded if `ok`, and adjusts the concurrency limit."""
+        self.in_flight -= 1
+        self.fetched += 1
+        if ok:
+            self.latency = seconds if self.latency is None else self.latency + LATENCY_WEIGHT * (seconds - self.latency)
+            self.best_latency = seconds if self.best_latency is None else min(self.best_latency, seconds)
+        else:
+            self.errors += 1
+        if not self._adaptive:
+            return
+        congested = not ok or self.latency > self._latency_factor * self.best_latency
+        if not congested:
+            self.limit = min(float(self._max_concurrency), self.limit + 1 / self.limit)
+        elif now - self._decreased >= (self.latency or 0.0):
+            self.limit = max(1.0, self.limit * DECREASE_FACTOR)
+            self._decreased = now
+
+    def to_dict(self) -> dict:
+        """Returns what the host was sent and how it responded as a JSON-serializable `dict`."""
+        return {
+            "fetched": self.fetched,
+            "errors": self.errors,
+            "limit": round(self.limit, 3),
+            "peak_in_flight": self.peak_in_flight,
+            "latency_ms": round(self.latency * 1000, 3) if self.latency is not None else None,
+            "best_latency_ms": round(self.best_latency * 1000, 3) if self.best_latency is not None else None,
+        }
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self._burst, self._tokens + (now - self._refilled) * self._rate)
+        self._refilled = now
+
+
+class OrbHostScheduler:
+    """Fetches the pages of a frontier's http(s) URIs with a pool of worker threads, a few hosts at a time, and
+    hands them to the crawl as they arrive.
+
+    The scheduler stands in for both the frontier and the fetcher of `run_sequential_crawl`: URIs pushed to it go
+    through the wrapped `frontier`, from which they are sorted into one `OrbHostState` queue per host. Workers
+    repeatedly take a URI from whichever host is ready soonest (see `OrbHostState`), fetch it through `pool`, and
+    queue the response; `pop` returns the URIs whose pages have been fetched, in the order they arrived, and the
+    agent crawling one gets its page from `open` without another request. URIs the pool cannot fetch (such as local
+    files) are returned by `pop` right away, before any fetched page.
+
+    Unlike a `SpiderUriFrontier`, `pop` blocks until a page has been fetched (or nothing is left to fetch), and the
+    order pages are crawled in depends on how fast each host responds.
+
+    Attributes:
+        _frontier (SpiderUriFrontier): frontier URIs pass through before they are sorted by host.
+        _pool (OrbHttpPool): fetches the pages.
+        _encoding (str): encoding of pages that do not declare one.
+        _workers (int): number of worker threads.
+        _host_options (dict): keyword arguments every `OrbHostState` is created with.
+        _hosts (dict[str, OrbHostState]): every host seen so far.
+        _local (deque[OrbURI]): URIs the pool cannot fetch, waiting to be popped.
+        _done (deque[tuple[OrbURI, OrbHttpResponse | None]]): fetched URIs waiting to be popped, with their pages.
+        _responses (dict[str, OrbHttpResponse | None]): pages of popped URIs, waiting to be opened.
+        _queued (int): URIs queued in all hosts.
+        _in_flight (int): requests under way to all hosts.
+        _condition (Condition): guards the state above, and wakes workers and `pop`.
+        _threads (list[Thread]): worker threads, started on the first URI to fetch.
+        _closed (bool): whether the workers were told to stop.
+
+    """
+    def __init__(self, frontier, pool: OrbHttpPool, encoding: str = "UTF-8", workers: int = DEFAULT_WORKERS,
+                 rate: float | None = DEFAULT_RATE, burst: float = DEFAULT_BURST,
+                 max_concurrency: int = DEFAULT_MAX_CONCURRENCY, adaptive: bool = True) -> None:
+        if workers < 1:
+            raise ValueError("The scheduler needs at least one worker.")
+        self._frontier = frontier
+        self._pool = pool
+        self._encoding = encoding
+        self._workers = workers
+        self._host_options = {"rate": rate, "burst": burst, "max_concurrency": max_concurrency,
+                              "adaptive": adaptive}
+        self._hosts: dict[str, OrbHostState] = {}
+        self._local: deque[OrbURI] = deque()
+        self._done: deque[tuple[OrbURI, OrbHttpResponse | None]] = deque()
+        self._responses: dict[str, OrbHttpResponse | None] = {}
+        self._queued = 0
+        self._in_flight = 0
+        self._condition = threading.Condition()
+        self._threads: list[threading.Thread] = []
+        self._closed = False
+        self._admit()
+
+    @classmethod
+    def from_options(cls, frontier, pool: OrbHttpPool, options: dict, encoding: str = "UTF-8") -> OrbHostScheduler:
+        """Creates a scheduler configured by the "http_workers", "host_rate", "host_burst", "host_max_concurrency",
+        and "host_adaptive" config `options`."""
+        return cls(frontier, pool, encoding, options.get("http_workers", DEFAULT_WORKERS),
+                   options.get("host_rate", DEFAULT_RATE), options.get("host_burst", DEFAULT_BURST),
+                   options.get("host_max_concurrency", DEFAULT_MAX_CONCURRENCY), options.get("host_adaptive", True))
+
+    def __len__(self) -> int:
+        with self._condition:
+            return len(self._frontier) + len(self._local) + self._queued + self._in_flight + len(self._done)
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
+    def push(self, uri: OrbURI) -> None:
+        self._frontier.push(uri)
+        self._admit()
+
+    def push_all(self, *args: OrbURI) -> None:
+        self._frontier.push_all(*args)
+        self._admit()
+
+    def pop(self) -> OrbURI | None:
+        """Returns the next URI to crawl, waiting for a page to be fetched if need be, or `None` once there is
+        nothing left to crawl."""
+        with self._condition:
+            while True:
+                if self._local:
+                    return self._local.popleft()
+                if self._done:
+                    uri, response = self._done.popleft()
+                    self._responses[uri.uri] = response
+                    return uri
+                if not self._queued and not self._in_flight:
+                    return None
+                self._condition.wait()
+
+    def drain(self) -> list[OrbURI]:
+        """Stops the workers and returns every URI not crawled yet (including fetched ones), e.g., for a budget."""
+        self.close()
+        with self._condition:
+            remaining = list(self._local) + [uri for uri, _ in self._done]
+            for host in self._hosts.values():
+                remaining.extend(host.queue)
+                host.queue.clear()
+            self._local.clear()
+            self._done.clear()
+            self._queued = 0
+        return remaining
+
+    def can_fetch(self, uri: str) -> bool:
+        return self._pool.can_fetch(uri)
+
+    def open(self, uri: str, encoding: str = "UTF-8") -> OrbHttpResponse | None:
+        """Returns the page fetched for `uri`, popped before, or `None` if it could not be fetched."""
+        with self._condition:
+            return self._responses.pop(uri, None)
+
+    def close(self) -> None:
+        """Stops the workers, letting requests under way finish; the pool is left open."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def __enter__(self) -> OrbHostScheduler:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def to_dict(self) -> dict:
+        """Returns the state of every host as a JSON-serializable `dict`."""
+        with self._condition:
+            return {name: host.to_dict() for name, host in self._hosts.items()}
+
+    def host_key(self, uri: str) -> str:
+        """Returns the host `uri` is queued and paced under: its host and port."""
+        return urlsplit(uri).netloc.lower()
+
+    def _admit(self) -> None:
+        """Moves every URI in the frontier to the queue of its host (or to `_local`), and wakes the workers."""
+        with self._condition:
+            fetched = False
+            while self._frontier:
+                uri = self._frontier.pop()
+                if uri is None:
+                    break
+                if not self._pool.can_fetch(uri.uri):
+                    self._local.append(uri)
+                    continue
+                key = self.host_key(uri.uri)
+                host = self._hosts.get(key)
+                if host is None:
+                    host = self._hosts[key] = OrbHostState(key, now=monotonic(), **self._host_options)
+                host.queue.append(uri)
+                self._queued += 1
+                fetched = True
+            if fetched:
+                if not self._threads and not self._closed:
+                    self._threads = [threading.Thread(target=self._work, name="orb-fetch-{:d}".format(i), daemon=True)
+                                     for i in range(self._workers)]
+                    for thread in self._threads:
+                        thread.start()
+                self._condition.notify_all()
+
+    def _next_host(self, now: float) -> tuple[OrbHostState | None, float | None]:
+        """Returns the host ready soonest (the one with the fewest requests in flight among those ready now) if it
+        is ready now, and otherwise `None` and how long to wait for one (`None` if no host can become ready)."""
+        best, best_at = None, None
+        for host in self._hosts.values():
+            ready_at = host.ready_at(now)
+            if ready_at is None:
+                continue
+            if best_at is None or ready_at < best_at or (ready_at == best_at and host.in_flight < best.in_flight):
+                best, best_at = host, ready_at
+        if best_at is not None and best_at <= now:
+            return best, None
+        return None, None if best_at is None else best_at - now
+
+    def _work(self) -> None:
+        while True:
+            with self._condition:
+                while True:
+                    if self._closed:
+                        return
+                    now = monotonic()
+                    host, wait = self._next_host(now)
+                    if host is not None:
+                        break
+                    self._condition.wait(wait)
+                uri = host.start(now)
+                self._queued -= 1
+                self._in_flight += 1
+            started = perf_counter()
+            response = self._pool.open(uri.uri, self._encoding)
+            seconds = perf_counter() - started
+            with self._condition:
+                host.finish(seconds, response is not None, monotonic())
+                self._in_flight -= 1
+                self._done.append((uri, response))
+                self._condition.notify_all()
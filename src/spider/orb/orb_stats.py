@@ -0,0 +1,175 @@
+"""Per-stage timing and counter instrumentation for the local crawler (`OrbAgent` and `run_sequential_crawl`).
+"""
+
+from __future__ import annotations
+import json
+from time import perf_counter
+
+__author__ = "Garrett Buchanan", "Livingstone Rwagatare"
+__copyright__ = "Copyright 2023, Westmont College"
+__credits__ = ["Garrett Buchanan", "Livingstone Rwagatare", "Mike Ryu"]
+__license__ = "MIT"
+__email__ = "mryu@westmont.edu"
+
+STAGES = ("open", "fetch", "read", "parse", "content", "links", "db", "frontier", "write", "index", "store", "graph",
+          "warc", "paths")
+COUNTERS = ("pages", "bytes", "documents", "duplicates", "failed_opens", "external", "links", "new_links",
+            "broken_links")
+HISTOGRAM_BUCKETS = 24  # Powers of two in microseconds, i.e., the last bucket holds everything >= ~4 seconds.
+
+
+class OrbCrawlStats:
+    """Records the time spent in every stage of the crawl loop, plus counters of what the crawl has seen.
+
+    Stages are timed with `with stats.time("parse"): ...`; every timing adds to the stage's total, count, maximum,
+    and a histogram of durations in power-of-two microsecond buckets, so that a handful of slow pages can be told
+    apart from uniformly slow ones. Counters are bumped with `stats.count("pages")` (or `count("bytes", n)`).
+
+    Stages and counters used by the crawler are listed in `STAGES` and `COUNTERS`, but any name can be recorded.
+    An `OrbCrawlStats` is truthy, unlike `OrbNullStats`, so code can skip computing what it would record with
+    `if stats: ...` when instrumentation is disabled.
+
+    Attributes:
+        _stages (dict[str, _StageStats]): timing totals and histograms per stage name.
+        _counters (dict[str, int]): counter values per counter name.
+        _started (float): `perf_counter` value when the stats were created (or last `reset`).
+
+    """
+    def __init__(self) -> None:
+        self._stages: dict[str, _StageStats] = {}
+        self._counters: dict[str, int] = {}
+        self._started = perf_counter()
+        self.reset()
+
+    def __bool__(self) -> bool:
+        return True
+
+    def reset(self) -> None:
+        """Zeroes every stage and counter and restarts the wall clock."""
+        self._stages = {stage: _StageStats(stage) for stage in STAGES}
+        self._counters = dict.fromkeys(COUNTERS, 0)
+        self._started = perf_counter()
+
+    def time(self, stage: str) -> _StageStats:
+        """Returns a context manager that adds the time spent in its `with` block to `stage`."""
+        stats = self._stages.get(stage)
+        if stats is None:
+            stats = self._stages[stage] = _StageStats(stage)
+        return stats
+
+    def record(self, stage: str, seconds: float) -> None:
+        """Adds one timing of `seconds` to `stage`."""
+        self.time(stage).add(seconds)
+
+    def count(self, counter: str, amount: int = 1) -> None:
+        """Adds `amount` to `counter`."""
+        self._counters[counter] = self._counters.get(counter, 0) + amount
+
+    def counter(self, counter: str) -> int:
+        return self._counters.get(counter, 0)
+
+    def stage(self, stage: str) -> dict:
+        """Returns the summary of `stage` as it appears in `to_dict`."""
+        return self.time(stage).to_dict()
+
+    def to_dict(self) -> dict:
+        """Returns the wall time, every stage's summary, and every counter as a JSON-serializable `dict`."""
+        return {
+            "wall_seconds": round(perf_counter() - self._started, 6),
+            "stages": {stage: stats.to_dict() for stage, stats in self._stages.items()},
+            "counters": dict(self._counters),
+        }
+
+    def dump(self, output_path: str) -> None:
+        """Writes `to_dict` as JSON to `output_path`."""
+        with open(output_path, 'w', encoding="UTF-8") as output_file:
+            json.dump(self.to_dict(), output_file, indent=2)
+            output_file.write("\n")
+
+
+class OrbNullStats:
+    """Stand-in for `OrbCrawlStats` that records nothing; it is what the crawler uses when instrumentation is off.
+
+    Every method is a no-op and `time` returns the same do-nothing context manager, so leaving the instrumentation
+    calls in the crawl loop costs no more than a method call each. It is falsy, see `OrbCrawlStats`.
+
+    """
+    def __bool__(self) -> bool:
+        return False
+
+    def reset(self) -> None:
+        pass
+
+    def time(self, stage: str) -> _NullTimer:
+        return _NULL_TIMER
+
+    def record(self, stage: str, seconds: float) -> None:
+        pass
+
+    def count(self, counter: str, amount: int = 1) -> None:
+        pass
+
+    def counter(self, counter: str) -> int:
+        return 0
+
+    def to_dict(self) -> dict:
+        return {}
+
+
+class _StageStats:
+    """Timing totals of one stage; also the context manager `OrbCrawlStats.time` returns for it.
+
+    Stages are not re-entrant: timing a stage inside a `with` block of the same stage overwrites its start time.
+
+    """
+    __slots__ = ("name", "count", "total", "max", "histogram", "_start")
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.histogram = [0] * HISTOGRAM_BUCKETS
+        self._start = 0.0
+
+    def __enter__(self) -> _StageStats:
+        self._start = perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.add(perf_counter() - self._start)
+
+    def add(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        bucket = int(seconds * 1_000_000).bit_length()  # bucket b holds durations in [2^(b-1), 2^b) microseconds
+        self.histogram[min(bucket, HISTOGRAM_BUCKETS - 1)] += 1
+
+    def to_dict(self) -> dict:
+        histogram = {}
+        for bucket, hits in enumerate(self.histogram):
+            if hits:
+                histogram["<{}us".format(1 << bucket) if bucket < HISTOGRAM_BUCKETS - 1 else "more"] = hits
+        return {
+            "count": self.count,
+            "total_ms": round(self.total * 1000, 3),
+            "mean_ms": round(self.total * 1000 / self.count, 3) if self.count else 0.0,
+            "max_ms": round(self.max * 1000, 3),
+            "histogram": histogram,
+        }
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self) -> _NullTimer:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        pass
+
+
+_NULL_TIMER = _NullTimer()
+NULL_STATS = OrbNullStats()
@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+"""Streaming extraction of very large pages (e.g., books exported as one HTML file): `OrbStreamAgent` feeds the
+page to an incremental parser in fixed-size chunks instead of reading it whole and building its tree, so the
+memory a page takes is bounded by the chunk size plus the text of the matching elements still open (and the
+content extracted so far, which makes up the page's document in the end).
+
+`OrbStreamParser` extracts what `OrbAgent` finds with BeautifulSoup: the text of every element matching the
+configured `tags` (recorded when its end tag is seen) and the 'href' of every 'a' tag (recorded when its start tag
+is seen), reproducing how BeautifulSoup's "html.parser" tree builder nests elements and what `.text` includes. The
+agent yields each link as soon as the chunk it is in has been parsed, so `run_sequential_crawl` pushes links to
+the frontier while the rest of the page is still being read (and an `OrbHostScheduler` starts fetching them).
+
+Pages are streamed by setting "stream_bytes" in the agent config: `agent_class` picks `OrbStreamAgent` for local
+pages of at least that many bytes (every page if it is 0), which read "stream_chunk_size" characters at a time
+(`CHUNK_SIZE` by default).
+
+Example:
+    $ python3 -m spider.orb.orb_stream ../corpora/book.html --tags p h2 --links
+"""
+
+from __future__ import annotations
+import io
+import os
+import sys
+import argparse
+from collections import Counter, deque
+from html.entities import html5
+from html.parser import HTMLParser
+from typing import Iterator
+from spider.orb.orb_models import OrbLazyAgent
+
+__author__ = "Garrett Buchanan", "Livingstone Rwagatare"
+__copyright__ = "Copyright 2023, Westmont College"
+__credits__ = ["Garrett Buchanan", "Livingstone Rwagatare", "Mike Ryu"]
+__license__ = "MIT"
+__email__ = "mryu@westmont.edu"
+
+CHUNK_SIZE = 64 * 1024  # Characters read and parsed at a time.
+VOID_ELEMENTS = frozenset(("area", "base", "br", "col", "embed", "hr", "img", "input", "keygen", "link", "menuitem",
+                           "meta", "param", "source", "track", "wbr", "basefont", "bgsound", "command", "frame",
+                           "image", "isindex", "nextid", "spacer"))  # Never have content, as in BeautifulSoup.
+STRING_CONTAINERS = frozenset(("script", "style", "template"))  # Text in these is not part of `.text`.
+PRESERVE_WHITESPACE = frozenset(("pre", "textarea"))  # Whitespace between tags in these is kept as it is.
+ASCII_SPACES = "\x20\x0a\x09\x0c\x0d"
+CDATA = "<![CDATA["  # Kind of the strings in CDATA sections.
+ENTITIES = {name[:-1]: text for name, text in html5.items() if name.endswith(";")}  # Text of entities, by name.
+MULTI_VALUED_ATTRIBUTES = frozenset(("class", "rel", "rev", "accept-charset", "headers", "accesskey", "dropzone"))
+
+
+def main() -> None:
+    pars = argparse.ArgumentParser(prog="python3 -m spider.orb.orb_stream")
+    pars.add_argument("page_path", type=str, help="required path to an HTML page")
+    pars.add_argument("--tags", type=str, nargs='+', default=["p"], help="tags to extract the content of")
+    pars.add_argument("--links", action="store_true", help="switch to list the links on the page as well")
+    pars.add_argument("--encoding", type=str, default="UTF-8", help="encoding of the page")
+    args = pars.parse_args()
+
+    parser = OrbStreamParser({tag: {} for tag in args.tags}, args.links)
+    try:
+        with open(args.page_path, 'r', encoding=args.encoding) as page_file:
+            for chunk in iter(lambda: page_file.read(CHUNK_SIZE), ""):
+                parser.feed(chunk)
+                while parser.links:
+                    print(parser.links.popleft())
+    except OSError as e:
+        print("An error occurred while trying to open files:\n  ", e, file=sys.stderr)
+        exit(1)
+    parser.close()
+    for link in parser.links:
+        print(link)
+    print(parser.content())
+
+
+class OrbStreamParser(HTMLParser):
+    """Incremental HTML parser extracting the content of the elements matching `tags` (in the format of `tags` in
+    the agent config, i.e., tag names mapped to attribute filters) and the links on a page, fed in any chunks.
+
+    Elements nest like BeautifulSoup nests them with "html.parser": void elements close as they start (unless they
+    are self-closing), an end tag closes the last element open with its name along with every element opened after
+    it, and an end tag with no element open by its name is ignored. The text of an element is what its `.text` would
+    be: the strings in it, except comments and the strings in `STRING_CONTAINERS` (only the strings directly in a
+    container, for a container itself), with entities decoded and whitespace between tags collapsed as BeautifulSoup
+    does.
+
+    Attributes:
+        _tags (dict[str, dict]): attribute filters of the tags to extract the content of, by tag name.
+        _matches (dict[str, list[str | None]]): stripped text of every matching element by tag name, in the order
+            they started (`None` for elements still open).
+        _stack (list[tuple[str, list[str] | None, int]]): open elements: their name, and the text in them so far
+            and their position in `_matches` if they match.
+        _open (list[tuple[str, list[str]]]): name and text so far of the matching elements open, innermost last.
+        _containers (list[str]): names of the `STRING_CONTAINERS` elements open, innermost last.
+        _preserve (int): number of `PRESERVE_WHITESPACE` elements open.
+        _text (list[str]): text since the last tag, not added to the open elements yet.
+        _closed_voids (Counter[str]): number of void elements closed as they started by name, as many of whose end
+            tags (or end tags of self-closing tags with the same name) close nothing.
+        _collect_links (bool): whether to collect links.
+        links (deque[str]): 'href' of every 'a' tag found and not taken yet, in order.
+
+    """
+    def __init__(self, tags: dict, collect_links: bool = True) -> None:
+        super().__init__(convert_charrefs=False)  # references are decoded as BeautifulSoup decodes them
+        self._tags = tags
+        self._matches: dict[str, list[str | None]] = {tag: [] for tag in tags}
+        self._stack: list[tuple[str, list[str] | None, int]] = []
+        self._open: list[tuple[str, list[str]]] = []
+        self._containers: list[str] = []
+        self._preserve = 0
+        self._text: list[str] = []
+        self._closed_voids: Counter[str] = Counter()
+        self._collect_links = collect_links
+        self.links: deque[str] = deque()
+
+    def content(self) -> str:
+        """Returns the content of the elements closed so far, as `OrbAgent` would: the text of every match of every
+        tag, in the order of `tags`, stripped and separated by spaces."""
+        return "".join((text or "") + " " for tag in self._tags for text in self._matches[tag]).strip()
+
+    def close(self) -> None:
+        """Parses what is left of the page and closes every element still open, as the end of the page does."""
+        super().close()
+        self._flush()
+        while self._stack:
+            self._pop()
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]], close_void: bool = True) -> None:
+        self._flush()
+        attributes = {name: "" if value is None else value for name, value in attrs}
+        if tag == 'a' and self._collect_links and "href" in attributes:
+            self.links.append(attributes["href"])
+        if close_void and tag in VOID_ELEMENTS:
+            if tag in self._tags and _matches(attributes, self._tags[tag]):
+                self._matches[tag].append("")
+            self._closed_voids[tag] += 1
+            return
+        parts = None
+        slot = -1
+        if tag in self._tags and _matches(attributes, self._tags[tag]):
+            slot = len(self._matches[tag])
+            self._matches[tag].append(None)
+            parts = []
+            self._open.append((tag, parts))
+        if tag in STRING_CONTAINERS:
+            self._containers.append(tag)
+        if tag in PRESERVE_WHITESPACE:
+            self._preserve += 1
+        self._stack.append((tag, parts, slot))
+
+    def handle_startendtag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        self.handle_starttag(tag, attrs, False)
+        self.handle_endtag(tag)
+
+    def handle_endtag(self, tag: str) -> None:
+        if self._closed_voids[tag]:  # e.g., '</br>' after '<br>'; the text around it is one string
+            self._closed_voids[tag] -= 1
+            return
+        self._flush()
+        for position in range(len(self._stack) - 1, -1, -1):
+            if self._stack[position][0] == tag:
+                while len(self._stack) > position:
+                    self._pop()
+                return
+
+    def handle_data(self, data: str) -> None:
+        self._text.append(data)
+
+    def handle_charref(self, name: str) -> None:
+        code = int(name.lstrip("xX"), 16) if name[:1] in "xX" else int(name)
+        text = None
+        if code < 256:  # references to Windows-1252 code points are common
+            try:
+                text = bytes((code,)).decode("windows-1252")
+            except UnicodeDecodeError:
+                pass
+        if not text:
+            try:
+                text = chr(code)
+            except (ValueError, OverflowError):
+                pass
+        self._text.append(text or "\N{REPLACEMENT CHARACTER}")
+
+    def handle_entityref(self, name: str) -> None:
+        self._text.append(ENTITIES.get(name, "&" + name))
+
+    def handle_comment(self, data: str) -> None:
+        self._flush()
+
+    def handle_decl(self, decl: str) -> None:
+        self._flush()
+
+    def handle_pi(self, data: str) -> None:
+        self._flush()
+
+    def unknown_decl(self, data: str) -> None:
+        self._flush()
+        if data.upper().startswith("CDATA["):  # CDATA sections are part of the text, even in string containers
+            self._text.append(data[len("CDATA["):])
+            self._flush(CDATA)
+
+    def _flush(self, kind: str | None = None) -> None:
+        """Adds the text since the last tag to the matching elements open that include it in their text, as a
+        string of `kind`: `CDATA`, or else the innermost string container open (`None` if there is none)."""
+        if not self._text:
+            return
+        text = "".join(self._text)
+        self._text.clear()
+        if not self._open:
+            return
+        if not self._preserve and not text.strip(ASCII_SPACES):
+            text = "\n" if "\n" in text else " "
+        if kind is None and self._containers:
+            kind = self._containers[-1]
+        for tag, parts in self._open:
+            if kind == tag if tag in STRING_CONTAINERS else kind is None or kind is CDATA:
+                parts.append(text)
+
+    def _pop(self) -> None:
+        tag, parts, slot = self._stack.pop()
+        if tag in STRING_CONTAINERS:
+            self._containers.pop()
+        if tag in PRESERVE_WHITESPACE:
+            self._preserve -= 1
+        if parts is not None:
+            self._open.pop()
+            self._matches[tag][slot] = "".join(parts).strip()
+
+
+class OrbStreamAgent(OrbLazyAgent):
+    """`OrbLazyAgent` that parses its page incrementally with an `OrbStreamParser`, one chunk at a time, as its
+    processors need: the link processor reads only as far as the next link, and the content processor
+    reads the rest of the page. A streamed page is never held whole, so `page` stays `None`, and the runner refuses
+    to write WARC files of a streamed crawl.
+
+    Attributes:
+        _parser (OrbStreamParser | None): parser of the page, or `None` if it could not be opened.
+        _file (TextIO | None): the page, until it has been read to the end.
+
+    """
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._parser: OrbStreamParser | None = None
+        self._file = None
+
+    def content(self) -> str:
+        self._load()
+        if self._extracted is not None:
+            return self._extracted[0]
+        if self._parser is None:
+            return ""
+        while self._feed():
+            pass
+        with self._stats.time("content"):
+            return self._parser.content()
+
+    def iter_links(self) -> Iterator[str]:
+        self._load()
+        if self._extracted is not None:
+            yield from self._extracted[1]
+            return
+        if self._parser is None or not self._config.get("extract_links", True):
+            return
+        links = self._parser.links
+        while True:
+            while links:
+                link = links.popleft()
+                if '#' not in link:  # links with a '#' are skipped, as `OrbAgent` skips them
+                    yield self._resolve_link(link, self._base_uri)
+            if not self._feed():
+                return
+
+    def _load(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        stats = self._stats
+        with stats.time("open"):
+            openfile = self._open_uri_as_file()
+        if not openfile:
+            return
+        extracted = openfile.cached_extraction(self._config) if hasattr(openfile, "cached_extraction") else None
+        if extracted is not None:  # an unchanged page from the HTTP cache
+            self._extracted = extracted
+            self._page = openfile.getvalue()
+            openfile.close()
+            if stats:
+                stats.count("pages")
+                stats.count("bytes", self._bytes_read)
+                stats.count("cached_extractions")
+            return
+        if self._bytes_read is None:
+            try:
+                self._bytes_read = os.fstat(openfile.fileno()).st_size
+            except (OSError, io.UnsupportedOperation):
+                pass
+        self._base_uri = getattr(openfile, "uri", None)
+        self._parser = OrbStreamParser(self._config["tags"], self._config.get("extract_links", True))
+        self._file = openfile
+        if stats:
+            stats.count("pages")
+
+    def _feed(self) -> bool:
+        """Parses the next chunk of the page (or, at its end, what the parser holds back); returns `False` if the
+        whole page was parsed already."""
+        if self._file is None:
+            return False
+        stats = self._stats
+        with stats.time("read"):
+            chunk = self._file.read(self._config.get("stream_chunk_size", CHUNK_SIZE))
+        with stats.time("parse"):
+            if chunk:
+                self._parser.feed(chunk)
+            else:
+                self._parser.close()
+        if not chunk:
+            self._file.close()
+            self._file = None
+        elif stats:
+            stats.count("bytes", len(chunk.encode(self._config["encoding"], "replace")))
+        return True
+
+
+def _matches(attributes: dict[str, str], filters: dict) -> bool:
+    """Returns whether an element with `attributes` passes the attribute `filters` of a tag, as in `find_all`."""
+    for name, wanted in filters.items():
+        value = attributes.get(name)
+        if not _value_matches(name, value, wanted):
+            return False
+    return True
+
+
+def _value_matches(name: str, value: str | None, wanted) -> bool:
+    if wanted is True:
+        return value is not None
+    if wanted is None or wanted is False:
+        return value is None
+    if isinstance(wanted, (list, tuple, set)):
+        return any(_value_matches(name, value, item) for item in wanted)
+    if value is None:
+        return wanted == ""
+    wanted = str(wanted)
+    return value == wanted or name in MULTI_VALUED_ATTRIBUTES and wanted in value.split()
+
+
+if __name__ == '__main__':
+    main()
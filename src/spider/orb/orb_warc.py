@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""Provides `OrbWarcWriter` and `OrbWarcReader` for keeping the raw pages of a crawl, along with the content
+extracted from them, in WARC files, so that batch jobs downstream can stream the crawled corpus sequentially
+instead of reading every page again.
+
+A crawl writes one WARC file per worker (one for a sequential crawl, one per node of a distributed crawl) into
+its output directory, `pages-<worker>.warc.gz`, next to an offset index, `pages-<worker>.idx`:
+
+* `pages-<worker>.warc.gz`: a "warcinfo" record, then, for every page in the order it was crawled, a "resource"
+  record holding the page (the text the agent read, encoded with the configured encoding) and, if the page
+  yielded a document, a "conversion" record holding the document's content as UTF-8 text that refers to it.
+  Every record is compressed as a gzip member of its own, as is usual for `.warc.gz` files, so the file can be
+  read with any WARC tool, crawled with `spider.orb.orb_archive` (its pages are the "resource" records), or
+  decompressed in one stream.
+* `pages-<worker>.idx`: for every page, one line of its offset in the WARC file, the compressed length of its
+  records, and its URI as a JSON string, separated by tabs.
+
+Example:
+    $ python3 -m spider.orb.orb_warc ../out/warc/pages-000.warc.gz
+"""
+
+from __future__ import annotations
+import io
+import os
+import sys
+import gzip
+import json
+import uuid
+import argparse
+from datetime import datetime, timezone
+from typing import Iterator, NamedTuple
+
+__author__ = "Garrett Buchanan", "Livingstone Rwagatare"
+__copyright__ = "Copyright 2023, Westmont College"
+__credits__ = ["Garrett Buchanan", "Livingstone Rwagatare", "Mike Ryu"]
+__license__ = "MIT"
+__email__ = "mryu@westmont.edu"
+
+WARC_VERSION = "WARC/1.1"
+DEFAULT_BATCH_SIZE = 4 * 1024 * 1024  # Compressed bytes of records buffered before they are written out.
+DEFAULT_LEVEL = 6  # gzip compression level.
+WARC_NAME, INDEX_NAME = "pages-{:03d}.warc.gz", "pages-{:03d}.idx"
+
+
+def main() -> None:
+    pars = argparse.ArgumentParser(prog="python3 -m spider.orb.orb_warc")
+    pars.add_argument("warc_path", type=str, help="required path to a WARC file written by `OrbWarcWriter`")
+    pars.add_argument("uris", type=str, nargs='*', help="URIs of pages to print the content of (all are listed "
+                                                        "otherwise)")
+    args = pars.parse_args()
+
+    try:
+        reader = OrbWarcReader(args.warc_path)
+        if not args.uris:
+            for page in reader:
+                print("{} ({:d} bytes, {})".format(page.uri, len(page.page),
+                                                   "no document" if page.content is None else
+                                                   "{:d} characters of content".format(len(page.content))))
+        for uri in args.uris:
+            page = reader.get(uri)
+            print("{}\n{}".format(uri, "(none)" if page is None else page.content))
+    except (OSError, ValueError, EOFError) as e:
+        print("An error occurred while trying to open files:\n  ", e, file=sys.stderr)
+        exit(1)
+
+
+class OrbWarcPage(NamedTuple):
+    """Page read back from a WARC file written by `OrbWarcWriter`.
+
+    Attributes:
+        uri (str): URI the page was crawled from.
+        page (bytes): the page, as the agent read it.
+        content (str | None): content of the document extracted from the page, or `None` if it yielded none.
+
+    """
+    uri: str
+    page: bytes
+    content: str | None
+
+
+class OrbWarcWriter:
+    """Appends crawled pages to the WARC file of one worker, with an offset index, in large batches.
+
+    Records are compressed as they are added into an in-memory batch, which is appended to the WARC file once it
+    reaches `batch_size` bytes (`DEFAULT_BATCH_SIZE` if it is `None`), and likewise for the index lines; `finish`
+    writes out the last batch. Files are only ever appended to, so a crawl that stops early leaves every page of the
+    batches written out readable.
+
+    Attributes:
+        _warc_path (str): path of the WARC file.
+        _encoding (str): encoding pages are written in (as they were read from disk).
+        _batch_size (int): compressed bytes buffered before they are written out.
+        _level (int): gzip compression level.
+        _batch (bytearray): compressed records not written out yet.
+        _index (list[str]): index lines of the pages in `_batch`.
+        _warc_file (BufferedWriter): the WARC file.
+        _index_file (TextIOWrapper): the offset index.
+        _offset (int): offset in the WARC file the batch will be written at.
+        _count (int): number of pages added.
+
+    """
+    def __init__(self, out_dir: str, worker: int = 0, encoding: str = "UTF-8", batch_size: int = None,
+                 level: int = DEFAULT_LEVEL) -> None:
+        if batch_size is None:
+            batch_size = DEFAULT_BATCH_SIZE
+        if batch_size < 1:
+            raise ValueError("Batch size must be a positive number of bytes.")
+        os.makedirs(out_dir, exist_ok=True)
+        self._warc_path = os.path.join(out_dir, WARC_NAME.format(worker))
+        self._encoding = encoding
+        self._batch_size = batch_size
+        self._level = level
+        self._batch = bytearray()
+        self._index: list[str] = []
+        self._warc_file = open(self._warc_path, 'wb')
+        self._index_file = open(os.path.join(out_dir, INDEX_NAME.format(worker)), 'w', encoding="UTF-8")
+        self._offset = 0
+        self._count = 0
+        info = "software: local-crawl orb\r\nformat: WARC File Format 1.1\r\nworker: {:d}\r\n".format(worker)
+        self._batch += self._record("warcinfo", {"Content-Type": "application/warc-fields",
+                                                 "WARC-Filename": os.path.basename(self._warc_path)},
+                                    info.encode("UTF-8"))
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def path(self) -> str:
+        return self._warc_path
+
+    def add(self, uri: str, page: str, content: str | None = None) -> int:
+        """Stores `page`, the text of the page crawled from `uri`, and the `content` of the document extracted
+        from it, if any; returns the offset of its records in the WARC file."""
+        offset = self._offset + len(self._batch)
+        record_id = _record_id()
+        self._batch += self._record("resource", {
+            "WARC-Record-ID": record_id,
+            "WARC-Target-URI": uri,
+            "Content-Type": "text/html; charset={}".format(self._encoding),
+        }, page.encode(self._encoding, "replace"))
+        if content is not None:
+            self._batch += self._record("conversion", {
+                "WARC-Target-URI": uri,
+                "WARC-Refers-To": record_id,
+                "Content-Type": "text/plain; charset=UTF-8",
+            }, content.encode("UTF-8"))
+        length = self._offset + len(self._batch) - offset
+        self._index.append("{:d}\t{:d}\t{}\n".format(offset, length, json.dumps(uri)))
+        self._count += 1
+        if len(self._batch) >= self._batch_size:
+            self._flush()
+        return offset
+
+    def finish(self) -> str:
+        """Writes out the last batch and closes the files; returns the path of the WARC file."""
+        self._flush()
+        self._warc_file.close()
+        self._index_file.close()
+        return self._warc_path
+
+    def _flush(self) -> None:
+        self._warc_file.write(self._batch)
+        self._index_file.writelines(self._index)
+        self._offset += len(self._batch)
+        self._batch = bytearray()
+        self._index = []
+
+    def _record(self, kind: str, headers: dict, block: bytes) -> bytes:
+        fields = {
+            "WARC-Type": kind,
+            "WARC-Record-ID": headers.pop("WARC-Record-ID", None) or _record_id(),
+            "WARC-Date": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        }
+        fields.update(headers)
+        fields["Content-Length"] = str(len(block))
+        head = WARC_VERSION + "\r\n" + "".join("{}: {}\r\n".format(name, value) for name, value in fields.items())
+        return gzip.compress(head.encode("UTF-8") + b"\r\n" + block + b"\r\n\r\n", self._level, mtime=0)
+
+
+class OrbWarcReader:
+    """Reads a WARC file written by `OrbWarcWriter`: sequentially, page by page (`__iter__`), or one page at a time
+    by URI through its offset index (`get`).
+
+    Attributes:
+        _warc_path (str): path of the WARC file.
+        _offsets (dict[str, tuple[int, int]] | None): offset and length of every page by URI, read on first `get`.
+
+    """
+    def __init__(self, warc_path: str) -> None:
+        if not os.path.isfile(warc_path):
+            raise OSError("No such WARC file: {}".format(warc_path))
+        self._warc_path = warc_path
+        self._offsets: dict[str, tuple[int, int]] | None = None
+
+    def __iter__(self) -> Iterator[OrbWarcPage]:
+        with gzip.open(self._warc_path, 'rb') as stream:
+            yield from _pages(_records(stream))
+
+    def get(self, uri: str) -> OrbWarcPage | None:
+        """Returns the page crawled from `uri`, or `None` if there is none."""
+        if self._offsets is None:
+            self._offsets = {}
+            index_path = self._warc_path[:-len(".warc.gz")] + ".idx"
+            with open(index_path, 'r', encoding="UTF-8") as index_file:
+                for line in index_file:
+                    offset, length, indexed_uri = line.rstrip("\n").split("\t", 2)
+                    self._offsets.setdefault(json.loads(indexed_uri), (int(offset), int(length)))
+        if uri not in self._offsets:
+            return None
+        offset, length = self._offsets[uri]
+        with open(self._warc_path, 'rb') as warc_file:
+            warc_file.seek(offset)
+            data = warc_file.read(length)
+        return next(_pages(_records(gzip.GzipFile(fileobj=io.BytesIO(data)))), None)
+
+
+def read_warc_record(stream) -> tuple[dict[str, str], bytes] | None:
+    """Reads the next record from the (decompressed) `stream`; returns its headers, with lowercased names, and its
+    block, or `None` at the end of the stream. Blank lines before the record, which separate records, are skipped."""
+    version = stream.readline()
+    while version in (b"\r\n", b"\n"):
+        version = stream.readline()
+    if not version:
+        return None
+    if not version.startswith(b"WARC/"):
+        raise ValueError("Not a WARC record: {!r}".format(version[:40]))
+    headers = {}
+    for line in iter(stream.readline, b""):
+        if line in (b"\r\n", b"\n"):
+            break
+        name, _, value = line.decode("UTF-8", "replace").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get("content-length", 0))
+    block = stream.read(length)
+    if len(block) < length:
+        raise EOFError("Truncated WARC record")
+    return headers, block
+
+
+def _records(stream) -> Iterator[tuple[dict[str, str], bytes]]:
+    """Yields the headers and the block of every record read from the decompressed `stream`."""
+    return iter(lambda: read_warc_record(stream), None)
+
+
+def _pages(records: Iterator[tuple[dict[str, str], bytes]]) -> Iterator[OrbWarcPage]:
+    """Pairs every "resource" record with the "conversion" record referring to it, if it is the next record."""
+    page = None
+    for headers, block in records:
+        kind = headers.get("warc-type")
+        if kind == "conversion" and page is not None and headers.get("warc-refers-to") == page[0]:
+            yield OrbWarcPage(page[1], page[2], block.decode("UTF-8"))
+            page = None
+            continue
+        if page is not None:
+            yield OrbWarcPage(page[1], page[2], None)
+            page = None
+        if kind == "resource":
+            page = (headers.get("warc-record-id"), headers.get("warc-target-uri", ""), block)
+    if page is not None:
+        yield OrbWarcPage(page[1], page[2], None)
+
+
+def _record_id() -> str:
+    return "<urn:uuid:{}>".format(uuid.uuid4())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+"""Unit tests for classes in `text_processing.freq_binary` (and the front coding in `text_processing.freq_codec`).
+"""
+
+import io
+import os
+import tempfile
+import unittest
+
+from text_processing.freq_models import TwoGram, Frequency, FrequencyTable
+from text_processing.freq_utils import tokenize_file, print_frequencies
+from text_processing.freq_counter import compute_word_freq, compute_twogram_freq
+from text_processing.freq_codec import encode_front_coded, FrontCodedReader
+from text_processing.freq_binary import write_frequency_file, FrequencyFile
+
+__author__ = "Garrett Buchanan, Livingstone Rwagatare"
+__copyright__ = "Copyright 2023, Westmont College"
+__credits__ = ["Garrett Buchanan", "Livingstone Rwagatare",
+               "Donald J. Patterson", "Mike Ryu", ]
+__license__ = "MIT"
+__email__ = "mryu@westmont.edu"
+
+
+class FrontCodingTest(unittest.TestCase):
+    def setUp(self):
+        self.keys = sorted({"{}{}".format(prefix, i).encode("UTF-8")
+                            for prefix in ("", "a", "ab", "abc", "ΣΟΦΟΣ") for i in range(30)})
+        self.buffer = bytearray(b"pad")
+        offsets = encode_front_coded(((key, i) for i, key in enumerate(self.keys)), 4, self.buffer)
+        self.reader = FrontCodedReader(self.buffer, offsets, len(self.keys), 4)
+
+    def test_lookup(self):
+        self.assertEqual(len(self.keys), len(self.reader))
+        for i, key in enumerate(self.keys):
+            self.assertEqual(i, self.reader.get(key))
+        self.assertIsNone(self.reader.get(b"a"))
+        self.assertIsNone(self.reader.get(b"zzz"))
+        self.assertEqual(-1, self.reader.get(b"", -1))
+
+    def test_items(self):
+        self.assertEqual([(key, i) for i, key in enumerate(self.keys)], list(self.reader.items()))
+        start = self.keys.index(b"ab0")
+        self.assertEqual(self.keys[start:start + 3], [key for key, _ in self.reader.items(b"ab")][:3])
+
+
+class FrequencyFileTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "freqs.bin")
+        cwd = os.path.dirname(__file__)
+        with open(os.path.relpath("./data/twogram_06.in.txt", cwd), 'r', encoding="UTF-8") as fo:
+            self.tokens = tokenize_file(fo)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    @staticmethod
+    def _print(freqs):
+        out = io.StringIO()
+        print_frequencies(freqs, out)
+        return out.getvalue()
+
+    def test_words_round_trip(self):
+        expected = compute_word_freq(self.tokens)
+        write_frequency_file(expected, self.path, block_size=4)
+        with FrequencyFile(self.path) as freqs:
+            self.assertFalse(freqs.pairs)
+            self.assertEqual(expected.total, freqs.total)
+            self.assertEqual(len(expected), len(freqs))
+            self.assertEqual(self._print(expected), freqs.render())
+            self.assertEqual(list(expected), list(freqs))
+            for freq in expected:
+                self.assertEqual(freq.freq, freqs.get(freq.token))
+            self.assertEqual(0, freqs.get("not a token"))
+            self.assertNotIn("not a token", freqs)
+
+    def test_twograms_round_trip(self):
+        expected = compute_twogram_freq(self.tokens)
+        write_frequency_file(expected, self.path)
+        with FrequencyFile(self.path) as freqs:
+            self.assertTrue(freqs.pairs)
+            self.assertEqual(self._print(expected), freqs.render())
+            first = expected[0]
+            self.assertEqual(first.freq, freqs.get(first.token))
+            self.assertEqual(first.freq, freqs.get((first.token.object1, first.token.object2)))
+            self.assertIn(first.token, freqs)
+            self.assertEqual(first.token, next(iter(freqs)).token)
+
+    def test_spilled_frequencies(self):
+        with compute_twogram_freq(self.tokens, budget=64, temp_dir=self.tmp_dir.name) as spilled:
+            write_frequency_file(spilled, self.path)
+            with FrequencyFile(self.path) as freqs:
+                self.assertEqual(self._print(spilled), freqs.render())
+
+    def test_items_in_token_order(self):
+        write_frequency_file(FrequencyTable(["b", "a", "ab", "c"], [3, 2, 2, 1]), self.path, block_size=2)
+        with FrequencyFile(self.path) as freqs:
+            self.assertEqual([("a", 2), ("ab", 2), ("b", 3), ("c", 1)], list(freqs.items()))
+            self.assertEqual([("ab", 2), ("b", 3), ("c", 1)], list(freqs.items("aa")))
+            self.assertEqual([], list(freqs.items("d")))
+
+    def test_frequency_list(self):
+        write_frequency_file([Frequency(TwoGram("a", "b"), 2), Frequency(TwoGram("b", "a"), 1)], self.path)
+        with FrequencyFile(self.path) as freqs:
+            self.assertEqual(3, freqs.total)
+            self.assertEqual(2, freqs.get(TwoGram("a", "b")))
+
+    def test_partial_flag(self):
+        write_frequency_file(compute_word_freq(self.tokens), self.path)
+        with FrequencyFile(self.path) as freqs:
+            self.assertFalse(freqs.partial)
+        write_frequency_file(compute_word_freq(self.tokens), self.path, partial=True)
+        with FrequencyFile(self.path) as freqs:
+            self.assertTrue(freqs.partial)
+            self.assertFalse(freqs.pairs)
+
+    def test_empty(self):
+        write_frequency_file(FrequencyTable([], []), self.path)
+        with FrequencyFile(self.path) as freqs:
+            self.assertEqual(0, len(freqs))
+            self.assertEqual(self._print([]), freqs.render())
+            self.assertEqual(0, freqs.get("a"))
+
+    def test_not_a_frequency_file(self):
+        with open(self.path, 'w', encoding="UTF-8") as text_file:
+            print_frequencies(compute_word_freq(self.tokens), text_file)
+        with self.assertRaises(ValueError):
+            FrequencyFile(self.path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+"""Unit tests for classes in `text_processing.freq_index` (and the varint helpers in `text_processing.freq_codec`).
+"""
+
+import os
+import random
+import tempfile
+import unittest
+
+from spider.orb.orb_models import OrbDoc
+from text_processing.freq_models import Posting
+from text_processing.freq_codec import encode_varints, encode_deltas, decode_varints, decode_deltas
+from text_processing.freq_index import IndexBuilder, InvertedIndex
+from text_processing.freq_stopwords import StopwordFilter
+
+__author__ = "Garrett Buchanan, Livingstone Rwagatare"
+__copyright__ = "Copyright 2023, Westmont College"
+__credits__ = ["Garrett Buchanan", "Livingstone Rwagatare",
+               "Donald J. Patterson", "Mike Ryu", ]
+__license__ = "MIT"
+__email__ = "mryu@westmont.edu"
+
+
+class VarintTest(unittest.TestCase):
+    def test_round_trip(self):
+        values = [0, 1, 127, 128, 300, 16383, 16384, 2 ** 40]
+        buffer = bytearray()
+        encode_varints(values, buffer)
+        self.assertEqual(1 + 1 + 1 + 2 + 2 + 2 + 3 + 6, len(buffer))
+        self.assertEqual((values, len(buffer)), decode_varints(buffer, 0, len(values)))
+
+    def test_deltas(self):
+        values = [3, 5, 5, 1000, 1001]
+        buffer = bytearray(b"\x07")
+        self.assertEqual(1001, encode_deltas(values, buffer, previous=2))
+        self.assertEqual((values, len(buffer)), decode_deltas(buffer, 1, len(values), previous=2))
+
+
+class IndexBuilderTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        rng = random.Random(7)
+        words = ["alpha", "beta", "gamma", "delta", "don't", "the", "a", "ΣΟΦΟΣ", "x1"]
+        self.contents = [" ".join(rng.choices(words, k=rng.randint(0, 40))).title() for _ in range(60)]
+        self.contents.append("Gamma gamma, GAMMA! the end.")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _build(self, name, stopwords=None, segment_budget=1 << 20):
+        builder = IndexBuilder(os.path.join(self.tmp_dir.name, name), stopwords, segment_budget)
+        for i, content in enumerate(self.contents):
+            self.assertEqual(i, builder.add(OrbDoc(content, "Doc {}".format(i)), "doc{}.htm".format(i)))
+        return builder.finish()
+
+    def _expected_postings(self, tokenize):
+        expected = {}
+        for doc_id, content in enumerate(self.contents):
+            for position, token in enumerate(tokenize(content)):
+                postings = expected.setdefault(token, {})
+                postings.setdefault(doc_id, []).append(position)
+        return {token: [Posting(doc_id, len(positions), positions) for doc_id, positions in postings.items()]
+                for token, postings in expected.items()}
+
+    def test_postings_and_stats(self):
+        with self._build("single") as index:
+            expected = self._expected_postings(index.tokenize)
+            self.assertEqual(len(expected), len(index))
+            self.assertEqual(len(self.contents), index.num_docs)
+            for token, postings in expected.items():
+                self.assertEqual(postings, index.postings(token))
+                self.assertEqual(len(postings), index.doc_freq(token))
+                self.assertEqual(sum(p.tf for p in postings), index.coll_freq(token))
+                self.assertEqual(max(p.tf for p in postings), index.max_tf(token))
+            self.assertEqual([Posting(60, 3)], index.postings("gamma", positions=False)[-1:])
+            self.assertEqual(5, index.doc_length(60))
+            self.assertEqual({"uri": "doc60.htm", "title": "Doc 60"}, index.document(60))
+            self.assertEqual(sum(len(index.tokenize(c)) for c in self.contents), index.total_tokens)
+            self.assertEqual([], index.postings("missing"))
+            self.assertEqual(0, index.doc_freq("missing"))
+
+    def test_segments_merge_to_same_index(self):
+        with self._build("single") as single, self._build("segmented", segment_budget=64) as segmented:
+            self.assertEqual(single.vocabulary.tokens, segmented.vocabulary.tokens)
+            for token in single.vocabulary.tokens:
+                self.assertEqual(single.postings(token), segmented.postings(token))
+        self.assertFalse(os.path.exists(os.path.join(self.tmp_dir.name, "segmented", "segments")))
+
+    def test_stopwords(self):
+        with self._build("stopwords", StopwordFilter({"the", "a"})) as index:
+            self.assertNotIn("the", index)
+            self.assertEqual(["gamma", "end"], index.tokenize("The gamma, a end"))
+            self.assertEqual([Posting(60, 3, [0, 1, 2])], index.postings("gamma")[-1:])
+            self.assertEqual(4, index.doc_length(60))
+        with InvertedIndex(os.path.join(self.tmp_dir.name, "stopwords")) as reopened:
+            self.assertEqual(frozenset({"the", "a"}), reopened.stopwords.words)
+
+    def test_empty(self):
+        builder = IndexBuilder(os.path.join(self.tmp_dir.name, "empty"))
+        builder.add(OrbDoc("...", None))
+        with builder.finish() as index:
+            self.assertEqual(0, len(index))
+            self.assertEqual(1, index.num_docs)
+            self.assertEqual(0.0, index.avg_doc_length)
+            self.assertEqual([], index.postings("alpha"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,7 +2,7 @@
 """
 
 import unittest
-from text_processing.freq_models import Pair, TwoGram, Frequency
+from text_processing.freq_models import Pair, TwoGram, Frequency, FrequencyTable, Vocabulary
 
 __author__ = "Boaty McBoatface, Planey McPlaneface"
 __copyright__ = "Copyright 2023, Westmont College"
@@ -274,5 +274,69 @@ class FrequencyTest(unittest.TestCase):
         self.assertTrue(t2 != t1)
 
 
+class FrequencyTableTest(unittest.TestCase):
+    def setUp(self):
+        self.tokens = ["the", "a", "is", "word"]
+        self.counts = [5, 3, 3, 1]
+        self.table = FrequencyTable(self.tokens, self.counts, 12)
+
+    def test_constructor(self):
+        with self.assertRaises(ValueError):
+            FrequencyTable(["one"], [1, 2])
+
+        self.assertEqual(4, len(self.table))
+        self.assertEqual(12, self.table.total)
+        self.assertEqual(0, len(FrequencyTable([], [])))
+
+    def test_getitem(self):
+        self.assertEqual(Frequency("the", 5), self.table[0])
+        self.assertEqual(Frequency("word", 1), self.table[-1])
+        with self.assertRaises(IndexError):
+            _ = self.table[4]
+
+    def test_slices_are_views(self):
+        view = self.table[1:3]
+        self.assertIsInstance(view, FrequencyTable)
+        self.assertEqual(["a", "is"], view.tokens())
+        self.assertEqual(6, view.total)
+        self.assertEqual(Frequency("is", 3), view[1])
+        self.assertEqual(["word", "is", "a", "the"], self.table[::-1].tokens())
+
+    def test_top(self):
+        self.assertEqual(["the", "a"], self.table.top(2).tokens())
+        self.assertEqual(4, len(self.table.top(10)))
+        self.assertEqual(0, len(self.table.top(-1)))
+
+    def test_eq_against_lists(self):
+        expected = [Frequency(t, c) for t, c in zip(self.tokens, self.counts)]
+        self.assertEqual(expected, self.table)
+        self.assertEqual(self.table, expected)
+        self.assertEqual([], FrequencyTable([], []))
+        self.assertNotEqual(expected[:3], self.table)
+        self.assertEqual(FrequencyTable(list(self.tokens), list(self.counts)), self.table)
+
+    def test_lines_and_twograms(self):
+        table = FrequencyTable([TwoGram("you", "think"), TwoGram("how", "you")], [2, 1])
+        self.assertEqual(["     2 <you:think>\n", "     1 <how:you>\n"], list(table.lines()))
+        self.assertEqual(TwoGram("how", "you"), table[1].token)
+
+
+class VocabularyTest(unittest.TestCase):
+    def test_ids(self):
+        vocab = Vocabulary(["b", "a"])
+        self.assertEqual(2, len(vocab))
+        self.assertEqual([1, 0, 2, 0], vocab.ids(["a", "b", "c", "b"]))
+        self.assertEqual(["b", "a", "c"], vocab.tokens)
+        self.assertEqual("c", vocab.token(2))
+        self.assertIn("c", vocab)
+
+    def test_get_does_not_assign(self):
+        vocab = Vocabulary()
+        self.assertIsNone(vocab.get("missing"))
+        self.assertEqual(-1, vocab.get("missing", -1))
+        self.assertEqual(0, len(vocab))
+        self.assertEqual(0, vocab.id("missing"))
+
+
 if __name__ == '__main__':
     unittest.main()
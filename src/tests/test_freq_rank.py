@@ -0,0 +1,97 @@
+"""Unit tests for classes in `text_processing.freq_rank`.
+"""
+
+import math
+import random
+import tempfile
+import unittest
+
+from spider.orb.orb_models import OrbDoc
+from text_processing.freq_index import IndexBuilder
+from text_processing.freq_rank import QueryEngine, Hit, METHODS
+from text_processing.freq_stopwords import StopwordFilter
+
+__author__ = "Garrett Buchanan, Livingstone Rwagatare"
+__copyright__ = "Copyright 2023, Westmont College"
+__credits__ = ["Garrett Buchanan", "Livingstone Rwagatare",
+               "Donald J. Patterson", "Mike Ryu", ]
+__license__ = "MIT"
+__email__ = "mryu@westmont.edu"
+
+
+class QueryEngineTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp_dir = tempfile.TemporaryDirectory()
+        rng = random.Random(11)
+        words = ["w{}".format(i) for i in range(60)]
+        weights = [1 / (i + 1) for i in range(60)]
+        cls.contents = [" ".join(rng.choices(words, weights, k=rng.randint(1, 80))) for _ in range(400)]
+        cls.contents += ["The quick brown fox", "the brown quick fox", "A quick brown dog, quick brown!"]
+        builder = IndexBuilder(cls.tmp_dir.name, StopwordFilter({"the", "a"}), segment_budget=4096)
+        for content in cls.contents:
+            builder.add(OrbDoc(content, None))
+        cls.index = builder.finish()
+        cls.engine = QueryEngine(cls.index)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.index.close()
+        cls.tmp_dir.cleanup()
+
+    def _brute_force(self, query, k):
+        terms = self.index.tokenize(query)
+        n, avg_dl = len(self.contents), self.index.avg_doc_length
+        scores = {}
+        for doc_id, content in enumerate(self.contents):
+            tokens = self.index.tokenize(content)
+            norm = 1.2 * (1 - 0.75 + 0.75 * len(tokens) / avg_dl)
+            score = 0.0
+            for term in set(terms):
+                tf = tokens.count(term)
+                if tf:
+                    df = self.index.doc_freq(term)
+                    idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+                    score += terms.count(term) * idf * tf * 2.2 / (tf + norm)
+            if score:
+                scores[doc_id] = score
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:k]
+
+    def test_methods_agree_with_brute_force(self):
+        rng = random.Random(5)
+        for _ in range(60):
+            query = " ".join("w{}".format(int(rng.paretovariate(0.7)) % 70) for _ in range(rng.randint(1, 5)))
+            k = rng.choice([1, 3, 10, 1000])
+            expected = self._brute_force(query, k)
+            hits = {method: self.engine.search(query, k, method) for method in METHODS}
+            self.assertEqual([doc_id for doc_id, _ in expected], [hit.doc_id for hit in hits["taat"]], query)
+            for (_, score), hit in zip(expected, hits["taat"]):
+                self.assertAlmostEqual(score, hit.score)
+            for method in METHODS:
+                self.assertEqual(hits["taat"], hits[method], (method, query, k))
+
+    def test_phrase(self):
+        quick_brown = {400, 402}
+        self.assertEqual(quick_brown, self.engine.phrase_docs(["quick", "brown"]))
+        self.assertEqual({400}, self.engine.phrase_docs(["quick", "brown", "fox"]))
+        for method in METHODS:
+            hits = self.engine.search('fox "the quick brown"', 10, method)
+            self.assertEqual([400, 402], [hit.doc_id for hit in hits])  # "fox" only adds to the score
+            self.assertEqual(quick_brown, {hit.doc_id for hit in self.engine.search('"quick brown"', 10, method)})
+            self.assertEqual([], self.engine.search('"brown fox" "quick dog"', 10, method))
+
+    def test_parse(self):
+        query = self.engine.parse('The quick, quick "brown FOX" a')
+        self.assertEqual(["quick", "brown", "fox"], query.terms)
+        self.assertEqual([2, 1, 1], query.weights)
+        self.assertEqual([["brown", "fox"]], query.phrases)
+
+    def test_no_results(self):
+        self.assertEqual([], self.engine.search("missing the", 10))
+        self.assertEqual([], self.engine.search("w1", 0))
+        self.assertRaises(ValueError, self.engine.search, "w1", 10, "bogus")
+        self.assertIsInstance(self.engine.search("w1", 1)[0], Hit)
+
+
+if __name__ == '__main__':
+    unittest.main()
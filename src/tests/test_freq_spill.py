@@ -0,0 +1,71 @@
+"""Unit tests for classes in `text_processing.freq_spill`.
+"""
+
+import io
+import os
+import tempfile
+import unittest
+
+from text_processing.freq_models import TwoGram, Frequency, FrequencyTable
+from text_processing.freq_utils import tokenize_file, print_frequencies
+from text_processing.freq_counter import compute_word_freq, compute_twogram_freq
+from text_processing.freq_spill import ExternalFrequencyCounter, ExternalFrequencies
+
+__author__ = "Garrett Buchanan, Livingstone Rwagatare"
+__copyright__ = "Copyright 2023, Westmont College"
+__credits__ = ["Garrett Buchanan", "Livingstone Rwagatare",
+               "Donald J. Patterson", "Mike Ryu", ]
+__license__ = "MIT"
+__email__ = "mryu@westmont.edu"
+
+
+class ExternalFrequencyCounterTest(unittest.TestCase):
+    def setUp(self):
+        cwd = os.path.dirname(__file__)
+        with open(os.path.relpath("./data/twogram_06.in.txt", cwd), 'r', encoding="UTF-8") as fo:
+            self.tokens = tokenize_file(fo)
+
+    @staticmethod
+    def _print(freqs):
+        out = io.StringIO()
+        print_frequencies(freqs, out)
+        return out.getvalue()
+
+    def test_invalid_budget(self):
+        with self.assertRaises(ValueError):
+            ExternalFrequencyCounter(0)
+
+    def test_within_budget_stays_in_memory(self):
+        counter = ExternalFrequencyCounter(budget=10)
+        counter.update(["b", "a", "b"])
+        freqs = counter.finish()
+        self.assertIsInstance(freqs, FrequencyTable)
+        self.assertEqual(0, counter.spilled)
+        self.assertEqual([Frequency("b", 2), Frequency("a", 1)], freqs)
+
+    def test_words_match_in_memory(self):
+        counter = ExternalFrequencyCounter(budget=50)
+        for token in self.tokens:
+            counter.add(token)
+        self.assertTrue(counter.spilled > 1)
+
+        with counter.finish() as freqs:
+            self.assertIsInstance(freqs, ExternalFrequencies)
+            expected = compute_word_freq(self.tokens)
+            self.assertEqual(len(expected), len(freqs))
+            self.assertEqual(list(expected), list(freqs))
+            self.assertEqual(self._print(expected), self._print(freqs))
+
+    def test_twograms_match_in_memory(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for compress in (False, True):
+                freqs = compute_twogram_freq(self.tokens, budget=64, temp_dir=temp_dir, compress=compress)
+                self.assertIsInstance(freqs, ExternalFrequencies)
+                self.assertEqual(self._print(compute_twogram_freq(self.tokens)), self._print(freqs))
+                self.assertEqual(TwoGram("à", "à"), next(iter(freqs)).token)
+                freqs.close()
+            self.assertEqual([], os.listdir(temp_dir))
+
+
+if __name__ == '__main__':
+    unittest.main()
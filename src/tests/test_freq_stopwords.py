@@ -0,0 +1,83 @@
+"""Unit tests for `text_processing.freq_stopwords`.
+"""
+
+import os
+import sys
+import tempfile
+import subprocess
+import unittest
+
+from text_processing.freq_models import Vocabulary
+from text_processing import freq_stopwords
+from text_processing.freq_stopwords import StopwordFilter, load_stopwords
+
+__author__ = "Garrett Buchanan, Livingstone Rwagatare"
+__copyright__ = "Copyright 2023, Westmont College"
+__credits__ = ["Garrett Buchanan", "Livingstone Rwagatare",
+               "Donald J. Patterson", "Mike Ryu", ]
+__license__ = "MIT"
+__email__ = "mryu@westmont.edu"
+
+
+class LoadStopwordsTest(unittest.TestCase):
+    def test_reads_and_memoizes_cache_file(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            with open(os.path.join(cache_dir, "stopwords.test_cached.txt"), 'w', encoding="UTF-8") as cache_file:
+                cache_file.write("a\nthe\nof")
+
+            words = load_stopwords("test_cached", cache_dir)
+            self.assertEqual(frozenset(["a", "the", "of"]), words)
+
+        self.assertIs(words, load_stopwords("test_cached", cache_dir))
+
+    def test_empty_cache_file_is_reloaded(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache_path = os.path.join(cache_dir, "stopwords.english.txt")
+            open(cache_path, 'w', encoding="UTF-8").close()  # as left by a crashed or concurrent writer
+            freq_stopwords._LOADED.pop("english", None)
+            words = load_stopwords("english", cache_dir)
+            self.assertIn("the", words)
+            with open(cache_path, 'r', encoding="UTF-8") as cache_file:
+                self.assertEqual(words, frozenset(cache_file.read().split("\n")))
+            self.assertEqual(["stopwords.english.txt"], os.listdir(cache_dir))  # no temporary file left behind
+
+
+class StopwordFilterTest(unittest.TestCase):
+    def setUp(self):
+        self.filter = StopwordFilter(["the", "a", "of"])
+        self.tokens = ["the", "word", "of", "a", "sentence", "the"]
+
+    def test_empty(self):
+        empty = StopwordFilter()
+        self.assertFalse(empty)
+        self.assertEqual(self.tokens, empty.filter(self.tokens))
+        self.assertIsNot(self.tokens, empty.filter(self.tokens))
+
+    def test_filter(self):
+        self.assertTrue(self.filter)
+        self.assertIn("the", self.filter)
+        self.assertEqual(["word", "sentence"], self.filter.filter(self.tokens))
+        self.assertEqual(6, len(self.tokens))
+
+    def test_mask_and_filter_ids(self):
+        vocab = Vocabulary()
+        ids = vocab.ids(self.tokens)
+        self.assertEqual(bytearray([1, 0, 1, 1, 0]), self.filter.mask(vocab))
+        self.assertEqual([vocab.id("word"), vocab.id("sentence")], self.filter.filter_ids(ids, vocab))
+
+        ids = vocab.ids(["new", "of", "words"])
+        self.assertEqual(7, len(self.filter.mask(vocab)))
+        self.assertEqual(["new", "words"], [vocab.token(i) for i in self.filter.filter_ids(ids, vocab)])
+
+    def test_disabled_config_does_not_import_nltk(self):
+        code = ("import sys\n"
+                "from text_processing.freq_stopwords import StopwordFilter\n"
+                "f = StopwordFilter.from_config({'options': {'remove_stopwords': False, 'stopwords_lang': 'x'}})\n"
+                "assert not f and 'nltk' not in sys.modules\n")
+        src_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        result = subprocess.run([sys.executable, "-c", code], cwd=src_dir, capture_output=True)
+        self.assertEqual(0, result.returncode, result.stderr)
+
+
+if __name__ == '__main__':
+    unittest.main()
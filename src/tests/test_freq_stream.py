@@ -0,0 +1,76 @@
+"""Unit tests for classes in `text_processing.freq_stream`.
+"""
+
+import io
+import os
+import unittest
+
+from text_processing.freq_utils import tokenize_file, print_frequencies
+from text_processing.freq_counter import compute_twogram_freq
+from text_processing.freq_stream import TokenStream, StreamingTwoGramCounter
+from text_processing.freq_stopwords import StopwordFilter
+
+__author__ = "Garrett Buchanan, Livingstone Rwagatare"
+__copyright__ = "Copyright 2023, Westmont College"
+__credits__ = ["Garrett Buchanan", "Livingstone Rwagatare",
+               "Donald J. Patterson", "Mike Ryu", ]
+__license__ = "MIT"
+__email__ = "mryu@westmont.edu"
+
+
+class TokenStreamTest(unittest.TestCase):
+    def setUp(self):
+        self.fragments = ["An input string, this is!", "(or isn't it?) 123-45", "ΣΟΦΟΣ\nKAI", " ΟΔΟΣ", "Ends"]
+
+    def test_matches_tokenize_file_on_concatenation(self):
+        stream = TokenStream()
+        tokens = []
+        for fragment in self.fragments:
+            tokens.extend(stream.feed(fragment))
+        tokens.extend(stream.flush())
+        self.assertEqual(tokenize_file(io.StringIO("".join(self.fragments))), tokens)
+        self.assertIn("is", tokens)
+        self.assertIn("οδοσends", tokens)
+
+    def test_carries_partial_tokens(self):
+        stream = TokenStream()
+        self.assertEqual([], stream.feed("hello"))
+        self.assertEqual(["helloworld"], stream.feed("world again"))
+        self.assertEqual(["again"], stream.flush())
+        self.assertEqual([], stream.flush())
+
+
+class StreamingTwoGramCounterTest(unittest.TestCase):
+    def setUp(self):
+        cwd = os.path.dirname(__file__)
+        with open(os.path.relpath("./data/twogram_06.in.txt", cwd), 'r', encoding="UTF-8") as fo:
+            self.text = fo.read()
+
+    @staticmethod
+    def _print(freqs):
+        out = io.StringIO()
+        print_frequencies(freqs, out)
+        return out.getvalue()
+
+    def test_empty(self):
+        self.assertEqual([], StreamingTwoGramCounter().finish())
+
+    def test_matches_compute_twogram_freq(self):
+        counter = StreamingTwoGramCounter()
+        for i in range(0, len(self.text), 97):
+            counter.write(self.text[i:i + 97])
+        expected = compute_twogram_freq(tokenize_file(io.StringIO(self.text)))
+        self.assertEqual(self._print(expected), self._print(counter.finish()))
+
+    def test_stopwords_and_spill(self):
+        stopwords = frozenset(["the", "of", "and", "à"])
+        counter = StreamingTwoGramCounter(StopwordFilter(stopwords), budget=50)
+        for line in io.StringIO(self.text):
+            counter.write(line)
+        tokens = [token for token in tokenize_file(io.StringIO(self.text)) if token not in stopwords]
+        with counter.finish() as actual:
+            self.assertEqual(self._print(compute_twogram_freq(tokens)), self._print(actual))
+
+
+if __name__ == '__main__':
+    unittest.main()
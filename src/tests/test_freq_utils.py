@@ -5,8 +5,8 @@ import io
 import os
 import unittest
 
-from text_processing.freq_utils import tokenize_file, print_frequencies
-from text_processing.freq_models import Frequency
+from text_processing.freq_utils import tokenize_file, order_frequencies, print_frequencies
+from text_processing.freq_models import TwoGram, Frequency, FrequencyTable
 
 __author__ = "Boaty McBoatface, Planey McPlaneface"
 __copyright__ = "Copyright 2023, Westmont College"
@@ -77,6 +77,27 @@ class TokenizeFileTest(unittest.TestCase):
             self.assertEqual("45",     words[9])
 
 
+class OrderFrequenciesTest(unittest.TestCase):
+    def test_empty(self):
+        self.assertEqual(([], []), order_frequencies({}))
+
+    def test_words(self):
+        counts = {"this": 1, "sentence": 2, "repeats": 1, "the": 1, "word": 1, "a": 2}
+        self.assertEqual((["a", "sentence", "repeats", "the", "this", "word"], [2, 2, 1, 1, 1, 1]),
+                         order_frequencies(counts))
+
+    def test_matches_twogram_comparison_sort(self):
+        words = "you think you know how you think that you know and how".split()
+        counts = {}
+        for pair in zip(words, words[1:]):
+            counts[pair] = counts.get(pair, 0) + 1
+
+        expected = sorted(((TwoGram(*pair), count) for pair, count in counts.items()), key=lambda x: (-x[1], x[0]))
+        tokens, ordered_counts = order_frequencies(counts)
+        self.assertEqual([twogram for twogram, _ in expected], [TwoGram(*pair) for pair in tokens])
+        self.assertEqual([count for _, count in expected], ordered_counts)
+
+
 class PrintFrequenciesTest(unittest.TestCase):
     def test_static(self):
         freqs = [
@@ -109,6 +130,18 @@ class PrintFrequenciesTest(unittest.TestCase):
         actual_out_str = actual_out_stream.read()
         self.assertEqual(expected_out_str, actual_out_str)
 
+    def test_table(self):
+        table = FrequencyTable(["goodbye", "hello", "hi"], [3, 2, 1], 6)
+
+        actual_out_stream = io.StringIO()
+        expected_out_str = ("     6 total items\n     3 unique items\n\n" +
+                            "     3 goodbye\n     2 hello\n     1 hi\n")
+
+        print_frequencies(table, actual_out_stream)
+
+        actual_out_stream.seek(0)
+        self.assertEqual(expected_out_str, actual_out_stream.read())
+
 
 if __name__ == '__main__':
     unittest.main()
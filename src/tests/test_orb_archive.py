@@ -0,0 +1,189 @@
+"""Unit tests for classes in `spider.orb.orb_archive`, against archives of the test fixtures built in a temporary
+directory.
+"""
+
+import io
+import os
+import gzip
+import random
+import tarfile
+import zipfile
+import tempfile
+import unittest
+from spider.orb.orb_models import OrbURI, OrbAgent, OrbDocDB, OrbUriDB, agent_class
+from spider.orb.orb_archive import (OrbArchiveAgent, SeekableGzip, open_archive, close_archives, archive_uri,
+                                    split_archive_uri)
+
+__author__ = "Garrett Buchanan", "Livingstone Rwagatare"
+__copyright__ = "Copyright 2023, Westmont College"
+__credits__ = ["Garrett Buchanan", "Livingstone Rwagatare", "Mike Ryu"]
+__license__ = "MIT"
+__email__ = "mryu@westmont.edu"
+
+PAGES = ("spider.orb_01.in.html", "spider.orb_02.in.html", "spider.orb_03.in.html")
+SITE = "http://www.example.com/site/"
+
+
+def _warc_record(uri: str, block: bytes, kind: str = "response") -> bytes:
+    headers = "WARC/1.0\r\nWARC-Type: {}\r\nWARC-Target-URI: {}\r\nContent-Length: {:d}\r\n\r\n".format(
+        kind, uri, len(block))
+    return headers.encode("UTF-8") + block + b"\r\n\r\n"
+
+
+def _http_response(body: bytes, status: str = "200 OK", headers: str = "") -> bytes:
+    return "HTTP/1.1 {}\r\nContent-Type: text/html\r\n{}\r\n".format(status, headers).encode("ISO-8859-1") + body
+
+
+class OrbArchiveAgentTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cwd = os.path.dirname(__file__)
+        cls.data_dir = os.path.relpath("./data", cwd)
+        cls.pages = {}
+        for page in PAGES:
+            with open(os.path.join(cls.data_dir, page), 'rb') as page_file:
+                cls.pages[page] = page_file.read()
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.config = {
+            "external": ["https://", "http://"],
+            "encoding": "UTF-8",
+            "parser": "html.parser",
+            "tags": {"p": {}, "dd": {}, "h2": {}},
+            "debug": False
+        }
+
+    def tearDown(self):
+        close_archives()
+        self.tmp_dir.cleanup()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.tmp_dir.name, name)
+
+    def _zip(self) -> str:
+        path = self._path("site.zip")
+        with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+            for page, data in self.pages.items():
+                archive.writestr("site/" + page, data)
+        return path
+
+    def _tar(self, name: str) -> str:
+        path = self._path(name)
+        with tarfile.open(path, "w:gz" if name.endswith(".gz") else "w") as archive:
+            for page, data in self.pages.items():
+                info = tarfile.TarInfo("./site/" + page)
+                info.size = len(data)
+                archive.addfile(info, io.BytesIO(data))
+        return path
+
+    def _warc(self, name: str) -> str:
+        records = [_warc_record(SITE + "missing.html", _http_response(b"gone", "404 Not Found"))]
+        for page, data in self.pages.items():
+            if page == PAGES[0]:  # compressed and chunked, as the server sent it
+                compressed = gzip.compress(data)
+                body = "{:x}\r\n".format(len(compressed)).encode() + compressed + b"\r\n0\r\n\r\n"
+                block = _http_response(body, headers="Content-Encoding: gzip\r\nTransfer-Encoding: chunked\r\n")
+            else:
+                block = _http_response(data)
+            records.append(_warc_record(SITE + page, block))
+        records.append(_warc_record(SITE + PAGES[1], _http_response(b"later duplicate")))
+        path = self._path(name)
+        with open(path, 'wb') as warc_file:
+            for record in records:
+                warc_file.write(gzip.compress(record) if name.endswith(".gz") else record)
+        return path
+
+    def _crawl(self, agent: OrbAgent) -> tuple[list[str], list[str]]:
+        content_processor, link_processor = agent.crawl()
+        return [doc.content for doc in content_processor], link_processor.links
+
+    def test_archive_uri(self):
+        uri = archive_uri("../a b.zip", "site/index.html")
+        self.assertEqual("archive:../a b.zip!/site/index.html", uri)
+        self.assertEqual(("../a b.zip", "site/index.html"), split_archive_uri(uri))
+        self.assertEqual(("a.warc", "http://x/!/y"), split_archive_uri("archive:a.warc!/http://x/!/y"))
+        with self.assertRaises(ValueError):
+            split_archive_uri("site/index.html")
+        self.assertIs(OrbArchiveAgent, agent_class(uri))
+        self.assertIs(OrbAgent, agent_class("site/index.html"))
+        with self.assertRaises(ValueError):
+            open_archive(self._path("site.rar"))
+
+    def test_members(self):
+        expected = ["site/" + page for page in PAGES]
+        for path in (self._zip(), self._tar("site.tar"), self._tar("site.tar.gz")):
+            archive = open_archive(path)
+            self.assertEqual(expected, archive.members(), path)
+            self.assertIs(archive, open_archive(path))  # opened once
+            for page, data in reversed(self.pages.items()):
+                self.assertEqual(data, archive.read("site/" + page))
+            with self.assertRaises(KeyError):
+                archive.read("site/missing.html")
+
+    def test_warc_members(self):
+        for path in (self._warc("site.warc"), self._warc("site.warc.gz")):
+            archive = open_archive(path)
+            self.assertEqual([SITE + page for page in PAGES], archive.members(), path)
+            for page, data in reversed(self.pages.items()):  # the first record for a URI wins, decoded
+                self.assertEqual(data, archive.read(SITE + page), path)
+            self.assertNotIn(SITE + "missing.html", archive)
+
+    def test_crawl_matches_files(self):
+        file_uri = os.path.join(self.data_dir, PAGES[2])
+        file_content, file_links = self._crawl(OrbAgent(OrbURI(file_uri), OrbDocDB(), OrbUriDB(), self.config))
+        for path in (self._zip(), self._tar("site.tar.gz")):
+            uri = archive_uri(path, "site/" + PAGES[2])
+            content, links = self._crawl(OrbArchiveAgent(OrbURI(uri), OrbDocDB(), OrbUriDB(), self.config))
+            self.assertEqual(file_content, content)
+            self.assertEqual(len(file_links), len(links))
+            for file_link, link in zip(file_links, links):
+                if file_link.startswith("http"):
+                    self.assertEqual(file_link, link)
+                else:
+                    self.assertEqual(archive_uri(path, "site/" + os.path.basename(file_link)), link)
+                    self.assertEqual(self._crawl(OrbAgent(OrbURI(file_link), OrbDocDB(), OrbUriDB(), self.config)),
+                                     self._crawl(OrbArchiveAgent(OrbURI(link), OrbDocDB(), OrbUriDB(), self.config)))
+
+    def test_crawl_warc(self):
+        path = self._warc("site.warc.gz")
+        file_content, file_links = self._crawl(
+            OrbAgent(OrbURI(os.path.join(self.data_dir, PAGES[2])), OrbDocDB(), OrbUriDB(), self.config))
+        content, links = self._crawl(
+            OrbArchiveAgent(OrbURI(archive_uri(path, SITE + PAGES[2])), OrbDocDB(), OrbUriDB(), self.config))
+        self.assertEqual(file_content, content)
+        expected = [link if link.startswith("http") else archive_uri(path, SITE + os.path.basename(link))
+                    for link in file_links]
+        self.assertEqual(expected, links)
+
+    def test_missing_member(self):
+        agent = OrbArchiveAgent(OrbURI(archive_uri(self._zip(), "site/missing.html")), OrbDocDB(), OrbUriDB(),
+                                self.config)
+        self.assertEqual(([], []), self._crawl(agent))
+        self.assertIsNone(agent.bytes_read)
+
+
+class SeekableGzipTest(unittest.TestCase):
+    def test_random_reads(self):
+        rng = random.Random(7)
+        first = bytes(rng.getrandbits(8) for _ in range(20000))
+        second = b"second member " * 3000
+        data = first + second
+        with tempfile.TemporaryFile() as compressed:
+            compressed.write(gzip.compress(first) + gzip.compress(second))  # two gzip members, read as one
+            compressed.seek(0)
+            stream = SeekableGzip(compressed, spacing=2048)
+            self.assertEqual(data, stream.read())
+            self.assertGreater(stream.num_checkpoints, 1)
+            for _ in range(50):
+                start = rng.randrange(len(data))
+                stream.seek(start)
+                self.assertEqual(data[start:start + 1000], stream.read(1000))
+            self.assertEqual(len(data), stream.seek(0, io.SEEK_END))
+            self.assertEqual(b"", stream.read(10))
+            stream.seek(-5, io.SEEK_CUR)
+            self.assertEqual(data[-5:], stream.read())
+
+
+if __name__ == '__main__':
+    unittest.main()
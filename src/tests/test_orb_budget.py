@@ -0,0 +1,76 @@
+"""Unit tests for classes in `spider.orb.orb_budget`.
+"""
+
+import os
+import json
+import tempfile
+import unittest
+from spider.orb.orb_models import OrbURI, OrbUriFrontier
+from spider.orb.orb_budget import OrbCrawlBudget, uri_depth
+
+__author__ = "Garrett Buchanan", "Livingstone Rwagatare"
+__copyright__ = "Copyright 2023, Westmont College"
+__credits__ = ["Garrett Buchanan", "Livingstone Rwagatare", "Mike Ryu"]
+__license__ = "MIT"
+__email__ = "mryu@westmont.edu"
+
+
+class OrbCrawlBudgetTest(unittest.TestCase):
+    def test_no_limits(self):
+        budget = OrbCrawlBudget()
+        self.assertFalse(budget)
+        budget.charge(1 << 40)
+        self.assertIsNone(budget.exceeded())
+        self.assertTrue(budget.within_depth(OrbURI("a", {"depth": 1000})))
+
+    def test_from_options(self):
+        budget = OrbCrawlBudget.from_options({"max_pages": 10, "max_bytes": 5}, max_bytes=None, max_depth=2)
+        self.assertTrue(budget)
+        self.assertEqual({"max_pages": 10, "max_bytes": 5, "max_depth": 2, "max_seconds": None},
+                         budget.to_dict()["limits"])
+        with self.assertRaises(ValueError):
+            OrbCrawlBudget.from_options({"max_pages": -1})
+
+    def test_pages_and_bytes(self):
+        budget = OrbCrawlBudget(max_pages=3, max_bytes=100)
+        budget.charge(40)
+        budget.charge(40)
+        self.assertIsNone(budget.exceeded())
+        budget.charge(40)
+        self.assertEqual("max_pages", budget.exceeded())
+        self.assertEqual("max_bytes", OrbCrawlBudget(max_bytes=0).exceeded())
+
+    def test_deadline(self):
+        budget = OrbCrawlBudget(max_seconds=0)
+        self.assertEqual("max_seconds", budget.exceeded())
+        budget = OrbCrawlBudget(max_seconds=600)
+        budget.start()
+        self.assertIsNone(budget.exceeded())
+
+    def test_depth(self):
+        seed = OrbURI("seed")
+        self.assertEqual(0, uri_depth(seed))
+        budget = OrbCrawlBudget(max_depth=1)
+        self.assertTrue(budget.within_depth(seed))
+        self.assertTrue(budget.within_depth(OrbURI("a", {"parent": "seed", "depth": 1})))
+        self.assertFalse(budget.within_depth(OrbURI("b", {"parent": "a", "depth": 2})))
+        self.assertTrue(budget.partial)
+        self.assertIsNone(budget.stopped)
+
+    def test_stop_records_frontier(self):
+        budget = OrbCrawlBudget(max_pages=0)
+        frontier = OrbUriFrontier([OrbURI("a"), OrbURI("b")])
+        budget.stop(budget.exceeded(), frontier)
+        self.assertEqual(["a", "b"], budget.remaining)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "out.txt.budget.json")
+            budget.dump(path)
+            with open(path, 'r', encoding="UTF-8") as budget_file:
+                dumped = json.load(budget_file)
+        self.assertTrue(dumped["partial"])
+        self.assertEqual("max_pages", dumped["stopped"])
+        self.assertEqual(2, dumped["remaining_count"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,254 @@
+"""Unit tests for classes in `spider.orb.orb_cache`, against a local stand-in server that honors conditional
+requests.
+"""
+
+import os
+import hashlib
+import tempfile
+import threading
+import unittest
+from functools import partial
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+from spider.orb.orb_models import OrbURI, OrbAgent, OrbDocDB, OrbUriDB
+from spider.orb.orb_http import OrbHttpPool
+from spider.orb.orb_stats import OrbCrawlStats
+from spider.orb.orb_cache import OrbHttpCache, canonical_uri, extraction_key
+
+__author__ = "Garrett Buchanan", "Livingstone Rwagatare"
+__copyright__ = "Copyright 2023, Westmont College"
+__credits__ = ["Garrett Buchanan", "Livingstone Rwagatare", "Mike Ryu"]
+__license__ = "MIT"
+__email__ = "mryu@westmont.edu"
+
+PAGE = "spider.orb_03.in.html"
+
+
+class _ConditionalHandler(SimpleHTTPRequestHandler):
+    """Serves the fixtures with Last-Modified (and If-Modified-Since, as `SimpleHTTPRequestHandler` does), plus
+    pages with an ETag honoring If-None-Match: "/versioned", whose body is the server's `version` text, "/fresh",
+    which may be cached for a minute, and "/private", which must not be stored; "/moved" redirects to "/fresh"."""
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.server.requests += 1
+        if self.path == "/moved":
+            self.send_response(301)
+            self.send_header("Location", "/fresh")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        elif self.path in ("/versioned", "/fresh", "/private"):
+            body = "<p>{}</p>".format(self.server.version).encode("UTF-8")
+            etag = '"{}"'.format(hashlib.md5(body).hexdigest())
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=UTF-8")
+            self.send_header("ETag", etag)
+            if self.path == "/fresh":
+                self.send_header("Cache-Control", "max-age=60")
+            elif self.path == "/private":
+                self.send_header("Cache-Control", "no-store")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            self.server.downloads += 1
+        else:
+            modified = "If-Modified-Since" in self.headers
+            super().do_GET()
+            self.server.downloads += not modified or self.server.last_status == 200
+
+    def send_response(self, code, message=None):
+        self.server.last_status = code
+        super().send_response(code, message)
+
+    def log_message(self, *args):
+        pass
+
+
+class CanonicalUriTest(unittest.TestCase):
+    def test_canonical_uri(self):
+        self.assertEqual("http://example.com/", canonical_uri("HTTP://Example.COM"))
+        self.assertEqual("http://example.com/a?b=1", canonical_uri("http://example.com:80/a?b=1#top"))
+        self.assertEqual("https://example.com:8443/a", canonical_uri("https://user@example.com:8443/a"))
+        self.assertEqual("http://[::1]:8080/", canonical_uri("http://[::1]:8080/"))
+
+    def test_extraction_key(self):
+        config = {"encoding": "UTF-8", "external": ["http://"], "parser": "html.parser", "tags": {"p": {}},
+                  "debug": False}
+        self.assertEqual(extraction_key(config), extraction_key(dict(config, debug=True)))
+        self.assertNotEqual(extraction_key(config), extraction_key(dict(config, tags={"h2": {}})))
+
+
+class OrbHttpCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache_dir = self.tmp_dir.name
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_round_trip(self):
+        cache = OrbHttpCache(self.cache_dir)
+        self.assertIsNone(cache.get("http://a/"))
+        entry = cache.put("http://A:80/", {"etag": '"x"', "last-modified": "then", "server": "ignored"}, b"body")
+        self.assertEqual({"etag": '"x"', "last-modified": "then"}, entry.headers)
+        self.assertEqual({"If-None-Match": '"x"', "If-Modified-Since": "then"}, entry.validators())
+        self.assertFalse(entry.is_fresh(entry.stored_at))
+        cached = OrbHttpCache(self.cache_dir).get("http://a/#fragment")  # entries outlive the cache object
+        self.assertEqual(b"body", cached.body)
+        self.assertEqual("http://a/", cached.uri)
+        self.assertEqual(1, len(cache))
+
+    def test_freshness(self):
+        cache = OrbHttpCache(self.cache_dir)
+        entry = cache.put("http://a/", {"cache-control": "public, max-age=60"}, b"body")
+        self.assertTrue(entry.is_fresh(entry.stored_at + 59))
+        self.assertFalse(entry.is_fresh(entry.stored_at + 61))
+        self.assertFalse(cache.put("http://b/", {"cache-control": "no-cache, max-age=60"}, b"").is_fresh(0))
+        self.assertIsNone(cache.put("http://c/", {"cache-control": "no-store"}, b"body"))
+        self.assertIsNone(cache.get("http://c/"))
+
+    def test_extraction(self):
+        cache = OrbHttpCache(self.cache_dir)
+        entry = cache.put("http://a/", {}, b"body")
+        self.assertIsNone(entry.extracted("key"))
+        cache.save_extraction(entry, "key", "content", ["http://a/b"])
+        entry = cache.get("http://a/")
+        self.assertEqual(("content", ["http://a/b"]), entry.extracted("key"))
+        self.assertIsNone(entry.extracted("other key"))
+        entry = cache.refresh(entry, {"etag": '"y"'})
+        self.assertEqual('"y"', cache.get("http://a/").headers["etag"])
+        self.assertEqual(("content", ["http://a/b"]), cache.get("http://a/").extracted("key"))
+
+    def test_alias(self):
+        cache = OrbHttpCache(self.cache_dir)
+        self.assertFalse(cache.alias("http://a/old", "http://A/old#top"))
+        cache.alias("http://a/old", "http://a/new")
+        self.assertIsNone(cache.get("http://a/old"))  # nothing cached for the target yet
+        cache.put("http://a/new", {}, b"body")
+        entry = OrbHttpCache(self.cache_dir).get("http://a/old")
+        self.assertEqual(("http://a/new", b"body"), (entry.uri, entry.body))
+        cache.alias("http://a/new", "http://a/newer")
+        self.assertIsNone(cache.get("http://a/old"))  # only one alias is followed
+
+    def test_lru_eviction(self):
+        stats = OrbCrawlStats()
+        cache = OrbHttpCache(self.cache_dir, max_bytes=1000, stats=stats)
+        for name in "abc":
+            cache.put("http://host/" + name, {}, b"x" * 200)
+        cache.get("http://host/a")  # "b" is now the least recently used
+        cache.put("http://host/d", {}, b"x" * 200)
+        self.assertIsNone(cache.get("http://host/b"))
+        for name in "acd":
+            self.assertIsNotNone(cache.get("http://host/" + name), name)
+        self.assertLessEqual(cache.size, 1000)
+        self.assertEqual(1, cache.to_dict()["evicted"])
+        self.assertEqual(1, stats.counter("cache_evicted"))
+        self.assertIsNone(cache.put("http://host/e", {}, b"x" * 1001))  # larger than the whole cache
+        self.assertEqual(3, len(OrbHttpCache(self.cache_dir, max_bytes=1000)))
+        with self.assertRaises(ValueError):
+            OrbHttpCache(self.cache_dir, max_bytes=-1)
+
+
+class OrbHttpPoolCacheTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cwd = os.path.dirname(__file__)
+        cls.data_dir = os.path.abspath(os.path.relpath("./data", cwd))
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), partial(_ConditionalHandler, directory=cls.data_dir))
+        cls.server.daemon_threads = True
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base = "http://127.0.0.1:{:d}/".format(cls.server.server_address[1])
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.server.version, self.server.requests, self.server.downloads = "first", 0, 0
+        self.config = {
+            "external": ["https://", "http://"],
+            "encoding": "UTF-8",
+            "parser": "html.parser",
+            "tags": {"p": {}, "dd": {}, "h2": {}},
+            "debug": False
+        }
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _pool(self, stats=None):
+        return OrbHttpPool(cache=OrbHttpCache(self.tmp_dir.name, stats=stats or OrbCrawlStats()))
+
+    def test_etag_revalidation(self):
+        with self._pool() as pool:
+            self.assertEqual("<p>first</p>", pool.open(self.base + "versioned").read())
+            self.assertEqual("<p>first</p>", pool.open(self.base + "versioned").read())
+            self.assertEqual((2, 1), (self.server.requests, self.server.downloads))
+            self.server.version = "second"
+            self.assertEqual("<p>second</p>", pool.open(self.base + "versioned").read())
+            self.assertEqual((3, 2), (self.server.requests, self.server.downloads))
+            counts = pool.cache.to_dict()
+        self.assertEqual((0, 1, 2), (counts["hits"], counts["revalidated"], counts["misses"]))
+
+    def test_last_modified_revalidation(self):
+        with open(os.path.join(self.data_dir, PAGE), 'r', encoding="UTF-8") as fixture:
+            expected = fixture.read()
+        with self._pool() as pool:
+            self.assertEqual(expected, pool.open(self.base + PAGE).read())
+            self.assertEqual(expected, pool.open(self.base + PAGE).read())
+            self.assertEqual(1, pool.cache.to_dict()["revalidated"])
+        self.assertEqual((2, 1), (self.server.requests, self.server.downloads))
+
+    def test_fresh_hit(self):
+        stats = OrbCrawlStats()
+        with self._pool(stats) as pool:
+            pool.open(self.base + "fresh")
+            self.server.version = "second"  # not seen while the cached page is fresh
+            self.assertEqual("<p>first</p>", pool.open(self.base + "fresh").read())
+        self.assertEqual(1, self.server.requests)
+        self.assertEqual(1, stats.counter("cache_hits"))
+        self.assertEqual(1, stats.counter("cache_misses"))
+
+    def test_redirect_hit(self):
+        stats = OrbCrawlStats()
+        with self._pool(stats) as pool:
+            self.assertEqual(self.base + "fresh", pool.open(self.base + "moved").uri)
+            self.assertEqual(2, self.server.requests)
+            response = pool.open(self.base + "moved")  # served without repeating the redirect
+            self.assertEqual((self.base + "fresh", "<p>first</p>"), (response.uri, response.read()))
+        self.assertEqual(2, self.server.requests)
+        self.assertEqual(1, stats.counter("cache_hits"))
+
+    def test_no_store(self):
+        with self._pool() as pool:
+            pool.open(self.base + "private")
+            pool.open(self.base + "private")
+            self.assertEqual(0, len(pool.cache))
+        self.assertEqual(2, self.server.downloads)
+
+    def test_unchanged_page_reuses_extraction(self):
+        stats = OrbCrawlStats()
+        with self._pool(stats) as pool:
+            results = []
+            for _ in range(2):
+                agent = OrbAgent(OrbURI(self.base + PAGE), OrbDocDB(), OrbUriDB(), self.config, stats, pool)
+                content_processor, link_processor = agent.crawl()
+                results.append(([doc.content for doc in content_processor], link_processor.links, agent.bytes_read))
+            self.assertEqual(results[0], results[1])
+            self.assertEqual(1, stats.counter("cached_extractions"))
+            self.assertEqual(1, stats.stage("parse")["count"])
+            other = dict(self.config, tags={"h2": {}})  # extracting other tags parses the page again
+            agent = OrbAgent(OrbURI(self.base + PAGE), OrbDocDB(), OrbUriDB(), other, stats, pool)
+            agent.crawl()
+            self.assertEqual(2, stats.stage("parse")["count"])
+
+
+if __name__ == '__main__':
+    unittest.main()
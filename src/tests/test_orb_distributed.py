@@ -0,0 +1,132 @@
+"""Unit tests for functions and classes in `spider.orb.orb_distributed`.
+"""
+
+import io
+import os
+import json
+import tempfile
+import unittest
+from collections import Counter
+from spider.orb.orb_models import OrbURI, OrbUriFrontier, OrbDocDB, OrbUriDB
+from spider.orb.orb_runner import run_sequential_crawl
+from spider.orb.orb_distributed import partition, count_document, stitch_documents, run_local_crawl
+from spider.orb.orb_warc import OrbWarcWriter, OrbWarcReader
+from spider.orb.orb_scan import scan_corpus
+from text_processing.freq_utils import print_frequencies
+from text_processing.freq_stream import StreamingTwoGramCounter
+from text_processing.freq_stopwords import StopwordFilter
+from benchmarks.corpus_gen import generate_corpus
+
+__author__ = "Garrett Buchanan", "Livingstone Rwagatare"
+__copyright__ = "Copyright 2023, Westmont College"
+__credits__ = ["Garrett Buchanan", "Livingstone Rwagatare", "Mike Ryu"]
+__license__ = "MIT"
+__email__ = "mryu@westmont.edu"
+
+
+def _print(freqs):
+    out = io.StringIO()
+    print_frequencies(freqs, out)
+    return out.getvalue()
+
+
+class StitchTest(unittest.TestCase):
+    DOCUMENTS = ["Four score and", "seven years", "ago", "our", "fathers\nbrought forth", "...", "ΟΔΟΣ",
+                 "ΣΟΦΟΣ ΟΔΟΣ", "upon this continent, a new nation", " conceived in liberty ", "isn't", "'t it"]
+
+    def _check(self, documents, stopwords=None):
+        counter = StreamingTwoGramCounter(stopwords)
+        for document in documents:
+            counter.write(document)
+        expected = counter.finish()
+
+        counts = Counter()
+        fringes, total = [], 0
+        for document in documents:
+            fringe, counted = count_document(document, stopwords, counts)
+            fringes.append(fringe)
+            total += counted
+        total += stitch_documents(fringes, stopwords, counts)
+        self.assertEqual(expected.total, total)
+        self.assertEqual({(freq.token.object1, freq.token.object2): freq.freq for freq in expected}, dict(counts))
+
+    def test_matches_streaming_counter(self):
+        self._check(self.DOCUMENTS)
+        self._check(self.DOCUMENTS[::-1])
+        self._check(["a", "b", "c"])
+        self._check([])
+
+    def test_matches_streaming_counter_without_stopwords(self):
+        self._check(self.DOCUMENTS, StopwordFilter(["and", "a", "in", "it", "our", "this"]))
+        self._check(["the end", "the", "the start"], StopwordFilter(["the"]))
+
+
+class DistributedCrawlTest(unittest.TestCase):
+    def setUp(self):
+        cwd = os.path.dirname(__file__)
+        self.seeds = [os.path.relpath("./data/spider.orb_{:02d}.in.html".format(i), cwd) for i in (3, 4)]
+        self.config = {
+            "seeds": self.seeds,
+            "options": {"remove_stopwords": False, "stopwords_lang": "english"},
+            "agent_config": {
+                "external": ["https://", "http://"],
+                "encoding": "UTF-8",
+                "parser": "html.parser",
+                "tags": {"p": {}, "dd": {}, "h2": {}},
+                "debug": False
+            }
+        }
+
+    @staticmethod
+    def _sequential(config, follow_links=True):
+        counter = StreamingTwoGramCounter(StopwordFilter.from_config(config))
+        frontier = OrbUriFrontier(list(map(OrbURI, config["seeds"])))
+        run_sequential_crawl(counter, frontier, OrbDocDB(), OrbUriDB(), config, follow_links=follow_links)
+        return _print(counter.finish())
+
+    def test_partition(self):
+        uris = ["page_{:06d}.htm".format(i) for i in range(1000)]
+        owners = [partition(uri, 4) for uri in uris]
+        self.assertEqual({0, 1, 2, 3}, set(owners))
+        self.assertEqual(owners, [partition(uri, 4) for uri in uris])
+        self.assertEqual({0}, {partition(uri, 1) for uri in uris})
+
+    def test_matches_sequential_crawl(self):
+        expected = self._sequential(self.config)
+        for nodes in (1, 3):
+            self.assertEqual(expected, _print(run_local_crawl(self.config, nodes)))
+
+    def test_matches_sequential_crawl_of_generated_corpus(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with open(generate_corpus(tmp_dir, pages=60, page_words=40, duplicate_ratio=0.2, broken_ratio=0.1),
+                      'r', encoding="UTF-8") as config_file:
+                config = json.load(config_file)
+            self.assertEqual(self._sequential(config), _print(run_local_crawl(config, 4)))
+
+    def test_without_following_links(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with open(generate_corpus(tmp_dir, pages=60, page_words=40), 'r', encoding="UTF-8") as config_file:
+                config = json.load(config_file)
+            config["seeds"] = [uri.uri for uri in scan_corpus(tmp_dir)][::3]
+            expected = self._sequential(config, follow_links=False)
+            self.assertNotEqual(self._sequential(config), expected)
+            self.assertEqual(expected, _print(run_local_crawl(config, 3, follow_links=False)))
+
+    def test_warc_file_per_node(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            writer = OrbWarcWriter(os.path.join(tmp_dir, "sequential"))
+            frontier = OrbUriFrontier(list(map(OrbURI, self.config["seeds"])))
+            run_sequential_crawl(io.StringIO(), frontier, OrbDocDB(), OrbUriDB(), self.config, warc=writer)
+            expected = {page.uri: page.page for page in OrbWarcReader(writer.finish())}
+            warc_dir = os.path.join(tmp_dir, "nodes")
+            run_local_crawl(dict(self.config, options=dict(self.config["options"], warc_dir=warc_dir)), 3)
+            pages = {}
+            for node in range(3):
+                for page in OrbWarcReader(os.path.join(warc_dir, "pages-{:03d}.warc.gz".format(node))):
+                    self.assertNotIn(page.uri, pages)
+                    pages[page.uri] = page.page
+            self.assertEqual(expected, pages)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+"""Unit tests for classes in `spider.orb.orb_docstore`.
+"""
+
+import os
+import json
+import random
+import tempfile
+import unittest
+
+from spider.orb.orb_models import OrbDoc, OrbStoredDoc
+from spider.orb.orb_docstore import OrbDocStoreWriter, OrbDocStore, META_FILE
+
+__author__ = "Garrett Buchanan", "Livingstone Rwagatare"
+__copyright__ = "Copyright 2023, Westmont College"
+__credits__ = ["Garrett Buchanan", "Livingstone Rwagatare", "Mike Ryu"]
+__license__ = "MIT"
+__email__ = "mryu@westmont.edu"
+
+
+class OrbDocStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        rng = random.Random(11)
+        words = ["four", "score", "and", "seven", "years", "ago", "ΣΟΦΟΣ", "don't"]
+        self.docs = [OrbDoc(" ".join(rng.choices(words, k=rng.randint(0, 60))), "Doc {}".format(i) if i % 3 else None)
+                     for i in range(80)]
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _build(self, block_size=256):
+        writer = OrbDocStoreWriter(self.tmp_dir.name, block_size)
+        for i, doc in enumerate(self.docs):
+            self.assertEqual(doc.iid, writer.add(doc, "doc{}.htm".format(i) if i % 5 else None))
+        return writer.finish()
+
+    def _expected(self, i):
+        doc = self.docs[i]
+        return OrbStoredDoc(doc.iid, "doc{}.htm".format(i) if i % 5 else None, doc.title, doc.content)
+
+    def test_streams_in_order(self):
+        with self._build() as store:
+            self.assertEqual(len(self.docs), len(store))
+            self.assertTrue(store.num_blocks > 1)
+            self.assertEqual([self._expected(i) for i in range(len(self.docs))], list(store))
+            self.assertEqual([doc.content for doc in self.docs], list(store.contents()))
+            self.assertEqual([doc.iid for doc in self.docs], list(store.iids()))
+
+    def test_random_access(self):
+        with self._build() as store:
+            for i in random.Random(3).sample(range(len(self.docs)), len(self.docs)):
+                self.assertEqual(self._expected(i), store.get(self.docs[i].iid))
+            self.assertIn(self.docs[0].iid, store)
+            self.assertNotIn(self.docs[0].iid - 1, store)
+            self.assertIsNone(store.get(self.docs[-1].iid + 1))
+
+    def test_single_block(self):
+        with self._build(block_size=1 << 20) as store:
+            self.assertEqual(1, store.num_blocks)
+            self.assertEqual(self._expected(40), store.get(self.docs[40].iid))
+
+    def test_empty(self):
+        with OrbDocStoreWriter(self.tmp_dir.name).finish() as store:
+            self.assertEqual(0, len(store))
+            self.assertEqual([], list(store))
+            self.assertIsNone(store.get(1))
+
+    def test_iids_must_increase(self):
+        writer = OrbDocStoreWriter(self.tmp_dir.name)
+        writer.add(self.docs[1])
+        with self.assertRaises(ValueError):
+            writer.add(self.docs[0])
+        writer.finish().close()
+
+    def test_unsupported_version(self):
+        self._build().close()
+        with open(os.path.join(self.tmp_dir.name, META_FILE), 'w', encoding="UTF-8") as meta_file:
+            json.dump({"version": 0, "compression": "zlib"}, meta_file)
+        with self.assertRaises(ValueError):
+            OrbDocStore(self.tmp_dir.name)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+"""Unit tests for classes in `spider.orb.orb_graph`.
+"""
+
+import random
+import tempfile
+import unittest
+
+from spider.orb.orb_graph import OrbGraphBuilder, OrbLinkGraph
+
+__author__ = "Garrett Buchanan", "Livingstone Rwagatare"
+__copyright__ = "Copyright 2023, Westmont College"
+__credits__ = ["Garrett Buchanan", "Livingstone Rwagatare", "Mike Ryu"]
+__license__ = "MIT"
+__email__ = "mryu@westmont.edu"
+
+
+def _pagerank(links, n, damping=0.85, iterations=200):
+    """Straightforward PageRank over `{source: [target, ...]}` to check the vectorized one against."""
+    ranks = [1.0 / n] * n
+    for _ in range(iterations):
+        updated = [(1.0 - damping) / n] * n
+        for node in range(n):
+            targets = links.get(node, [])
+            if targets:
+                for target in targets:
+                    updated[target] += damping * ranks[node] / len(targets)
+            else:
+                for target in range(n):
+                    updated[target] += damping * ranks[node] / n
+        ranks = updated
+    return ranks
+
+
+class OrbLinkGraphTest(unittest.TestCase):
+    def setUp(self):
+        builder = OrbGraphBuilder()
+        builder.add_edges("a", ["b", "c", "b"])
+        builder.add_edges("b", ["c"])
+        builder.add_edges("c", ["a", "d"])
+        builder.add_edges("e", [])
+        self.graph = builder.finish()
+
+    def test_csr(self):
+        graph = self.graph
+        self.assertEqual(5, graph.num_nodes)
+        self.assertEqual(6, graph.num_edges)
+        self.assertEqual(["a", "b", "c", "d", "e"], [graph.uri(node) for node in range(graph.num_nodes)])
+        self.assertEqual([1, 2, 1], list(graph.successors(graph.node("a"))))
+        self.assertEqual([], list(graph.successors(graph.node("d"))))
+        self.assertIsNone(graph.node("f"))
+
+    def test_degrees(self):
+        self.assertEqual([3, 1, 2, 0, 0], list(self.graph.out_degrees()))
+        self.assertEqual([1, 2, 2, 1, 0], list(self.graph.in_degrees()))
+
+    def test_bfs_depths(self):
+        self.assertEqual([0, 1, 1, 2, -1], list(self.graph.bfs_depths([0])))
+        self.assertEqual([1, 2, 0, 1, 0], list(self.graph.bfs_depths([2, 4])))
+
+    def test_pagerank_matches_reference(self):
+        rng = random.Random(5)
+        builder = OrbGraphBuilder()
+        links = {}
+        for node in range(40):
+            if node % 7:  # leave some pages without links
+                links[node] = [rng.randrange(45) for _ in range(rng.randint(1, 6))]
+            builder.add_edges(str(node), map(str, links.get(node, [])))
+        graph = builder.finish()
+        ids = [int(graph.uri(node)) for node in range(graph.num_nodes)]
+        expected = _pagerank({ids.index(source): [ids.index(target) for target in targets]
+                              for source, targets in links.items()}, graph.num_nodes)
+        ranks = graph.pagerank()
+        self.assertAlmostEqual(1.0, ranks.sum())
+        for rank, expected_rank in zip(ranks, expected):
+            self.assertAlmostEqual(expected_rank, rank, places=9)
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            self.graph.save(tmp_dir)
+            loaded = OrbLinkGraph.load(tmp_dir)
+            self.assertEqual(list(self.graph.indptr), list(loaded.indptr))
+            self.assertEqual(list(self.graph.indices), list(loaded.indices))
+            self.assertEqual(2, loaded.node("c"))
+            self.assertEqual(list(self.graph.pagerank()), list(loaded.pagerank()))
+
+    def test_empty(self):
+        graph = OrbGraphBuilder().finish()
+        self.assertEqual(0, graph.num_nodes)
+        self.assertEqual([], list(graph.pagerank()))
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            graph.save(tmp_dir)
+            self.assertEqual(0, OrbLinkGraph.load(tmp_dir).num_edges)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,208 @@
+"""Unit tests for classes in `spider.orb.orb_http`, against a local `http.server` serving the `data` fixtures.
+"""
+
+import io
+import os
+import gzip
+import time
+import zlib
+import threading
+import unittest
+from functools import partial
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+from spider.orb.orb_models import OrbURI, OrbAgent, OrbDocDB, OrbUriDB, OrbUriFrontier
+from spider.orb.orb_http import OrbHttpPool
+from spider.orb.orb_stats import OrbCrawlStats
+from spider.orb.orb_runner import run_sequential_crawl
+
+__author__ = "Garrett Buchanan", "Livingstone Rwagatare"
+__copyright__ = "Copyright 2023, Westmont College"
+__credits__ = ["Garrett Buchanan", "Livingstone Rwagatare", "Mike Ryu"]
+__license__ = "MIT"
+__email__ = "mryu@westmont.edu"
+
+PAGE = "spider.orb_03.in.html"
+ENCODED_BODY = "<p>encoded body</p>\n" * 200
+
+
+class _FixtureHandler(SimpleHTTPRequestHandler):
+    """Serves the fixtures over keep-alive connections, plus a few paths exercising what plain files cannot."""
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        if self.path == "/gzip":
+            self._send(gzip.compress(ENCODED_BODY.encode("UTF-8")), "gzip")
+        elif self.path == "/deflate":
+            self._send(zlib.compress(ENCODED_BODY.encode("UTF-8")), "deflate")
+        elif self.path == "/raw-deflate":
+            compressor = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+            self._send(compressor.compress(ENCODED_BODY.encode("UTF-8")) + compressor.flush(), "deflate")
+        elif self.path == "/redirect":
+            self.send_response(302)
+            self.send_header("Location", "/" + PAGE)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        elif self.path == "/slow":
+            time.sleep(0.5)
+            self._send(b"late")
+        else:
+            super().do_GET()
+
+    def _send(self, body, content_encoding=None):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=UTF-8")
+        if content_encoding:
+            self.send_header("Content-Encoding", content_encoding)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class _FixtureServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        pass  # clients hanging up early (size caps, timeouts) are expected
+
+
+class _LocalServerTestCase(unittest.TestCase):
+    """Starts a local server for the fixtures once per test class."""
+    @classmethod
+    def setUpClass(cls):
+        cwd = os.path.dirname(__file__)
+        cls.data_dir = os.path.abspath(os.path.relpath("./data", cwd))
+        cls.server = _FixtureServer(("127.0.0.1", 0), partial(_FixtureHandler, directory=cls.data_dir))
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.base = "http://127.0.0.1:{:d}/".format(cls.server.server_address[1])
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def _fixture(self, name):
+        with open(os.path.join(self.data_dir, name), 'r', encoding="UTF-8") as fixture:
+            return fixture.read()
+
+
+class OrbHttpPoolTest(_LocalServerTestCase):
+    def test_fetch_fixture(self):
+        with OrbHttpPool() as pool:
+            response = pool.open(self.base + PAGE)
+            self.assertEqual(self._fixture(PAGE), response.read())
+            self.assertEqual(self.base + PAGE, response.uri)
+            self.assertEqual(len(self._fixture(PAGE).encode("UTF-8")), response.size)
+
+    def test_connection_reuse(self):
+        stats = OrbCrawlStats()
+        with OrbHttpPool(stats=stats) as pool:
+            for i in range(5):
+                self.assertIsNotNone(pool.open(self.base + "spider.orb_{:02d}.in.html".format(i)))
+            counts = pool.to_dict()
+        self.assertEqual(5, counts["requests"])
+        self.assertEqual(1, counts["connections"])
+        self.assertEqual(4, counts["reused"])
+        self.assertAlmostEqual(0.8, counts["reuse_rate"])
+        self.assertGreater(counts["mean_ms"], 0.0)
+        summary = stats.to_dict()
+        self.assertEqual(5, summary["stages"]["fetch"]["count"])
+        self.assertEqual(4, summary["counters"]["http_reused"])
+
+    def test_no_pooling(self):
+        with OrbHttpPool(pool_size=0) as pool:
+            pool.open(self.base + PAGE)
+            pool.open(self.base + PAGE)
+            self.assertEqual(2, pool.to_dict()["connections"])
+            self.assertEqual(0.0, pool.reuse_rate)
+
+    def test_content_encodings(self):
+        with OrbHttpPool() as pool:
+            for path in ("gzip", "deflate", "raw-deflate"):
+                self.assertEqual(ENCODED_BODY, pool.open(self.base + path).read(), path)
+            self.assertEqual(2, pool.to_dict()["reused"])
+
+    def test_size_cap(self):
+        with OrbHttpPool(max_bytes=100) as pool:
+            response = pool.open(self.base + PAGE)
+            self.assertEqual(self._fixture(PAGE)[:100], response.read())
+            self.assertEqual(100, response.size)
+            response = pool.open(self.base + "gzip")
+            self.assertEqual(ENCODED_BODY[:100], response.read())
+            counts = pool.to_dict()
+        self.assertEqual(2, counts["truncated"])
+        self.assertEqual(0, counts["reused"])  # a body cut off leaves its connection unusable
+
+    def test_redirect(self):
+        with OrbHttpPool() as pool:
+            response = pool.open(self.base + "redirect")
+            self.assertEqual(self.base + PAGE, response.uri)
+            self.assertEqual(self._fixture(PAGE), response.read())
+
+    def test_errors(self):
+        with OrbHttpPool(timeout=0.1) as pool:
+            self.assertIsNone(pool.open(self.base + "missing.html"))
+            self.assertIsNone(pool.open(self.base + "slow"))
+            self.assertIsNone(pool.open("http://127.0.0.1:1/"))
+            self.assertEqual(3, pool.to_dict()["errors"])
+            self.assertIsNotNone(pool.open(self.base + PAGE))
+
+    def test_can_fetch(self):
+        pool = OrbHttpPool(hosts=["127.0.0.1"])
+        self.assertTrue(pool.can_fetch(self.base + PAGE))
+        self.assertFalse(pool.can_fetch("https://www.mikeryu.com"))
+        self.assertFalse(pool.can_fetch("ftp://127.0.0.1/" + PAGE))
+        self.assertFalse(pool.can_fetch(PAGE))
+        self.assertTrue(OrbHttpPool().can_fetch("https://www.mikeryu.com"))
+        with self.assertRaises(ValueError):
+            OrbHttpPool(pool_size=-1)
+
+    def test_from_options(self):
+        pool = OrbHttpPool.from_options({"http_pool_size": 0, "http_max_bytes": 10, "http_hosts": ["127.0.0.1"]})
+        self.assertFalse(pool.can_fetch("https://www.mikeryu.com"))
+        pool.open(self.base + PAGE)
+        self.assertEqual(1, pool.to_dict()["truncated"])
+
+
+class OrbHttpCrawlTest(_LocalServerTestCase):
+    def setUp(self):
+        self.config = {
+            "options": {"remove_stopwords": False, "stopwords_lang": "english"},
+            "agent_config": {
+                "external": ["https://", "http://"],
+                "encoding": "UTF-8",
+                "parser": "html.parser",
+                "tags": {"p": {}, "dd": {}, "h2": {}},
+                "debug": False
+            }
+        }
+
+    def _crawl(self, seed, fetcher=None):
+        documents = io.StringIO()
+        frontier = OrbUriFrontier([OrbURI(seed)])
+        run_sequential_crawl(documents, frontier, OrbDocDB(), OrbUriDB(), self.config, fetcher=fetcher)
+        return documents.getvalue()
+
+    def test_agent_resolves_links(self):
+        with OrbHttpPool(hosts=["127.0.0.1"]) as pool:
+            agent = OrbAgent(OrbURI(self.base + PAGE), OrbDocDB(), OrbUriDB(), self.config["agent_config"],
+                             fetcher=pool)
+            _, link_processor = agent.crawl()
+            self.assertEqual(len(self._fixture(PAGE).encode("UTF-8")), agent.bytes_read)
+        self.assertEqual([self.base + "spider.orb_01.in.html", self.base + "spider.orb_02.in.html",
+                          "https://www.mikeryu.com"], link_processor.links)
+
+    def test_crawl_matches_file_crawl(self):
+        with OrbHttpPool(hosts=["127.0.0.1"]) as pool:
+            over_http = self._crawl(self.base + PAGE, pool)
+            self.assertEqual(3, pool.to_dict()["requests"])
+            self.assertEqual(2, pool.to_dict()["reused"])
+        self.assertEqual(self._crawl(os.path.relpath(os.path.join(self.data_dir, PAGE))), over_http)
+        self.assertEqual("", self._crawl(self.base + PAGE))  # without a fetcher http(s) links are skipped
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,6 +4,7 @@
 import os
 import unittest
 from spider.orb.orb_models import *
+from spider.orb.orb_stats import OrbCrawlStats
 
 __author__ = "Mike Ryu"
 __copyright__ = "Copyright 2023, Mike Ryu"
@@ -180,6 +181,58 @@ class OrbAgentTest(unittest.TestCase):
             next(links)
 
 
+class OrbLazyAgentTest(unittest.TestCase):
+    def setUp(self):
+        cwd = os.path.dirname(__file__)
+        self.paths = [os.path.relpath("./data/spider.orb_{:02d}.in.html".format(i), cwd) for i in range(5)]
+        self.config = {
+            "external": ["https://", "http://"],
+            "encoding": "UTF-8",
+            "parser": "html.parser",
+            "tags": {"p": {}, "dd": {}, "h2": {}},
+            "debug": False
+        }
+
+    @staticmethod
+    def _drain(agent, links_first=False):
+        content_processor, link_processor = agent.crawl()
+        if links_first:
+            links = [uri.uri for uri in link_processor]
+            return [doc.content for doc in content_processor], links, link_processor.links
+        docs = [doc.content for doc in content_processor]
+        return docs, [uri.uri for uri in link_processor], link_processor.links
+
+    def test_matches_eager_agent(self):
+        for path in self.paths + ["missing.html"]:
+            expected = self._drain(OrbAgent(OrbURI(path), OrbDocDB(), OrbUriDB(), self.config))
+            for links_first in (False, True):
+                agent = OrbLazyAgent(OrbURI(path), OrbDocDB(), OrbUriDB(), self.config)
+                self.assertEqual(expected, self._drain(agent, links_first), path)
+
+    def test_parses_once_on_demand(self):
+        stats = OrbCrawlStats()
+        agent = OrbLazyAgent(OrbURI(self.paths[3]), OrbDocDB(), OrbUriDB(), self.config, stats)
+        content_processor, link_processor = agent.crawl()
+        self.assertIsNone(agent.bytes_read)  # nothing was opened yet
+        self.assertEqual(0, stats.stage("open")["count"])
+        next(link_processor)
+        self.assertEqual(1, stats.counter("links"))  # links are found one at a time
+        self.assertEqual(0, stats.stage("content")["count"])  # and the content is not extracted for them
+        self.assertIsNotNone(agent.bytes_read)
+        list(content_processor)
+        list(link_processor)
+        self.assertEqual(1, stats.stage("parse")["count"])
+        self.assertEqual(1, stats.stage("content")["count"])
+
+    def test_content_only(self):
+        stats = OrbCrawlStats()
+        content_processor, _ = OrbLazyAgent(OrbURI(self.paths[3]), OrbDocDB(), OrbUriDB(), self.config,
+                                            stats).crawl()
+        self.assertEqual(1, len(list(content_processor)))
+        self.assertEqual(0, stats.counter("links"))
+        self.assertEqual(0, stats.stage("links")["count"])
+
+
 class OrbUriFrontierTest(unittest.TestCase):
     def setUp(self):
         cwd = os.path.dirname(__file__)
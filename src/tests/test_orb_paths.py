@@ -0,0 +1,102 @@
+"""Unit tests for classes in `spider.orb.orb_paths`, and crawls rejecting broken links with them.
+"""
+
+import io
+import os
+import json
+import tempfile
+import unittest
+from spider.orb.orb_models import OrbURI, OrbUriFrontier, OrbDocDB, OrbUriDB, OrbAgent
+from spider.orb.orb_runner import run_sequential_crawl
+from spider.orb.orb_stats import OrbCrawlStats
+from spider.orb.orb_paths import OrbPathIndex
+from benchmarks.corpus_gen import generate_corpus
+
+__author__ = "Garrett Buchanan", "Livingstone Rwagatare"
+__copyright__ = "Copyright 2023, Westmont College"
+__credits__ = ["Garrett Buchanan", "Livingstone Rwagatare", "Mike Ryu"]
+__license__ = "MIT"
+__email__ = "mryu@westmont.edu"
+
+
+class OrbPathIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = self.tmp_dir.name
+        os.makedirs(os.path.join(self.root, "sub"))
+        for name in ("a.htm", "b.htm", os.path.join("sub", "c.htm")):
+            open(os.path.join(self.root, name), 'w').close()
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_exists(self):
+        paths = OrbPathIndex()
+        root = self.root
+        self.assertTrue(paths.exists(root + "/a.htm"))
+        self.assertTrue(paths.exists(root + "/b.htm"))
+        self.assertTrue(paths.exists(root + "/sub/../a.htm"))
+        self.assertTrue(paths.exists(root + "/sub/c.htm"))
+        self.assertFalse(paths.exists(root + "/missing.htm"))
+        self.assertFalse(paths.exists(root + "/missing.htm"))
+        self.assertFalse(paths.exists(root + "/sub"))  # a directory is not a page
+        self.assertFalse(paths.exists(root + "/nowhere/d.htm"))
+        counts = paths.to_dict()
+        self.assertEqual(8, counts["lookups"])
+        self.assertEqual(3, counts["directories"])  # every directory is listed once
+        self.assertEqual(3, counts["stats"])  # and every missing file is confirmed once
+
+    def test_report(self):
+        paths = OrbPathIndex()
+        for page in ("p1", "p2", "p2", "p3", "p4", "p5", "p6"):
+            paths.reject("x.htm", page)
+        paths.reject("y.htm", "p1")
+        self.assertEqual(2, len(paths))
+        report = paths.report()
+        self.assertEqual((2, 8), (report["missing"], report["broken_links"]))
+        self.assertEqual({"uri": "x.htm", "links": 7, "pages": ["p1", "p2", "p3", "p4", "p5"]}, report["targets"][0])
+        path = os.path.join(self.root, "broken.json")
+        paths.dump(path)
+        with open(path, 'r', encoding="UTF-8") as report_file:
+            self.assertEqual(report, json.load(report_file))
+
+    def test_link_processor(self):
+        page = os.path.join(self.root, "a.htm")
+        with open(page, 'w', encoding="UTF-8") as page_file:
+            page_file.write('<p>a</p><a href="b.htm">b</a><a href="gone.htm">gone</a><a href="http://x.org/">x</a>'
+                            '<a href="sub/c.htm">c</a><a href="gone.htm">again</a>')
+        config = {"external": ["https://", "http://"], "encoding": "UTF-8", "parser": "html.parser",
+                  "tags": {"p": {}}, "debug": False}
+        stats = OrbCrawlStats()
+        paths = OrbPathIndex()
+        _, link_processor = OrbAgent(OrbURI(page), OrbDocDB(), OrbUriDB(), config, stats, paths=paths).crawl()
+        self.assertEqual([self.root + "/b.htm", "http://x.org/", self.root + "/sub/c.htm"],
+                         [uri.uri for uri in link_processor])
+        self.assertEqual(5, len(link_processor.links))  # the link graph still sees every link
+        self.assertEqual(2, stats.counter("broken_links"))
+        self.assertEqual([{"uri": self.root + "/gone.htm", "links": 2, "pages": [page]}], paths.report()["targets"])
+
+
+class BrokenLinkCrawlTest(unittest.TestCase):
+    def test_crawl_matches_without_failed_opens(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with open(generate_corpus(tmp_dir, pages=80, page_words=30, broken_ratio=0.2), 'r',
+                      encoding="UTF-8") as config_file:
+                config = json.load(config_file)
+            results = []
+            for paths in (None, OrbPathIndex()):
+                stats = OrbCrawlStats()
+                doc_str = io.StringIO()
+                run_sequential_crawl(doc_str, OrbUriFrontier(list(map(OrbURI, config["seeds"]))), OrbDocDB(),
+                                     OrbUriDB(), config, stats=stats, paths=paths)
+                results.append((doc_str.read(), stats.counter("pages"), stats.counter("failed_opens")))
+            (expected, pages, failed), (content, checked_pages, checked_failed) = results
+            self.assertEqual(expected, content)
+            self.assertEqual(pages, checked_pages)
+            self.assertGreater(failed, 0)
+            self.assertEqual(0, checked_failed)
+            self.assertEqual(failed, paths.report()["missing"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,164 @@
+"""Unit tests for functions in `spider.orb.orb_runner`.
+"""
+
+import io
+import os
+import sys
+import tempfile
+import subprocess
+import unittest
+from spider.orb.orb_models import OrbURI, OrbUriFrontier, OrbDocDB, OrbUriDB
+from spider.orb.orb_runner import run_sequential_crawl, remove_stopwords
+from text_processing.freq_utils import tokenize_file, print_frequencies
+from text_processing.freq_counter import compute_twogram_freq
+from text_processing.freq_stream import StreamingTwoGramCounter
+from text_processing.freq_index import IndexBuilder
+from spider.orb.orb_docstore import OrbDocStoreWriter
+from spider.orb.orb_graph import OrbGraphBuilder
+from spider.orb.orb_budget import OrbCrawlBudget
+
+__author__ = "Garrett Buchanan", "Livingstone Rwagatare"
+__copyright__ = "Copyright 2023, Westmont College"
+__credits__ = ["Garrett Buchanan", "Livingstone Rwagatare", "Mike Ryu"]
+__license__ = "MIT"
+__email__ = "mryu@westmont.edu"
+
+
+class _DocumentList(list):
+    """Document stream that keeps every document written to it apart."""
+    def write(self, content):
+        self.append(content)
+
+
+class RunSequentialCrawlTest(unittest.TestCase):
+    def setUp(self):
+        cwd = os.path.dirname(__file__)
+        self.seeds = [os.path.relpath("./data/spider.orb_{:02d}.in.html".format(i), cwd) for i in (3, 4)]
+        self.config = {
+            "seeds": self.seeds,
+            "options": {"remove_stopwords": False, "stopwords_lang": "english"},
+            "agent_config": {
+                "external": ["https://", "http://"],
+                "encoding": "UTF-8",
+                "parser": "html.parser",
+                "tags": {"p": {}, "dd": {}, "h2": {}},
+                "debug": False
+            }
+        }
+
+    def _crawl(self, doc_stream):
+        frontier = OrbUriFrontier(list(map(OrbURI, self.seeds)))
+        run_sequential_crawl(doc_stream, frontier, OrbDocDB(), OrbUriDB(), self.config)
+        return doc_stream
+
+    @staticmethod
+    def _print(freqs):
+        out = io.StringIO()
+        print_frequencies(freqs, out)
+        return out.getvalue()
+
+    def test_string_stream_is_rewound(self):
+        doc_stream = self._crawl(io.StringIO())
+        self.assertTrue(doc_stream.read().startswith("Four score and seven years ago"))
+
+    def test_streaming_counter_matches_string_stream(self):
+        tokens = remove_stopwords(tokenize_file(self._crawl(io.StringIO())), self.config)
+        expected = self._print(compute_twogram_freq(tokens))
+        actual = self._print(self._crawl(StreamingTwoGramCounter()).finish())
+        self.assertEqual(expected, actual)
+        self.assertFalse(actual.startswith("     0 total items"))
+
+    def test_index_receives_every_document(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            index = IndexBuilder(tmp_dir)
+            frontier = OrbUriFrontier(list(map(OrbURI, self.seeds)))
+            documents = _DocumentList()
+            run_sequential_crawl(documents, frontier, OrbDocDB(), OrbUriDB(), self.config, index=index)
+            with index.finish() as index:
+                self.assertEqual(len(documents), index.num_docs)
+                self.assertEqual(sum(len(index.tokenize(doc)) for doc in documents), index.total_tokens)
+                self.assertEqual(self.seeds[0], index.document(0)["uri"])
+                self.assertEqual(0, index.postings("four")[0].doc_id)
+
+    def test_store_receives_every_document(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            store = OrbDocStoreWriter(tmp_dir, block_size=64)
+            frontier = OrbUriFrontier(list(map(OrbURI, self.seeds)))
+            documents = _DocumentList()
+            run_sequential_crawl(documents, frontier, OrbDocDB(), OrbUriDB(), self.config, store=store)
+            with store.finish() as store:
+                self.assertEqual(documents, list(store.contents()))
+                self.assertEqual(self.seeds[0], next(iter(store)).uri)
+
+    def test_graph_records_every_link(self):
+        graph = OrbGraphBuilder()
+        frontier = OrbUriFrontier(list(map(OrbURI, self.seeds)))
+        run_sequential_crawl(io.StringIO(), frontier, OrbDocDB(), OrbUriDB(), self.config, graph=graph)
+        graph = graph.finish()
+        self.assertEqual(self.seeds[0], graph.uri(0))
+        self.assertTrue(graph.num_edges >= graph.num_nodes - 1)
+        self.assertEqual(graph.num_edges, int(graph.in_degrees().sum()))
+
+    def test_budget_stops_crawl(self):
+        budget = OrbCrawlBudget(max_pages=1)
+        frontier = OrbUriFrontier(list(map(OrbURI, self.seeds)))
+        documents = _DocumentList()
+        run_sequential_crawl(documents, frontier, OrbDocDB(), OrbUriDB(), self.config, budget=budget)
+        self.assertEqual(1, len(documents))
+        self.assertEqual("max_pages", budget.stopped)
+        self.assertTrue(budget.partial)
+        self.assertEqual(self.seeds[1], budget.remaining[0])
+        self.assertEqual(0, len(frontier))
+
+    def test_depth_budget_crawls_seeds_only(self):
+        budget = OrbCrawlBudget(max_depth=0)
+        frontier = OrbUriFrontier(list(map(OrbURI, self.seeds)))
+        run_sequential_crawl(_DocumentList(), frontier, OrbDocDB(), OrbUriDB(), self.config, budget=budget)
+        self.assertEqual(len(self.seeds), budget.pages)
+        self.assertIsNone(budget.stopped)
+
+    def test_unused_budget_is_complete(self):
+        budget = OrbCrawlBudget(max_pages=1000, max_seconds=600)
+        expected = self._crawl(_DocumentList())
+        frontier = OrbUriFrontier(list(map(OrbURI, self.seeds)))
+        documents = _DocumentList()
+        run_sequential_crawl(documents, frontier, OrbDocDB(), OrbUriDB(), self.config, budget=budget)
+        self.assertEqual(expected, documents)
+        self.assertFalse(budget.partial)
+        self.assertTrue(budget.bytes > 0)
+
+
+class CommandLineTest(unittest.TestCase):
+    def test_warc_rejects_streamed_pages(self):
+        src_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        config_path = os.path.join(os.path.dirname(src_dir), "data", "orb_net_bible.config.json")
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            result = subprocess.run([sys.executable, "-m", "spider.orb.orb_runner", config_path,
+                                     os.path.join(tmp_dir, "out.txt"), "--warc", tmp_dir, "--stream-bytes", "0"],
+                                    cwd=src_dir, capture_output=True, text=True)
+            self.assertEqual(2, result.returncode)
+            self.assertIn("--warc cannot be used with --stream-bytes", result.stderr)
+            self.assertEqual([], os.listdir(tmp_dir))  # rejected before anything is written
+
+
+class EntryPointStartupTest(unittest.TestCase):
+    """Guards against heavy modules creeping back into the import path of the command-line entry points."""
+    @staticmethod
+    def _modules_imported_by(module):
+        code = f"import sys; before = set(sys.modules); import {module}; print(*(set(sys.modules) - before))"
+        src_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        result = subprocess.run([sys.executable, "-c", code], cwd=src_dir, capture_output=True, text=True, check=True)
+        return set(result.stdout.split())
+
+    def test_orb_runner_imports_lazily(self):
+        imported = self._modules_imported_by("spider.orb.orb_runner")
+        self.assertIn("spider.orb.orb_models", imported)
+        self.assertFalse({"bs4", "nltk", "text_processing.freq_spill"} & imported)
+
+    def test_freq_counter_imports_lazily(self):
+        imported = self._modules_imported_by("text_processing.freq_counter")
+        self.assertFalse({"bs4", "nltk", "text_processing.freq_spill"} & imported)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+"""Unit tests for functions in `spider.orb.orb_scan`, and crawls seeded by them.
+"""
+
+import io
+import os
+import tempfile
+import unittest
+from spider.orb.orb_models import OrbURI, OrbUriFrontier, OrbDocDB, OrbUriDB, OrbAgent
+from spider.orb.orb_runner import run_sequential_crawl
+from spider.orb.orb_stats import OrbCrawlStats
+from spider.orb.orb_graph import OrbGraphBuilder
+from spider.orb.orb_scan import scan_corpus
+
+__author__ = "Garrett Buchanan", "Livingstone Rwagatare"
+__copyright__ = "Copyright 2023, Westmont College"
+__credits__ = ["Garrett Buchanan", "Livingstone Rwagatare", "Mike Ryu"]
+__license__ = "MIT"
+__email__ = "mryu@westmont.edu"
+
+FILES = {
+    "index.html": '<p>home page</p><a href="a/one.htm">one</a><a href="b/two.HTML">two</a>',
+    "notes.txt": "not a page",
+    "a/one.htm": '<p>first page</p><a href="../index.html">home</a>',
+    "a/deep/orphan.htm": "<p>nothing links here</p>",
+    "b/two.HTML": '<p>second page</p><a href="../a/one.htm">one</a>',
+    "c/three.html": "<p>first page</p>",  # same content as a/one.htm
+}
+
+
+class ScanCorpusTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = self.tmp_dir.name
+        for name, text in FILES.items():
+            path = os.path.join(self.root, *name.split("/"))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w', encoding="UTF-8") as page_file:
+                page_file.write(text)
+        self.config = {
+            "options": {"remove_stopwords": False},
+            "agent_config": {"external": ["https://", "http://"], "encoding": "UTF-8", "parser": "html.parser",
+                             "tags": {"p": {}}, "debug": False}
+        }
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _relative(self, uris):
+        return [os.path.relpath(uri.uri, self.root).replace(os.sep, "/") for uri in uris]
+
+    def test_scan(self):
+        uris = scan_corpus(self.root)
+        self.assertEqual(["index.html", "a/one.htm", "a/deep/orphan.htm", "b/two.HTML", "c/three.html"],
+                         self._relative(uris))
+        for uri in uris:
+            self.assertEqual(os.path.getsize(uri.uri), uri.props["size"])
+        self.assertEqual(self._relative(uris), self._relative(scan_corpus(self.root, workers=3)))
+        self.assertEqual(["notes.txt"], self._relative(scan_corpus(self.root, [".txt"])))
+        self.assertEqual(6, len(scan_corpus(self.root, [])))
+        self.assertEqual(["a/one.htm", "a/deep/orphan.htm", "c/three.html"],
+                         self._relative(scan_corpus(self.root, globs=["a/*", "c/*"])))
+        self.assertEqual([], scan_corpus(os.path.join(self.root, "missing")))
+
+    def test_size_hint(self):
+        uri = scan_corpus(self.root)[0]
+        agent = OrbAgent(uri, OrbDocDB(), OrbUriDB(), self.config["agent_config"])
+        agent.crawl()
+        self.assertEqual(uri.props["size"], agent.bytes_read)
+
+    def test_crawl_without_following_links(self):
+        stats = OrbCrawlStats()
+        graph = OrbGraphBuilder()
+        doc_str = io.StringIO()
+        run_sequential_crawl(doc_str, OrbUriFrontier(scan_corpus(self.root)), OrbDocDB(), OrbUriDB(), self.config,
+                             stats=stats, graph=graph, follow_links=False)
+        self.assertEqual(5, stats.counter("pages"))  # every page once, including the orphan
+        self.assertEqual(4, stats.counter("documents"))
+        self.assertEqual("home pagefirst pagenothing links heresecond page", doc_str.read())
+        self.assertEqual(4, graph.finish().num_edges)  # links are still extracted for the link graph
+
+    def test_skip_links(self):
+        config = dict(self.config["agent_config"], extract_links=False)
+        stats = OrbCrawlStats()
+        content_processor, link_processor = OrbAgent(OrbURI(os.path.join(self.root, "index.html")), OrbDocDB(),
+                                                     OrbUriDB(), config, stats).crawl()
+        self.assertEqual("home page", next(content_processor).content)
+        self.assertEqual([], link_processor.links)
+        self.assertEqual(0, stats.stage("links")["count"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,197 @@
+"""Unit tests for classes in `spider.orb.orb_scheduler`, against local `http.server`s on two ports standing in for
+two hosts.
+"""
+
+import os
+import threading
+import unittest
+from functools import partial
+from time import perf_counter
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+from spider.orb.orb_models import OrbURI, OrbDocDB, OrbUriDB, OrbUriFrontier
+from spider.orb.orb_http import OrbHttpPool
+from spider.orb.orb_budget import OrbCrawlBudget
+from spider.orb.orb_scheduler import OrbHostState, OrbHostScheduler
+from spider.orb.orb_runner import run_sequential_crawl
+
+__author__ = "Garrett Buchanan", "Livingstone Rwagatare"
+__copyright__ = "Copyright 2023, Westmont College"
+__credits__ = ["Garrett Buchanan", "Livingstone Rwagatare", "Mike Ryu"]
+__license__ = "MIT"
+__email__ = "mryu@westmont.edu"
+
+PAGE = "spider.orb_03.in.html"
+
+
+class _DocumentList(list):
+    """Document stream that keeps every document written to it apart."""
+    def write(self, content):
+        self.append(content)
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+
+class OrbHostStateTest(unittest.TestCase):
+    def test_token_bucket(self):
+        host = OrbHostState("a", rate=2.0, burst=1.0, max_concurrency=4, adaptive=False)
+        self.assertIsNone(host.ready_at(0.0))
+        host.queue.extend([OrbURI("http://a/1"), OrbURI("http://a/2")])
+        self.assertEqual(0.0, host.ready_at(0.0))
+        self.assertEqual("http://a/1", host.start(0.0).uri)
+        self.assertAlmostEqual(0.5, host.ready_at(0.0))
+        self.assertAlmostEqual(0.5, host.ready_at(0.25))
+        self.assertEqual(0.5, host.ready_at(0.5))
+
+    def test_unlimited_rate(self):
+        host = OrbHostState("a", rate=None, max_concurrency=2, adaptive=False)
+        host.queue.extend(OrbURI("http://a/{:d}".format(i)) for i in range(3))
+        host.start(0.0)
+        self.assertEqual(0.0, host.ready_at(0.0))
+        host.start(0.0)
+        self.assertIsNone(host.ready_at(0.0))  # at its concurrency limit
+        host.finish(0.1, True, 0.1)
+        self.assertEqual(0.1, host.ready_at(0.1))
+        self.assertEqual(2.0, host.limit)
+        self.assertEqual(2, host.peak_in_flight)
+
+    def test_additive_increase(self):
+        host = OrbHostState("a", rate=None, max_concurrency=3)
+        self.assertEqual(1.0, host.limit)
+        for limit in (2.0, 2.5, 2.9, 3.0):
+            host.queue.append(OrbURI("http://a/"))
+            host.start(0.0)
+            host.finish(0.1, True, 0.0)
+            self.assertAlmostEqual(limit, host.limit, places=1)
+
+    def test_multiplicative_decrease(self):
+        host = OrbHostState("a", rate=None, max_concurrency=8)
+        host.limit = 8.0
+        host.queue.extend(OrbURI("http://a/") for _ in range(4))
+        for _ in range(4):
+            host.start(0.0)
+        host.finish(0.5, True, 0.5)
+        self.assertEqual(8.0, host.limit)
+        host.finish(0.1, False, 1.0)
+        self.assertEqual(4.0, host.limit)
+        host.finish(0.1, False, 1.2)  # within one latency of the last decrease, so not decreased again
+        self.assertEqual(4.0, host.limit)
+        host.finish(0.1, False, 2.0)
+        self.assertEqual(2.0, host.limit)
+        self.assertEqual(3, host.errors)
+
+    def test_latency_congestion(self):
+        host = OrbHostState("a", rate=None, max_concurrency=8)
+        host.limit = 4.0
+        host.queue.extend(OrbURI("http://a/") for _ in range(4))
+        for _ in range(4):
+            host.start(0.0)
+        host.finish(0.01, True, 0.0)
+        self.assertGreater(host.limit, 4.0)
+        for now in (1.0, 2.0, 3.0):
+            host.finish(1.0, True, now)  # smoothed latency rises far above the best latency
+        self.assertLess(host.limit, 4.0)
+        self.assertEqual(0, host.errors)
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            OrbHostState("a", max_concurrency=0)
+        with self.assertRaises(ValueError):
+            OrbHostState("a", rate=0.0)
+
+
+class OrbHostSchedulerTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cwd = os.path.dirname(__file__)
+        cls.data_dir = os.path.abspath(os.path.relpath("./data", cwd))
+        cls.servers = [ThreadingHTTPServer(("127.0.0.1", 0), partial(_QuietHandler, directory=cls.data_dir))
+                       for _ in range(2)]
+        for server in cls.servers:
+            server.daemon_threads = True
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+        cls.bases = ["http://127.0.0.1:{:d}/".format(server.server_address[1]) for server in cls.servers]
+
+    @classmethod
+    def tearDownClass(cls):
+        for server in cls.servers:
+            server.shutdown()
+            server.server_close()
+
+    def setUp(self):
+        self.config = {
+            "options": {"remove_stopwords": False, "stopwords_lang": "english"},
+            "agent_config": {
+                "external": ["https://", "http://"],
+                "encoding": "UTF-8",
+                "parser": "html.parser",
+                "tags": {"p": {}, "dd": {}, "h2": {}},
+                "debug": False
+            }
+        }
+
+    def _crawl(self, seeds, fetcher=None, budget=None, **scheduler_options):
+        documents = _DocumentList()
+        frontier = OrbUriFrontier(list(map(OrbURI, seeds)))
+        if fetcher is not None:
+            frontier = fetcher = OrbHostScheduler(frontier, fetcher, **scheduler_options)
+        run_sequential_crawl(documents, frontier, OrbDocDB(), OrbUriDB(), self.config, budget=budget,
+                             fetcher=fetcher)
+        if fetcher is not None:
+            fetcher.close()
+        return documents, fetcher
+
+    def test_crawl_two_hosts(self):
+        expected, _ = self._crawl([os.path.relpath(os.path.join(self.data_dir, PAGE))])
+        with OrbHttpPool(hosts=["127.0.0.1"]) as pool:
+            documents, scheduler = self._crawl([base + PAGE for base in self.bases], pool, workers=4)
+        self.assertEqual(sorted(expected), sorted(documents))  # the second host's pages are duplicates
+        hosts = scheduler.to_dict()
+        self.assertEqual(2, len(hosts))
+        for host in hosts.values():
+            self.assertEqual(3, host["fetched"])
+            self.assertEqual(0, host["errors"])
+            self.assertLessEqual(host["peak_in_flight"], 2)  # one, then two once the seed was fetched
+        self.assertFalse(scheduler)
+
+    def test_local_uris_pass_through(self):
+        local = os.path.relpath(os.path.join(self.data_dir, PAGE))
+        with OrbHttpPool(hosts=["127.0.0.1"]) as pool:
+            documents, scheduler = self._crawl([local, self.bases[0] + PAGE], pool)
+        expected, _ = self._crawl([local])
+        self.assertEqual(expected, documents)  # the local seed is crawled first; the pages fetched are duplicates
+        self.assertEqual(3, scheduler.to_dict()[self.bases[0][7:-1]]["fetched"])
+
+    def test_rate_limit(self):
+        with OrbHttpPool(hosts=["127.0.0.1"]) as pool:
+            started = perf_counter()
+            self._crawl([self.bases[0] + PAGE], pool, rate=10.0, burst=1.0)
+            self.assertGreaterEqual(perf_counter() - started, 0.19)  # three requests, one every 0.1 seconds
+
+    def test_budget_drains_scheduler(self):
+        budget = OrbCrawlBudget(max_pages=1)
+        with OrbHttpPool(hosts=["127.0.0.1"]) as pool:
+            documents, _ = self._crawl([self.bases[0] + PAGE, self.bases[1] + PAGE], pool, budget=budget)
+        self.assertEqual("max_pages", budget.stopped)
+        self.assertEqual(1, budget.pages)
+        self.assertEqual(4, len(budget.remaining))  # the other seed, and the three links of the one crawled
+        self.assertIn("https://www.mikeryu.com", budget.remaining)
+
+    def test_from_options(self):
+        with OrbHttpPool() as pool:
+            scheduler = OrbHostScheduler.from_options(OrbUriFrontier([OrbURI("a.html")]), pool,
+                                                      {"http_workers": 2, "host_rate": None})
+            self.assertEqual(1, len(scheduler))
+            self.assertEqual("a.html", scheduler.pop().uri)
+            self.assertIsNone(scheduler.pop())
+            scheduler.close()
+        with self.assertRaises(ValueError):
+            OrbHostScheduler(OrbUriFrontier([OrbURI("a.html")]), OrbHttpPool(), workers=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
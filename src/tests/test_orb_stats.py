@@ -0,0 +1,77 @@
+"""Unit tests for classes in `spider.orb.orb_stats`.
+"""
+
+import os
+import json
+import tempfile
+import unittest
+from spider.orb.orb_models import OrbURI, OrbUriFrontier, OrbDocDB, OrbUriDB
+from spider.orb.orb_runner import run_sequential_crawl
+from spider.orb.orb_stats import OrbCrawlStats, NULL_STATS, STAGES, COUNTERS
+from text_processing.freq_stream import StreamingTwoGramCounter
+
+__author__ = "Garrett Buchanan", "Livingstone Rwagatare"
+__copyright__ = "Copyright 2023, Westmont College"
+__credits__ = ["Garrett Buchanan", "Livingstone Rwagatare", "Mike Ryu"]
+__license__ = "MIT"
+__email__ = "mryu@westmont.edu"
+
+
+class OrbCrawlStatsTest(unittest.TestCase):
+    def test_time_and_count(self):
+        stats = OrbCrawlStats()
+        with stats.time("parse"):
+            pass
+        stats.record("parse", 0.003)
+        stats.count("pages")
+        stats.count("bytes", 512)
+
+        parse = stats.stage("parse")
+        self.assertEqual(2, parse["count"])
+        self.assertGreaterEqual(parse["total_ms"], 3.0)
+        self.assertEqual(3.0, parse["max_ms"])
+        self.assertEqual(1, parse["histogram"]["<4096us"])
+        self.assertEqual(1, stats.counter("pages"))
+        self.assertEqual(512, stats.counter("bytes"))
+
+    def test_reset_and_dump(self):
+        stats = OrbCrawlStats()
+        stats.count("pages", 3)
+        stats.record("custom", 1.0)
+        stats.reset()
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "stats.json")
+            stats.dump(path)
+            with open(path, 'r', encoding="UTF-8") as stats_file:
+                dumped = json.load(stats_file)
+        self.assertEqual(list(STAGES), list(dumped["stages"]))
+        self.assertEqual(dict.fromkeys(COUNTERS, 0), dumped["counters"])
+
+    def test_null_stats(self):
+        self.assertFalse(NULL_STATS)
+        with NULL_STATS.time("parse"):
+            NULL_STATS.count("pages")
+        self.assertEqual(0, NULL_STATS.counter("pages"))
+        self.assertEqual({}, NULL_STATS.to_dict())
+
+    def test_sequential_crawl(self):
+        cwd = os.path.dirname(__file__)
+        seeds = [os.path.relpath("./data/spider.orb_{:02d}.in.html".format(i), cwd) for i in (3, 4, 4)]
+        config = {"agent_config": {"external": ["https://", "http://"], "encoding": "UTF-8",
+                                   "parser": "html.parser", "tags": {"p": {}, "dd": {}, "h2": {}}, "debug": False}}
+        stats = OrbCrawlStats()
+        run_sequential_crawl(StreamingTwoGramCounter(), OrbUriFrontier(list(map(OrbURI, seeds))),
+                             OrbDocDB(), OrbUriDB(), config, stats=stats)
+
+        self.assertGreaterEqual(stats.counter("pages"), 3)
+        self.assertEqual(stats.counter("pages"), stats.stage("parse")["count"])
+        self.assertGreater(stats.counter("bytes"), 0)
+        self.assertGreaterEqual(stats.counter("duplicates"), 1)  # the second copy of the last seed
+        self.assertGreater(stats.counter("links"), 0)
+        self.assertEqual(stats.counter("documents"), stats.stage("write")["count"])
+        self.assertEqual(stats.counter("pages") + stats.counter("failed_opens") + stats.counter("external"),
+                         stats.stage("open")["count"])
+
+
+if __name__ == '__main__':
+    unittest.main()
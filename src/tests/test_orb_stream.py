@@ -0,0 +1,137 @@
+"""Unit tests for classes in `spider.orb.orb_stream`, and crawls streaming every page with them.
+"""
+
+import io
+import os
+import json
+import tempfile
+import unittest
+from spider.orb.orb_models import OrbURI, OrbUriFrontier, OrbDocDB, OrbUriDB, OrbAgent, agent_class
+from spider.orb.orb_runner import run_sequential_crawl
+from spider.orb.orb_stats import OrbCrawlStats
+from spider.orb.orb_stream import OrbStreamAgent, OrbStreamParser
+from benchmarks.corpus_gen import generate_corpus
+
+__author__ = "Garrett Buchanan", "Livingstone Rwagatare"
+__copyright__ = "Copyright 2023, Westmont College"
+__credits__ = ["Garrett Buchanan", "Livingstone Rwagatare", "Mike Ryu"]
+__license__ = "MIT"
+__email__ = "mryu@westmont.edu"
+
+TRICKY_PAGE = """<html><head><title>t</title><style>p { color: red; }</style></head><body>
+<div class="note wide"><p>outer <b>bold</b> <p>nested &amp; &lt;escaped&gt;</p> tail</p></div>
+<p class="note">classy<br>after break <img src="x.png"></p>
+<script>var s = "<p>not a paragraph</p>";</script>
+<template><p>in a template</p></template><!-- <p>commented</p> -->
+<p>cdata <![CDATA[kept]]> and <i>unclosed</p></i> text</span>
+<div id="">empty id</div><div id="x">has id</div><div data-flag>flagged</div>
+<a href="one.htm">one</a><a>no href</a><a href="#top">anchor</a><a href="http://x.org/">x</a>
+<p>entities: &foo; &amp &#150; &#x2014; &nbsp;<pre> <b> </b>
+ </pre> <textarea>  </textarea></p> <p>
+<?pi?><b>x</b> <!DOCTYPE y><i>i<br/>j</br>k</i>
+<p>never closed <a href="two.htm">two</a>
+"""
+TRICKY_TAGS = {"p": {}, "b": {}, "div": {"class": "note"}, "i": {}, "img": {}, "br": {}}
+
+
+class OrbStreamParserTest(unittest.TestCase):
+    def setUp(self):
+        self.config = {"external": ["https://", "http://"], "encoding": "UTF-8", "parser": "html.parser",
+                       "tags": TRICKY_TAGS, "debug": False}
+
+    def _parse(self, page, tags, chunk_size):
+        parser = OrbStreamParser(tags)
+        for start in range(0, len(page), chunk_size):
+            parser.feed(page[start:start + chunk_size])
+        parser.close()
+        return parser.content(), list(parser.links)
+
+    def _expected(self, page, tags):
+        from bs4 import BeautifulSoup
+        agent = OrbAgent(OrbURI("page.htm"), OrbDocDB(), OrbUriDB(), dict(self.config, tags=tags))
+        soup = BeautifulSoup(page, "html.parser")
+        return agent._extract_content(soup), [tag.get('href') for tag in soup.find_all('a') if tag.get('href')]
+
+    def test_matches_beautiful_soup(self):
+        for tags in (TRICKY_TAGS, {"div": {"id": ""}}, {"div": {"id": True}}, {"div": {"class": ["x", "wide"]}},
+                     {"div": {"data-flag": ""}}, {"span": {}, "template": {}, "style": {}},
+                     {"pre": {}, "textarea": {}}):
+            expected = self._expected(TRICKY_PAGE, tags)
+            for chunk_size in (1, 7, 64, len(TRICKY_PAGE)):
+                self.assertEqual(expected, self._parse(TRICKY_PAGE, tags, chunk_size), (tags, chunk_size))
+
+    def test_content_in_tag_order(self):
+        page = "<h2>a</h2><p>b</p><h2>c</h2><p>d <h2>e</h2></p>"
+        self.assertEqual(("b d e a c e", []), self._parse(page, {"p": {}, "h2": {}}, 5))
+
+
+class OrbStreamAgentTest(unittest.TestCase):
+    def setUp(self):
+        cwd = os.path.dirname(__file__)
+        self.paths = [os.path.relpath("./data/spider.orb_{:02d}.in.html".format(i), cwd) for i in range(5)]
+        self.config = {
+            "external": ["https://", "http://"],
+            "encoding": "UTF-8",
+            "parser": "html.parser",
+            "tags": {"p": {}, "dd": {}, "h2": {}},
+            "debug": False,
+            "stream_chunk_size": 64
+        }
+
+    @staticmethod
+    def _drain(agent):
+        content_processor, link_processor = agent.crawl()
+        links = [uri.uri for uri in link_processor]
+        return [doc.content for doc in content_processor], links, link_processor.links, agent.bytes_read
+
+    def test_matches_eager_agent(self):
+        for path in self.paths + ["missing.html"]:
+            expected = self._drain(OrbAgent(OrbURI(path), OrbDocDB(), OrbUriDB(), self.config))
+            stats = OrbCrawlStats()
+            self.assertEqual(expected, self._drain(OrbStreamAgent(OrbURI(path), OrbDocDB(), OrbUriDB(), self.config,
+                                                                  stats)), path)
+            if path != "missing.html":
+                self.assertEqual(os.path.getsize(path), stats.counter("bytes"))
+
+    def test_links_before_end_of_page(self):
+        stats = OrbCrawlStats()
+        agent = OrbStreamAgent(OrbURI(self.paths[3]), OrbDocDB(), OrbUriDB(), self.config, stats)
+        content_processor, link_processor = agent.crawl()
+        next(link_processor)
+        self.assertLess(stats.counter("bytes"), os.path.getsize(self.paths[3]))  # the page was not read to the end
+        self.assertEqual(0, stats.stage("content")["count"])
+        list(content_processor)
+        self.assertEqual(os.path.getsize(self.paths[3]), stats.counter("bytes"))
+        self.assertIsNone(agent.page)
+
+    def test_agent_class(self):
+        path = self.paths[3]
+        size = os.path.getsize(path)
+        self.assertIs(OrbAgent, agent_class(path, self.config))
+        self.assertIs(OrbStreamAgent, agent_class(path, dict(self.config, stream_bytes=0)))
+        self.assertIs(OrbStreamAgent, agent_class(path, dict(self.config, stream_bytes=size)))
+        self.assertIs(OrbAgent, agent_class(path, dict(self.config, stream_bytes=size + 1)))
+        self.assertIs(OrbAgent, agent_class("missing.html", dict(self.config, stream_bytes=1)))
+        self.assertIs(OrbAgent, agent_class("http://x.org/", dict(self.config, stream_bytes=0)))
+
+
+class StreamedCrawlTest(unittest.TestCase):
+    def test_crawl_matches_eager_crawl(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with open(generate_corpus(tmp_dir, pages=60, page_words=80), 'r', encoding="UTF-8") as config_file:
+                config = json.load(config_file)
+            results = []
+            for stream_bytes in (None, 0):
+                config["agent_config"]["stream_bytes"] = stream_bytes
+                config["agent_config"]["stream_chunk_size"] = 100
+                stats = OrbCrawlStats()
+                doc_str = io.StringIO()
+                run_sequential_crawl(doc_str, OrbUriFrontier(list(map(OrbURI, config["seeds"]))), OrbDocDB(),
+                                     OrbUriDB(), config, stats=stats)
+                results.append((doc_str.read(), stats.counter("pages"), stats.counter("links"),
+                                stats.counter("bytes")))
+            self.assertEqual(results[0], results[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+"""Unit tests for classes in `spider.orb.orb_warc`.
+"""
+
+import io
+import os
+import gzip
+import tempfile
+import unittest
+from spider.orb.orb_models import OrbURI, OrbUriFrontier, OrbDocDB, OrbUriDB
+from spider.orb.orb_runner import run_sequential_crawl
+from spider.orb.orb_archive import OrbWarcArchive
+from spider.orb.orb_warc import OrbWarcWriter, OrbWarcReader, OrbWarcPage
+
+__author__ = "Garrett Buchanan", "Livingstone Rwagatare"
+__copyright__ = "Copyright 2023, Westmont College"
+__credits__ = ["Garrett Buchanan", "Livingstone Rwagatare", "Mike Ryu"]
+__license__ = "MIT"
+__email__ = "mryu@westmont.edu"
+
+
+class OrbWarcTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.warc_dir = os.path.join(self.tmp_dir.name, "warc")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_round_trip(self):
+        pages = [OrbWarcPage("http://a/{:d}.html".format(i), "<p>page {:d} é</p>".format(i).encode("UTF-8"),
+                             None if i % 3 == 0 else "page {:d}".format(i)) for i in range(50)]
+        writer = OrbWarcWriter(self.warc_dir, worker=2, batch_size=1000)
+        offsets = [writer.add(page.uri, page.page.decode("UTF-8"), page.content) for page in pages]
+        self.assertEqual(50, len(writer))
+        self.assertTrue(os.path.getsize(writer.path) > 0)  # batches were written out before `finish`
+        path = writer.finish()
+        self.assertEqual(os.path.join(self.warc_dir, "pages-002.warc.gz"), path)
+        self.assertEqual(sorted(offsets), offsets)
+
+        reader = OrbWarcReader(path)
+        self.assertEqual(pages, list(reader))
+        for page in reversed(pages):
+            self.assertEqual(page, reader.get(page.uri))
+        self.assertIsNone(reader.get("http://a/missing.html"))
+
+        with gzip.open(path, 'rb') as stream:  # a standard .warc.gz file, decompressed in one stream
+            data = stream.read()
+        self.assertEqual(1 + 50 + 33, data.count(b"WARC/1.1\r\n"))
+        archive = OrbWarcArchive(path)  # whose pages can be crawled in place
+        try:
+            self.assertEqual([page.uri for page in pages], archive.members())
+            self.assertEqual(pages[7].page, archive.read(pages[7].uri))
+        finally:
+            archive.close()
+
+    def test_uri_with_whitespace(self):
+        writer = OrbWarcWriter(self.warc_dir)
+        uris = ["/corpus/my  pages/a\tb.htm", "/corpus/my pages/a b.htm"]
+        for uri in uris:
+            writer.add(uri, "<p>{}</p>".format(uri), uri)
+        reader = OrbWarcReader(writer.finish())
+        for uri in uris:
+            self.assertEqual(uri, reader.get(uri).content)
+
+    def test_crawl(self):
+        data_dir = os.path.relpath("./data", os.path.dirname(__file__))
+        seed = os.path.join(data_dir, "spider.orb_03.in.html")
+        config = {
+            "options": {"remove_stopwords": False},
+            "agent_config": {"external": ["https://", "http://"], "encoding": "UTF-8", "parser": "html.parser",
+                             "tags": {"p": {}, "dd": {}, "h2": {}}, "debug": False}
+        }
+        writer = OrbWarcWriter(self.warc_dir)
+        run_sequential_crawl(io.StringIO(), OrbUriFrontier([OrbURI(seed)]), OrbDocDB(), OrbUriDB(), config,
+                             warc=writer)
+        pages = list(OrbWarcReader(writer.finish()))
+        self.assertEqual(seed, pages[0].uri)
+        self.assertGreater(len(pages), 1)
+        for page in pages:
+            with open(page.uri, 'rb') as page_file:
+                self.assertEqual(page_file.read(), page.page)
+        self.assertTrue(all(page.content for page in pages if page.content is not None))
+
+
+if __name__ == '__main__':
+    unittest.main()
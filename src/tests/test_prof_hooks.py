@@ -0,0 +1,80 @@
+"""Unit tests for `profiling.prof_hooks`.
+"""
+
+import os
+import pstats
+import tempfile
+import unittest
+from profiling.prof_hooks import RunProfiler, NULL_PROFILER
+
+__author__ = "Garrett Buchanan, Livingstone Rwagatare"
+__copyright__ = "Copyright 2023, Westmont College"
+__credits__ = ["Garrett Buchanan", "Livingstone Rwagatare", "Mike Ryu"]
+__license__ = "MIT"
+__email__ = "mryu@westmont.edu"
+
+
+def _work(n):
+    return sorted(str(i) for i in range(n))
+
+
+class RunProfilerTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.output_path = os.path.join(self.tmp_dir.name, "out.txt")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_disabled(self):
+        self.assertFalse(NULL_PROFILER)
+        with RunProfiler(None, self.output_path) as profiler:
+            with profiler.agent():
+                _work(10)
+        self.assertEqual([], os.listdir(self.tmp_dir.name))
+
+    def test_both(self):
+        with RunProfiler("both", self.output_path, top=5, snapshot_every=2) as profiler:
+            for _ in range(4):
+                with profiler.agent():
+                    _work(100)
+        self.assertIn("_work", str(pstats.Stats(profiler.pstats_path).stats))
+        with open(profiler.alloc_path, 'r', encoding="UTF-8") as report_file:
+            report = report_file.read()
+        self.assertTrue(report.startswith("Peak traced memory: "))
+        self.assertIn("Snapshot after 2 agents (top 5)", report)
+        self.assertIn("Snapshot after 4 agents (top 5)", report)
+        self.assertIn("Final snapshot after 4 agents (top 5)", report)
+
+    def test_sampling_profiles_every_nth_agent(self):
+        with RunProfiler("cpu", self.output_path, sample_every=3) as profiler:
+            _work(10)  # outside of any agent, so not profiled when sampling
+            for _ in range(7):
+                with profiler.agent():
+                    _work(10)
+        calls = {func[2]: stat[1] for func, stat in pstats.Stats(profiler.pstats_path).stats.items()}
+        self.assertEqual(2, calls["_work"])  # the 3rd and 6th agents
+        self.assertFalse(os.path.exists(profiler.alloc_path))
+
+    def test_from_options(self):
+        options = {"profile": "mem", "profile_sample_every": 4, "profile_top": 3}
+        profiler = RunProfiler.from_options(None, self.output_path, options, snapshot_every=10)
+        self.assertTrue(profiler.mem)
+        self.assertFalse(profiler.cpu)
+        self.assertTrue(RunProfiler.from_options("cpu", self.output_path, options).cpu)
+        self.assertRaises(ValueError, RunProfiler, "disk", self.output_path)
+
+    def test_from_options_explicit_arguments_take_precedence(self):
+        options = {"profile": "mem", "profile_snapshot_every": 2}
+        with RunProfiler.from_options(None, self.output_path, options, snapshot_every=0) as profiler:
+            for _ in range(4):
+                with profiler.agent():
+                    _work(10)
+        with open(profiler.alloc_path, 'r', encoding="UTF-8") as report_file:
+            report = report_file.read()
+        self.assertNotIn("Snapshot after 2 agents", report)  # 0 turns the config's periodic snapshots off
+        self.assertIn("Final snapshot after 4 agents", report)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""Provides a compact binary file format for frequency tables, with `write_frequency_file` to write one and
+`FrequencyFile` to look tokens up in (and render) one through `mmap` without loading it.
+
+A frequency file is laid out as follows (all fixed-size integers little-endian):
+
+* Header (`HEADER`): magic `FRQ1`, format version, flags (bit 0 set for two-gram tables, bit 1 for tables counted
+  from a partial crawl), total count, number of rows, rows per block, number of blocks, and the offsets of the
+  three sections below.
+* Vocabulary: every token with its count, sorted by token (UTF-8 bytes; a two-gram is stored as its two tokens
+  joined by a NUL byte) and front-coded in blocks, see `freq_codec.encode_front_coded`. Counts are varints.
+* Block index: the file offset of every vocabulary block, as unsigned 64-bit integers, to binary search them.
+* Ranks: for every row of the table in its original order (decreasing count, then token), the position of its
+  token in the sorted vocabulary, as unsigned 32-bit integers; this is what the text renderer walks.
+
+Example:
+    $ python3 -m text_processing.freq_binary ../out/freqs.bin ../out/freqs.txt
+    $ python3 -m text_processing.freq_binary ../out/freqs.bin --lookup "four score"
+"""
+
+from __future__ import annotations
+import io
+import os
+import sys
+import mmap
+import struct
+import argparse
+from array import array
+from collections import OrderedDict
+from text_processing.freq_models import Frequency, FrequencyTable, TwoGram
+from text_processing.freq_codec import encode_front_coded, FrontCodedReader, little_endian_view
+from text_processing.freq_utils import print_frequencies
+
+__author__ = "Garrett Buchanan, Livingstone Rwagatare"
+__copyright__ = "Copyright 2023, Westmont College"
+__credits__ = ["Garrett Buchanan", "Livingstone Rwagatare",
+               "Donald J. Patterson", "Mike Ryu", ]
+__license__ = "MIT"
+__email__ = "mryu@westmont.edu"
+
+MAGIC = b"FRQ1"
+FORMAT_VERSION = 1
+FLAG_PAIRS = 0x1
+FLAG_PARTIAL = 0x2
+HEADER = struct.Struct("<4sHHQQIIQQQ")
+DEFAULT_BLOCK_SIZE = 16  # Rows per front-coded vocabulary block.
+BLOCK_CACHE_SIZE = 4096  # Decoded vocabulary blocks kept while rendering.
+PAIR_SEPARATOR = b"\x00"
+
+
+def main() -> None:
+    pars = argparse.ArgumentParser(prog="python3 -m text_processing.freq_binary")
+    pars.add_argument("input_file_path", type=str, help="required path to a binary frequency file")
+    pars.add_argument("output_file_path", type=str, nargs='?',
+                      help="optional path to render the text output to (printed to the console otherwise)")
+    pars.add_argument("--lookup", type=str, nargs='+', default=None,
+                      help="optional tokens (or space-separated two-grams) to print the counts of instead")
+    args = pars.parse_args()
+
+    try:
+        with FrequencyFile(args.input_file_path) as frequencies:
+            if frequencies.partial:
+                print("Note: these frequencies were counted from a partial input.", file=sys.stderr)
+            if args.lookup:
+                for token in args.lookup:
+                    key = tuple(token.split(" ", 1)) if frequencies.pairs else token
+                    print("{:6d} {}".format(frequencies.get(key), token))
+            elif args.output_file_path:
+                with open(args.output_file_path, 'w', encoding="UTF-8") as output_file:
+                    print_frequencies(frequencies, output_file)
+            else:
+                print_frequencies(frequencies, sys.stdout)
+    except (OSError, ValueError) as e:
+        print("An error occurred while trying to open files:\n  ", e, file=sys.stderr)
+        exit(1)
+
+
+def write_frequency_file(frequencies, output_path: str, block_size: int = DEFAULT_BLOCK_SIZE,
+                         partial: bool = False) -> None:
+    """Writes a frequency table to `output_path` in the binary format described in the module documentation.
+
+    Accepts anything `print_frequencies` does: a `FrequencyTable`, an `ExternalFrequencies` (whose rows are read
+    into memory to sort them by token), or a list of `Frequency`s (whose tokens may be `TwoGram`s). Rows keep
+    their order, so rendering the file produces exactly what `print_frequencies` would print for `frequencies`.
+    Pass `partial=True` to flag the table as counted from an incomplete input, e.g., a crawl that ran out of budget.
+
+    """
+    tokens, counts, pairs = _columns(frequencies)
+    total = frequencies.total if hasattr(frequencies, "total") else sum(counts)
+    if pairs:
+        keys = [PAIR_SEPARATOR.join((first.encode("UTF-8"), second.encode("UTF-8"))) for first, second in tokens]
+    else:
+        keys = [token.encode("UTF-8") for token in tokens]
+    order = sorted(range(len(keys)), key=keys.__getitem__)
+    ranks = array('I', bytes(4 * len(keys)))
+    for position, row in enumerate(order):
+        ranks[row] = position
+
+    vocab_offset = HEADER.size
+    vocabulary = bytearray()
+    offsets = array('Q', (vocab_offset + offset for offset in
+                          encode_front_coded(((keys[row], counts[row]) for row in order), block_size, vocabulary)))
+    if sys.byteorder != "little":
+        offsets.byteswap()
+        ranks.byteswap()
+
+    blocks_offset = _align(vocab_offset + len(vocabulary), 8)
+    ranks_offset = blocks_offset + 8 * len(offsets)
+    with open(output_path, 'wb') as output_file:
+        flags = (FLAG_PAIRS if pairs else 0) | (FLAG_PARTIAL if partial else 0)
+        output_file.write(HEADER.pack(MAGIC, FORMAT_VERSION, flags, total, len(keys), block_size, len(offsets),
+                                      vocab_offset, blocks_offset, ranks_offset))
+        output_file.write(vocabulary)
+        output_file.write(bytes(blocks_offset - vocab_offset - len(vocabulary)))
+        offsets.tofile(output_file)
+        ranks.tofile(output_file)
+
+
+class FrequencyFile:
+    """Read-only frequency table backed by a memory-mapped binary frequency file.
+
+    Opening the file only reads its header; looking up a token binary searches the block index and decodes one
+    vocabulary block, straight from the mapping. It also provides the `total`, `len`, and `lines` that
+    `print_frequencies` uses, so the text output can be rendered from the binary file at any time.
+
+    Attributes:
+        _file (BufferedReader): the open binary file.
+        _buffer (mmap): contents of the file.
+        _total (int): total count of all rows.
+        _pairs (bool): whether the tokens are two-grams.
+        _partial (bool): whether the table was counted from an incomplete input.
+        _vocab (FrontCodedReader): sorted, front-coded tokens and their counts.
+        _ranks (Sequence[int]): position in `_vocab` of every row, in the table's original order.
+        _blocks (OrderedDict[int, list]): recently decoded vocabulary blocks.
+
+    """
+    def __init__(self, path: str) -> None:
+        self._file = open(path, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        if size < HEADER.size:
+            self._file.close()
+            raise ValueError("Not a binary frequency file: {}".format(path))
+        self._buffer = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, flags, total, rows, block_size, blocks, _, blocks_offset, ranks_offset = \
+            HEADER.unpack_from(self._buffer, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            self._buffer.close()
+            self._file.close()
+            raise ValueError("Not a binary frequency file (or an unsupported version): {}".format(path))
+        self._total = total
+        self._pairs = bool(flags & FLAG_PAIRS)
+        self._partial = bool(flags & FLAG_PARTIAL)
+        self._block_size = block_size
+        self._vocab = FrontCodedReader(self._buffer, little_endian_view(self._buffer, blocks_offset, blocks, 'Q'),
+                                       rows, block_size)
+        self._ranks = little_endian_view(self._buffer, ranks_offset, rows, 'I')
+        self._blocks: OrderedDict[int, list] = OrderedDict()
+
+    @property
+    def total(self) -> int:
+        return self._total
+
+    @property
+    def pairs(self) -> bool:
+        return self._pairs
+
+    @property
+    def partial(self) -> bool:
+        """Whether the table was flagged as counted from an incomplete input when it was written."""
+        return self._partial
+
+    def __len__(self) -> int:
+        return len(self._vocab)
+
+    def get(self, token: object, default: int = 0) -> int:
+        """Returns the count of `token` (a `str`, or for two-grams a `TwoGram` or `(object1, object2)` tuple)."""
+        return self._vocab.get(self._key(token), default)
+
+    def __contains__(self, token: object) -> bool:
+        return self._vocab.get(self._key(token)) is not None
+
+    def rows(self):
+        """Yields `(token, count)` rows in the table's original order."""
+        block_size = self._block_size
+        for position in self._ranks:
+            key, count = self._block(position // block_size)[position % block_size]
+            yield self._token(key), count
+
+    def items(self, start: object = None):
+        """Yields `(token, count)` rows in token order, starting from the first token not less than `start`."""
+        for key, count in self._vocab.items(b"" if start is None else self._key(start)):
+            yield self._token(key), count
+
+    def lines(self):
+        """Yields the rows formatted as `print_frequencies` output lines."""
+        if self._pairs:
+            for token, count in self.rows():
+                yield "{:6d} <{}:{}>\n".format(count, *token)
+        else:
+            for token, count in self.rows():
+                yield "{:6d} {}\n".format(count, token)
+
+    def __iter__(self):
+        for token, count in self.rows():
+            yield Frequency(TwoGram(*token) if self._pairs else token, count)
+
+    def render(self) -> str:
+        """Returns the text `print_frequencies` prints for this table."""
+        out = io.StringIO()
+        print_frequencies(self, out)
+        return out.getvalue()
+
+    def close(self) -> None:
+        self._blocks.clear()
+        for view in (self._vocab.offsets, self._ranks):
+            if isinstance(view, memoryview):
+                view.release()
+        self._buffer.close()
+        self._file.close()
+
+    def __enter__(self) -> FrequencyFile:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _key(self, token: object) -> bytes:
+        if self._pairs:
+            first, second = (token.object1, token.object2) if isinstance(token, TwoGram) else token
+            return PAIR_SEPARATOR.join((first.encode("UTF-8"), second.encode("UTF-8")))
+        return token.encode("UTF-8")
+
+    def _token(self, key: bytes) -> str | tuple[str, str]:
+        if self._pairs:
+            first, second = key.split(PAIR_SEPARATOR, 1)
+            return first.decode("UTF-8"), second.decode("UTF-8")
+        return key.decode("UTF-8")
+
+    def _block(self, block: int) -> list[tuple[bytes, int]]:
+        pairs = self._blocks.get(block)
+        if pairs is None:
+            pairs = self._blocks[block] = self._vocab.block(block)
+            if len(self._blocks) > BLOCK_CACHE_SIZE:
+                self._blocks.popitem(last=False)
+        return pairs
+
+
+def _columns(frequencies) -> tuple[list, list[int], bool]:
+    """Returns the tokens, the counts, and whether the tokens are two-grams (as `(object1, object2)` tuples)."""
+    if isinstance(frequencies, FrequencyTable):
+        tokens, counts = frequencies.tokens(), frequencies.counts()
+    elif hasattr(frequencies, "rows"):
+        rows = list(frequencies.rows())
+        tokens, counts = [token for token, _ in rows], [count for _, count in rows]
+    else:
+        tokens, counts = [freq.token for freq in frequencies], [freq.freq for freq in frequencies]
+    pairs = bool(tokens) and isinstance(tokens[0], (tuple, TwoGram))
+    if pairs:
+        tokens = [(token.object1, token.object2) if isinstance(token, TwoGram) else token for token in tokens]
+    return tokens, counts, pairs
+
+
+def _align(offset: int, alignment: int) -> int:
+    return -(-offset // alignment) * alignment
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,211 @@
+#!/usr/bin/env python
+"""Provides variable-length integer (varint), delta, and front coding helpers for the binary index and frequency
+files.
+"""
+
+from __future__ import annotations
+import sys
+from array import array
+
+__author__ = "Garrett Buchanan, Livingstone Rwagatare"
+__copyright__ = "Copyright 2023, Westmont College"
+__credits__ = ["Garrett Buchanan", "Livingstone Rwagatare",
+               "Donald J. Patterson", "Mike Ryu", ]
+__license__ = "MIT"
+__email__ = "mryu@westmont.edu"
+
+
+def encode_varint(value: int, out: bytearray) -> None:
+    """Appends the non-negative `value` to `out` as a LEB128 varint: 7 bits per byte, low bits first, with the
+    high bit of every byte but the last set. Values below 128 take a single byte."""
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def encode_varints(values, out: bytearray) -> None:
+    """Appends every non-negative integer in `values` to `out` as a varint."""
+    append = out.append
+    for value in values:
+        while value >= 0x80:
+            append((value & 0x7F) | 0x80)
+            value >>= 7
+        append(value)
+
+
+def encode_deltas(values, out: bytearray, previous: int = 0) -> int:
+    """Appends the gaps between consecutive values of the non-decreasing `values` (the first one taken from
+    `previous`) to `out` as varints, and returns the last value."""
+    append = out.append
+    for value in values:
+        gap, previous = value - previous, value
+        while gap >= 0x80:
+            append((gap & 0x7F) | 0x80)
+            gap >>= 7
+        append(gap)
+    return previous
+
+
+def decode_varint(buffer, pos: int) -> tuple[int, int]:
+    """Decodes the varint starting at `buffer[pos]`; returns the value and the position right after it."""
+    byte = buffer[pos]
+    if byte < 0x80:
+        return byte, pos + 1
+    value, shift = byte & 0x7F, 7
+    while True:
+        pos += 1
+        byte = buffer[pos]
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos + 1
+        shift += 7
+
+
+def decode_varints(buffer, pos: int, count: int) -> tuple[list[int], int]:
+    """Decodes `count` consecutive varints starting at `buffer[pos]`; returns them and the position after them."""
+    values = []
+    append = values.append
+    for _ in range(count):
+        byte = buffer[pos]
+        pos += 1
+        if byte < 0x80:
+            append(byte)
+            continue
+        value, shift = byte & 0x7F, 7
+        while True:
+            byte = buffer[pos]
+            pos += 1
+            value |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                break
+            shift += 7
+        append(value)
+    return values, pos
+
+
+def decode_deltas(buffer, pos: int, count: int, previous: int = 0) -> tuple[list[int], int]:
+    """Decodes `count` gaps written by `encode_deltas` back into values; returns them and the position after them."""
+    gaps, pos = decode_varints(buffer, pos, count)
+    values = []
+    append = values.append
+    for gap in gaps:
+        previous += gap
+        append(previous)
+    return values, pos
+
+
+def encode_front_coded(items, block_size: int, out: bytearray) -> list[int]:
+    """Appends the `(key, value)` pairs in `items` to `out` as front-coded blocks; returns the offset in `out` of
+    every block.
+
+    Keys are `bytes` in increasing order, values non-negative integers. Every block of `block_size` keys starts with
+    its first key in full (`len(key), key, value`); every other key only stores the length of the prefix it shares
+    with the key before it and the rest (`shared, len(rest), rest, value`). Sorted keys tend to share long prefixes,
+    so this is much smaller than storing every key, while any key can still be found by binary searching the first
+    keys of the blocks and decoding a single block (see `FrontCodedReader`).
+
+    """
+    offsets = []
+    previous = b""
+    for i, (key, value) in enumerate(items):
+        if i % block_size == 0:
+            offsets.append(len(out))
+            encode_varints((len(key),), out)
+            out += key
+        else:
+            shared = 0
+            limit = min(len(key), len(previous))
+            while shared < limit and key[shared] == previous[shared]:
+                shared += 1
+            encode_varints((shared, len(key) - shared), out)
+            out += key[shared:]
+        encode_varint(value, out)
+        previous = key
+    return offsets
+
+
+class FrontCodedReader:
+    """Looks up and scans `(key, value)` pairs front-coded by `encode_front_coded`, straight from a buffer.
+
+    The buffer is typically a memory-mapped file, so nothing is read until a block is needed; a lookup binary
+    searches the blocks' first keys and then decodes a single block.
+
+    Attributes:
+        _buffer (mmap | bytes): buffer holding the blocks.
+        _offsets (Sequence[int]): offset of every block in `_buffer`.
+        _count (int): number of pairs.
+        _block_size (int): number of pairs per block (the last block may hold fewer).
+
+    """
+    def __init__(self, buffer, offsets, count: int, block_size: int) -> None:
+        self._buffer = buffer
+        self._offsets = offsets
+        self._count = count
+        self._block_size = block_size
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def offsets(self):
+        return self._offsets
+
+    def first_key(self, block: int) -> bytes:
+        length, pos = decode_varint(self._buffer, self._offsets[block])
+        return bytes(self._buffer[pos:pos + length])
+
+    def block(self, block: int) -> list[tuple[bytes, int]]:
+        """Decodes every `(key, value)` pair of a block."""
+        buffer = self._buffer
+        length, pos = decode_varint(buffer, self._offsets[block])
+        key = bytes(buffer[pos:pos + length])
+        value, pos = decode_varint(buffer, pos + length)
+        pairs = [(key, value)]
+        for _ in range(min(self._block_size, self._count - block * self._block_size) - 1):
+            shared, pos = decode_varint(buffer, pos)
+            length, pos = decode_varint(buffer, pos)
+            key = key[:shared] + bytes(buffer[pos:pos + length])
+            value, pos = decode_varint(buffer, pos + length)
+            pairs.append((key, value))
+        return pairs
+
+    def find(self, key: bytes) -> int:
+        """Returns the index of the last block whose first key is not greater than `key` (-1 if there is none)."""
+        low, high = 0, len(self._offsets)
+        while low < high:
+            middle = (low + high) // 2
+            if self.first_key(middle) <= key:
+                low = middle + 1
+            else:
+                high = middle
+        return low - 1
+
+    def get(self, key: bytes, default: int = None) -> int | None:
+        """Returns the value of `key`, or `default` if it is not in the table."""
+        block = self.find(key)
+        if block < 0:
+            return default
+        for block_key, value in self.block(block):
+            if block_key == key:
+                return value
+        return default
+
+    def items(self, start: bytes = b""):
+        """Yields every `(key, value)` pair with a key of at least `start`, in key order."""
+        for block in range(max(self.find(start), 0), len(self._offsets)):
+            for key, value in self.block(block):
+                if key >= start:
+                    yield key, value
+
+
+def little_endian_view(buffer, offset: int, count: int, typecode: str):
+    """Returns `count` little-endian integers of the `array` `typecode` at `buffer[offset:]` without copying them
+    where possible (a `memoryview`), or as a byte-swapped `array` copy on big-endian machines."""
+    size = array(typecode).itemsize
+    view = memoryview(buffer)[offset:offset + count * size]
+    if sys.byteorder == "little":
+        return view.cast(typecode)
+    values = array(typecode, view.tobytes())
+    values.byteswap()
+    return values
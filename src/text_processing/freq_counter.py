@@ -2,10 +2,18 @@
 """Counts the total number of either words of `TwoGram`s in a text file.
 """
 
+from __future__ import annotations
 import sys
 import argparse
-from text_processing.freq_models import TwoGram, Frequency
-from text_processing.freq_utils import tokenize_file, print_frequencies
+from collections import Counter
+from itertools import islice
+from typing import TYPE_CHECKING
+from text_processing.freq_utils import tokenize_file, order_frequencies, print_frequencies
+from profiling.prof_hooks import RunProfiler, add_profile_arguments
+
+if TYPE_CHECKING:
+    from text_processing.freq_models import FrequencyTable
+    from text_processing.freq_spill import ExternalFrequencies
 
 __author__ = "Garrett Buchanan, Livingstone Rwagatare"
 __copyright__ = "Copyright 2023, Westmont College"
@@ -22,16 +30,24 @@ def main() -> None:
         pars.error("Processing mode must be either 1 (word) or 2 (twogram).")
 
     try:
-        with open(args.input_file_path, 'r', encoding="UTF-8") as input_file:
-            tokens = tokenize_file(input_file)
-        if args.processing_mode == 1:
-            frequencies = compute_word_freq(tokens)
-        elif args.processing_mode == 2:
-            frequencies = compute_twogram_freq(tokens)
-        with open(args.output_file_path, 'w', encoding="UTF-8") as output_file:
+        with RunProfiler(args.profile, args.output_file_path):  # does nothing unless `--profile` is given
+            with open(args.input_file_path, 'r', encoding="UTF-8") as input_file:
+                tokens = tokenize_file(input_file)
+            spill = dict(budget=args.spill_budget, temp_dir=args.spill_dir, compress=args.spill_compress)
+            if args.processing_mode == 1:
+                frequencies = compute_word_freq(tokens, **spill)
+            elif args.processing_mode == 2:
+                frequencies = compute_twogram_freq(tokens, **spill)
             if args.verbose:
                 print_frequencies(frequencies, sys.stdout)
-            print_frequencies(frequencies, output_file)
+            if args.format == "binary":  # compact, memory-mappable file; render it with `freq_binary` when needed
+                from text_processing.freq_binary import write_frequency_file
+                write_frequency_file(frequencies, args.output_file_path)
+            else:
+                with open(args.output_file_path, 'w', encoding="UTF-8") as output_file:
+                    print_frequencies(frequencies, output_file)
+            if hasattr(frequencies, "close"):  # frequencies spilled to disk hold on to their run files until closed
+                frequencies.close()
         if args.verbose:  # DO NOT get rid of this -- this will be useful in debugging.
             pass
     except OSError as e:  # Leave this `except` block as-is.
@@ -48,59 +64,80 @@ def setup_argument_parser():
                       help="required string containing the path to a text file to write the output to")
     pars.add_argument("-v", "--verbose", action="store_true",
                       help="switch to enable verbose mode to mirror (print) the output to console")
+    pars.add_argument("--spill-budget", type=int, default=None, metavar="N",
+                      help="optional number of unique items to keep in memory before spilling sorted runs to disk")
+    pars.add_argument("--spill-dir", type=str, default=None, metavar="DIR",
+                      help="optional directory to write spilled runs to (defaults to the system temp directory)")
+    pars.add_argument("--spill-compress", action="store_true",
+                      help="switch to gzip-compress spilled runs")
+    pars.add_argument("--format", type=str, default="text", choices=("text", "binary"),
+                      help="output file format: text (as printed) or binary (see `text_processing.freq_binary`)")
+    add_profile_arguments(pars)
     return pars
 
 
-def compute_word_freq(tokens: list[str]) -> list[Frequency]:
-    """Takes the input list of words and processes it, returning a list of `Frequency`s.
+def compute_word_freq(tokens: list[str], budget: int = None, temp_dir: str = None,
+                      compress: bool = False) -> FrequencyTable | ExternalFrequencies:
+    """Takes the input list of words and processes it, returning a `FrequencyTable` (a sequence of `Frequency`s).
 
     This function expects a list of lowercase alphanumeric strings (in any spoken language).
-    If the input list is `None` or empty, an empty list is returned.
+    If the input list is `None` or empty, an empty table (equal to `[]`) is returned.
 
-    There is one `Frequency` in the output list for every unique word in the original list.
+    There is one `Frequency` in the output table for every unique word in the original list.
     The frequency of each word is equal to the number of times that word occurs in the original list.
 
+    If a spill `budget` is given, at most about that many unique words are counted in memory at a time; the rest
+    are spilled to sorted run files and merged back on disk (see `ExternalFrequencyCounter`), in which case an
+    `ExternalFrequencies` with the same rows is returned instead of a table.
+
     Args:
         tokens (list[str]): list of lowercase words in any spoken language including numbers (e.g., 1, 123).
                             This list will not be modified.
+        budget (int): optional number of unique words to keep in memory before spilling to disk.
+        temp_dir (str): optional directory for spilled runs; defaults to the system temp directory.
+        compress (bool): whether spilled runs are gzip-compressed.
 
     Yields:
-        A list ordered by decreasing frequency, with tied words sorted lexicographically.
+        A table ordered by decreasing frequency, with tied words sorted lexicographically.
 
     Example:
         >>> word_freq = compute_word_freq(["this", "sentence", "repeats", "the", "word", "sentence"])
         >>> print(list(map(str, word_freq)))
         ["sentence:2", "repeats:1", "the:1", "this:1",  "word:1"]
     """
-    # Returns an empty list if tokens is type None of there is nothing in the inputed list
+    from text_processing.freq_models import FrequencyTable  # imported on first use, like the disk backend below
+    # Returns an empty table if tokens is type None of there is nothing in the inputed list
     if tokens is None or len(tokens) == 0:
-        return[]
-    # Create a dictionary
-    wordsFrequency = {}
-    # Iterate through tokens until there is nothing left in tokens
-    for token in tokens:
-        if token in wordsFrequency:
-            wordsFrequency[token] += 1
-        else:
-            wordsFrequency[token] = 1
-    # Create a list freq_list       
-    freq_list = [Frequency(word, count) for word, count in wordsFrequency.items()]
-    # Return the sorted freq list
-    return sorted(freq_list, key=lambda x: (-x.freq, x.token))
-
-def compute_twogram_freq(tokens: list[str]) -> list[Frequency]:
-    """Takes the input list of words and processes it, returning a list of `Frequency`s.
-
-    This function expects a list of tokens. If the input list is `None` or empty, an empty list is returned.
-
-    There is one `Frequency` in the output list for every unique `TwoGram` in the original list.
+        return FrequencyTable([], [], 0)
+    # Count on disk if a spill budget was given (the disk backend is only imported when it is needed)
+    if budget is not None:
+        from text_processing.freq_spill import ExternalFrequencyCounter
+        counter = ExternalFrequencyCounter(budget, temp_dir, compress)
+        counter.update(tokens)
+        return counter.finish()
+    # Count every word, then order the rows by bucketing them on their counts
+    words, counts = order_frequencies(Counter(tokens))
+    return FrequencyTable(words, counts, len(tokens))
+
+def compute_twogram_freq(tokens: list[str], budget: int = None, temp_dir: str = None,
+                         compress: bool = False) -> FrequencyTable | ExternalFrequencies:
+    """Takes the input list of words and processes it, returning a `FrequencyTable` (a sequence of `Frequency`s).
+
+    This function expects a list of tokens. If the input list is `None` or empty, an empty table is returned.
+
+    There is one `Frequency` in the output table for every unique `TwoGram` in the original list.
     The frequency of each `TwoGram`s is equal to the number of times that `TwoGram` occurs in the original list.
 
+    A spill `budget` bounds the number of unique `TwoGram`s counted in memory, exactly as in `compute_word_freq`.
+
     Args:
         tokens (list[str]): list of `TwoGrams`. This list will not be modified.
+        budget (int): optional number of unique `TwoGram`s to keep in memory before spilling to disk.
+        temp_dir (str): optional directory for spilled runs; defaults to the system temp directory.
+        compress (bool): whether spilled runs are gzip-compressed.
 
     Yields:
-        A list ordered by decreasing frequency, with tied `TwoGram`s sorted lexicographically.
+        A table ordered by decreasing frequency, with tied `TwoGram`s sorted lexicographically.
 
     Example:
         >>> import sys
@@ -116,22 +153,19 @@ def compute_twogram_freq(tokens: list[str]) -> list[Frequency]:
              1 <think:you>
              1 <you:know>
     """
-    # Returns an empty list if tokens is type None of there is nothing in the inputed list
+    from text_processing.freq_models import FrequencyTable  # imported on first use, like the disk backend below
+    # Returns an empty table if tokens is type None of there is nothing in the inputed list
     if tokens is None or len(tokens) == 0:
-        return []
-    # Create a dictionary for twogramFrequencies
-    twogramFrequencies = {}
-    # Iterate through tokens until there is nothing left in tokens
-    for i in range(len(tokens) - 1):
-        twogram = TwoGram(tokens[i], tokens[i+1])
-        if twogram in twogramFrequencies:
-            twogramFrequencies[twogram] += 1
-        else:
-            twogramFrequencies[twogram] = 1
-    # Create a list freq_list
-    freq_list = [Frequency(twogram, count) for twogram, count in twogramFrequencies.items()]
-    # Return the sorted list
-    return sorted(freq_list, key=lambda x: (-x.freq, x.token))
+        return FrequencyTable([], [], 0)
+    # Count on disk if a spill budget was given (the disk backend is only imported when it is needed)
+    if budget is not None:
+        from text_processing.freq_spill import ExternalFrequencyCounter
+        counter = ExternalFrequencyCounter(budget, temp_dir, compress, pairs=True)
+        counter.update(zip(tokens, islice(tokens, 1, None)))
+        return counter.finish()
+    # Count adjacent pairs as plain tuples; they only become `TwoGram`s when the table is indexed
+    twograms, counts = order_frequencies(Counter(zip(tokens, islice(tokens, 1, None))))
+    return FrequencyTable(twograms, counts, len(tokens) - 1, pairs=True)
 
 
 if __name__ == '__main__':
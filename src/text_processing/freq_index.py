@@ -0,0 +1,436 @@
+#!/usr/bin/env python3
+"""Provides `IndexBuilder` and `InvertedIndex` for building a positional inverted index of crawled documents on disk
+and querying it afterwards without re-crawling.
+
+An index is a directory holding:
+
+* `terms.bin`: every indexed token with its term ID, as a binary frequency file (see `freq_binary`) whose rows are
+  in term ID order, so terms are looked up by binary search over its memory-mapped, front-coded vocabulary.
+* `lexicon.bin`: for every term ID, the offset and size of its postings in `postings.bin`, its document frequency,
+  its collection frequency, and its largest within-document frequency (as little-endian unsigned 64-bit integers).
+* `postings.bin`: the postings of every term, ordered by term ID. A term's postings list every document containing
+  it in order of document ID, each as the varint gap from the previous document ID, the term frequency, and the
+  gaps between the term's positions in the document.
+* `doclens.bin`: the length (in tokens) of every document, as little-endian unsigned 32-bit integers by document ID.
+* `docs.jsonl`: the URI and title of every document, one JSON object per line, ordered by document ID.
+* `stopwords.txt`: the stopwords removed from the documents (and to be removed from queries), if any.
+* `meta.json`: format version and totals.
+
+Example:
+    $ python3 -m text_processing.freq_index ../out/index score years
+"""
+
+from __future__ import annotations
+import os
+import sys
+import json
+import mmap
+import heapq
+import shutil
+import argparse
+from array import array
+from text_processing.freq_models import Vocabulary, Posting, FrequencyTable
+from text_processing.freq_codec import encode_varint, encode_varints, encode_deltas, decode_varint, \
+    decode_varints, decode_deltas, little_endian_view
+from text_processing.freq_binary import write_frequency_file, FrequencyFile
+from text_processing.freq_stream import TOKEN_PATTERN
+from text_processing.freq_stopwords import StopwordFilter
+
+__author__ = "Garrett Buchanan, Livingstone Rwagatare"
+__copyright__ = "Copyright 2023, Westmont College"
+__credits__ = ["Garrett Buchanan", "Livingstone Rwagatare",
+               "Donald J. Patterson", "Mike Ryu", ]
+__license__ = "MIT"
+__email__ = "mryu@westmont.edu"
+
+INDEX_VERSION = 2
+DEFAULT_SEGMENT_BUDGET = 32 * 1024 * 1024  # Bytes of encoded postings buffered in memory before flushing a segment.
+LEXICON_COLUMNS = 5  # offset, size, document frequency, collection frequency, and max term frequency per term.
+META_FILE, TERMS_FILE, LEXICON_FILE, POSTINGS_FILE = "meta.json", "terms.bin", "lexicon.bin", "postings.bin"
+DOCS_FILE, DOC_LENGTHS_FILE, STOPWORDS_FILE = "docs.jsonl", "doclens.bin", "stopwords.txt"
+
+
+def main() -> None:
+    pars = argparse.ArgumentParser(prog="python3 -m text_processing.freq_index")
+    pars.add_argument("index_dir", type=str, help="required path to an index directory written by `IndexBuilder`")
+    pars.add_argument("terms", type=str, nargs='+', help="terms to print the postings of")
+    args = pars.parse_args()
+
+    with InvertedIndex(args.index_dir) as index:
+        print("{:d} documents, {:d} tokens, {:d} terms".format(index.num_docs, index.total_tokens, len(index)))
+        for term in index.tokenize(" ".join(args.terms)):
+            print("{} (df {:d}, cf {:d})".format(term, index.doc_freq(term), index.coll_freq(term)))
+            for posting in index.postings(term):
+                print("  {:6d} {}".format(posting.tf, index.document(posting.doc_id)["uri"]))
+
+
+class IndexBuilder:
+    """Builds a positional inverted index from documents as they are added, with bounded memory.
+
+    Every document added is tokenized like `tokenize_file` would tokenize it (optionally removing stopwords), its
+    tokens are interned in a `Vocabulary`, and its postings are appended, already varint- and delta-encoded, to an
+    in-memory buffer per term ID. Whenever the buffered postings reach `segment_budget` bytes
+    (`DEFAULT_SEGMENT_BUDGET` if it is `None`), they are flushed to a segment file ordered by term ID and the buffer
+    starts over. `finish` then merges all segments (plus whatever is still buffered) in a single k-way pass into the
+    final postings file. Since documents are numbered in the order they are added, a term's postings from
+    consecutive segments simply follow each other; merging only has to re-encode the first document ID gap of every
+    segment's postings.
+
+    Only the vocabulary and one length per document are held in memory for the whole build. Document URIs and
+    titles are written to disk as they are added.
+
+    Attributes:
+        _index_dir (str): directory the index is written to.
+        _stopwords (StopwordFilter | None): filter for the tokens not to index.
+        _budget (int): bytes of encoded postings to buffer before flushing a segment.
+        _vocab (Vocabulary): term IDs of every token indexed so far.
+        _buffer (dict[int, list]): per term ID, `[postings, df, cf, max_tf, first_doc, last_doc]` buffered since
+            the last flush, where `postings` is a `bytearray` of encoded postings after the first document ID.
+        _buffered (int): bytes of encoded postings in `_buffer`.
+        _segments (list[str]): paths of the segment files flushed so far.
+        _doc_lengths (array): length of every document added so far, in tokens.
+
+    """
+    def __init__(self, index_dir: str, stopwords: StopwordFilter = None,
+                 segment_budget: int = None) -> None:
+        if segment_budget is None:
+            segment_budget = DEFAULT_SEGMENT_BUDGET
+        if segment_budget < 1:
+            raise ValueError("Segment budget must be a positive number of bytes.")
+        os.makedirs(index_dir, exist_ok=True)
+        self._index_dir = index_dir
+        self._stopwords = stopwords if stopwords else None
+        self._budget = segment_budget
+        self._vocab = Vocabulary()
+        self._buffer: dict[int, list] = {}
+        self._buffered = 0
+        self._segments: list[str] = []
+        self._doc_lengths = array('I')
+        self._docs_file = open(os.path.join(index_dir, DOCS_FILE), 'w', encoding="UTF-8")
+
+    @property
+    def num_docs(self) -> int:
+        return len(self._doc_lengths)
+
+    def add(self, doc, uri: str = None) -> int:
+        """Indexes the content of `doc` (an `OrbDoc`, or any `SpiderDoc`) crawled from `uri`; returns its doc ID."""
+        tokens = TOKEN_PATTERN.findall(doc.content.lower())
+        if self._stopwords:
+            tokens = self._stopwords.filter(tokens)
+        doc_id = len(self._doc_lengths)
+        self._doc_lengths.append(len(tokens))
+        self._docs_file.write(json.dumps({"uri": uri, "title": doc.title}) + "\n")
+
+        positions: dict[int, list[int]] = {}
+        for position, term_id in enumerate(self._vocab.ids(tokens)):
+            term_positions = positions.get(term_id)
+            if term_positions is None:
+                positions[term_id] = [position]
+            else:
+                term_positions.append(position)
+
+        buffer = self._buffer
+        added = 0
+        for term_id, term_positions in positions.items():
+            tf = len(term_positions)
+            entry = buffer.get(term_id)
+            if entry is None:
+                postings = bytearray()
+                buffer[term_id] = [postings, 1, tf, tf, doc_id, doc_id]
+            else:
+                postings = entry[0]
+                added -= len(postings)
+                encode_varint(doc_id - entry[5], postings)
+                entry[1] += 1
+                entry[2] += tf
+                if tf > entry[3]:
+                    entry[3] = tf
+                entry[5] = doc_id
+            encode_varint(tf, postings)
+            encode_deltas(term_positions, postings)
+            added += len(postings)
+
+        self._buffered += added
+        if self._buffered >= self._budget:
+            self._flush()
+        return doc_id
+
+    def finish(self) -> InvertedIndex:
+        """Merges the segments into the final index files, removes the segments, and opens the finished index."""
+        self._docs_file.close()
+        sources = [_read_segment(path, number) for number, path in enumerate(self._segments)]
+        sources.append(self._buffered_records(len(self._segments)))
+
+        lexicon = array('Q', bytes(8 * LEXICON_COLUMNS * len(self._vocab)))
+        offset = 0
+        with open(os.path.join(self._index_dir, POSTINGS_FILE), 'wb') as postings_file:
+            current, last_doc, start = -1, 0, 0
+            out = bytearray()
+            for term_id, _, df, cf, max_tf, first_doc, doc_end, postings in heapq.merge(*sources):
+                if term_id != current:
+                    current, last_doc, start = term_id, 0, offset + len(out)
+                row = term_id * LEXICON_COLUMNS
+                encode_varint(first_doc - last_doc, out)
+                out += postings
+                last_doc = doc_end
+                lexicon[row] = start
+                lexicon[row + 1] = offset + len(out) - start
+                lexicon[row + 2] += df
+                lexicon[row + 3] += cf
+                lexicon[row + 4] = max(lexicon[row + 4], max_tf)
+                if len(out) >= 1 << 20:
+                    postings_file.write(out)
+                    offset += len(out)
+                    out = bytearray()
+            postings_file.write(out)
+
+        self._buffer, self._buffered = {}, 0
+        for path in self._segments:
+            os.remove(path)
+        self._segments = []
+        if os.path.isdir(self._segment_dir):
+            shutil.rmtree(self._segment_dir)
+
+        self._write_files(lexicon)
+        return InvertedIndex(self._index_dir)
+
+    @property
+    def _segment_dir(self) -> str:
+        return os.path.join(self._index_dir, "segments")
+
+    def _flush(self) -> None:
+        os.makedirs(self._segment_dir, exist_ok=True)
+        path = os.path.join(self._segment_dir, "segment_{:06d}.bin".format(len(self._segments)))
+        with open(path, 'wb') as segment_file:
+            out = bytearray()
+            for term_id, _, df, cf, max_tf, first_doc, last_doc, postings in self._buffered_records(0):
+                encode_varints((term_id, df, cf, max_tf, first_doc, last_doc, len(postings)), out)
+                out += postings
+                if len(out) >= 1 << 20:
+                    segment_file.write(out)
+                    out = bytearray()
+            segment_file.write(out)
+        self._segments.append(path)
+        self._buffer, self._buffered = {}, 0
+
+    def _buffered_records(self, number: int):
+        """Yields the buffered postings as segment records (see `_read_segment`), ordered by term ID."""
+        buffer = self._buffer
+        for term_id in sorted(buffer):
+            postings, df, cf, max_tf, first_doc, last_doc = buffer[term_id]
+            yield term_id, number, df, cf, max_tf, first_doc, last_doc, postings
+
+    def _write_files(self, lexicon: array) -> None:
+        term_ids = list(range(len(self._vocab)))
+        write_frequency_file(FrequencyTable(self._vocab.tokens, term_ids, len(term_ids)),
+                             os.path.join(self._index_dir, TERMS_FILE))
+        _write_array(lexicon, os.path.join(self._index_dir, LEXICON_FILE))
+        _write_array(self._doc_lengths, os.path.join(self._index_dir, DOC_LENGTHS_FILE))
+        stopwords_path = os.path.join(self._index_dir, STOPWORDS_FILE)
+        if self._stopwords:
+            with open(stopwords_path, 'w', encoding="UTF-8") as stopwords_file:
+                stopwords_file.writelines(word + "\n" for word in sorted(self._stopwords.words))
+        elif os.path.exists(stopwords_path):
+            os.remove(stopwords_path)
+        with open(os.path.join(self._index_dir, META_FILE), 'w', encoding="UTF-8") as meta_file:
+            json.dump({
+                "version": INDEX_VERSION,
+                "num_docs": len(self._doc_lengths),
+                "num_terms": len(self._vocab),
+                "total_tokens": sum(self._doc_lengths),
+            }, meta_file, indent=2)
+
+
+class InvertedIndex:
+    """Read-only view of an index directory written by `IndexBuilder`.
+
+    The terms, lexicon, and postings files are memory-mapped, so opening an index only loads its document lengths;
+    a term's ID is found by binary search in the terms file and its postings are decoded straight from the mapping
+    when asked for. Terms are looked up the way `IndexBuilder` indexed them; `tokenize` applies the same
+    tokenization and stopword removal to query text.
+
+    Attributes:
+        _index_dir (str): directory the index was read from.
+        _terms (FrequencyFile): term ID of every indexed token.
+        _vocab (Vocabulary | None): term IDs of every indexed token in memory, loaded on first use.
+        _lexicon (Sequence[int]): `LEXICON_COLUMNS` unsigned integers per term ID, see the module documentation.
+        _doc_lengths (array): length of every document in tokens.
+        _postings (mmap | bytes): contents of the postings file.
+        _stopwords (StopwordFilter | None): stopwords removed at indexing time.
+        _docs (list[dict] | None): URI and title of every document, loaded on first use.
+
+    """
+    def __init__(self, index_dir: str) -> None:
+        self._index_dir = index_dir
+        with open(os.path.join(index_dir, META_FILE), 'r', encoding="UTF-8") as meta_file:
+            meta = json.load(meta_file)
+        if meta.get("version") != INDEX_VERSION:
+            raise ValueError("Unsupported index version {} in {}.".format(meta.get("version"), index_dir))
+        self._terms = FrequencyFile(os.path.join(index_dir, TERMS_FILE))
+        self._vocab: Vocabulary | None = None
+        self._lexicon_file, self._lexicon_map = _map_file(os.path.join(index_dir, LEXICON_FILE))
+        self._lexicon = little_endian_view(self._lexicon_map, 0, LEXICON_COLUMNS * len(self._terms), 'Q')
+        self._doc_lengths = _read_array('I', os.path.join(index_dir, DOC_LENGTHS_FILE))
+        self._total_tokens = meta["total_tokens"]
+
+        stopwords_path = os.path.join(index_dir, STOPWORDS_FILE)
+        self._stopwords = None
+        if os.path.exists(stopwords_path):
+            with open(stopwords_path, 'r', encoding="UTF-8") as stopwords_file:
+                self._stopwords = StopwordFilter(line[:-1] for line in stopwords_file)
+
+        self._postings_file, self._postings = _map_file(os.path.join(index_dir, POSTINGS_FILE))
+        self._docs: list[dict] | None = None
+
+    def __len__(self) -> int:
+        """Returns the number of unique terms in the index."""
+        return len(self._terms)
+
+    def __contains__(self, term: object) -> bool:
+        return isinstance(term, str) and term in self._terms
+
+    @property
+    def vocabulary(self) -> Vocabulary:
+        """Every indexed token with its term ID, read into memory (only) the first time it is asked for."""
+        if self._vocab is None:
+            self._vocab = Vocabulary([token for token, _ in self._terms.rows()])
+        return self._vocab
+
+    def term_id(self, term: str) -> int | None:
+        """Returns the term ID of `term`, or `None` if it is not in the index."""
+        return self._terms.get(term, None)
+
+    @property
+    def stopwords(self) -> StopwordFilter | None:
+        return self._stopwords
+
+    @property
+    def num_docs(self) -> int:
+        return len(self._doc_lengths)
+
+    @property
+    def total_tokens(self) -> int:
+        return self._total_tokens
+
+    @property
+    def avg_doc_length(self) -> float:
+        return self._total_tokens / len(self._doc_lengths) if self._doc_lengths else 0.0
+
+    def tokenize(self, text: str) -> list[str]:
+        """Tokenizes `text` the way documents were tokenized (and filtered) when they were indexed."""
+        tokens = TOKEN_PATTERN.findall(text.lower())
+        return self._stopwords.filter(tokens) if self._stopwords else tokens
+
+    def doc_length(self, doc_id: int) -> int:
+        return self._doc_lengths[doc_id]
+
+    def document(self, doc_id: int) -> dict:
+        """Returns the URI and title of a document as a `dict` with "uri" and "title" keys."""
+        if self._docs is None:
+            with open(os.path.join(self._index_dir, DOCS_FILE), 'r', encoding="UTF-8") as docs_file:
+                self._docs = [json.loads(line) for line in docs_file]
+        return self._docs[doc_id]
+
+    def doc_freq(self, term: str) -> int:
+        """Returns the number of documents containing `term`."""
+        return self._stat(term, 2)
+
+    def coll_freq(self, term: str) -> int:
+        """Returns the number of occurrences of `term` in all documents."""
+        return self._stat(term, 3)
+
+    def max_tf(self, term: str) -> int:
+        """Returns the largest number of occurrences of `term` in any one document."""
+        return self._stat(term, 4)
+
+    def postings(self, term: str, positions: bool = True) -> list[Posting]:
+        """Returns the postings of `term` (with positions unless `positions` is `False`), ordered by doc ID."""
+        term_id = self.term_id(term)
+        if term_id is None:
+            return []
+        buffer = self._postings
+        row = term_id * LEXICON_COLUMNS
+        pos, df = self._lexicon[row], self._lexicon[row + 2]
+        postings = []
+        doc_id = 0
+        for _ in range(df):
+            gap, pos = decode_varint(buffer, pos)
+            tf, pos = decode_varint(buffer, pos)
+            doc_id += gap
+            if positions:
+                term_positions, pos = decode_deltas(buffer, pos, tf)
+                postings.append(Posting(doc_id, tf, term_positions))
+            else:
+                pos = decode_varints(buffer, pos, tf)[1]
+                postings.append(Posting(doc_id, tf))
+        return postings
+
+    def doc_tfs(self, term: str) -> tuple[list[int], list[int]]:
+        """Returns the IDs of the documents containing `term` and the term's frequency in each, as two lists."""
+        postings = self.postings(term, positions=False)
+        return [posting.doc_id for posting in postings], [posting.tf for posting in postings]
+
+    def close(self) -> None:
+        if isinstance(self._lexicon, memoryview):
+            self._lexicon.release()
+        for mapping, mapped_file in ((self._lexicon_map, self._lexicon_file), (self._postings, self._postings_file)):
+            if isinstance(mapping, mmap.mmap):
+                mapping.close()
+            mapped_file.close()
+        self._terms.close()
+
+    def __enter__(self) -> InvertedIndex:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _stat(self, term: str, column: int) -> int:
+        term_id = self.term_id(term)
+        return 0 if term_id is None else self._lexicon[term_id * LEXICON_COLUMNS + column]
+
+
+def _read_segment(path: str, number: int):
+    """Yields the records of a segment file as `(term_id, number, df, cf, max_tf, first_doc, last_doc, postings)`,
+    ordered by term ID, where `postings` are the encoded postings after the first document ID."""
+    with open(path, 'rb') as segment_file:
+        if not os.fstat(segment_file.fileno()).st_size:
+            return
+        with mmap.mmap(segment_file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            pos, end = 0, len(buffer)
+            while pos < end:
+                (term_id, df, cf, max_tf, first_doc, last_doc, size), pos = decode_varints(buffer, pos, 7)
+                yield term_id, number, df, cf, max_tf, first_doc, last_doc, buffer[pos:pos + size]
+                pos += size
+
+
+def _map_file(path: str) -> tuple:
+    """Opens `path` and memory-maps it for reading; returns the file and the mapping (`b""` if the file is empty,
+    since an empty file cannot be memory-mapped)."""
+    mapped_file = open(path, 'rb')
+    if not os.fstat(mapped_file.fileno()).st_size:
+        return mapped_file, b""
+    return mapped_file, mmap.mmap(mapped_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _write_array(values: array, path: str) -> None:
+    """Writes `values` to `path` in little-endian byte order, whatever the byte order of the machine."""
+    if sys.byteorder != "little":
+        values = array(values.typecode, values)
+        values.byteswap()
+    with open(path, 'wb') as array_file:
+        values.tofile(array_file)
+
+
+def _read_array(typecode: str, path: str) -> array:
+    """Reads an array of `typecode` values written by `_write_array` from `path`."""
+    values = array(typecode)
+    with open(path, 'rb') as array_file:
+        values.frombytes(array_file.read())
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,12 @@
 #!/usr/bin/env python
-"""Provides `Pair`, `TwoGram`, and `Frequency` classes as data models for text processing.
+"""Provides `Pair`, `TwoGram`, `Frequency`, `FrequencyTable`, `Vocabulary`, and `Posting` classes as data models for
+text processing.
 """
 
+from __future__ import annotations
+from collections.abc import Sequence
+from typing import NamedTuple
+
 __author__ = "Garrett Buchanan, Livingstone Rwagatare"
 __copyright__ = "Copyright 2023, Westmont College"
 __credits__ = ["Garrett Buchanan", "Livingstone Rwagatare",
@@ -354,3 +359,180 @@ class Frequency:
                 return 1
             else:
                 return 0
+
+
+class FrequencyTable(Sequence):
+    """Columnar, read-only sequence of `Frequency`s backed by parallel arrays of tokens and counts.
+
+    Counting functions produce one row per unique token; keeping the rows as two parallel lists (plus a
+    precomputed total) avoids allocating a `Frequency` per row until one is actually requested by indexing
+    or iteration. Slicing returns another `FrequencyTable` viewing the same arrays, so slices and top-N views
+    are O(1) regardless of the table size.
+
+    A `FrequencyTable` compares equal to any `list` or `tuple` of `Frequency`s with the same rows in the same
+    order, which keeps callers written against `list[Frequency]` working unchanged.
+
+    Two-gram tables may store their tokens as plain `(object1, object2)` tuples by passing `pairs=True`; the
+    tuples are only turned into `TwoGram`s when a row is read, and are rendered as "<object1:object2>" directly.
+
+    Attributes:
+        _tokens (list): tokens (`str`s or `TwoGram`s, or `tuple`s if `_pairs`), one per row.
+        _counts (list[int]): counts aligned with `_tokens`.
+        _pairs (bool): whether `_tokens` holds `(object1, object2)` tuples standing in for `TwoGram`s.
+        _rows (range): row indices of `_tokens`/`_counts` visible through this table (or view).
+        _total (int | None): sum of the visible counts; lazily computed for views.
+
+    """
+    def __init__(self, tokens: list, counts: list[int], total: int = None, pairs: bool = False) -> None:
+        if len(tokens) != len(counts):
+            raise ValueError("Tokens and counts must have the same length.")
+        self._tokens = tokens
+        self._counts = counts
+        self._pairs = pairs
+        self._rows = range(len(tokens))
+        self._total = total
+
+    @classmethod
+    def _view(cls, table: FrequencyTable, rows: range) -> FrequencyTable:
+        view = cls.__new__(cls)
+        view._tokens = table._tokens
+        view._counts = table._counts
+        view._pairs = table._pairs
+        view._rows = rows
+        view._total = None
+        return view
+
+    @property
+    def total(self) -> int:
+        """Sum of the counts in this table, i.e., the total number of items counted."""
+        if self._total is None:
+            counts = self._counts
+            self._total = sum(counts[i] for i in self._rows)
+        return self._total
+
+    def tokens(self) -> list:
+        """Returns the tokens of this table as a list, in row order."""
+        return [self._token(i) for i in self._rows]
+
+    def counts(self) -> list[int]:
+        """Returns the counts of this table as a list, in row order."""
+        return [self._counts[i] for i in self._rows]
+
+    def top(self, n: int) -> FrequencyTable:
+        """Returns a view of the first `n` rows (the `n` most frequent tokens for a sorted table)."""
+        return self[:max(n, 0)]
+
+    def lines(self):
+        """Yields the rows formatted as `print_frequencies` output lines, without creating `Frequency`s."""
+        tokens = self._tokens
+        counts = self._counts
+        if self._pairs:
+            for i in self._rows:
+                yield "{:6d} <{}:{}>\n".format(counts[i], *tokens[i])
+        else:
+            for i in self._rows:
+                yield "{:6d} {}\n".format(counts[i], tokens[i])
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return FrequencyTable._view(self, self._rows[index])
+        row = self._rows[index]
+        return Frequency(self._token(row), self._counts[row])
+
+    def __iter__(self):
+        counts = self._counts
+        for i in self._rows:
+            yield Frequency(self._token(i), counts[i])
+
+    def _token(self, row: int) -> object:
+        token = self._tokens[row]
+        return TwoGram(*token) if self._pairs else token
+
+    def __eq__(self, other: object) -> bool:
+        """Two tables (or a table and a `list`/`tuple` of `Frequency`s) are equal if all their rows are equal."""
+        if isinstance(other, FrequencyTable):
+            return len(self) == len(other) and self.counts() == other.counts() and self.tokens() == other.tokens()
+        if isinstance(other, (list, tuple)):
+            return len(self) == len(other) and all(f == o for f, o in zip(self, other))
+        return NotImplemented
+
+    def __ne__(self, other: object) -> bool:
+        """Complement of __eq__, used to support the `!=` (not equals) operation."""
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    __hash__ = None
+
+    def __str__(self) -> str:
+        return "[{}]".format(", ".join(map(str, self)))
+
+
+class Vocabulary:
+    """Bidirectional mapping between tokens and dense integer IDs, assigned in order of first appearance.
+
+    Interning tokens lets later stages (e.g., indexing or stopword masking) work with small integers and flat
+    arrays indexed by ID instead of hashing strings over and over.
+
+    Attributes:
+        _ids (dict[str, int]): ID of every token seen so far.
+        _tokens (list[str]): token for every ID, i.e., `_tokens[_ids[token]] == token`.
+
+    """
+    def __init__(self, tokens: list[str] = None) -> None:
+        self._ids: dict[str, int] = {}
+        self._tokens: list[str] = []
+        if tokens:
+            self.ids(tokens)
+
+    def __len__(self) -> int:
+        return len(self._tokens)
+
+    def __contains__(self, token: object) -> bool:
+        return token in self._ids
+
+    @property
+    def tokens(self) -> list[str]:
+        """Every token in the vocabulary, ordered by ID."""
+        return self._tokens
+
+    def id(self, token: str) -> int:
+        """Returns the ID of `token`, assigning the next free ID if it has not been seen before."""
+        token_id = self._ids.get(token)
+        if token_id is None:
+            token_id = self._ids[token] = len(self._tokens)
+            self._tokens.append(token)
+        return token_id
+
+    def ids(self, tokens: list[str]) -> list[int]:
+        """Returns the IDs of all `tokens` in order, assigning new IDs to the ones not seen before."""
+        get = self._ids.get
+        ids = [get(token) for token in tokens]
+        if None in ids:
+            ids = [self.id(token) if token_id is None else token_id for token, token_id in zip(tokens, ids)]
+        return ids
+
+    def get(self, token: str, default: int = None) -> int | None:
+        """Returns the ID of `token` without assigning one, or `default` if it has not been seen."""
+        return self._ids.get(token, default)
+
+    def token(self, token_id: int) -> str:
+        """Returns the token with the given ID."""
+        return self._tokens[token_id]
+
+
+class Posting(NamedTuple):
+    """One document's entry in the postings list of a term of an inverted index.
+
+    Attributes:
+        doc_id (int): ID of the document, in the order the documents were indexed.
+        tf (int): number of times the term occurs in the document.
+        positions (list[int] | None): token positions of the term in the document, in increasing order; `None`
+            if the postings were read without positions.
+
+    """
+    doc_id: int
+    tf: int
+    positions: list[int] | None = None
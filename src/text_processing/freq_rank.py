@@ -0,0 +1,405 @@
+#!/usr/bin/env python3
+"""Ranked retrieval over an `InvertedIndex` with BM25 scoring and top-k dynamic pruning.
+
+Queries are tokenized exactly like the indexed documents (see `InvertedIndex.tokenize`). Double-quoted parts of a
+query are phrases: a document only matches if it contains every phrase word for word (after stopword removal),
+and the phrase's terms are scored like any other query terms.
+
+Example:
+    $ python3 -m text_processing.freq_rank ../out/index 'nation "civil war"' -k 5 --method wand
+"""
+
+from __future__ import annotations
+import re
+import math
+import heapq
+import argparse
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import NamedTuple
+from text_processing.freq_index import InvertedIndex
+
+__author__ = "Garrett Buchanan, Livingstone Rwagatare"
+__copyright__ = "Copyright 2023, Westmont College"
+__credits__ = ["Garrett Buchanan", "Livingstone Rwagatare",
+               "Donald J. Patterson", "Mike Ryu", ]
+__license__ = "MIT"
+__email__ = "mryu@westmont.edu"
+
+METHODS = ("taat", "daat", "wand", "maxscore")
+DEFAULT_METHOD = "maxscore"
+DEFAULT_CACHE_SIZE = 1024  # Decoded postings lists kept per `QueryEngine`.
+PHRASE_PATTERN = re.compile(r'"([^"]*)"')
+
+
+def main() -> None:
+    pars = argparse.ArgumentParser(prog="python3 -m text_processing.freq_rank")
+    pars.add_argument("index_dir", type=str, help="required path to an index directory written by `IndexBuilder`")
+    pars.add_argument("query", type=str, help="required query; double-quote words to search for them as a phrase")
+    pars.add_argument("-k", type=int, default=10, help="number of results to return")
+    pars.add_argument("--method", type=str, default=DEFAULT_METHOD, choices=METHODS,
+                      help="query evaluation strategy (all return the same results)")
+    args = pars.parse_args()
+
+    with InvertedIndex(args.index_dir) as index:
+        engine = QueryEngine(index)
+        for rank, hit in enumerate(engine.search(args.query, args.k, args.method), 1):
+            print("{:3d}. {:8.4f} {}".format(rank, hit.score, index.document(hit.doc_id)["uri"]))
+
+
+class Hit(NamedTuple):
+    """One ranked result of a query.
+
+    Attributes:
+        doc_id (int): ID of the matching document in the index.
+        score (float): BM25 score of the document for the query.
+
+    """
+    doc_id: int
+    score: float
+
+
+class Query(NamedTuple):
+    """A parsed query.
+
+    Attributes:
+        terms (list[str]): unique query terms, in order of first appearance.
+        weights (list[int]): number of times each term appears in the query.
+        phrases (list[list[str]]): phrases every matching document must contain (only those of 2+ terms).
+
+    """
+    terms: list[str]
+    weights: list[int]
+    phrases: list[list[str]]
+
+
+class BM25:
+    """Okapi BM25 scoring over the collection statistics of an `InvertedIndex`.
+
+    A term occurring `tf` times in a document of length `dl` contributes `idf * tf * (k1 + 1) / (tf + k1 * (1 - b
+    + b * dl / avgdl))`, with `idf = ln(1 + (N - df + 0.5) / (df + 0.5))`, which is never negative.
+
+    Attributes:
+        _index (InvertedIndex): index providing the statistics.
+        _k1 (float): term frequency saturation.
+        _b (float): document length normalization.
+        _norms (list[float]): `k1 * (1 - b + b * dl / avgdl)` of every document, precomputed.
+        _min_norm (float): smallest of `_norms`, for the upper bound of a term's contribution.
+
+    """
+    def __init__(self, index: InvertedIndex, k1: float = 1.2, b: float = 0.75) -> None:
+        self._index = index
+        self._k1 = k1
+        self._b = b
+        avg_dl = index.avg_doc_length or 1.0
+        self._norms = [k1 * (1 - b + b * index.doc_length(doc_id) / avg_dl) for doc_id in range(index.num_docs)]
+        self._min_norm = min(self._norms, default=0.0)
+
+    @property
+    def norms(self) -> list[float]:
+        return self._norms
+
+    @property
+    def k1(self) -> float:
+        return self._k1
+
+    def idf(self, term: str) -> float:
+        df = self._index.doc_freq(term)
+        return math.log(1 + (self._index.num_docs - df + 0.5) / (df + 0.5))
+
+    def score(self, tf: int, doc_id: int, idf: float) -> float:
+        """Returns the contribution of a term with inverse document frequency `idf` occurring `tf` times."""
+        return idf * (self._k1 + 1) * tf / (tf + self._norms[doc_id])
+
+    def upper_bound(self, term: str, idf: float) -> float:
+        """Returns an upper bound of the contribution of `term` to the score of any document.
+
+        Contributions grow with the term frequency and shrink with the document length, so no document can score
+        more than one of the shortest length containing the term as often as any document does.
+
+        """
+        max_tf = self._index.max_tf(term)
+        return idf * (self._k1 + 1) * max_tf / (max_tf + self._min_norm) if max_tf else 0.0
+
+
+class QueryEngine:
+    """Answers top-k BM25 queries over an `InvertedIndex` with one of several evaluation strategies.
+
+    * "taat" (term-at-a-time) scores one postings list after the other into a dictionary of accumulators.
+    * "daat" (document-at-a-time) walks all postings lists in parallel and fully scores one document at a time.
+    * "wand" walks the lists in parallel too, but skips every document whose terms' score upper bounds cannot add up
+      to more than the current k-th best score (Broder et al.'s weak AND).
+    * "maxscore" splits the terms into "essential" ones and "non-essential" ones whose upper bounds add up to no more
+      than the k-th best score; only documents containing an essential term are candidates, and a candidate's
+      non-essential terms are only looked up while it can still make it into the top k (Turtle and Flood).
+
+    All four return the same hits: results are ordered by decreasing score and then increasing doc ID, documents
+    are always scored by summing their terms' contributions in query order, and pruning only ever skips documents
+    that could not have outscored the k-th hit. Decoded postings lists are cached (least recently used first out).
+
+    Attributes:
+        _index (InvertedIndex): the index to query.
+        _bm25 (BM25): scoring function.
+        _cache (OrderedDict[str, tuple]): `(doc_ids, tfs, idf, bound)` of recently queried terms.
+        _cache_size (int): number of postings lists to keep in `_cache`.
+
+    """
+    def __init__(self, index: InvertedIndex, k1: float = 1.2, b: float = 0.75,
+                 cache_size: int = DEFAULT_CACHE_SIZE) -> None:
+        self._index = index
+        self._bm25 = BM25(index, k1, b)
+        self._cache: OrderedDict[str, tuple] = OrderedDict()
+        self._cache_size = cache_size
+
+    @property
+    def bm25(self) -> BM25:
+        return self._bm25
+
+    def parse(self, text: str) -> Query:
+        """Splits `text` into its (tokenized and filtered) terms and its double-quoted phrases."""
+        tokens = self._index.tokenize(PHRASE_PATTERN.sub(r" \1 ", text))
+        weights: dict[str, int] = {}
+        for token in tokens:
+            weights[token] = weights.get(token, 0) + 1
+        phrases = [phrase for phrase in map(self._index.tokenize, PHRASE_PATTERN.findall(text)) if len(phrase) > 1]
+        return Query(list(weights), list(weights.values()), phrases)
+
+    def search(self, text: str | Query, k: int = 10, method: str = DEFAULT_METHOD) -> list[Hit]:
+        """Returns the (at most) `k` best-scoring documents for the query `text`, evaluated with `method`."""
+        if method not in METHODS:
+            raise ValueError("Query evaluation method must be one of: {}.".format(", ".join(METHODS)))
+        query = self.parse(text) if isinstance(text, str) else text
+        if k < 1 or not query.terms:
+            return []
+        allowed = None
+        if query.phrases:
+            allowed = self.phrase_docs(query.phrases[0])
+            for phrase in query.phrases[1:]:
+                allowed &= self.phrase_docs(phrase)
+            if not allowed:
+                return []
+        lists = [self._term_list(term, weight) for term, weight in zip(query.terms, query.weights)]
+        lists = [term_list for term_list in lists if term_list.doc_ids]
+        if not lists:
+            return []
+        return getattr(self, "_" + method)(lists, k, allowed)
+
+    def phrase_docs(self, phrase: list[str]) -> set[int]:
+        """Returns the IDs of the documents containing the (already tokenized) `phrase` as consecutive tokens."""
+        postings = [self._index.postings(term) for term in phrase]
+        if not all(postings):
+            return set()
+        # Intersect the documents of the rarest terms first, then check positions only where all terms occur.
+        common = set(posting.doc_id for posting in min(postings, key=len))
+        for term_postings in postings:
+            common &= {posting.doc_id for posting in term_postings}
+        if not common:
+            return set()
+        by_doc = [{posting.doc_id: posting.positions for posting in term_postings if posting.doc_id in common}
+                  for term_postings in postings]
+        matches = set()
+        for doc_id in common:
+            starts = set(by_doc[0][doc_id])
+            for offset, term_positions in enumerate(by_doc[1:], 1):
+                starts &= {position - offset for position in term_positions[doc_id]}
+                if not starts:
+                    break
+            if starts:
+                matches.add(doc_id)
+        return matches
+
+    def _term_list(self, term: str, weight: int) -> _TermList:
+        cached = self._cache.get(term)
+        if cached is None:
+            doc_ids, tfs = self._index.doc_tfs(term)
+            idf = self._bm25.idf(term)
+            cached = self._cache[term] = (doc_ids, tfs, idf, self._bm25.upper_bound(term, idf))
+            if len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+        else:
+            self._cache.move_to_end(term)
+        doc_ids, tfs, idf, bound = cached
+        return _TermList(doc_ids, tfs, weight * idf * (self._bm25.k1 + 1), weight * bound)
+
+    def _score(self, lists: list[_TermList], doc_id: int) -> float:
+        """Scores `doc_id` from scratch, summing its terms' contributions in query order."""
+        norm = self._bm25.norms[doc_id]
+        score = 0.0
+        for term_list in lists:
+            doc_ids = term_list.doc_ids
+            i = bisect_left(doc_ids, doc_id)
+            if i < len(doc_ids) and doc_ids[i] == doc_id:
+                tf = term_list.tfs[i]
+                score += term_list.factor * tf / (tf + norm)
+        return score
+
+    def _taat(self, lists: list[_TermList], k: int, allowed: set[int] | None) -> list[Hit]:
+        norms = self._bm25.norms
+        accumulators: dict[int, float] = {}
+        get = accumulators.get
+        for term_list in lists:
+            factor = term_list.factor
+            for doc_id, tf in zip(term_list.doc_ids, term_list.tfs):
+                accumulators[doc_id] = get(doc_id, 0.0) + factor * tf / (tf + norms[doc_id])
+        if allowed is not None:
+            accumulators = {doc_id: accumulators[doc_id] for doc_id in allowed if doc_id in accumulators}
+        return _top_k(accumulators.items(), k)
+
+    def _daat(self, lists: list[_TermList], k: int, allowed: set[int] | None) -> list[Hit]:
+        norms = self._bm25.norms
+        cursors = [0] * len(lists)
+        top = _TopK(k)
+        heads = [(term_list.doc_ids[0], i) for i, term_list in enumerate(lists)]
+        heapq.heapify(heads)
+        while heads:
+            doc_id = heads[0][0]
+            matched = []
+            while heads and heads[0][0] == doc_id:
+                matched.append(heapq.heappop(heads)[1])
+            if allowed is None or doc_id in allowed:
+                norm = norms[doc_id]
+                score = 0.0
+                for i in sorted(matched):  # query order, like every other strategy
+                    tf = lists[i].tfs[cursors[i]]
+                    score += lists[i].factor * tf / (tf + norm)
+                top.offer(doc_id, score)
+            for i in matched:
+                cursors[i] += 1
+                if cursors[i] < len(lists[i].doc_ids):
+                    heapq.heappush(heads, (lists[i].doc_ids[cursors[i]], i))
+        return top.hits()
+
+    def _wand(self, lists: list[_TermList], k: int, allowed: set[int] | None) -> list[Hit]:
+        top = _TopK(k)
+        cursors = [_Cursor(term_list) for term_list in lists]
+        while True:
+            cursors = [cursor for cursor in cursors if cursor.doc_id is not None]
+            if not cursors:
+                break
+            cursors.sort(key=lambda cursor: cursor.doc_id)
+            threshold = top.threshold
+            bound, pivot = 0.0, None
+            for i, cursor in enumerate(cursors):
+                bound += cursor.bound
+                if bound > threshold:
+                    pivot = i
+                    break
+            if pivot is None:  # not even all remaining terms together can beat the k-th best score
+                break
+            pivot_doc = cursors[pivot].doc_id
+            if cursors[0].doc_id == pivot_doc:
+                if allowed is None or pivot_doc in allowed:
+                    top.offer(pivot_doc, self._score(lists, pivot_doc))
+                for cursor in cursors:
+                    if cursor.doc_id != pivot_doc:
+                        break
+                    cursor.advance(pivot_doc + 1)
+            else:
+                for cursor in cursors[:pivot]:  # documents before the pivot cannot make it into the top k
+                    cursor.advance(pivot_doc)
+        return top.hits()
+
+    def _maxscore(self, lists: list[_TermList], k: int, allowed: set[int] | None) -> list[Hit]:
+        norms = self._bm25.norms
+        top = _TopK(k)
+        cursors = sorted((_Cursor(term_list) for term_list in lists), key=lambda cursor: cursor.bound)
+        prefix = [0.0]  # prefix[i] is the sum of the bounds of the i terms with the lowest bounds
+        for cursor in cursors:
+            prefix.append(prefix[-1] + cursor.bound)
+
+        essential = 0  # cursors[:essential] are non-essential: together they cannot beat the threshold
+        while True:
+            threshold = top.threshold
+            while essential < len(cursors) and prefix[essential + 1] <= threshold:
+                essential += 1
+            doc_id = min((cursor.doc_id for cursor in cursors[essential:] if cursor.doc_id is not None), default=None)
+            if doc_id is None:
+                break
+
+            norm = norms[doc_id]
+            partial = 0.0
+            for cursor in cursors[essential:]:
+                if cursor.doc_id == doc_id:
+                    tf = cursor.tf
+                    partial += cursor.factor * tf / (tf + norm)
+                    cursor.advance(doc_id + 1)
+            if allowed is not None and doc_id not in allowed:
+                continue
+            for i in range(essential - 1, -1, -1):  # non-essential terms, highest bound first
+                if partial + prefix[i + 1] <= threshold:
+                    break
+                cursor = cursors[i]
+                cursor.advance(doc_id)
+                if cursor.doc_id == doc_id:
+                    tf = cursor.tf
+                    partial += cursor.factor * tf / (tf + norm)
+            else:
+                if partial > threshold * (1 - 1e-9):  # rescored in query order, so that ties break the same way
+                    top.offer(doc_id, self._score(lists, doc_id))
+        return top.hits()
+
+
+class _TermList:
+    """Decoded postings list of a query term, with its BM25 factor `weight * idf * (k1 + 1)` and score bound."""
+    __slots__ = ("doc_ids", "tfs", "factor", "bound")
+
+    def __init__(self, doc_ids: list[int], tfs: list[int], factor: float, bound: float) -> None:
+        self.doc_ids = doc_ids
+        self.tfs = tfs
+        self.factor = factor
+        self.bound = bound * (1 + 1e-9)  # slack against rounding, so that it never falls below a real contribution
+
+
+class _Cursor:
+    """Position in a `_TermList` that can skip ahead to a document ID by binary search."""
+    __slots__ = ("doc_ids", "tfs", "factor", "bound", "_pos", "doc_id")
+
+    def __init__(self, term_list: _TermList) -> None:
+        self.doc_ids = term_list.doc_ids
+        self.tfs = term_list.tfs
+        self.factor = term_list.factor
+        self.bound = term_list.bound
+        self._pos = 0
+        self.doc_id = self.doc_ids[0] if self.doc_ids else None
+
+    @property
+    def tf(self) -> int:
+        return self.tfs[self._pos]
+
+    def advance(self, target: int) -> None:
+        """Moves to the first document ID that is at least `target` (or past the end, where `doc_id` is `None`)."""
+        if self.doc_id is not None and self.doc_id < target:
+            self._pos = bisect_left(self.doc_ids, target, self._pos)
+            self.doc_id = self.doc_ids[self._pos] if self._pos < len(self.doc_ids) else None
+
+
+class _TopK:
+    """Min-heap of the `k` best `(score, -doc_id)` seen so far, i.e., ties go to the lower doc ID."""
+    __slots__ = ("_k", "_heap")
+
+    def __init__(self, k: int) -> None:
+        self._k = k
+        self._heap: list[tuple[float, int]] = []
+
+    @property
+    def threshold(self) -> float:
+        """Score a document has to beat to make it into the top k, given that it comes after every one seen."""
+        return self._heap[0][0] if len(self._heap) == self._k else -1.0
+
+    def offer(self, doc_id: int, score: float) -> None:
+        if len(self._heap) < self._k:
+            heapq.heappush(self._heap, (score, -doc_id))
+        elif (score, -doc_id) > self._heap[0]:
+            heapq.heapreplace(self._heap, (score, -doc_id))
+
+    def hits(self) -> list[Hit]:
+        return [Hit(-neg_doc_id, score) for score, neg_doc_id in sorted(self._heap, reverse=True)]
+
+
+def _top_k(scores, k: int) -> list[Hit]:
+    best = heapq.nlargest(k, ((score, -doc_id) for doc_id, score in scores))
+    return [Hit(-neg_doc_id, score) for score, neg_doc_id in best]
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,277 @@
+#!/usr/bin/env python
+"""Provides `ExternalFrequencyCounter` for counting more unique tokens than fit in memory by spilling to disk.
+"""
+
+from __future__ import annotations
+import os
+import gzip
+import heapq
+import tempfile
+from collections import Counter
+from itertools import islice
+from text_processing.freq_models import Frequency, FrequencyTable, TwoGram
+from text_processing.freq_utils import order_frequencies
+
+__author__ = "Garrett Buchanan, Livingstone Rwagatare"
+__copyright__ = "Copyright 2023, Westmont College"
+__credits__ = ["Garrett Buchanan", "Livingstone Rwagatare",
+               "Donald J. Patterson", "Mike Ryu", ]
+__license__ = "MIT"
+__email__ = "mryu@westmont.edu"
+
+DEFAULT_BUDGET = 1_000_000  # Unique tokens held in memory before a run is spilled to disk.
+DEFAULT_FAN_IN = 64  # Maximum number of run files merged (and held open) at once.
+
+
+class ExternalFrequencyCounter:
+    """Token counter that keeps at most about `budget` unique tokens in memory, spilling the rest to run files.
+
+    Whenever the in-memory `Counter` reaches its budget, its rows are sorted by token and written out as a run
+    file of tab-separated text (optionally gzip-compressed), and counting starts over with an empty `Counter`.
+    `finish` then k-way merges the runs to sum the counts of each token and, since the merged rows come out in
+    token order, sorts them a second time externally by decreasing count (ties by token) so that the result
+    lists its rows in exactly the order `compute_word_freq` and `compute_twogram_freq` would.
+
+    If nothing ever had to be spilled, `finish` simply returns an in-memory `FrequencyTable`.
+
+    Notes:
+        Tokens are written to run files as plain text, so they must not contain tab or newline characters;
+        `tokenize_file` never produces such tokens. Two-grams are counted as `(object1, object2)` tuples.
+
+    Attributes:
+        _budget (int): number of unique tokens to hold in memory before spilling a run.
+        _compress (bool): whether run files are gzip-compressed.
+        _pairs (bool): whether tokens are `(object1, object2)` tuples standing in for `TwoGram`s.
+        _counts (Counter): in-memory counts for the current run.
+        _total (int): total number of tokens counted so far.
+        _tmp (TemporaryDirectory | None): lazily created directory holding the run files.
+        _runs (list[str]): paths of the run files spilled so far, each sorted by token.
+
+    """
+    def __init__(self, budget: int = DEFAULT_BUDGET, temp_dir: str = None, compress: bool = False,
+                 pairs: bool = False) -> None:
+        if budget is None or budget < 1:
+            raise ValueError("Spill budget must be a positive number of unique tokens.")
+        self._budget = budget
+        self._temp_dir = temp_dir
+        self._compress = compress
+        self._pairs = pairs
+        self._counts = Counter()
+        self._total = 0
+        self._tmp: tempfile.TemporaryDirectory | None = None
+        self._runs: list[str] = []
+        self._run_serial = 0
+
+    @property
+    def total(self) -> int:
+        return self._total
+
+    @property
+    def spilled(self) -> int:
+        """Number of runs that have been spilled to disk so far."""
+        return len(self._runs)
+
+    def add(self, token: object, count: int = 1) -> None:
+        """Counts `token` `count` more times, spilling the in-memory counts if they reached the budget."""
+        self._counts[token] += count
+        self._total += count
+        if len(self._counts) >= self._budget:
+            self._spill()
+
+    def update(self, tokens) -> None:
+        """Counts every token in the iterable `tokens`, spilling to disk as often as the budget requires.
+
+        Tokens are counted in chunks by `Counter.update`; a chunk is never longer than the room left in the
+        budget (but at least 1/16th of the budget), so the in-memory counts overshoot the budget by at most that.
+
+        """
+        iterator = iter(tokens)
+        min_chunk = max(1, self._budget // 16)
+        while True:
+            chunk = list(islice(iterator, max(self._budget - len(self._counts), min_chunk)))
+            if not chunk:
+                break
+            self._counts.update(chunk)
+            self._total += len(chunk)
+            if len(self._counts) >= self._budget:
+                self._spill()
+
+    def finish(self) -> FrequencyTable | ExternalFrequencies:
+        """Returns all counted rows ordered by decreasing count, with tied tokens sorted lexicographically.
+
+        Returns:
+            A `FrequencyTable` if every unique token fit within the budget, otherwise an `ExternalFrequencies`
+            streaming its rows from sorted run files on disk (which should be `close`d once no longer needed).
+
+        """
+        if not self._runs:
+            tokens, counts = order_frequencies(self._counts)
+            self._counts = Counter()
+            return FrequencyTable(tokens, counts, self._total, pairs=self._pairs)
+
+        if self._counts:
+            self._spill()
+        merged = self._reduce(self._runs, _read_token_run, self._write_token_run)
+
+        # First pass: sum the counts of every token, then re-sort those sums by (-count, token) in bounded runs.
+        unique = 0
+        count_runs = []
+        buffer = {}
+        for token, count in _sum_tokens(_read_token_run(merged, self._compress, self._pairs)):
+            buffer[token] = count
+            unique += 1
+            if len(buffer) >= self._budget:
+                count_runs.append(self._write_count_run(buffer))
+                buffer = {}
+        if buffer:
+            count_runs.append(self._write_count_run(buffer))
+        os.remove(merged)
+
+        # Second pass: reduce the count-ordered runs down to what can be merged in a single pass while printing.
+        count_runs = self._reduce(count_runs, _read_count_run, self._write_merged_count_run, keep=DEFAULT_FAN_IN)
+        result = ExternalFrequencies(count_runs, self._total, unique, self._compress, self._pairs, self._tmp)
+        self._tmp, self._runs, self._counts = None, [], Counter()
+        return result
+
+    def _spill(self) -> None:
+        self._runs.append(self._write_token_run(sorted(self._counts.items())))
+        self._counts = Counter()
+
+    def _new_run_path(self) -> str:
+        if self._tmp is None:
+            self._tmp = tempfile.TemporaryDirectory(prefix="freq_spill_", dir=self._temp_dir)
+        self._run_serial += 1
+        name = "run_{:06d}{}".format(self._run_serial, ".gz" if self._compress else "")
+        return os.path.join(self._tmp.name, name)
+
+    def _write_token_run(self, rows) -> str:
+        path = self._new_run_path()
+        if self._pairs:
+            lines = ("{}\t{}\t{}\n".format(token[0], token[1], count) for token, count in rows)
+        else:
+            lines = ("{}\t{}\n".format(token, count) for token, count in rows)
+        with _open_run(path, 'w', self._compress) as run_file:
+            run_file.writelines(lines)
+        return path
+
+    def _write_count_run(self, buffer: dict) -> str:
+        tokens, counts = order_frequencies(buffer)
+        return self._write_merged_count_run(zip((-count for count in counts), tokens))
+
+    def _write_merged_count_run(self, rows) -> str:
+        path = self._new_run_path()
+        if self._pairs:
+            lines = ("{}\t{}\t{}\n".format(-neg_count, token[0], token[1]) for neg_count, token in rows)
+        else:
+            lines = ("{}\t{}\n".format(-neg_count, token) for neg_count, token in rows)
+        with _open_run(path, 'w', self._compress) as run_file:
+            run_file.writelines(lines)
+        return path
+
+    def _reduce(self, runs: list[str], read, write, keep: int = 1) -> str | list[str]:
+        """Merges `runs` (DEFAULT_FAN_IN at a time) until no more than `keep` runs remain."""
+        runs = list(runs)
+        while len(runs) > keep:
+            group, runs = runs[:DEFAULT_FAN_IN], runs[DEFAULT_FAN_IN:]
+            merged = write(heapq.merge(*[read(path, self._compress, self._pairs) for path in group]))
+            for path in group:
+                os.remove(path)
+            runs.append(merged)
+        return runs[0] if keep == 1 else runs
+
+
+class ExternalFrequencies:
+    """Read-only, re-iterable sequence of `Frequency`s streamed from count-ordered run files on disk.
+
+    This is what `ExternalFrequencyCounter.finish` returns when counting spilled; it provides the same `total`,
+    `len`, and `lines` that `print_frequencies` uses for a `FrequencyTable`, but not random access. The run
+    files are deleted by `close` (or when used as a context manager).
+
+    Attributes:
+        _runs (list[str]): paths of run files, each sorted by decreasing count then token.
+        _total (int): total number of tokens counted.
+        _unique (int): number of unique tokens counted.
+
+    """
+    def __init__(self, runs: list[str], total: int, unique: int, compress: bool, pairs: bool,
+                 tmp: tempfile.TemporaryDirectory = None) -> None:
+        self._runs = runs
+        self._total = total
+        self._unique = unique
+        self._compress = compress
+        self._pairs = pairs
+        self._tmp = tmp
+
+    @property
+    def total(self) -> int:
+        return self._total
+
+    def __len__(self) -> int:
+        return self._unique
+
+    def rows(self):
+        """Yields `(token, count)` rows in order of decreasing count, with tied tokens sorted lexicographically."""
+        readers = [_read_count_run(path, self._compress, self._pairs) for path in self._runs]
+        for neg_count, token in heapq.merge(*readers):
+            yield token, -neg_count
+
+    def lines(self):
+        """Yields the rows formatted as `print_frequencies` output lines."""
+        if self._pairs:
+            for token, count in self.rows():
+                yield "{:6d} <{}:{}>\n".format(count, *token)
+        else:
+            for token, count in self.rows():
+                yield "{:6d} {}\n".format(count, token)
+
+    def __iter__(self):
+        for token, count in self.rows():
+            yield Frequency(TwoGram(*token) if self._pairs else token, count)
+
+    def close(self) -> None:
+        """Deletes the run files backing this sequence."""
+        if self._tmp is not None:
+            self._tmp.cleanup()
+            self._tmp = None
+
+    def __enter__(self) -> ExternalFrequencies:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def _open_run(path: str, mode: str, compress: bool):
+    if compress:
+        return gzip.open(path, mode + 't', encoding="UTF-8", compresslevel=1)
+    return open(path, mode, encoding="UTF-8", buffering=1 << 20)
+
+
+def _read_token_run(path: str, compress: bool, pairs: bool):
+    """Yields `(token, count)` rows from a run file sorted by token."""
+    with _open_run(path, 'r', compress) as run_file:
+        for line in run_file:
+            fields = line[:-1].split('\t')
+            yield (fields[0], fields[1]) if pairs else fields[0], int(fields[-1])
+
+
+def _read_count_run(path: str, compress: bool, pairs: bool):
+    """Yields `(-count, token)` rows from a run file sorted by decreasing count then token."""
+    with _open_run(path, 'r', compress) as run_file:
+        for line in run_file:
+            fields = line[:-1].split('\t')
+            yield -int(fields[0]), (fields[1], fields[2]) if pairs else fields[1]
+
+
+def _sum_tokens(rows):
+    """Sums the counts of consecutive rows with the same token in a token-ordered stream of `(token, count)`."""
+    current, total = None, 0
+    for token, count in rows:
+        if token == current:
+            total += count
+        else:
+            if total:
+                yield current, total
+            current, total = token, count
+    if total:
+        yield current, total
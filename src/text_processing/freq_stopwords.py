@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+"""Provides `StopwordFilter` and `load_stopwords` for removing stopwords from tokens or token IDs.
+"""
+
+from __future__ import annotations
+import os
+from weakref import WeakKeyDictionary
+from text_processing.freq_models import Vocabulary
+
+__author__ = "Garrett Buchanan, Livingstone Rwagatare"
+__copyright__ = "Copyright 2023, Westmont College"
+__credits__ = ["Garrett Buchanan", "Livingstone Rwagatare",
+               "Donald J. Patterson", "Mike Ryu", ]
+__license__ = "MIT"
+__email__ = "mryu@westmont.edu"
+
+_LOADED: dict[str, frozenset] = {}  # Stopword sets loaded so far in this process, keyed by language.
+
+
+def load_stopwords(lang: str, cache_dir: str = None) -> frozenset:
+    """Returns NLTK's stopwords for `lang`, loading them at most once per process.
+
+    NLTK itself is only imported the first time a language is loaded and no cache file exists for it. If a
+    `cache_dir` is given, the list is read from (or, after loading it from NLTK, written to) a plain text file
+    named "stopwords.<lang>.txt" in that directory, with one stopword per line; an empty cache file is ignored.
+
+    Args:
+        lang (str): name of the NLTK stopwords list (e.g., "english").
+        cache_dir (str): optional directory to persist the loaded stopword lists in.
+
+    Returns:
+        A `frozenset` of the stopwords.
+    """
+    words = _LOADED.get(lang)
+    if words is not None:
+        return words
+
+    cache_path = os.path.join(cache_dir, "stopwords.{}.txt".format(lang)) if cache_dir else None
+    if cache_path and os.path.isfile(cache_path):
+        with open(cache_path, 'r', encoding="UTF-8") as cache_file:
+            words = frozenset(cache_file.read().split("\n")) - {""}
+    if not words:  # no cache file, or an empty one: load the list from NLTK
+        from nltk.corpus import stopwords  # Deferred: importing NLTK is slow and only needed on a cache miss.
+        words = frozenset(stopwords.words(lang))
+        if cache_path:
+            os.makedirs(cache_dir, exist_ok=True)
+            temp_path = "{}.{:d}.tmp".format(cache_path, os.getpid())
+            with open(temp_path, 'w', encoding="UTF-8") as cache_file:
+                cache_file.write("\n".join(sorted(words)))
+            os.replace(temp_path, cache_path)  # other processes read the whole list or none of it
+
+    _LOADED[lang] = words
+    return words
+
+
+class StopwordFilter:
+    """Removes stopwords from lists of tokens, or of token IDs from a `Vocabulary`.
+
+    Token lists are filtered by set membership. Token ID lists are filtered with a boolean mask indexed by ID
+    (a `bytearray` with a 1 for every stopword), precomputed over the vocabulary and only extended for IDs added
+    to the vocabulary since the mask was last used.
+
+    Attributes:
+        _words (frozenset): stopwords to remove.
+        _masks (WeakKeyDictionary[Vocabulary, bytearray]): stopword masks, keyed by the vocabulary they cover.
+
+    """
+    def __init__(self, words: frozenset = frozenset()) -> None:
+        self._words = frozenset(words)
+        self._masks: WeakKeyDictionary[Vocabulary, bytearray] = WeakKeyDictionary()
+
+    @classmethod
+    def from_config(cls, config: dict) -> StopwordFilter:
+        """Creates the filter described by a crawl config's `options`; empty (and NLTK-free) if it is disabled."""
+        options = config["options"]
+        if not options["remove_stopwords"]:
+            return cls()
+        return cls(load_stopwords(options["stopwords_lang"], options.get("stopwords_cache")))
+
+    @property
+    def words(self) -> frozenset:
+        return self._words
+
+    def __bool__(self) -> bool:
+        return bool(self._words)
+
+    def __len__(self) -> int:
+        return len(self._words)
+
+    def __contains__(self, token: object) -> bool:
+        return token in self._words
+
+    def filter(self, tokens: list[str]) -> list[str]:
+        """Returns a new list of `tokens` without the stopwords, in order; `tokens` itself is not modified."""
+        if not self._words:
+            return list(tokens)
+        words = self._words
+        return [token for token in tokens if token not in words]
+
+    def mask(self, vocab: Vocabulary) -> bytearray:
+        """Returns the stopword mask for `vocab`: `mask[token_id]` is 1 if the token is a stopword, else 0."""
+        mask = self._masks.get(vocab)
+        if mask is None:
+            mask = self._masks[vocab] = bytearray()
+        if len(mask) < len(vocab):
+            words = self._words
+            mask.extend(token in words for token in vocab.tokens[len(mask):])
+        return mask
+
+    def filter_ids(self, token_ids: list[int], vocab: Vocabulary) -> list[int]:
+        """Returns a new list of `token_ids` (from `vocab`) without the IDs of stopwords, in order."""
+        if not self._words:
+            return list(token_ids)
+        mask = self.mask(vocab)
+        return [token_id for token_id in token_ids if not mask[token_id]]
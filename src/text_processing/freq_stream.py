@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+"""Provides `TokenStream` and `StreamingTwoGramCounter` for counting two-grams of text as it is produced.
+"""
+
+from __future__ import annotations
+import re
+from collections import Counter
+from typing import TYPE_CHECKING
+from text_processing.freq_models import FrequencyTable
+from text_processing.freq_utils import order_frequencies
+from text_processing.freq_stopwords import StopwordFilter
+
+if TYPE_CHECKING:
+    from text_processing.freq_spill import ExternalFrequencies
+
+__author__ = "Garrett Buchanan, Livingstone Rwagatare"
+__copyright__ = "Copyright 2023, Westmont College"
+__credits__ = ["Garrett Buchanan", "Livingstone Rwagatare",
+               "Donald J. Patterson", "Mike Ryu", ]
+__license__ = "MIT"
+__email__ = "mryu@westmont.edu"
+
+TOKEN_PATTERN = re.compile(r"[\w']+")  # Same token definition as `tokenize_file`.
+
+
+class TokenStream:
+    """Tokenizes text fragments exactly as `tokenize_file` would tokenize them written back to back into one file.
+
+    Fragments are not separated from each other: a token cut in two by a fragment boundary (e.g., a document that
+    ends in a word followed by one that starts with a word) comes out as one token, just like it would from the
+    concatenated text. To get this right without holding on to the whole text, `feed` only tokenizes up to the last
+    whitespace character seen so far and carries the rest over into the next call. Whitespace can neither be part of
+    a token nor affect how its neighbors are lowercased, so the tokens are identical to `tokenize_file`'s.
+
+    Attributes:
+        _carry (str): trailing text since the last whitespace character, not yet tokenized.
+
+    """
+    def __init__(self) -> None:
+        self._carry = ""
+
+    def feed(self, text: str) -> list[str]:
+        """Adds `text` to the stream and returns the tokens that are now complete, in order."""
+        text = self._carry + text
+        cut = max(text.rfind(" "), text.rfind("\n")) + 1
+        self._carry = text[cut:]
+        return TOKEN_PATTERN.findall(text[:cut].lower()) if cut else []
+
+    def flush(self) -> list[str]:
+        """Ends the stream and returns its last tokens (the ones held back by `feed`)."""
+        text, self._carry = self._carry, ""
+        return TOKEN_PATTERN.findall(text.lower())
+
+
+class StreamingTwoGramCounter:
+    """Writable sink that tokenizes, filters, and counts the two-grams of everything written to it right away.
+
+    This fuses `tokenize_file`, stopword removal, and `compute_twogram_freq` into a single pass over the text, so
+    that the text (and its token lists) never have to be held in memory; only the counts (and at most the few tokens
+    carried over by the `TokenStream`) are. It can be passed wherever a text stream is written to, e.g., as the
+    document stream of `orb_runner.run_sequential_crawl`, and produces the same rows as
+    `compute_twogram_freq(remove_stopwords(tokenize_file(stream)))` would over the text written to it.
+
+    Attributes:
+        _tokens (TokenStream): tokenizer carrying partial tokens across writes.
+        _stopwords (StopwordFilter | None): filter for the tokens to drop before counting.
+        _prev (str | None): last token counted, paired with the first token of the next write.
+        _counts (Counter | ExternalFrequencyCounter): two-gram counts keyed by `(object1, object2)` tuples;
+            an `ExternalFrequencyCounter` if a spill budget was given.
+
+    """
+    def __init__(self, stopwords: StopwordFilter = None, budget: int = None, temp_dir: str = None,
+                 compress: bool = False) -> None:
+        self._tokens = TokenStream()
+        self._stopwords = stopwords
+        self._prev: str | None = None
+        self._total = 0
+        if budget is None:
+            self._counts = Counter()
+        else:
+            from text_processing.freq_spill import ExternalFrequencyCounter  # only imported if spilling is enabled
+            self._counts = ExternalFrequencyCounter(budget, temp_dir, compress, pairs=True)
+
+    def write(self, text: str) -> int:
+        """Counts the two-grams completed by `text`; returns the number of characters written, like `TextIO`."""
+        self._count(self._tokens.feed(text))
+        return len(text)
+
+    def finish(self) -> FrequencyTable | ExternalFrequencies:
+        """Counts the last pending tokens and returns the two-gram frequencies of everything written."""
+        self._count(self._tokens.flush())
+        self._prev = None
+        if not isinstance(self._counts, Counter):
+            return self._counts.finish()
+        twograms, counts = order_frequencies(self._counts)
+        return FrequencyTable(twograms, counts, self._total, pairs=True)
+
+    def _count(self, tokens: list[str]) -> None:
+        if self._stopwords:
+            tokens = self._stopwords.filter(tokens)
+        if not tokens:
+            return
+        if self._prev is not None:
+            tokens.insert(0, self._prev)
+        self._prev = tokens[-1]
+        self._total += len(tokens) - 1
+        self._counts.update(zip(tokens, tokens[1:]))
@@ -1,11 +1,16 @@
 #!/usr/bin/env python
-"""Provides utility methods `tokenize_file` and `print_frequencies` for text processing.
+"""Provides utility methods `tokenize_file`, `order_frequencies`, and `print_frequencies` for text processing.
 """
 
+from __future__ import annotations
 import sys
 import re
 from io import TextIOWrapper
-from text_processing.freq_models import Frequency
+from itertools import chain
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from text_processing.freq_models import Frequency, FrequencyTable
 
 __author__ = "Garrett Buchanan, Livingstone Rwagatare"
 __copyright__ = "Copyright 2023, Westmont College"
@@ -51,13 +56,54 @@ def tokenize_file(file_obj: TextIOWrapper) -> list:
         tokens.extend(re.findall(token_pattern, line)) 
     return tokens
 
-def print_frequencies(freqs: list[Frequency], out: TextIOWrapper) -> None:
+def order_frequencies(counts: dict) -> tuple[list, list[int]]:
+    """Orders the rows of a token-to-count mapping by decreasing count, with tied tokens sorted lexicographically.
+
+    Rather than comparison-sorting every row on a `(-count, token)` key, rows are bucketed by their count and
+    only the (few) distinct counts are sorted; each bucket is then sorted on the token itself. Tokens are expected
+    to be plain `str`s or tuples of `str`s (e.g., two-grams as `(object1, object2)`), so ties are resolved by
+    built-in comparisons instead of `TwoGram`'s rich comparison methods. Frequency distributions of natural text
+    are heavily skewed, so nearly all rows land in the buckets for the lowest few counts.
+
+    Args:
+        counts (dict): mapping of each unique token to the number of times it occurred. It will not be modified.
+
+    Returns:
+        A tuple of two parallel lists: the ordered tokens and their counts.
+
+    Example:
+        >>> order_frequencies({"this": 1, "sentence": 2, "repeats": 1})
+        (['sentence', 'repeats', 'this'], [2, 1, 1])
+    """
+    buckets = {}
+    for token, count in counts.items():
+        bucket = buckets.get(count)
+        if bucket is None:
+            buckets[count] = [token]
+        else:
+            bucket.append(token)
+
+    ordered_tokens = []
+    ordered_counts = []
+    for count in sorted(buckets, reverse=True):
+        bucket = buckets[count]
+        bucket.sort()
+        ordered_tokens.extend(bucket)
+        ordered_counts.extend([count] * len(bucket))
+    return ordered_tokens, ordered_counts
+
+
+def print_frequencies(freqs: list[Frequency] | FrequencyTable, out: TextIOWrapper) -> None:
     """Takes a list of `Frequency`s and outputs it to the stream passed in via the `out` argument.
 
     Also prints out the total number of items, and the total number of unique items.
 
+    A `FrequencyTable` (or the disk-backed `ExternalFrequencies` from `freq_spill`) is written straight from its
+    columns: its precomputed total and length are used for the header, and the whole output is handed to `out`
+    in a single `writelines` call.
+
     Args:
-        freqs (list[Frequency]): a list of `Frequencies`s
+        freqs (list[Frequency] | FrequencyTable): a list of `Frequencies`s, or a `FrequencyTable`
         out (TextIOWrapper): output stream to print to.
 
     Example:
@@ -88,19 +134,21 @@ def print_frequencies(freqs: list[Frequency], out: TextIOWrapper) -> None:
              1 think you
              3 you know
     """
-    
-    total_items = 0
-    for freq in freqs:
-        total_items += freq.freq
-            
-    unique_items = len(set(freqs))
-     
-    # Print out total and unique items  
-    out.write(f"{total_items:>6} total items\n")
-    out.write(f"{unique_items:>6} unique items\n\n")
-    
-    for freq in freqs:
-        out.write("{:6d} {}\n".format(freq.freq, freq.token))
+    if hasattr(freqs, "lines"):  # a `FrequencyTable` or `ExternalFrequencies`
+        # Rows in a table are unique tokens already, so no set needs to be built to count them
+        total_items = freqs.total
+        unique_items = len(freqs)
+        lines = freqs.lines()
+    else:
+        total_items = 0
+        for freq in freqs:
+            total_items += freq.freq
+        unique_items = len(set(freqs))
+        lines = ("{:6d} {}\n".format(freq.freq, freq.token) for freq in freqs)
+
+    # Print out total and unique items, followed by every row
+    header = f"{total_items:>6} total items\n{unique_items:>6} unique items\n\n"
+    out.writelines(chain((header,), lines))
     try:      
         pass
     except IOError as e:  # Leave this `except` block as-is.